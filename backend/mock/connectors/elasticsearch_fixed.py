@@ -122,6 +122,8 @@ class MockElasticsearchConnector:
         
         # Get appropriate mock data based on index (unlimited if size is None)
         mock_events = self._get_mock_data_for_index(index, size)
+        if size is not None:
+            mock_events = mock_events[:size]
         
         # Convert mock events to Elasticsearch format
         hits = []
@@ -157,6 +159,13 @@ class MockElasticsearchConnector:
         
         return response
     
+    def count(self, index: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Mock _count: number of documents a search on the index would match"""
+        return {
+            "count": len(self._get_mock_data_for_index(index, None)),
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0}
+        }
+    
     def _get_mock_data_for_index(self, index: str, limit: Optional[int]) -> List[Any]:
         """Get appropriate mock data based on index name"""
         
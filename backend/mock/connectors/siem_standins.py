@@ -0,0 +1,252 @@
+"""
+Local SIEM Stand-in Servers
+Minimal HTTP stand-ins for the Splunk REST, QRadar Ariel and Log Analytics
+APIs so the enterprise connectors can be exercised and benchmarked offline.
+
+Run ``python -m mock.connectors.siem_standins`` from ``backend/`` to start
+all three servers and benchmark paged fetching against them.
+"""
+
+import re
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Tuple
+
+from aiohttp import web
+
+
+def generate_events(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate deterministic security events shared by all stand-ins"""
+    rng = random.Random(seed)
+    start = datetime(2025, 10, 12)
+    users = ["alice", "bob", "carol", "dave", "svc_backup", "administrator"]
+    hosts = ["WS-001", "WS-002", "SRV-DC01", "SRV-WEB01", "SRV-DB01"]
+    events = []
+    for i in range(count):
+        events.append({
+            "timestamp": (start + timedelta(seconds=i)).isoformat() + "Z",
+            "event_id": rng.choice([4624, 4625, 4688, 4720, 5156]),
+            "severity": rng.choice(["low", "medium", "high", "critical"]),
+            "src_ip": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            "dest_ip": f"192.168.{rng.randint(0, 10)}.{rng.randint(1, 254)}",
+            "user": rng.choice(users),
+            "host": rng.choice(hosts),
+            "message": f"Synthetic security event {i}"
+        })
+    return events
+
+
+class SplunkStandIn:
+    """Splunk REST search API: jobs, job status and offset/count results"""
+
+    def __init__(self, events: List[Dict[str, Any]], latency: float = 0.0):
+        self.events = events
+        self.latency = latency
+        self.jobs: Dict[str, int] = {}
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/services/search/jobs", self.create_job)
+        app.router.add_get("/services/search/jobs/{sid}", self.job_status)
+        app.router.add_get("/services/search/jobs/{sid}/results", self.job_results)
+        return app
+
+    async def create_job(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        sid = uuid.uuid4().hex
+        self.jobs[sid] = min(len(self.events), int(form.get("max_count", len(self.events))))
+        return web.json_response({"sid": sid}, status=201)
+
+    async def job_status(self, request: web.Request) -> web.Response:
+        result_count = self.jobs.get(request.match_info["sid"])
+        if result_count is None:
+            return web.json_response({"messages": [{"type": "ERROR"}]}, status=404)
+        return web.json_response({"entry": [{"content": {
+            "isDone": True, "dispatchState": "DONE", "resultCount": result_count
+        }}]})
+
+    async def job_results(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        result_count = self.jobs.get(request.match_info["sid"], 0)
+        offset = int(request.query.get("offset", 0))
+        count = int(request.query.get("count", 100))
+        end = min(offset + count, result_count)
+        return web.json_response({"results": self.events[offset:end]})
+
+
+class QRadarStandIn:
+    """QRadar Ariel API: searches, status polling and Range-header results"""
+
+    def __init__(self, events: List[Dict[str, Any]], latency: float = 0.0):
+        self.latency = latency
+        self.events = [
+            {
+                "starttime": event["timestamp"],
+                "qid": event["event_id"],
+                "sourceip": event["src_ip"],
+                "destinationip": event["dest_ip"],
+                "username": event["user"],
+                "magnitude": event["severity"]
+            }
+            for event in events
+        ]
+        self.searches: Dict[str, int] = {}
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/system/about", self.about)
+        app.router.add_post("/api/ariel/searches", self.create_search)
+        app.router.add_get("/api/ariel/searches/{search_id}", self.search_status)
+        app.router.add_get("/api/ariel/searches/{search_id}/results", self.search_results)
+        return app
+
+    async def about(self, request: web.Request) -> web.Response:
+        return web.json_response({"release_name": "stand-in"})
+
+    async def create_search(self, request: web.Request) -> web.Response:
+        search_id = uuid.uuid4().hex
+        self.searches[search_id] = len(self.events)
+        return web.json_response({"search_id": search_id, "status": "WAIT"}, status=201)
+
+    async def search_status(self, request: web.Request) -> web.Response:
+        search_id = request.match_info["search_id"]
+        return web.json_response({
+            "search_id": search_id,
+            "status": "COMPLETED",
+            "record_count": self.searches.get(search_id, 0)
+        })
+
+    async def search_results(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        record_count = self.searches.get(request.match_info["search_id"], 0)
+        match = re.match(r"items=(\d+)-(\d+)", request.headers.get("Range", ""))
+        if not match:
+            return web.json_response({"events": self.events[:record_count]})
+        start, end = int(match.group(1)), min(int(match.group(2)) + 1, record_count)
+        return web.json_response({"events": self.events[start:end]}, status=206)
+
+
+class LogAnalyticsStandIn:
+    """Log Analytics query API understanding ``count`` and row_number windows"""
+
+    WINDOW_PATTERN = re.compile(r"between \((\d+) \.\. (\d+)\)")
+
+    def __init__(self, events: List[Dict[str, Any]], latency: float = 0.0):
+        self.latency = latency
+        self.columns = ["TimeGenerated", "EventID", "Level", "SourceIP", "DestinationIP", "Account", "Computer"]
+        self.rows = [
+            [event["timestamp"], event["event_id"], event["severity"], event["src_ip"],
+             event["dest_ip"], event["user"], event["host"]]
+            for event in events
+        ]
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/workspaces/{workspace_id}/query", self.query)
+        return app
+
+    async def query(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        kql = (await request.json()).get("query", "")
+        if kql.rstrip().endswith("| count"):
+            return self._table(["Count"], [[len(self.rows)]])
+
+        match = self.WINDOW_PATTERN.search(kql)
+        if match:
+            rows = self.rows[int(match.group(1)) - 1:int(match.group(2))]
+        else:
+            take = re.search(r"\| take (\d+)", kql)
+            rows = self.rows[:int(take.group(1))] if take else self.rows
+        return self._table(self.columns, rows)
+
+    def _table(self, columns: List[str], rows: List[List[Any]]) -> web.Response:
+        return web.json_response({"tables": [{
+            "name": "PrimaryResult",
+            "columns": [{"name": name, "type": "string"} for name in columns],
+            "rows": rows
+        }]})
+
+
+async def start_standins(
+    event_count: int = 100000,
+    host: str = "127.0.0.1",
+    latency: float = 0.0
+) -> Tuple[List[web.AppRunner], Dict[str, int]]:
+    """Start all stand-ins on free ports and return their runners and ports"""
+    events = generate_events(event_count)
+    apps = {
+        "splunk": SplunkStandIn(events, latency).build_app(),
+        "qradar": QRadarStandIn(events, latency).build_app(),
+        "azure_sentinel": LogAnalyticsStandIn(events, latency).build_app()
+    }
+    runners, ports = [], {}
+    for platform, app in apps.items():
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, 0)
+        await site.start()
+        runners.append(runner)
+        ports[platform] = site._server.sockets[0].getsockname()[1]
+    return runners, ports
+
+
+async def benchmark(
+    event_count: int,
+    page_size: int,
+    concurrency: int,
+    latency: float = 0.0
+) -> Dict[str, Dict[str, float]]:
+    """Stream every stand-in's full result set and report throughput"""
+    from src.connectors.enterprise_siem import SIEMConfig, create_siem_connector
+
+    runners, ports = await start_standins(event_count, latency=latency)
+    results = {}
+    try:
+        for platform, port in ports.items():
+            config = SIEMConfig(
+                host="127.0.0.1", port=port, scheme="http", ssl_verify=False,
+                username="admin", password="changeme", sec_token="stand-in", token="stand-in",
+                workspace_id="stand-in", max_results=event_count, page_size=page_size,
+                page_concurrency=concurrency, poll_interval=0.01, timeout=300
+            )
+            connector = create_siem_connector(platform, config)
+            if platform != "splunk":
+                await connector.connect()
+
+            started = time.perf_counter()
+            fetched = 0
+            async for page in connector.iter_pages({"query": {"bool": {"must": []}}}):
+                fetched += len(page)
+            elapsed = time.perf_counter() - started
+            await connector.disconnect()
+
+            results[platform] = {
+                "events": fetched,
+                "seconds": round(elapsed, 3),
+                "events_per_second": round(fetched / elapsed, 1) if elapsed else 0.0
+            }
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark paged SIEM connectors against local stand-ins")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated per-request server latency")
+    args = parser.parse_args()
+
+    results = asyncio.run(benchmark(args.events, args.page_size, args.concurrency, args.latency_ms / 1000))
+    for platform, stats in results.items():
+        print(f"{platform:15s} {stats['events']:>9d} events  {stats['seconds']:>8.3f}s  {stats['events_per_second']:>12.1f} ev/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ Main FastAPI application combining all backend services
 
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 import os
@@ -24,6 +24,8 @@ from .routes.platform_events import router as platform_events_router
 from .routes.investigations import router as investigations_router
 from .middleware.rate_limit import RateLimitMiddleware
 from .middleware.logging import LoggingMiddleware
+from ..core.monitoring.metrics import OPENMETRICS_CONTENT_TYPE, get_registry
+from ..core.monitoring.tracing import get_tracer
 
 # Configure logging
 logging.basicConfig(
@@ -54,18 +56,18 @@ async def lifespan(app: FastAPI):
         from src.core.context.manager import ContextManager
         from src.core.nlp.schema_mapper import SchemaMapper
         
+        # Import settings for centralized configuration
+        from src.core.config import settings
+        from src.connectors.multi_source_manager import MultiSourceManager
+        
         # Initialize components
         logger.info("Initializing core components...")
         
         # Initialize pipeline
-        app_state["pipeline"] = ConversationalPipeline()
+        app_state["pipeline"] = ConversationalPipeline(ai_timeout=settings.ai_timeout)
         await app_state["pipeline"].initialize()
         logger.info("✅ Pipeline initialized")
         
-        # Import settings for centralized configuration
-        from src.core.config import settings
-        from src.connectors.multi_source_manager import MultiSourceManager
-        
         # Choose initialization strategy based on configuration
         should_use_multi = settings.should_use_multi_source()
         data_source_mode = settings.get_effective_mode()
@@ -201,6 +203,13 @@ async def lifespan(app: FastAPI):
                 
                 app_state["siem_connector"] = fallback_connector
         
+        # Share the startup connectors through the process-wide registry
+        from src.connectors.registry import get_connector_registry
+        if app_state["multi_source_manager"]:
+            get_connector_registry().adopt(
+                "multi_source", {"environment": settings.environment}, app_state["multi_source_manager"]
+            )
+        
         # Initialize context manager
         app_state["context_manager"] = ContextManager()
         logger.info("✅ Context manager initialized")
@@ -216,6 +225,14 @@ async def lifespan(app: FastAPI):
             from src.core.caching.redis_manager import redis_manager
             await redis_manager.initialize()
             app_state["redis_manager"] = redis_manager
+            if redis_manager.redis is not None and os.getenv("CONTEXT_WRITE_THROUGH", "true").lower() == "true":
+                app_state["context_manager"].attach_redis(
+                    redis_manager.redis, f"{redis_manager.prefixes['context']}state:"
+                )
+            if redis_manager.redis is not None:
+                # Rate limits become shared across workers instead of per-process
+                from src.core.security.rate_limiting import get_rate_limiter
+                get_rate_limiter().attach_redis(redis_manager.redis, "kartavya:ratelimit:")
             if redis_manager.connected:
                 logger.info("✅ Redis caching enabled")
             else:
@@ -268,6 +285,10 @@ async def lifespan(app: FastAPI):
             await app_state["siem_connector"].disconnect()
     if app_state.get("redis_manager"):
         await app_state["redis_manager"].disconnect()
+    from src.connectors.registry import get_connector_registry
+    await get_connector_registry().close_all()
+    # Write out buffered spans (file exporter)
+    get_tracer().shutdown()
 
 # Create FastAPI app with simple configuration
 app = FastAPI(
@@ -344,6 +365,7 @@ async def root():
         "endpoints": {
             "docs": "/api/docs",
             "health": "/health",
+            "metrics": "/metrics",
             "chat": "/api/assistant/chat"
         }
     }
@@ -386,6 +408,12 @@ async def ping():
     """Simple ping endpoint"""
     return {"status": "pong", "timestamp": datetime.now().isoformat()}
 
+# Metrics scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Counters, gauges and histograms from every component, in OpenMetrics text format"""
+    return PlainTextResponse(get_registry().render_openmetrics(), media_type=OPENMETRICS_CONTENT_TYPE)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
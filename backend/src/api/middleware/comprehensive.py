@@ -22,6 +22,8 @@ from pydantic import BaseModel, ValidationError
 import redis
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from ...core.security.rate_limiting import RateLimit, RateLimiter, get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -187,13 +189,19 @@ class SecurityMiddleware(BaseHTTPMiddleware):
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Advanced rate limiting middleware with Redis backend"""
+    """Per-endpoint minute/hour/day limits on the shared GCRA rate limiter"""
     
     def __init__(self, app, redis_client=None, config: Optional[RateLimitConfig] = None):
         super().__init__(app)
-        self.redis_client = redis_client
         self.config = config or RateLimitConfig()
-        self.local_cache = {}  # Fallback for when Redis is unavailable
+        # An async Redis client gives this middleware its own shared limiter;
+        # otherwise it uses the process-wide one (Redis-backed once attached at startup)
+        self.limiter = RateLimiter(redis_client) if redis_client is not None else get_rate_limiter()
+        self.rules = (
+            RateLimit(self.config.requests_per_minute, 60, burst=min(self.config.burst_limit, self.config.requests_per_minute) or None),
+            RateLimit(self.config.requests_per_hour, 3600),
+            RateLimit(self.config.requests_per_day, 86400),
+        )
         
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """Apply rate limiting"""
@@ -201,128 +209,26 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             client_ip = self._get_client_ip(request)
             endpoint = str(request.url.path)
             
-            # Check rate limits
-            is_allowed, reset_time = await self._check_rate_limits(client_ip, endpoint)
-            
-            if not is_allowed:
-                return self._create_rate_limit_response(reset_time)
-            
-            # Process request
-            response = await call_next(request)
-            
-            # Add rate limit headers
-            remaining = await self._get_remaining_requests(client_ip, endpoint)
-            response.headers["X-RateLimit-Limit"] = str(self.config.requests_per_minute)
-            response.headers["X-RateLimit-Remaining"] = str(remaining)
-            response.headers["X-RateLimit-Reset"] = str(reset_time)
-            
-            return response
-            
+            # One atomic check across all three windows
+            result = await self.limiter.hit(f"{client_ip}:{endpoint}", *self.rules)
         except Exception as e:
             logger.error(f"Rate limiting error: {e}")
             # Continue processing if rate limiting fails
             return await call_next(request)
-    
-    async def _check_rate_limits(self, client_ip: str, endpoint: str) -> tuple[bool, int]:
-        """Check if request is within rate limits"""
-        current_time = int(time.time())
         
-        # Create keys for different time windows
-        minute_key = f"rate_limit:{client_ip}:{endpoint}:minute:{current_time // 60}"
-        hour_key = f"rate_limit:{client_ip}:{endpoint}:hour:{current_time // 3600}"
-        day_key = f"rate_limit:{client_ip}:{endpoint}:day:{current_time // 86400}"
-        
-        if self.redis_client:
-            try:
-                # Check and increment counters atomically
-                pipe = self.redis_client.pipeline()
-                pipe.incr(minute_key, 1)
-                pipe.expire(minute_key, 60)
-                pipe.incr(hour_key, 1)
-                pipe.expire(hour_key, 3600)
-                pipe.incr(day_key, 1)
-                pipe.expire(day_key, 86400)
-                results = pipe.execute()
-                
-                minute_count = results[0]
-                hour_count = results[2]
-                day_count = results[4]
-                
-            except Exception as e:
-                logger.warning(f"Redis rate limiting failed, using local cache: {e}")
-                return await self._check_local_rate_limits(client_ip, endpoint, current_time)
-        else:
-            return await self._check_local_rate_limits(client_ip, endpoint, current_time)
-        
-        # Check limits
-        if minute_count > self.config.requests_per_minute:
-            return False, (current_time // 60 + 1) * 60
-        if hour_count > self.config.requests_per_hour:
-            return False, (current_time // 3600 + 1) * 3600
-        if day_count > self.config.requests_per_day:
-            return False, (current_time // 86400 + 1) * 86400
-        
-        return True, (current_time // 60 + 1) * 60
-    
-    async def _check_local_rate_limits(self, client_ip: str, endpoint: str, current_time: int) -> tuple[bool, int]:
-        """Fallback rate limiting using local cache"""
-        key = f"{client_ip}:{endpoint}"
-        
-        if key not in self.local_cache:
-            self.local_cache[key] = {
-                "minute": {"count": 0, "window": current_time // 60},
-                "hour": {"count": 0, "window": current_time // 3600},
-                "day": {"count": 0, "window": current_time // 86400}
-            }
-        
-        cache_entry = self.local_cache[key]
-        
-        # Reset counters if windows have passed
-        minute_window = current_time // 60
-        if cache_entry["minute"]["window"] < minute_window:
-            cache_entry["minute"] = {"count": 0, "window": minute_window}
-        
-        hour_window = current_time // 3600
-        if cache_entry["hour"]["window"] < hour_window:
-            cache_entry["hour"] = {"count": 0, "window": hour_window}
-        
-        day_window = current_time // 86400
-        if cache_entry["day"]["window"] < day_window:
-            cache_entry["day"] = {"count": 0, "window": day_window}
-        
-        # Check limits
-        if cache_entry["minute"]["count"] >= self.config.requests_per_minute:
-            return False, (minute_window + 1) * 60
-        if cache_entry["hour"]["count"] >= self.config.requests_per_hour:
-            return False, (hour_window + 1) * 3600
-        if cache_entry["day"]["count"] >= self.config.requests_per_day:
-            return False, (day_window + 1) * 86400
-        
-        # Increment counters
-        cache_entry["minute"]["count"] += 1
-        cache_entry["hour"]["count"] += 1
-        cache_entry["day"]["count"] += 1
-        
-        return True, (minute_window + 1) * 60
-    
-    async def _get_remaining_requests(self, client_ip: str, endpoint: str) -> int:
-        """Get remaining requests for current minute"""
-        current_time = int(time.time())
-        minute_key = f"rate_limit:{client_ip}:{endpoint}:minute:{current_time // 60}"
+        reset_time = int(time.time() + (result.retry_after if not result.allowed else result.reset_after))
+        if not result.allowed:
+            return self._create_rate_limit_response(reset_time)
         
-        if self.redis_client:
-            try:
-                current_count = self.redis_client.get(minute_key) or 0
-                return max(0, self.config.requests_per_minute - int(current_count))
-            except:
-                pass
+        # Process request
+        response = await call_next(request)
         
-        # Fallback to local cache
-        key = f"{client_ip}:{endpoint}"
-        if key in self.local_cache:
-            return max(0, self.config.requests_per_minute - self.local_cache[key]["minute"]["count"])
+        # Add rate limit headers
+        response.headers["X-RateLimit-Limit"] = str(result.limit)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+        response.headers["X-RateLimit-Reset"] = str(reset_time)
         
-        return self.config.requests_per_minute
+        return response
     
     def _get_client_ip(self, request: Request) -> str:
         """Extract client IP address"""
@@ -9,16 +9,37 @@ from typing import Callable, Optional
 from fastapi import Request, Response
 from fastapi.routing import APIRoute
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Match
 
 from ...core.monitoring.performance_profiler import (
     performance_profiler, 
     QueryType, 
     PerformanceProfiler
 )
+from ...core.monitoring.sampling_profiler import get_sampling_profiler, sampling_enabled
+from ...core.monitoring.tracing import SERVER, extract, tracer
+from ...core.resilience.concurrency import get_backend_guards
+from ...core.security.rate_limiting import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Label for requests no route matches (404 scans), so raw paths never become label values
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_template(request: Request) -> str:
+    """Path template of the route serving the request, e.g. ``/api/v1/sessions/{session_id}``"""
+    route = request.scope.get("route")
+    if route is None:
+        # Routing runs after the middleware, so match the app's routes up front
+        for candidate in getattr(request.app, "routes", []):
+            match, _ = candidate.matches(request.scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
 
 class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
     """Middleware to automatically monitor API endpoint performance"""
@@ -40,7 +61,7 @@ class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
         
         # Generate request ID
         request_id = f"{request.method}_{request.url.path}_{int(time.time() * 1000)}"
-        endpoint = f"{request.method} {request.url.path}"
+        endpoint = f"{request.method} {route_template(request)}"
         
         # Extract metadata
         metadata = {
@@ -52,24 +73,33 @@ class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
             "content_length": request.headers.get("content-length")
         }
         
-        # Profile the request
-        async with self.profiler.profile_request(
-            query_type=QueryType.API_ENDPOINT,
-            endpoint=endpoint,
-            query_id=request_id,
-            metadata=metadata
-        ):
-            response = await call_next(request)
-            
-            # Add response metadata
-            metadata.update({
-                "response_status": response.status_code,
-                "response_size": response.headers.get("content-length")
-            })
+        # Profile the request, continuing the caller's trace if it sent a traceparent header
+        with tracer.start_span(
+            endpoint, {"http.method": request.method, "http.target": request.url.path},
+            parent=extract(request.headers), kind=SERVER
+        ) as span:
+            async with self.profiler.profile_request(
+                query_type=QueryType.API_ENDPOINT,
+                endpoint=endpoint,
+                query_id=request_id,
+                metadata=metadata
+            ):
+                # Attributes CPU samples to this endpoint while the sampling profiler runs
+                with get_sampling_profiler().request(endpoint):
+                    response = await call_next(request)
+                
+                # Add response metadata
+                metadata.update({
+                    "response_status": response.status_code,
+                    "response_size": response.headers.get("content-length")
+                })
+            span.set_attribute("http.status_code", response.status_code)
         
         # Add performance headers
         if hasattr(response, 'headers'):
             response.headers["X-Request-ID"] = request_id
+            if span.context is not None:
+                response.headers["traceparent"] = span.context.traceparent()
         
         return response
 
@@ -252,6 +282,148 @@ async def reset_performance_stats(request: Request) -> JSONResponse:
         )
 
 
+async def get_prometheus_metrics(request: Request) -> Response:
+    """Latency histograms in Prometheus text exposition format"""
+    try:
+        return PlainTextResponse(
+            performance_profiler.export_prometheus(),
+            media_type="text/plain; version=0.0.4"
+        )
+    except Exception as e:
+        logger.error(f"Error exporting Prometheus metrics: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Failed to export metrics", "details": str(e)}
+        )
+
+
+async def get_rate_limit_stats(request: Request) -> JSONResponse:
+    """Get rate limiter decisions, backend in use and Redis fallbacks"""
+    try:
+        return JSONResponse(content=get_rate_limiter().get_stats())
+    except Exception as e:
+        logger.error(f"Error getting rate limit stats: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Failed to get rate limit stats", "details": str(e)}
+        )
+
+
+async def get_resilience_stats(request: Request) -> JSONResponse:
+    """Breaker state, window rates and adaptive concurrency limit per backend"""
+    try:
+        return JSONResponse(content={
+            name: guard.get_stats() for name, guard in get_backend_guards().items()
+        })
+    except Exception as e:
+        logger.error(f"Error getting resilience stats: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Failed to get resilience stats", "details": str(e)}
+        )
+
+
+async def get_recent_traces(request: Request) -> JSONResponse:
+    """Newest traces held by the in-memory span exporter"""
+    try:
+        limit = int(request.query_params.get("limit", 20))
+        traces = tracer.memory.recent_traces(limit) if tracer.memory else []
+        return JSONResponse(content={"tracing": tracer.get_stats(), "traces": traces})
+    except Exception as e:
+        logger.error(f"Error getting traces: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Failed to get traces", "details": str(e)}
+        )
+
+
+async def get_trace_details(request: Request) -> JSONResponse:
+    """Every span of one trace with its offset and duration"""
+    try:
+        if not tracer.memory:
+            return JSONResponse(status_code=404, content={"error": "In-memory span exporter is not enabled"})
+        trace = tracer.memory.get_trace(request.path_params["trace_id"])
+        if not trace["spans"]:
+            return JSONResponse(status_code=404, content={"error": "Trace not found"})
+        return JSONResponse(content=trace)
+    except Exception as e:
+        logger.error(f"Error getting trace details: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Failed to get trace details", "details": str(e)}
+        )
+
+
+def _float_param(request: Request, name: str) -> Optional[float]:
+    value = request.query_params.get(name)
+    return float(value) if value else None
+
+
+async def start_sampling_profiler(request: Request) -> JSONResponse:
+    """Start the sampling profiler (?interval=seconds&duration=seconds); needs SAMPLING_PROFILER_ENABLED"""
+    if not sampling_enabled():
+        return JSONResponse(
+            status_code=403,
+            content={"error": "Sampling profiler is disabled; set SAMPLING_PROFILER_ENABLED=true"}
+        )
+    try:
+        interval = _float_param(request, "interval")
+        if interval is not None and not 0.001 <= interval <= 1.0:
+            return JSONResponse(status_code=400, content={"error": "interval must be between 0.001 and 1 second"})
+        profiler = get_sampling_profiler()
+        started = profiler.start(interval=interval, duration=_float_param(request, "duration"))
+        return JSONResponse(content={"started": started, "profiler": profiler.get_stats()})
+    except Exception as e:
+        logger.error(f"Error starting sampling profiler: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Failed to start sampling profiler", "details": str(e)}
+        )
+
+
+async def stop_sampling_profiler(request: Request) -> JSONResponse:
+    """Stop the sampling profiler; collected windows stay available"""
+    profiler = get_sampling_profiler()
+    return JSONResponse(content={"stopped": profiler.stop(), "profiler": profiler.get_stats()})
+
+
+async def get_sampling_profile(request: Request) -> JSONResponse:
+    """Samples per endpoint and the hottest functions (?seconds=&endpoint=&limit=)"""
+    try:
+        profiler = get_sampling_profiler()
+        seconds = _float_param(request, "seconds")
+        endpoint = request.query_params.get("endpoint")
+        return JSONResponse(content={
+            "profiler": profiler.get_stats(),
+            "endpoints": profiler.endpoints(seconds),
+            "top_functions": profiler.top_functions(
+                seconds, int(request.query_params.get("limit", 20)), endpoint
+            )
+        })
+    except Exception as e:
+        logger.error(f"Error getting sampling profile: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Failed to get sampling profile", "details": str(e)}
+        )
+
+
+async def get_collapsed_stacks(request: Request) -> Response:
+    """Collapsed stacks for flamegraph tools (?seconds=&by_endpoint=true&endpoint=)"""
+    try:
+        return PlainTextResponse(get_sampling_profiler().collapsed(
+            seconds=_float_param(request, "seconds"),
+            by_endpoint=request.query_params.get("by_endpoint", "false").lower() == "true",
+            endpoint=request.query_params.get("endpoint")
+        ))
+    except Exception as e:
+        logger.error(f"Error exporting collapsed stacks: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Failed to export collapsed stacks", "details": str(e)}
+        )
+
+
 # Helper function to add performance monitoring routes
 def add_performance_routes(app, prefix: str = "/api/v1/performance"):
     """Add performance monitoring routes to FastAPI app"""
@@ -264,6 +436,15 @@ def add_performance_routes(app, prefix: str = "/api/v1/performance"):
     router.add_api_route("/endpoint/{endpoint:path}", get_endpoint_details, methods=["GET"])
     router.add_api_route("/alerts", get_performance_alerts, methods=["GET"])
     router.add_api_route("/reset", reset_performance_stats, methods=["POST"])
+    router.add_api_route("/rate-limits", get_rate_limit_stats, methods=["GET"])
+    router.add_api_route("/resilience", get_resilience_stats, methods=["GET"])
+    router.add_api_route("/prometheus", get_prometheus_metrics, methods=["GET"])
+    router.add_api_route("/traces", get_recent_traces, methods=["GET"])
+    router.add_api_route("/traces/{trace_id}", get_trace_details, methods=["GET"])
+    router.add_api_route("/profiler", get_sampling_profile, methods=["GET"])
+    router.add_api_route("/profiler/start", start_sampling_profiler, methods=["POST"])
+    router.add_api_route("/profiler/stop", stop_sampling_profiler, methods=["POST"])
+    router.add_api_route("/profiler/collapsed", get_collapsed_stacks, methods=["GET"])
     
     app.include_router(router)
     logger.info(f"Performance monitoring routes added with prefix: {prefix}")
@@ -4,6 +4,7 @@ Handles chat and conversation endpoints for the NLP assistant
 """
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
 from datetime import datetime
@@ -21,6 +22,9 @@ from ...types.visual_responses import (
 # Import Redis caching
 from ...core.caching.redis_manager import get_redis_manager
 
+# Incremental responses
+from ...core.streaming.responses import sse_event, stream_assistant_response
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -253,9 +257,10 @@ async def chat(
                 error=validation_error
             )
         
-        # Execute query
-        search_results = await siem_connector.execute_query(
-            query=siem_query,
+        # Execute query with a pre-flight size check (sample/aggregate rather than truncate)
+        search_results, fetch_plan = await pipeline.fetch_results(
+            siem_connector,
+            siem_query,
             size=request.limit
         )
         
@@ -339,6 +344,7 @@ async def chat(
                 "processing_time": result.get("processing_time", 0),
                 "total_results": len(formatted_results),
                 "returned_results": min(len(formatted_results), request.limit),
+                "fetch_plan": fetch_plan.as_dict(),
                 "cache_hit": False,
                 "ai_enhancements": result.get("ai_enhancements", {}),  # Include AI improvements
                 "processed_query": result.get("processed_query", request.query)  # Show enhanced query
@@ -397,6 +403,53 @@ async def chat(
             error=str(e)
         )
 
+@router.post("/stream")
+async def stream_chat(request: ChatRequest):
+    """
+    Server-sent events version of /chat
+    
+    Emits status, intent, visual cards and result pages as soon as each is ready,
+    then the summary as ``token`` events, and finally a ``done`` event.
+    """
+    from ..main import get_pipeline, get_context_manager, get_siem_connector
+    
+    pipeline = get_pipeline()
+    context_manager = get_context_manager()
+    siem_connector = get_siem_connector()  # Can be None in offline mode
+    conversation_id = request.conversation_id or f"conv_{uuid.uuid4().hex[:8]}"
+    context = await context_manager.get_context(conversation_id)
+    
+    async def events():
+        async for event in stream_assistant_response(
+            query=request.query,
+            pipeline=pipeline,
+            siem_connector=siem_connector,
+            context=context,
+            user_context={**(request.user_context or {}), "user_id": request.user_id,
+                          "conversation_id": conversation_id},
+            filters=request.filters,
+            size=request.limit
+        ):
+            if event["type"] == "done":
+                event["conversation_id"] = conversation_id
+                if event["status"] == "success":
+                    await context_manager.update_context(
+                        conversation_id=conversation_id,
+                        query=request.query,
+                        response={
+                            "intent": event["metadata"].get("intent"),
+                            "entities": event["metadata"].get("entities", []),
+                            "results_count": event["metadata"].get("results_count", 0)
+                        }
+                    )
+            yield sse_event(event)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/clarify")
 async def clarify(request: ClarificationRequest):
     """
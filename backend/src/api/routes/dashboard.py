@@ -4,7 +4,7 @@ Real security data from available data sources - NO MOCK DATA
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 from datetime import datetime, timedelta
 import asyncio
@@ -12,6 +12,9 @@ import asyncio
 from ...core.config import settings
 from ...core.database.clients import MongoDBClient, SupabaseClient
 from ...connectors.factory import get_available_platforms
+from ...core.nlp.time_parser import parse_time_expression
+from ...core.query.estimator import FETCH_SAMPLE, FETCH_SKIP, get_limit_negotiator
+from ...core.query.projection import VIEW_FIELDS
 from ...security.rbac import RBAC
 from ...security.auth_manager import AuthManager
 
@@ -67,9 +70,7 @@ async def get_dashboard_metrics(
         logger.info(f"🔍 Fetching dashboard metrics for time range: {time_range}")
         
         # Parse time range
-        hours = parse_time_range(time_range)
-        start_time = datetime.utcnow() - timedelta(hours=hours)
-        end_time = datetime.utcnow()
+        start_time, end_time = parse_time_range(time_range)
         
         # Get real metrics from datasets
         metrics = await get_real_security_metrics(start_time, end_time)
@@ -257,8 +258,7 @@ async def get_network_traffic(
     try:
         logger.info(f"🌐 Fetching network traffic data: {time_range}, limit: {limit}")
         
-        hours = parse_time_range(time_range)
-        start_time = datetime.utcnow() - timedelta(hours=hours)
+        start_time, _ = parse_time_range(time_range)
         
         # Get real network traffic from datasets
         traffic_data = await get_real_network_traffic(start_time, limit)
@@ -324,13 +324,26 @@ async def get_real_security_metrics(start_time: datetime, end_time: datetime) ->
         if not connector:
             raise Exception("No SIEM connector configured")
         
-        # Query ALL types of security events from ALL generators (UNLIMITED!)
-        security_events = await connector.query({
-            "query": {"match_all": {}}
-            # NO SIZE LIMIT - Get EVERYTHING available from ALL generators!
-        })
+        # Size the fetch first: everything if it fits the budget, a uniform sample otherwise
+        metrics_query = {"query": {"match_all": {}}}
+        plan = await get_limit_negotiator().negotiate(
+            connector, metrics_query,
+            key=(id(connector), "dashboard_metrics"),
+            allow_aggregation=False  # the calculators below need events, not buckets
+        )
+        
+        if plan.mode == FETCH_SKIP:
+            security_events = []
+        else:
+            security_events = await connector.query({
+                **metrics_query,
+                "size": plan.limit,
+                "sample": plan.mode == FETCH_SAMPLE,
+                # ...and only the fields the metric calculators below actually read
+                "fields": VIEW_FIELDS["dashboard_metrics"]
+            })
         
-        logger.info(f"📊 Retrieved {len(security_events)} LIVE security events from dynamic generators")
+        logger.info(f"📊 Retrieved {len(security_events)} LIVE security events from dynamic generators ({plan.mode}, rate={plan.sample_rate:.3f})")
         
         # Calculate REAL metrics from ACTUAL generated data from ALL generators
         total_threats = 0
@@ -412,10 +425,10 @@ async def get_real_security_metrics(start_time: datetime, end_time: datetime) ->
         logger.info(f"📊 Breakdown: high_severity={high_severity_events}, security_alerts={security_alerts}, malware={malware_detections}, auth_failures={authentication_failures}")
         
         return {
-            "totalThreats": total_threats,
-            "activeAlerts": active_alerts,
+            "totalThreats": plan.scale(total_threats),
+            "activeAlerts": plan.scale(active_alerts),
             "systemsOnline": systems_online,
-            "incidentsToday": incidents_today,
+            "incidentsToday": plan.scale(incidents_today),
             "threatTrends": await calculate_real_threat_trends(security_events),
             "topThreats": await calculate_real_top_threats(security_events)
         }
@@ -554,7 +567,8 @@ async def get_real_system_uptime() -> int:
         # Query REAL system metrics from mock generators
         system_events = await connector.query({
             "query": {"match": {"event.category": "system"}},
-            "size": 100
+            "size": 100,
+            "fields": VIEW_FIELDS["system_inventory"]
         })
         
         # Count unique systems from REAL data
@@ -575,7 +589,8 @@ async def get_real_system_uptime() -> int:
         if not unique_systems:
             all_events = await connector.query({
                 "query": {"match_all": {}},
-                "size": 50
+                "size": 50,
+                "fields": VIEW_FIELDS["system_inventory"]
             })
             
             for event in all_events:
@@ -884,33 +899,12 @@ async def calculate_dynamic_top_threats(security_events: List[Dict[str, Any]]) -
             {"name": "SQL Injection", "count": random.randint(20, 60), "severity": 1}
         ]
 
-def parse_time_range(time_range: str) -> int:
-    """Parse time range string to hours"""
-    if time_range.endswith('h'):
-        return int(time_range[:-1])
-    elif time_range.endswith('d'):
-        return int(time_range[:-1]) * 24
-    elif time_range.endswith('w'):
-        return int(time_range[:-1]) * 24 * 7
-    elif time_range.endswith('m'):
-        return int(time_range[:-1]) * 24 * 30
-    else:
-        return 24  # Default to 24 hours
-
 # ============= HELPER FUNCTIONS =============
 
-def parse_time_range(time_range: str) -> int:
-    """Parse time range string to hours"""
-    if time_range == "1h":
-        return 1
-    elif time_range == "24h":
-        return 24
-    elif time_range == "7d":
-        return 24 * 7
-    elif time_range == "30d":
-        return 24 * 30
-    else:
-        return 24  # Default to 24 hours
+def parse_time_range(time_range: str) -> Tuple[datetime, datetime]:
+    """Resolve a time range ("1h", "24h", "7d", "30d", "last 2 weeks") to bucket-aligned UTC bounds"""
+    expression = parse_time_expression(time_range) or parse_time_expression("24h")
+    return expression.resolve(datetime.utcnow(), aligned=True)
 
 async def get_real_system_uptime_percentage() -> float:
     """Get real system uptime percentage from configured data source"""
@@ -46,9 +46,10 @@ async def execute_query(request: QueryRequest):
 		intent = result.get("intent", "general")
 		entities = result.get("entities", [])
 		
-		# Get raw results from connector
-		raw_results = await siem_connector.execute_query(
-			query=siem_query, 
+		# Get raw results from connector, sized by a pre-flight estimate
+		raw_results, fetch_plan = await pipeline.fetch_results(
+			siem_connector,
+			siem_query,
 			size=request.params.get("size", 100)
 		)
 
@@ -87,7 +88,8 @@ async def execute_query(request: QueryRequest):
 		metadata = {
 			"timestamp": result.get("timestamp"),
 			"session_id": request.params.get("session_id"),
-			"siem_query": siem_query  # For debugging purposes
+			"siem_query": siem_query,  # For debugging purposes
+			"fetch_plan": fetch_plan.as_dict()
 		}
 
 		return QueryResponse(
@@ -29,21 +29,39 @@ async def generate_report(request: ReportRequest):
 		if request.report_type.lower() == "security_summary":
 			# Example: Aggregate recent security events
 			query = {"query": {"match_all": {}}}
-			results = await siem_connector.execute_query(query=query, size=request.params.get("size", 1000))
+			results, plan = await pipeline.fetch_results(
+				siem_connector, query,
+				size=request.params.get("size", 1000),
+				group_by=["event.action", "event.category"],
+				summarize=True
+			)
 			summary = {
-				"total_events": results["hits"]["total"]["value"],
+				"total_events": plan.estimate.total if plan.estimate.known else results["hits"]["total"]["value"],
 				"top_actions": {},
-				"top_categories": {}
+				"top_categories": {},
+				"fetch_plan": plan.as_dict()
 			}
-			# Aggregate actions and categories
-			for hit in results["hits"]["hits"]:
-				event = hit["_source"].get("event", {})
-				action = event.get("action", "unknown")
-				category = event.get("category", "unknown")
-				summary["top_actions"].setdefault(action, 0)
-				summary["top_actions"][action] += 1
-				summary["top_categories"].setdefault(category, 0)
-				summary["top_categories"][category] += 1
+			buckets = results.get("aggregations", {})
+			if buckets:
+				# Aggregation-only plan: the cluster already counted for us
+				for bucket in buckets.get("by_event.action", {}).get("buckets", []):
+					summary["top_actions"][bucket["key"]] = bucket["doc_count"]
+				for bucket in buckets.get("by_event.category", {}).get("buckets", []):
+					summary["top_categories"][bucket["key"]] = bucket["doc_count"]
+			else:
+				# Aggregate actions and categories
+				for hit in results["hits"]["hits"]:
+					event = hit["_source"].get("event", {})
+					action = event.get("action", "unknown")
+					category = event.get("category", "unknown")
+					summary["top_actions"].setdefault(action, 0)
+					summary["top_actions"][action] += 1
+					summary["top_categories"].setdefault(category, 0)
+					summary["top_categories"][category] += 1
+				# Counts from a sample stand for the whole result set
+				for counts in (summary["top_actions"], summary["top_categories"]):
+					for key in counts:
+						counts[key] = plan.scale(counts[key])
 			return ReportResponse(success=True, data={"report_type": request.report_type, "summary": summary})
 
 		elif request.report_type.lower() == "incident_report":
@@ -4,7 +4,7 @@ Handles streaming chat responses and live updates
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends
-from typing import Dict, List, Any, Optional
+from typing import Dict, Any, Optional
 import json
 import logging
 import asyncio
@@ -15,6 +15,9 @@ from ...core.pipeline import ConversationalPipeline
 from ...connectors.base import BaseSIEMConnector
 from ...core.context.manager import ContextManager
 from ...core.nlp.schema_mapper import SchemaMapper
+from ...core.streaming.hub import BroadcastHub, DROP_OLDEST
+from ...core.streaming.responses import stream_assistant_response
+from ...core.monitoring.tracing import SERVER, extract, inject, tracer
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -25,14 +28,19 @@ active_connections: Dict[str, WebSocket] = {}
 class ConnectionManager:
     """Manages WebSocket connections for real-time chat"""
     
-    def __init__(self):
+    def __init__(self, hub: Optional[BroadcastHub] = None):
         self.active_connections: Dict[str, WebSocket] = {}
         self.user_sessions: Dict[str, str] = {}  # session_id -> user_id
+        
+        # Each connection gets a bounded queue drained by its own writer task
+        self.hub = hub or BroadcastHub(max_queue=256, overflow=DROP_OLDEST)
+        self.hub.add_close_listener(self._forget)
     
     async def connect(self, websocket: WebSocket, session_id: str):
         """Accept WebSocket connection and store it"""
         await websocket.accept()
         self.active_connections[session_id] = websocket
+        self.hub.register(session_id, websocket.send_text)
         logger.info(f"WebSocket connected: {session_id}")
         
         # Send connection confirmation
@@ -44,39 +52,30 @@ class ConnectionManager:
     
     def disconnect(self, session_id: str):
         """Remove WebSocket connection"""
-        if session_id in self.active_connections:
-            del self.active_connections[session_id]
-        if session_id in self.user_sessions:
-            del self.user_sessions[session_id]
+        self.hub.unregister(session_id)
+        self._forget(session_id)
         logger.info(f"WebSocket disconnected: {session_id}")
     
+    def _forget(self, session_id: str):
+        self.active_connections.pop(session_id, None)
+        self.user_sessions.pop(session_id, None)
+    
     async def send_message(self, session_id: str, message: Dict[str, Any]):
-        """Send message to specific WebSocket connection"""
+        """Queue a message for a specific WebSocket connection (in order, never dropped)"""
         if session_id in self.active_connections:
-            try:
-                await self.active_connections[session_id].send_text(json.dumps(message))
-                return True
-            except Exception as e:
-                logger.error(f"Failed to send WebSocket message to {session_id}: {e}")
-                self.disconnect(session_id)
-                return False
+            # Replies carry the trace of the request that produced them
+            return self.hub.send(session_id, inject(message))
         return False
     
-    async def broadcast(self, message: Dict[str, Any], exclude_session: Optional[str] = None):
-        """Broadcast message to all connected clients"""
-        disconnected = []
-        for session_id, websocket in self.active_connections.items():
-            if session_id == exclude_session:
-                continue
-            try:
-                await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Failed to broadcast to {session_id}: {e}")
-                disconnected.append(session_id)
+    async def broadcast(self, message: Dict[str, Any], exclude_session: Optional[str] = None,
+                        coalesce_key: Optional[str] = None):
+        """
+        Broadcast message to all connected clients
         
-        # Clean up disconnected clients
-        for session_id in disconnected:
-            self.disconnect(session_id)
+        The message is serialized once; slow clients lose their oldest live frames
+        (or, with ``coalesce_key``, only ever hold the latest one) instead of stalling the rest.
+        """
+        return self.hub.publish(message, coalesce_key=coalesce_key, exclude=exclude_session)
 
 # Global connection manager
 connection_manager = ConnectionManager()
@@ -119,17 +118,25 @@ async def websocket_chat_endpoint_impl(
             data = await websocket.receive_text()
             message = json.loads(data)
             
-            logger.info(f"Received WebSocket message from {session_id}: {message.get('type', 'unknown')}")
+            message_type = message.get("type", "unknown")
+            logger.info(f"Received WebSocket message from {session_id}: {message_type}")
             
-            # Handle different message types
-            if message.get("type") == "chat_message":
-                await handle_chat_message(session_id, message)
-            elif message.get("type") == "ping":
-                await handle_ping(session_id)
-            elif message.get("type") == "typing":
-                await handle_typing_indicator(session_id, message)
-            else:
-                logger.warning(f"Unknown WebSocket message type: {message.get('type')}")
+            # Continue the client's trace when the message carries a traceparent
+            with tracer.start_span(
+                f"websocket.{message_type}",
+                {"session.id": session_id},
+                parent=extract(message),
+                kind=SERVER
+            ):
+                # Handle different message types
+                if message_type == "chat_message":
+                    await handle_chat_message(session_id, message)
+                elif message_type == "ping":
+                    await handle_ping(session_id)
+                elif message_type == "typing":
+                    await handle_typing_indicator(session_id, message)
+                else:
+                    logger.warning(f"Unknown WebSocket message type: {message_type}")
                 
     except WebSocketDisconnect:
         connection_manager.disconnect(session_id)
@@ -210,198 +217,68 @@ async def process_query_with_streaming(
     siem_connector: BaseSIEMConnector,
     schema_mapper: SchemaMapper
 ):
-    """Process query through pipeline with streaming responses"""
+    """Process query through pipeline, relaying cards, result pages and summary tokens as they arrive"""
     message_id = str(uuid.uuid4())
     
-    try:
-        # Step 1: Send processing status
-        await connection_manager.send_message(session_id, {
+    def chat_response(content: str, status: str, stage: str, **extra) -> Dict[str, Any]:
+        return {
             "type": "chat_response",
             "data": {
                 "id": message_id,
                 "conversation_id": conversation_id,
                 "role": "assistant",
-                "content": "🔍 Analyzing your query...",
-                "status": "processing",
-                "stage": "nlp_processing"
+                "content": content,
+                "status": status,
+                "stage": stage,
+                **extra
             },
             "timestamp": datetime.now().isoformat()
-        })
-        
-        # Step 2: Process through NLP pipeline
-        result = await pipeline.process(
+        }
+    
+    try:
+        async for event in stream_assistant_response(
             query=query,
-            context=context,
-            user_context={},
-            filters={}
-        )
-        
-        if result.get("error"):
-            raise Exception(result["error"])
-        
-        # Step 3: Send NLP results
-        await connection_manager.send_message(session_id, {
-            "type": "chat_response",
-            "data": {
-                "id": message_id,
-                "conversation_id": conversation_id,
-                "role": "assistant", 
-                "content": f"✅ Intent: {result.get('intent', 'unknown')} (confidence: {result.get('confidence', 0):.2f})",
-                "status": "processing",
-                "stage": "query_building",
-                "metadata": {
-                    "intent": result.get('intent'),
-                    "confidence": result.get('confidence'),
-                    "entities": result.get('entities', [])
-                }
-            },
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Step 4: Build and execute query
-        if result.get("siem_query"):
-            await connection_manager.send_message(session_id, {
-                "type": "chat_response",
-                "data": {
-                    "id": message_id,
-                    "conversation_id": conversation_id,
-                    "role": "assistant",
-                    "content": "🔎 Searching SIEM data...",
-                    "status": "processing",
-                    "stage": "siem_query"
-                },
-                "timestamp": datetime.now().isoformat()
-            })
+            pipeline=pipeline,
+            siem_connector=siem_connector,
+            context=context
+        ):
+            kind = event["type"]
             
-            # Execute SIEM query
-            search_results = await siem_connector.execute_query(
-                query=result["siem_query"],
-                size=100
-            )
+            if kind == "status":
+                await connection_manager.send_message(
+                    session_id, chat_response(event["message"], "processing", event["stage"])
+                )
             
-            # Format results
-            formatted_results = await pipeline.format_results(
-                results=search_results,
-                query_type=result.get("intent", "unknown")
-            )
+            elif kind == "intent":
+                await connection_manager.send_message(session_id, chat_response(
+                    f"✅ Intent: {event.get('intent', 'unknown')} (confidence: {event.get('confidence', 0):.2f})",
+                    "processing", event["stage"],
+                    metadata={key: event.get(key) for key in ("intent", "confidence", "entities")}
+                ))
             
-            # Generate summary
-            summary = await pipeline.generate_summary(
-                results=formatted_results,
-                query=query,
-                intent=result.get("intent", "unknown")
-            )
+            elif kind in ("card", "rows", "token"):
+                # Incremental pieces of the answer; the final chat_response repeats them in full
+                await connection_manager.send_message(session_id, {
+                    "type": "chat_stream",
+                    "data": {"id": message_id, "conversation_id": conversation_id, **event},
+                    "timestamp": datetime.now().isoformat()
+                })
             
-            # Step 5: Send final results
-            await connection_manager.send_message(session_id, {
-                "type": "chat_response",
-                "data": {
-                    "id": message_id,
-                    "conversation_id": conversation_id,
-                    "role": "assistant",
-                    "content": summary,
-                    "status": "success",
-                    "stage": "complete",
-                    "metadata": {
-                        "intent": result.get('intent'),
-                        "confidence": result.get('confidence'),
-                        "entities": result.get('entities', []),
-                        "results_count": len(formatted_results),
-                        "processing_time": result.get('processing_time', 0)
-                    },
-                    "visual_payload": {
-                        "type": "composite",
-                        "cards": await generate_visual_cards(formatted_results, result.get("intent"))
-                    } if formatted_results else None
-                },
-                "timestamp": datetime.now().isoformat()
-            })
+            elif kind == "done":
+                await connection_manager.send_message(session_id, chat_response(
+                    event["summary"], event["status"], "complete",
+                    metadata=event.get("metadata", {}),
+                    visual_payload=event.get("visual_payload")
+                ))
             
-        else:
-            # No query generated - clarification needed
-            await connection_manager.send_message(session_id, {
-                "type": "chat_response",
-                "data": {
-                    "id": message_id,
-                    "conversation_id": conversation_id,
-                    "role": "assistant",
-                    "content": "I need more information to help you. Could you please clarify your request?",
-                    "status": "clarification_needed",
-                    "stage": "complete"
-                },
-                "timestamp": datetime.now().isoformat()
-            })
+            elif kind == "error":
+                raise Exception(event["message"])
         
     except Exception as e:
         logger.error(f"Error processing query with streaming: {e}")
-        await connection_manager.send_message(session_id, {
-            "type": "chat_response",
-            "data": {
-                "id": message_id,
-                "conversation_id": conversation_id,
-                "role": "assistant",
-                "content": f"I encountered an error processing your request: {str(e)}",
-                "status": "error",
-                "stage": "error"
-            },
-            "timestamp": datetime.now().isoformat()
-        })
-
-async def generate_visual_cards(results: List[Dict], intent: str) -> List[Dict]:
-    """Generate visual cards for results"""
-    cards = []
-    
-    if not results:
-        return cards
-    
-    # Summary card
-    cards.append({
-        "type": "summary_card",
-        "title": f"Results Found",
-        "value": len(results)
-    })
-    
-    # Sample data for chart if we have numeric data
-    if len(results) > 1 and intent in ["failed_login", "malware", "network"]:
-        # Create time series data
-        time_data = []
-        for i, result in enumerate(results[:10]):  # Limit to 10 points
-            time_data.append({
-                "x": result.get("@timestamp", f"Point {i+1}"),
-                "y": 1
-            })
-        
-        cards.append({
-            "type": "chart",
-            "chart_type": "line",
-            "title": f"{intent.replace('_', ' ').title()} Over Time",
-            "data": time_data
-        })
-    
-    # Table card with first few results
-    if results:
-        table_columns = [
-            {"key": "timestamp", "label": "Time"},
-            {"key": "message", "label": "Message"},
-            {"key": "source", "label": "Source"}
-        ]
-        
-        table_rows = []
-        for result in results[:5]:  # First 5 results
-            table_rows.append([
-                result.get("@timestamp", "Unknown"),
-                result.get("message", result.get("event", {}).get("action", "No message")),
-                result.get("host", {}).get("name", result.get("source", {}).get("ip", "Unknown"))
-            ])
-        
-        cards.append({
-            "type": "table",
-            "title": "Recent Events",
-            "columns": table_columns,
-            "rows": table_rows
-        })
-    
-    return cards
+        await connection_manager.send_message(session_id, chat_response(
+            f"I encountered an error processing your request: {str(e)}", "error", "error"
+        ))
 
 async def handle_ping(session_id: str):
     """Handle ping message - respond with pong"""
@@ -427,5 +304,6 @@ async def websocket_health():
     return {
         "status": "healthy",
         "active_connections": len(connection_manager.active_connections),
+        "broadcast": connection_manager.hub.get_stats(),
         "timestamp": datetime.now().isoformat()
     }
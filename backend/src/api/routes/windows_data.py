@@ -9,32 +9,29 @@ from elasticsearch import Elasticsearch
 import os
 from typing import Dict, Any, List
 
+from ...connectors.registry import get_connector_registry
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/windows", tags=["Windows Data"])
 
 
-def get_elasticsearch_client():
-    """Get Elasticsearch client"""
+async def get_elasticsearch_client():
+    """Lease the shared Elasticsearch client for the duration of a request"""
+    host = os.getenv('ELASTICSEARCH_HOST', 'localhost')
+    port = int(os.getenv('ELASTICSEARCH_PORT', 9200))
+    registry = get_connector_registry()
+    
     try:
-        host = os.getenv('ELASTICSEARCH_HOST', 'localhost')
-        port = int(os.getenv('ELASTICSEARCH_PORT', 9200))
-        
-        client = Elasticsearch(
-            [f'http://{host}:{port}'],
-            request_timeout=10,
-            max_retries=2,
-            retry_on_timeout=True,
-            headers={'Accept': 'application/json'}
-        )
-        
-        if not client.ping():
-            raise Exception("Cannot connect to Elasticsearch")
-        
-        return client
+        client = await registry.acquire("elasticsearch_client", {"url": f"http://{host}:{port}"})
     except Exception as e:
         logger.error(f"Failed to connect to Elasticsearch: {e}")
         raise HTTPException(status_code=503, detail="Elasticsearch unavailable")
+    
+    try:
+        yield client
+    finally:
+        await registry.release(client)
 
 
 @router.get("/dashboard-summary")
@@ -12,21 +12,36 @@ Advanced conversation context and memory features for security investigations:
 """
 
 import json
+import logging
 import time
 import uuid
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple, Iterator, Deque
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 import threading
 from pathlib import Path
 import sys
 
+# Redis imports (with fallback)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from nlp.security_entities import SecurityNLPRecognizer, SecurityEntity
+from nlp.security_entities import SecurityNLPRecognizer
+
+logger = logging.getLogger(__name__)
+
+# Entity as stored on a turn: (type, value, confidence) with interned strings
+EntityRef = Tuple[str, str, float]
 
 
 class ConversationState(Enum):
@@ -52,26 +67,64 @@ class QueryIntent(Enum):
     EXPLAIN = "explain"
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationTurn:
-    """A single turn in the conversation"""
+    """A single turn in the conversation (slotted; repeated strings interned)"""
     turn_id: str
     timestamp: datetime
     user_query: str
     intent: QueryIntent
-    entities: List[SecurityEntity]
-    context_used: List[str]
+    entities: Tuple[EntityRef, ...]
+    context_used: Tuple[str, ...]
     response: str
     confidence: float
     execution_time_ms: float
-    related_turns: List[str] = field(default_factory=list)
+    related_turns: Tuple[str, ...] = ()
+
+    def to_record(self) -> Dict[str, Any]:
+        """Log record for the append-only turn log"""
+        return {
+            "kind": "turn",
+            "turn_id": self.turn_id,
+            "timestamp": self.timestamp.isoformat(),
+            "query": self.user_query,
+            "intent": self.intent.value,
+            "entities": [list(entity) for entity in self.entities],
+            "context_used": list(self.context_used),
+            "response": self.response,
+            "confidence": self.confidence,
+            "execution_time_ms": self.execution_time_ms,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "ConversationTurn":
+        return cls(
+            turn_id=record["turn_id"],
+            timestamp=datetime.fromisoformat(record["timestamp"]),
+            user_query=record["query"],
+            intent=QueryIntent(record["intent"]),
+            entities=tuple(_entity_ref(entity) for entity in record.get("entities", [])),
+            context_used=tuple(sys.intern(dep) for dep in record.get("context_used", [])),
+            response=sys.intern(record.get("response", "")),
+            confidence=record.get("confidence", 0.0),
+            execution_time_ms=record.get("execution_time_ms", 0.0),
+        )
+
+
+def _entity_ref(entity: Any) -> EntityRef:
+    """Compact (type, value, confidence) from an analysis dict or a logged list"""
+    if isinstance(entity, dict):
+        entity_type, value, confidence = entity["type"], entity["value"], entity.get("confidence", 0.0)
+    else:
+        entity_type, value, confidence = entity
+    return sys.intern(str(entity_type)), sys.intern(str(value)), float(confidence)
 
 
 @dataclass 
 class InvestigationContext:
-    """Investigation context tracking"""
+    """Investigation context tracking (derived from the turns, maintained per turn)"""
     primary_entities: Dict[str, Set[str]] = field(default_factory=dict)  # entity_type -> values
-    timeline: List[Tuple[datetime, str]] = field(default_factory=list)
+    timeline: Deque[Tuple[datetime, str]] = field(default_factory=lambda: deque(maxlen=200))
     relationships: Dict[str, Set[str]] = field(default_factory=dict)  # entity -> related entities
     hypotheses: List[str] = field(default_factory=list)
     findings: List[str] = field(default_factory=list)
@@ -79,20 +132,133 @@ class InvestigationContext:
     threat_actors: Set[str] = field(default_factory=set)
     affected_systems: Set[str] = field(default_factory=set)
     investigation_focus: Optional[str] = None
+    entity_count: int = 0
+    intent_history: Deque[str] = field(default_factory=lambda: deque(maxlen=50))
+    intent_counts: Dict[str, int] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationSession:
-    """Complete conversation session for security investigation"""
+    """
+    Conversation session for security investigation
+
+    Only the most recent turns stay resident; the full history lives in the turn log.
+    """
     session_id: str
     created_at: datetime
     last_active: datetime
     state: ConversationState
-    turns: List[ConversationTurn]
+    turns: Deque[ConversationTurn]
     context: InvestigationContext
     user_id: str = "analyst"
     investigation_type: str = "general"
     priority: str = "medium"
+    turn_count: int = 0
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "kind": "session",
+            "session_id": self.session_id,
+            "created_at": self.created_at.isoformat(),
+            "user_id": self.user_id,
+            "investigation_type": self.investigation_type,
+            "priority": self.priority,
+        }
+
+
+class TurnLog:
+    """
+    Append-only per-session log of session headers and turns (kept in memory)
+
+    Sessions are rebuilt by replaying their records, so anything derived from the
+    turns never needs to be persisted. Durable logs survive worker restarts. The
+    in-memory log keeps each session's header and only its last ``max_turns`` turns,
+    so full histories of long investigations need a durable log.
+    """
+    durable = False
+
+    def __init__(self, max_turns: int = 500):
+        self.max_turns = max_turns
+        self._headers: Dict[str, str] = {}
+        self._turns: Dict[str, Deque[str]] = {}
+
+    def append(self, session_id: str, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str)
+        if record.get("kind") == "session":
+            self._headers[session_id] = line
+        else:
+            turns = self._turns.get(session_id)
+            if turns is None:
+                turns = self._turns[session_id] = deque(maxlen=self.max_turns)
+            turns.append(line)
+
+    def read(self, session_id: str) -> Iterator[Dict[str, Any]]:
+        header = self._headers.get(session_id)
+        if header is not None:
+            yield json.loads(header)
+        for line in list(self._turns.get(session_id, ())):
+            yield json.loads(line)
+
+    def delete(self, session_id: str) -> None:
+        self._headers.pop(session_id, None)
+        self._turns.pop(session_id, None)
+
+
+class FileTurnLog(TurnLog):
+    """One JSON-lines file per session under ``directory``"""
+    durable = True
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, session_id: str) -> Path:
+        return self.directory / f"{uuid.uuid5(uuid.NAMESPACE_OID, session_id).hex}.jsonl"
+
+    def append(self, session_id: str, record: Dict[str, Any]) -> None:
+        with open(self._path(session_id), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    def read(self, session_id: str) -> Iterator[Dict[str, Any]]:
+        path = self._path(session_id)
+        if not path.exists():
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def delete(self, session_id: str) -> None:
+        self._path(session_id).unlink(missing_ok=True)
+
+
+class RedisTurnLog(TurnLog):
+    """One Redis list per session (RPUSH per record), expiring with the session"""
+    durable = True
+
+    def __init__(self, client: Any = None, url: str = "redis://localhost:6379/0",
+                 prefix: str = "kartavya:memory:", ttl_seconds: int = 86400):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise ImportError("redis is not installed")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def append(self, session_id: str, record: Dict[str, Any]) -> None:
+        key = f"{self.prefix}{session_id}"
+        pipe = self.client.pipeline(transaction=False)
+        pipe.rpush(key, json.dumps(record, default=str))
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def read(self, session_id: str) -> Iterator[Dict[str, Any]]:
+        for line in self.client.lrange(f"{self.prefix}{session_id}", 0, -1):
+            yield json.loads(line.decode() if isinstance(line, bytes) else line)
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(f"{self.prefix}{session_id}")
 
 
 class SecurityContextBuilder:
@@ -140,7 +306,7 @@ class SecurityContextBuilder:
         intent = self._classify_intent(query, analysis)
         
         # Identify context dependencies
-        context_deps = self._identify_context_dependencies(query, session)
+        context_deps = self._identify_context_dependencies(query, session, analysis)
         
         # Generate contextual suggestions
         suggestions = self._generate_contextual_suggestions(session, analysis)
@@ -179,23 +345,28 @@ class SecurityContextBuilder:
             else:
                 return QueryIntent.SEARCH
     
-    def _identify_context_dependencies(self, query: str, session: ConversationSession) -> List[str]:
+    def _identify_context_dependencies(self, query: str, session: ConversationSession,
+                                       analysis: Optional[Dict[str, Any]] = None) -> List[str]:
         """Identify what context from previous turns is relevant"""
         dependencies = []
+        query_lower = query.lower()
         
         # Check for pronouns and references
         pronouns = ["this", "that", "these", "those", "it", "them", "they"]
-        if any(pronoun in query.lower() for pronoun in pronouns):
+        if any(pronoun in query_lower for pronoun in pronouns):
             dependencies.append("entity_reference")
         
         # Check for temporal references
         temporal = ["earlier", "before", "previous", "last", "recent"]
-        if any(temp in query.lower() for temp in temporal):
+        if any(temp in query_lower for temp in temporal):
             dependencies.append("temporal_reference")
         
-        # Check for implicit entity continuation
-        current_entities = self.nlp_recognizer.extract_entities(query)
-        if len(current_entities) == 0 and len(session.turns) > 0:
+        # Check for implicit entity continuation (reusing the entities already extracted)
+        if analysis is not None:
+            entity_count = len(analysis.get("entities", []))
+        else:
+            entity_count = len(self.nlp_recognizer.extract_entities(query))
+        if entity_count == 0 and session.turn_count > 0:
             dependencies.append("implicit_entity_continuation")
         
         return dependencies
@@ -290,47 +461,101 @@ class SecurityContextBuilder:
 
 
 class ConversationMemoryManager:
-    """Manages conversation sessions and memory"""
+    """
+    Manages conversation sessions and memory
+
+    Sessions are kept in an LRU bounded by ``max_sessions`` with only the last
+    ``resident_turns`` turns in memory; every turn is appended to ``turn_log`` and
+    evicted (or, with a durable log, pre-restart) sessions are rebuilt from it on access.
+    """
     
-    def __init__(self, max_sessions: int = 100):
-        self.sessions: Dict[str, ConversationSession] = {}
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        resident_turns: int = 20,
+        session_ttl_hours: float = 24,
+        turn_log: Optional[TurnLog] = None
+    ):
+        self.sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
         self.max_sessions = max_sessions
+        self.resident_turns = resident_turns
+        self.session_ttl = timedelta(hours=session_ttl_hours)
+        self.turn_log = turn_log or TurnLog()
         self.context_builder = SecurityContextBuilder()
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()
+        self.stats = {"created": 0, "restored": 0, "evicted": 0, "expired": 0, "log_errors": 0}
     
     def create_session(self, user_id: str = "analyst", investigation_type: str = "general") -> str:
         """Create a new conversation session"""
         session_id = str(uuid.uuid4())
         
         with self._lock:
-            # Clean up old sessions if needed
-            if len(self.sessions) >= self.max_sessions:
-                self._cleanup_old_sessions()
-            
-            session = ConversationSession(
-                session_id=session_id,
-                created_at=datetime.now(),
-                last_active=datetime.now(),
-                state=ConversationState.INITIATED,
-                turns=[],
-                context=InvestigationContext(),
-                user_id=user_id,
-                investigation_type=investigation_type
-            )
-            
-            self.sessions[session_id] = session
+            session = self._new_session(session_id, datetime.now(), user_id, investigation_type)
+            self._log(session_id, session.to_record())
+            self._admit(session)
+            self.stats["created"] += 1
         
         return session_id
     
+    def _new_session(self, session_id: str, created_at: datetime, user_id: str = "analyst",
+                     investigation_type: str = "general", priority: str = "medium") -> ConversationSession:
+        return ConversationSession(
+            session_id=session_id,
+            created_at=created_at,
+            last_active=created_at,
+            state=ConversationState.INITIATED,
+            turns=deque(maxlen=self.resident_turns),
+            context=InvestigationContext(),
+            user_id=sys.intern(user_id),
+            investigation_type=sys.intern(investigation_type),
+            priority=sys.intern(priority)
+        )
+    
+    def get_session(self, session_id: str) -> Optional[ConversationSession]:
+        """Resident session, restored from the turn log if it was evicted"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                return session
+            session = self.restore_session(session_id)
+            if session is None:
+                return None
+            if session.last_active < datetime.now() - self.session_ttl:
+                self.turn_log.delete(session_id)
+                return None
+            self._admit(session)
+            return session
+    
+    def restore_session(self, session_id: str) -> Optional[ConversationSession]:
+        """Rebuild a session by replaying its log (derived state is recomputed per turn)"""
+        session = None
+        try:
+            for record in self.turn_log.read(session_id):
+                if record.get("kind") == "session":
+                    session = self._new_session(
+                        session_id, datetime.fromisoformat(record["created_at"]),
+                        record.get("user_id", "analyst"), record.get("investigation_type", "general"),
+                        record.get("priority", "medium")
+                    )
+                elif record.get("kind") == "turn" and session is not None:
+                    self._apply_turn(session, ConversationTurn.from_record(record))
+        except Exception as e:
+            self.stats["log_errors"] += 1
+            logger.warning(f"⚠️ Failed to restore conversation session {session_id}: {e}")
+            return None
+        if session is not None:
+            self.stats["restored"] += 1
+        return session
+    
     def process_query(self, session_id: str, query: str) -> Dict[str, Any]:
         """Process a query within a conversation session"""
         with self._lock:
-            if session_id not in self.sessions:
+            session = self.get_session(session_id)
+            if session is None:
                 # Create new session if doesn't exist
                 session_id = self.create_session()
-            
-            session = self.sessions[session_id]
-            session.last_active = datetime.now()
+                session = self.sessions[session_id]
             
             # Analyze query with context
             start_time = time.time()
@@ -343,21 +568,16 @@ class ConversationMemoryManager:
                 timestamp=datetime.now(),
                 user_query=query,
                 intent=context_analysis["intent"],
-                entities=context_analysis["analysis"]["entities"],
-                context_used=context_analysis["context_dependencies"],
-                response=self._generate_response(context_analysis, session),
+                entities=tuple(_entity_ref(entity) for entity in context_analysis["analysis"]["entities"]),
+                context_used=tuple(sys.intern(dep) for dep in context_analysis["context_dependencies"]),
+                response=sys.intern(self._generate_response(context_analysis, session)),
                 confidence=0.85,  # Base confidence
                 execution_time_ms=processing_time
             )
             
-            # Update session context
-            self._update_session_context(session, turn, context_analysis)
-            
-            # Add turn to session
-            session.turns.append(turn)
-            
-            # Update conversation state
-            session.state = self._determine_next_state(session, turn)
+            # Log first, then fold the turn into the session's derived state
+            self._log(session_id, turn.to_record())
+            self._apply_turn(session, turn)
             
             return {
                 "session_id": session_id,
@@ -371,6 +591,27 @@ class ConversationMemoryManager:
                 "processing_time_ms": processing_time
             }
     
+    def _apply_turn(self, session: ConversationSession, turn: ConversationTurn) -> None:
+        """Incremental update shared by live turns and log replay"""
+        session.last_active = turn.timestamp
+        
+        # Update session context
+        self._update_session_context(session, turn)
+        
+        # Add turn to session
+        session.turns.append(turn)
+        session.turn_count += 1
+        
+        # Update conversation state
+        session.state = self._determine_next_state(session, turn)
+    
+    def _log(self, session_id: str, record: Dict[str, Any]) -> None:
+        try:
+            self.turn_log.append(session_id, record)
+        except Exception as e:
+            self.stats["log_errors"] += 1
+            logger.warning(f"⚠️ Failed to append to conversation log for {session_id}: {e}")
+    
     def _generate_response(self, analysis: Dict[str, Any], session: ConversationSession) -> str:
         """Generate contextual response based on analysis"""
         intent = analysis["intent"]
@@ -409,39 +650,37 @@ class ConversationMemoryManager:
         else:
             return f"Processing your {intent.value} request. Analyzing security data and preparing response..."
     
-    def _update_session_context(self, session: ConversationSession, turn: ConversationTurn, analysis: Dict[str, Any]):
+    def _update_session_context(self, session: ConversationSession, turn: ConversationTurn):
         """Update session context based on new turn"""
-        # Add entities to primary context
-        for entity in turn.entities:
-            entity_type = entity["type"]
-            entity_value = entity["value"]
-            
-            if entity_type not in session.context.primary_entities:
-                session.context.primary_entities[entity_type] = set()
-            session.context.primary_entities[entity_type].add(entity_value)
-        
-        # Track MITRE techniques
-        mitre_entities = [e for e in turn.entities if e["type"] == "mitre_technique"]
-        for entity in mitre_entities:
-            session.context.mitre_techniques.add(entity["value"])
-        
-        # Track threat actors
-        actor_entities = [e for e in turn.entities if e["type"] == "threat_actor"]
-        for entity in actor_entities:
-            session.context.threat_actors.add(entity["value"])
+        context = session.context
         
-        # Track affected systems
-        host_entities = [e for e in turn.entities if e["type"] in ["hostname", "ip_address"]]
-        for entity in host_entities:
-            session.context.affected_systems.add(entity["value"])
+        for entity_type, entity_value, _ in turn.entities:
+            # Add entities to primary context
+            values = context.primary_entities.setdefault(entity_type, set())
+            if entity_value not in values:
+                values.add(entity_value)
+                context.entity_count += 1
+            
+            # Track MITRE techniques, threat actors and affected systems
+            if entity_type == "mitre_technique":
+                context.mitre_techniques.add(entity_value)
+            elif entity_type == "threat_actor":
+                context.threat_actors.add(entity_value)
+            elif entity_type in ("hostname", "ip_address"):
+                context.affected_systems.add(entity_value)
         
         # Add to timeline
-        session.context.timeline.append((turn.timestamp, turn.user_query))
+        context.timeline.append((turn.timestamp, turn.user_query))
+        
+        # Intent history
+        intent = turn.intent.value
+        context.intent_history.append(intent)
+        context.intent_counts[intent] = context.intent_counts.get(intent, 0) + 1
         
         # Update investigation focus based on intent
         if turn.intent in [QueryIntent.INVESTIGATE, QueryIntent.HUNT] and turn.entities:
-            primary_entity = max(turn.entities, key=lambda x: x["confidence"])
-            session.context.investigation_focus = f"{primary_entity['type']}: {primary_entity['value']}"
+            entity_type, entity_value, _ = max(turn.entities, key=lambda entity: entity[2])
+            context.investigation_focus = f"{entity_type}: {entity_value}"
     
     def _determine_next_state(self, session: ConversationSession, turn: ConversationTurn) -> ConversationState:
         """Determine next conversation state based on current turn"""
@@ -496,22 +735,31 @@ class ConversationMemoryManager:
         
         return {
             "investigation_focus": context.investigation_focus,
-            "total_entities": sum(len(entities) for entities in context.primary_entities.values()),
+            "total_entities": context.entity_count,
             "entity_types": list(context.primary_entities.keys()),
             "mitre_techniques_found": list(context.mitre_techniques),
             "threat_actors_identified": list(context.threat_actors),
             "systems_affected": list(context.affected_systems),
-            "conversation_turns": len(session.turns),
+            "conversation_turns": session.turn_count,
+            "intent_counts": dict(context.intent_counts),
             "investigation_duration": str(datetime.now() - session.created_at),
             "current_state": session.state.value
         }
     
     def get_session_history(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get complete session history"""
-        if session_id not in self.sessions:
+        session = self.get_session(session_id)
+        if session is None:
             return None
         
-        session = self.sessions[session_id]
+        # Older turns only live in the log
+        turns: List[ConversationTurn] = list(session.turns)
+        if session.turn_count > len(turns):
+            turns = [
+                ConversationTurn.from_record(record)
+                for record in self.turn_log.read(session_id)
+                if record.get("kind") == "turn"
+            ] or turns
         
         return {
             "session_info": {
@@ -533,21 +781,32 @@ class ConversationMemoryManager:
                     "confidence": turn.confidence,
                     "processing_time_ms": turn.execution_time_ms
                 }
-                for turn in session.turns
+                for turn in turns
             ],
             "context_summary": self._generate_context_summary(session)
         }
     
+    def _admit(self, session: ConversationSession) -> None:
+        """Make a session resident, dropping expired and least recently used ones"""
+        self.sessions[session.session_id] = session
+        self.sessions.move_to_end(session.session_id)
+        self._cleanup_old_sessions()
+    
     def _cleanup_old_sessions(self):
-        """Remove old inactive sessions"""
-        cutoff_time = datetime.now() - timedelta(hours=24)  # Remove sessions older than 24 hours
-        
-        to_remove = [
-            session_id for session_id, session in self.sessions.items()
-            if session.last_active < cutoff_time
-        ]
-        
-        for session_id in to_remove:
+        """Drop inactive sessions (LRU order, so only the stale head is visited)"""
+        cutoff_time = datetime.now() - self.session_ttl
+        
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_active < cutoff_time:
+                self.stats["expired"] += 1
+                self.turn_log.delete(session_id)
+            elif len(self.sessions) > self.max_sessions:
+                self.stats["evicted"] += 1
+                if not self.turn_log.durable:
+                    self.turn_log.delete(session_id)
+            else:
+                break
             del self.sessions[session_id]
 
 
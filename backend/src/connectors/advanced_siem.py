@@ -7,7 +7,7 @@ Supports both demo (mock data) and production (live SIEM) modes
 import json
 import logging
 from typing import Dict, List, Any, Optional, Union, AsyncGenerator
-from datetime import datetime, timedelta
+from datetime import datetime
 from dataclasses import dataclass, asdict
 from enum import Enum
 import asyncio
@@ -15,6 +15,9 @@ import aiohttp
 from elasticsearch import AsyncElasticsearch
 from elasticsearch.helpers import async_scan, async_bulk
 
+from .registry import get_connector_registry
+from ..core.nlp.time_parser import parse_time_expression
+
 logger = logging.getLogger(__name__)
 
 
@@ -208,14 +211,10 @@ class AdvancedSiemConnector:
         
         try:
             if self.is_demo or self.platform == SiemPlatform.DATASET:
-                # For demo mode or dataset platform, use dataset connector
-                from .dataset_connector import DatasetConnector
-                dataset_connector = DatasetConnector()
-                await dataset_connector.connect()
-                
-                # Convert SIEM-Query to dataset query format
+                # For demo mode or dataset platform, use the shared dataset connector
                 dataset_query = self._convert_to_dataset_query(query)
-                dataset_result = await dataset_connector.execute_query(dataset_query, size=query.size)
+                async with get_connector_registry().lease("dataset") as dataset_connector:
+                    dataset_result = await dataset_connector.execute_query(dataset_query, size=query.size)
                 
                 # Convert back to SiemResult
                 events = [hit['_source'] for hit in dataset_result['hits']['hits']]
@@ -443,13 +442,10 @@ class AdvancedSiemConnector:
     async def stream_events(self, query: SiemQuery) -> AsyncGenerator[Dict[str, Any], None]:
         """Stream events for large result sets"""
         if self.is_demo or self.platform == SiemPlatform.DATASET:
-            # Use dataset connector for streaming
-            from .dataset_connector import DatasetConnector
-            dataset_connector = DatasetConnector()
-            await dataset_connector.connect()
-            
+            # Use the shared dataset connector for streaming (loaded once per process)
             dataset_query = self._convert_to_dataset_query(query)
-            dataset_result = await dataset_connector.execute_query(dataset_query, size=query.size or 1000)
+            async with get_connector_registry().lease("dataset") as dataset_connector:
+                dataset_result = await dataset_connector.execute_query(dataset_query, size=query.size or 1000)
             
             for hit in dataset_result['hits']['hits']:
                 yield hit['_source']
@@ -496,21 +492,16 @@ def create_siem_connector(platform: str, config: Dict[str, Any]) -> AdvancedSiem
 
 # Utility functions for query building
 def build_time_range(period: str) -> Dict[str, str]:
-    """Build time range filter for common periods"""
+    """Build time range filter for common periods ("1h", "24h", "7d", "last 30 days", ...)"""
     now = datetime.utcnow()
+    expression = parse_time_expression(period) or parse_time_expression("1h")
     
-    ranges = {
-        '1h': now - timedelta(hours=1),
-        '24h': now - timedelta(hours=24), 
-        '7d': now - timedelta(days=7),
-        '30d': now - timedelta(days=30)
-    }
-    
-    start_time = ranges.get(period, now - timedelta(hours=1))
+    # Bucket-aligned so repeated polls within a bucket send identical bounds
+    start_time, end_time = expression.resolve(now, aligned=True)
     
     return {
         'gte': start_time.isoformat() + 'Z',
-        'lte': now.isoformat() + 'Z'
+        'lte': end_time.isoformat() + 'Z'
     }
 
 
@@ -7,6 +7,8 @@ from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional
 import logging
 
+from ..core.query.projection import apply_source_filter
+
 logger = logging.getLogger(__name__)
 
 class BaseSIEMConnector(ABC):
@@ -77,7 +79,8 @@ class BaseSIEMConnector(ABC):
         self,
         query_string: str,
         size: int = 100,
-        index: Optional[str] = None
+        index: Optional[str] = None,
+        fields: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """
         Simple text search
@@ -86,11 +89,12 @@ class BaseSIEMConnector(ABC):
             query_string: Search string
             size: Max results
             index: Target index
+            fields: Fields to return (pushed down as ``_source`` includes)
             
         Returns:
             Search results
         """
-        query = self._build_text_query(query_string)
+        query = apply_source_filter(self._build_text_query(query_string), fields)
         return await self.execute_query(query, size, index)
     
     def _build_text_query(self, query_string: str) -> Dict[str, Any]:
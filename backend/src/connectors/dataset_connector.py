@@ -8,11 +8,15 @@ Two simple steps:
 import asyncio
 import logging
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 from datetime import datetime
 from datasets import load_dataset
 from pathlib import Path
 from .base import BaseSIEMConnector
+from ..core.query.codegen import RecordPredicate, lookup
+from ..core.query.estimator import ResultEstimate, reservoir_sample
+from ..core.query.projection import get_source_includes, project_document
+from ..core.datasets.ecs import record_to_ecs
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +28,10 @@ class DatasetConnector(BaseSIEMConnector):
         self.dataset_cache = {}
         self.connected = False
         
+        # Per-dataset statistics (doc count, distinct values per field) for size estimation
+        self.index_stats: Dict[str, Dict[str, Any]] = {}
+        self.estimate_sample_size = 500
+        
         # Setup data directory
         current_dir = Path(__file__).parent
         self.data_dir = current_dir.parent.parent.parent / "backend" / "data" / "datasets"
@@ -71,6 +79,7 @@ class DatasetConnector(BaseSIEMConnector):
                 logger.error("❌ No datasets loaded!")
                 return False
             
+            self.index_stats.clear()
             self.connected = True
             logger.info(f"✅ Dataset connector ready with {len(self.dataset_cache)} datasets")
             return True
@@ -161,55 +170,12 @@ class DatasetConnector(BaseSIEMConnector):
     def _convert_to_ecs(self, record: Dict) -> Optional[Dict]:
         """Convert dataset record to ECS (Elastic Common Schema) format"""
         try:
-            ecs_record = {
-                "@timestamp": datetime.now().isoformat(),
-                "event": {},
-                "source": {},
-                "destination": {},
-                "network": {},
-                "user": {},
-                "host": {},
-                "metadata": {"dataset": "security_logs"}
-            }
-            
-            # Map fields from the record
-            for key, value in record.items():
-                if value is None or value == '':
-                    continue
-                    
-                key_lower = str(key).lower()
-                
-                # Map common SIEM fields
-                if 'timestamp' in key_lower or 'time' in key_lower:
-                    try:
-                        ecs_record["@timestamp"] = str(value)
-                    except:
-                        pass
-                elif 'severity' in key_lower or 'level' in key_lower:
-                    ecs_record["event"]["severity"] = str(value).lower()
-                elif 'action' in key_lower or 'activity' in key_lower:
-                    ecs_record["event"]["action"] = str(value).lower()
-                elif 'src_ip' in key_lower or 'source_ip' in key_lower:
-                    ecs_record["source"]["ip"] = str(value)
-                elif 'dst_ip' in key_lower or 'dest_ip' in key_lower:
-                    ecs_record["destination"]["ip"] = str(value)
-                elif 'protocol' in key_lower:
-                    ecs_record["network"]["protocol"] = str(value).lower()
-                elif 'user' in key_lower:
-                    ecs_record["user"]["name"] = str(value)
-                elif 'message' in key_lower or 'description' in key_lower:
-                    ecs_record["message"] = str(value)
-                else:
-                    # Store unmapped fields in metadata
-                    ecs_record["metadata"][key] = value
-            
-            return ecs_record
-            
+            return record_to_ecs(record)
         except Exception as e:
             logger.warning(f"⚠️ Failed to convert record: {e}")
             return None
     
-    async def execute_query(self, query: Dict[str, Any], size: int = 100) -> List[Dict]:
+    async def execute_query(self, query: Union[Dict[str, Any], RecordPredicate], size: int = 100) -> List[Dict]:
         """Execute query against loaded dataset"""
         try:
             if not self.connected or not self.dataset_cache:
@@ -220,6 +186,12 @@ class DatasetConnector(BaseSIEMConnector):
             dataset_key = list(self.dataset_cache.keys())[0]
             dataset = self.dataset_cache[dataset_key]
             
+            # Structured query lowered from the shared query IR
+            if isinstance(query, RecordPredicate):
+                results = query.filter(dataset, size)
+                logger.info(f"🔍 Predicate query executed: {len(results)} results returned")
+                return results
+            
             # Simple filtering based on query
             query_text = query.get("query", "").lower()
             
@@ -241,6 +213,11 @@ class DatasetConnector(BaseSIEMConnector):
                 if not results:
                     results = random.sample(dataset, min(size, len(dataset)))
             
+            # Column selection for _source includes pushed down by the caller
+            fields = get_source_includes(query)
+            if fields:
+                results = [project_document(record, fields) for record in results]
+            
             logger.info(f"🔍 Query executed: {len(results)} results returned")
             return results
             
@@ -248,10 +225,60 @@ class DatasetConnector(BaseSIEMConnector):
             logger.error(f"❌ Query execution failed: {e}")
             return []
     
+    def get_index_stats(self, distinct_fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Document count and distinct-value counts of the loaded dataset, computed once per load"""
+        if not self.dataset_cache:
+            return {"doc_count": 0, "cardinality": {}}
+        
+        dataset_key = list(self.dataset_cache.keys())[0]
+        dataset = self.dataset_cache[dataset_key]
+        stats = self.index_stats.setdefault(dataset_key, {"doc_count": len(dataset), "cardinality": {}})
+        
+        for field_name in distinct_fields or []:
+            if field_name not in stats["cardinality"]:
+                values = set()
+                for record in dataset:
+                    value = lookup(record, field_name)
+                    if value is not None:
+                        values.add(json.dumps(value, sort_keys=True, default=str))
+                stats["cardinality"][field_name] = len(values)
+        
+        return {
+            "doc_count": stats["doc_count"],
+            "cardinality": {name: stats["cardinality"][name] for name in distinct_fields or []}
+        }
+    
+    async def estimate_result_size(
+        self,
+        query: Union[Dict[str, Any], RecordPredicate],
+        distinct_fields: Optional[List[str]] = None
+    ) -> ResultEstimate:
+        """Pre-flight result size: index stats for match-all, a predicate count, or a sampled text match"""
+        if not self.connected or not self.dataset_cache:
+            return ResultEstimate()
+        
+        stats = self.get_index_stats(distinct_fields)
+        dataset = self.dataset_cache[list(self.dataset_cache.keys())[0]]
+        
+        if isinstance(query, RecordPredicate):
+            return ResultEstimate(query.count(dataset), True, "scan", stats["cardinality"])
+        
+        query_text = query.get("query", "") if isinstance(query, dict) else ""
+        if not isinstance(query_text, str) or query_text == "*" or not query_text:
+            return ResultEstimate(stats["doc_count"], True, "index_stats", stats["cardinality"])
+        
+        # Substring search serializes every record; extrapolate from a sample instead
+        query_text = query_text.lower()
+        sample = reservoir_sample(dataset, self.estimate_sample_size)
+        hits = sum(1 for record in sample if query_text in json.dumps(record).lower())
+        total = round(hits * len(dataset) / len(sample)) if sample else 0
+        return ResultEstimate(total, False, "sample", stats["cardinality"])
+    
     async def disconnect(self) -> bool:
         """Disconnect from dataset (simple cleanup)"""
         self.connected = False
         self.dataset_cache.clear()
+        self.index_stats.clear()
         logger.info("📤 Dataset connector disconnected")
         return True
     
@@ -263,8 +290,9 @@ class DatasetConnector(BaseSIEMConnector):
         """Check if dataset connector is available"""
         return self.connected and len(self.dataset_cache) > 0
     
-    async def search(self, query: str, limit: int = 100) -> List[Dict]:
-        """Search the dataset with a text query"""
+    async def search(self, query: str, limit: int = 100,
+                     fields: Optional[List[str]] = None) -> List[Dict]:
+        """Search the dataset with a text query, optionally selecting fields"""
         try:
             if not self.connected or not self.dataset_cache:
                 logger.warning("Dataset not loaded, attempting to initialize...")
@@ -298,6 +326,9 @@ class DatasetConnector(BaseSIEMConnector):
                 if not results:
                     results = random.sample(dataset, min(limit, len(dataset)))
             
+            if fields:
+                results = [project_document(record, fields) for record in results]
+            
             logger.info(f"🔍 Search completed: {len(results)} results for query: {query}")
             return results
             
@@ -10,12 +10,30 @@ from typing import Dict, List, Any, Optional
 
 from elasticsearch import Elasticsearch
 
+from ..core.query.estimator import ResultEstimate
+from ..core.query.projection import apply_source_filter
+from ..core.resilience.concurrency import get_backend_guard
+
 logger = logging.getLogger(__name__)
 
 
 class ElasticConnector:
     """Connector for Elasticsearch SIEM platforms."""
     
+    # Fields read by normalize_windows_response; keeps the winlog.event_data
+    # blob and event.original out of Windows Security responses
+    WINDOWS_SOURCE_FIELDS = [
+        '@timestamp', 'message', 'log.level',
+        'source.ip', 'host.name', 'agent.hostname',
+        'destination.ip', 'destination.port', 'user.name',
+        'event.category', 'event.code', 'event.action', 'event.outcome',
+        'network.protocol', 'process.name', 'process.pid',
+        'winlog.event_id', 'winlog.user.name',
+        'winlog.event_data.Message', 'winlog.event_data.IpAddress',
+        'winlog.event_data.TargetUserName', 'winlog.event_data.SubjectUserName',
+        'winlog.event_data.ProcessName', 'winlog.event_data.ProcessId',
+    ]
+    
     def __init__(self):
         """Initialize Elasticsearch connection."""
         self.host = os.getenv('ELASTICSEARCH_HOST', 'localhost')
@@ -26,6 +44,8 @@ class ElasticConnector:
 
         self.client = self._connect()
         self._available = self.client is not None
+        # Shared across connector instances: one breaker and concurrency limit per cluster
+        self.guard = get_backend_guard("elasticsearch")
     
     def _connect(self) -> Elasticsearch:
         """Establish connection to Elasticsearch."""
@@ -75,13 +95,17 @@ class ElasticConnector:
         """Return True if a live Elasticsearch client is available."""
         return self.client is not None
 
-    async def search(self, query: str, limit: int = 100) -> Dict[str, Any]:
-        """Execute a keyword search and return normalized hits."""
+    async def search(self, query: str, limit: int = 100,
+                     fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Execute a keyword search and return normalized hits.
+
+        ``fields`` limits the returned ``_source`` to the given paths.
+        """
         if not self.is_available():
             return {"hits": [], "total": 0, "aggregations": {}}
 
         try:
-            return await asyncio.to_thread(self._search_sync, query or "*", limit)
+            return await self.guard.call(asyncio.to_thread, self._search_sync, query or "*", limit, fields)
         except Exception as exc:
             logger.warning(f"Elasticsearch search failed: {exc}")
             return {"hits": [], "total": 0, "aggregations": {}}
@@ -101,7 +125,8 @@ class ElasticConnector:
                     ]
                 }
             },
-            "sort": [{"@timestamp": {"order": "desc"}}]
+            "sort": [{"@timestamp": {"order": "desc"}}],
+            "_source": {"includes": self.WINDOWS_SOURCE_FIELDS}
         }
         
         # Add specific filters based on query params
@@ -130,7 +155,7 @@ class ElasticConnector:
             }
         
         try:
-            return await asyncio.to_thread(self._execute_windows_query, query_dsl, size)
+            return await self.guard.call(asyncio.to_thread, self._execute_windows_query, query_dsl, size)
         except Exception as exc:
             logger.warning(f"Windows security query failed: {exc}")
             return {"hits": [], "total": 0, "aggregations": {}}
@@ -185,7 +210,7 @@ class ElasticConnector:
         }
         
         try:
-            return await asyncio.to_thread(self._execute_windows_query, query_dsl, size)
+            return await self.guard.call(asyncio.to_thread, self._execute_windows_query, query_dsl, size)
         except Exception as exc:
             logger.warning(f"System metrics query failed: {exc}")
             return {"hits": [], "total": 0, "aggregations": {}}
@@ -207,7 +232,8 @@ class ElasticConnector:
             logger.error(f"Windows query execution failed: {e}")
             return {"hits": [], "total": 0, "aggregations": {}}
 
-    def _search_sync(self, query: Any, limit: int) -> Dict[str, Any]:
+    def _search_sync(self, query: Any, limit: int,
+                     fields: Optional[List[str]] = None) -> Dict[str, Any]:
         if isinstance(query, dict):
             query_dsl = query
         else:
@@ -220,6 +246,7 @@ class ElasticConnector:
                 }
             }
 
+        query_dsl = apply_source_filter(query_dsl, fields)
         normalized = self.send_query_to_elastic(query_dsl, size=limit)
         hits = normalized.get("hits", [])
         metadata = normalized.get("metadata", {})
@@ -763,6 +790,31 @@ class ElasticConnector:
             logger.error(f"Count operation failed: {e}")
             return 0
     
+    def estimate_result_size(self, query: Dict[str, Any],
+                             distinct_fields: Optional[List[str]] = None) -> ResultEstimate:
+        """Pre-flight ``_count``, plus a cardinality aggregation per requested field."""
+        if not self.client:
+            return ResultEstimate()
+        
+        body_query = query.get("query", {"match_all": {}})
+        total = self.client.count(index=self.index, body={"query": body_query}).get('count', 0)
+        
+        cardinality = {}
+        if distinct_fields:
+            aggs = {
+                f"distinct_{position}": {"cardinality": {"field": field_name}}
+                for position, field_name in enumerate(distinct_fields)
+            }
+            response = self.client.search(
+                index=self.index,
+                body={"size": 0, "query": body_query, "aggs": aggs}
+            )
+            buckets = response.get('aggregations', {})
+            for position, field_name in enumerate(distinct_fields):
+                cardinality[field_name] = buckets.get(f"distinct_{position}", {}).get('value', 0)
+        
+        return ResultEstimate(total=total, exact=True, method="count", cardinality=cardinality)
+    
     def get_cluster_health(self) -> Dict[str, Any]:
         """Get Elasticsearch cluster health information."""
         try:
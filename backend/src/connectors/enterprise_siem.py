@@ -4,16 +4,20 @@ Additional connectors for major SIEM platforms with data normalization and real-
 """
 
 import os
+import re
 import json
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Union, AsyncIterator
+from typing import Dict, List, Any, Optional, Union, AsyncIterator, Awaitable, Callable, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from abc import ABC, abstractmethod
+from collections import deque
 import aiohttp
 import ssl
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
+
+from ..core.query.projection import get_source_includes
 
 # Platform-specific imports (with fallbacks)
 try:
@@ -32,6 +36,8 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+ISO_DURATION = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
 
 @dataclass
 class SIEMConfig:
@@ -45,6 +51,12 @@ class SIEMConfig:
     ssl_verify: bool = True
     timeout: int = 30
     max_results: int = 10000
+    scheme: str = "https"
+    
+    # Result paging
+    page_size: int = 1000
+    page_concurrency: int = 4
+    poll_interval: float = 1.0
     
     # Platform-specific settings
     tenant_id: Optional[str] = None  # Azure
@@ -99,14 +111,65 @@ class NormalizedEvent:
     tags: Optional[List[str]] = None
 
 
+async def fetch_pages_concurrently(
+    fetch_page: Callable[[int, int], Awaitable[List[Dict[str, Any]]]],
+    total: int,
+    page_size: int,
+    concurrency: int
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Fetch result pages with up to ``concurrency`` requests in flight and yield
+    them in offset order. At most ``concurrency`` pages are held in memory.
+    """
+    offsets = iter(range(0, total, page_size))
+    in_flight: deque = deque()
+
+    def schedule_next() -> bool:
+        offset = next(offsets, None)
+        if offset is None:
+            return False
+        count = min(page_size, total - offset)
+        in_flight.append(asyncio.ensure_future(fetch_page(offset, count)))
+        return True
+
+    try:
+        for _ in range(max(1, concurrency)):
+            if not schedule_next():
+                break
+
+        while in_flight:
+            page = await in_flight.popleft()
+            schedule_next()
+            yield page
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
 class SIEMConnectorBase(ABC):
     """Base class for SIEM connectors"""
-    
+
     def __init__(self, config: SIEMConfig):
         self.config = config
         self.connected = False
         self.session = None
-        
+
+    async def iter_pages(
+        self,
+        query: Dict[str, Any],
+        page_size: Optional[int] = None,
+        max_results: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Iterate over result pages as lists of raw events.
+
+        Connectors with paged result APIs override this to fetch pages
+        concurrently; the default yields the full result set as one page.
+        """
+        results = await self.execute_query(query, size=max_results or self.config.max_results, **kwargs)
+        yield [hit.get("_source", {}) for hit in results.get("hits", {}).get("hits", [])]
+
     @abstractmethod
     async def connect(self) -> bool:
         """Connect to SIEM platform"""
@@ -146,7 +209,8 @@ class SplunkConnector(SIEMConnectorBase):
     def __init__(self, config: SIEMConfig):
         super().__init__(config)
         self.service = None
-        
+        self.base_url = f"{config.scheme}://{config.host}:{config.port}"
+
     async def connect(self) -> bool:
         """Connect to Splunk"""
         if not SPLUNK_AVAILABLE:
@@ -179,6 +243,9 @@ class SplunkConnector(SIEMConnectorBase):
         try:
             if self.service:
                 self.service.logout()
+            if self.session:
+                await self.session.close()
+                self.session = None
             self.connected = False
             return True
         except Exception as e:
@@ -202,7 +269,10 @@ class SplunkConnector(SIEMConnectorBase):
             }
             
             # Add time range if specified
-            if "range" in query:
+            if "earliest_time" in query:
+                search_kwargs["earliest_time"] = query["earliest_time"]
+                search_kwargs["latest_time"] = query.get("latest_time", "now")
+            elif "range" in query:
                 search_kwargs.update(self._parse_time_range(query["range"]))
             
             job = self.service.jobs.create(search_query, **search_kwargs)
@@ -228,7 +298,87 @@ class SplunkConnector(SIEMConnectorBase):
         except Exception as e:
             logger.error(f"Splunk query execution failed: {e}")
             raise
-    
+
+    async def iter_pages(
+        self,
+        query: Dict[str, Any],
+        page_size: Optional[int] = None,
+        max_results: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream Splunk results page by page through the REST API.
+
+        The search job runs in normal mode; once it is done the results are
+        fetched with ``offset``/``count`` windows, several pages in flight.
+        """
+        session = self._get_rest_session()
+        page_size = page_size or self.config.page_size
+        search_query = self._build_splunk_query(query)
+        if not search_query.lstrip().startswith(("search", "|")):
+            search_query = f"search {search_query}"
+
+        job_data = {
+            "search": search_query,
+            "exec_mode": "normal",
+            "output_mode": "json",
+            "max_count": max_results or self.config.max_results
+        }
+        if "range" in query:
+            job_data.update(self._parse_time_range(query["range"]))
+
+        async with session.post(f"{self.base_url}/services/search/jobs", data=job_data) as response:
+            if response.status not in (200, 201):
+                raise Exception(f"Failed to create Splunk search job: {response.status}")
+            sid = (await response.json())["sid"]
+
+        job_url = f"{self.base_url}/services/search/jobs/{sid}"
+        while True:
+            async with session.get(job_url, params={"output_mode": "json"}) as response:
+                content = (await response.json())["entry"][0]["content"]
+            if content.get("isDone"):
+                break
+            if content.get("dispatchState") == "FAILED":
+                raise Exception(f"Splunk search job {sid} failed")
+            await asyncio.sleep(self.config.poll_interval)
+
+        total = int(content.get("resultCount", 0))
+        if max_results:
+            total = min(total, max_results)
+
+        async def fetch_page(offset: int, count: int) -> List[Dict[str, Any]]:
+            params = {"output_mode": "json", "offset": offset, "count": count}
+            async with session.get(f"{job_url}/results", params=params) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to get Splunk results page at offset {offset}: {response.status}")
+                return (await response.json()).get("results", [])
+
+        async for page in fetch_pages_concurrently(
+            fetch_page, total, page_size, kwargs.get("concurrency", self.config.page_concurrency)
+        ):
+            yield page
+
+    def _get_rest_session(self) -> "aiohttp.ClientSession":
+        """Lazily create the aiohttp session used for REST result paging"""
+        if self.session is None or self.session.closed:
+            headers = {}
+            auth = None
+            if self.config.token:
+                headers["Authorization"] = f"Bearer {self.config.token}"
+            elif self.config.username:
+                auth = aiohttp.BasicAuth(self.config.username, self.config.password or "")
+
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    ssl=ssl.create_default_context() if self.config.ssl_verify else False,
+                    limit=self.config.page_concurrency * 2
+                ),
+                headers=headers,
+                auth=auth,
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout)
+            )
+        return self.session
+
     async def get_schema(self) -> Dict[str, Any]:
         """Get Splunk schema information"""
         if not self.connected or not self.service:
@@ -285,6 +435,16 @@ class SplunkConnector(SIEMConnectorBase):
             for filter_clause in bool_query.get("filter", []):
                 search_parts.extend(self._process_splunk_clause(filter_clause))
         
+        # Push _source includes down as a fields command so indexers drop
+        # everything else (including _raw) before results are shipped
+        includes = get_source_includes(query)
+        if includes:
+            field_list = ", ".join(
+                field if field.replace(".", "").replace("_", "").isalnum() else f'"{field}"'
+                for field in ["_time"] + [f for f in includes if f != "_time"]
+            )
+            return f"{' '.join(search_parts)} | fields {field_list}"
+        
         return " ".join(search_parts)
     
     def _process_splunk_clause(self, clause: Dict[str, Any]) -> List[str]:
@@ -325,7 +485,7 @@ class QRadarConnector(SIEMConnectorBase):
     
     def __init__(self, config: SIEMConfig):
         super().__init__(config)
-        self.base_url = f"https://{config.host}/api"
+        self.base_url = f"{config.scheme}://{config.host}:{config.port}/api"
         self.headers = {
             "SEC": config.sec_token or config.api_key,
             "Accept": "application/json",
@@ -346,7 +506,7 @@ class QRadarConnector(SIEMConnectorBase):
             )
             
             # Test connection with system info
-            url = urljoin(self.base_url, "/system/about")
+            url = self._url("/system/about")
             async with self.session.get(url) as response:
                 if response.status == 200:
                     self.connected = True
@@ -380,35 +540,11 @@ class QRadarConnector(SIEMConnectorBase):
         try:
             # Build AQL query
             aql_query = self._build_aql_query(query)
-            
-            # Create search
-            search_data = {
-                "query_expression": aql_query
-            }
-            
-            url = urljoin(self.base_url, "/ariel/searches")
-            async with self.session.post(url, json=search_data) as response:
-                if response.status != 201:
-                    raise Exception(f"Failed to create QRadar search: {response.status}")
-                
-                search_result = await response.json()
-                search_id = search_result["search_id"]
-            
-            # Poll for completion
-            search_status = "WAIT"
-            while search_status in ["WAIT", "EXECUTE"]:
-                await asyncio.sleep(1)
-                
-                status_url = urljoin(self.base_url, f"/ariel/searches/{search_id}")
-                async with self.session.get(status_url) as response:
-                    status_data = await response.json()
-                    search_status = status_data["status"]
-            
-            if search_status != "COMPLETED":
-                raise Exception(f"QRadar search failed with status: {search_status}")
+            search_id = await self._create_search(aql_query)
+            await self._wait_for_search(search_id)
             
             # Get results
-            results_url = urljoin(self.base_url, f"/ariel/searches/{search_id}/results")
+            results_url = self._url(f"/ariel/searches/{search_id}/results")
             async with self.session.get(results_url) as response:
                 if response.status != 200:
                     raise Exception(f"Failed to get QRadar results: {response.status}")
@@ -432,6 +568,68 @@ class QRadarConnector(SIEMConnectorBase):
         except Exception as e:
             logger.error(f"QRadar query execution failed: {e}")
             raise
+
+    async def iter_pages(
+        self,
+        query: Dict[str, Any],
+        page_size: Optional[int] = None,
+        max_results: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream Ariel search results page by page using ``Range: items=x-y``
+        headers, with several pages requested concurrently.
+        """
+        if not self.connected or not self.session:
+            raise Exception("Not connected to QRadar")
+
+        page_size = page_size or self.config.page_size
+        search_id = await self._create_search(self._build_aql_query(query))
+        status_data = await self._wait_for_search(search_id)
+
+        total = int(status_data.get("record_count", 0))
+        if max_results:
+            total = min(total, max_results)
+        results_url = self._url(f"/ariel/searches/{search_id}/results")
+
+        async def fetch_page(offset: int, count: int) -> List[Dict[str, Any]]:
+            headers = {"Range": f"items={offset}-{offset + count - 1}"}
+            async with self.session.get(results_url, headers=headers) as response:
+                if response.status not in (200, 206):
+                    raise Exception(f"Failed to get QRadar results range at {offset}: {response.status}")
+                return (await response.json()).get("events", [])
+
+        async for page in fetch_pages_concurrently(
+            fetch_page, total, page_size, kwargs.get("concurrency", self.config.page_concurrency)
+        ):
+            yield page
+
+    async def _create_search(self, aql_query: str) -> str:
+        """Submit an Ariel search and return its search id"""
+        async with self.session.post(self._url("/ariel/searches"), params={"query_expression": aql_query}) as response:
+            if response.status != 201:
+                raise Exception(f"Failed to create QRadar search: {response.status}")
+            search_result = await response.json()
+            return search_result["search_id"]
+
+    async def _wait_for_search(self, search_id: str) -> Dict[str, Any]:
+        """Poll an Ariel search until it finishes and return its status"""
+        status_url = self._url(f"/ariel/searches/{search_id}")
+        while True:
+            async with self.session.get(status_url) as response:
+                status_data = await response.json()
+            search_status = status_data["status"]
+            if search_status not in ["WAIT", "EXECUTE", "SORTING"]:
+                break
+            await asyncio.sleep(self.config.poll_interval)
+
+        if search_status != "COMPLETED":
+            raise Exception(f"QRadar search failed with status: {search_status}")
+        return status_data
+
+    def _url(self, path: str) -> str:
+        """Build an API URL below the /api prefix"""
+        return f"{self.base_url}{path}"
     
     async def get_schema(self) -> Dict[str, Any]:
         """Get QRadar schema information"""
@@ -440,12 +638,12 @@ class QRadarConnector(SIEMConnectorBase):
         
         try:
             # Get log sources
-            log_sources_url = urljoin(self.base_url, "/config/event_sources/log_source_management/log_sources")
+            log_sources_url = self._url("/config/event_sources/log_source_management/log_sources")
             async with self.session.get(log_sources_url) as response:
                 log_sources = await response.json() if response.status == 200 else []
             
             # Get event properties
-            properties_url = urljoin(self.base_url, "/data_classification/qid_records")
+            properties_url = self._url("/data_classification/qid_records")
             async with self.session.get(properties_url) as response:
                 properties = await response.json() if response.status == 200 else []
             
@@ -523,35 +721,44 @@ class AzureSentinelConnector(SIEMConnectorBase):
         super().__init__(config)
         self.credential = None
         self.client = None
+        # A bearer token selects the Log Analytics REST API instead of the SDK
+        self.rest_url = (
+            f"{config.scheme}://{config.host}:{config.port}/v1/workspaces/{config.workspace_id}/query"
+            if config.token else None
+        )
         
     async def connect(self) -> bool:
         """Connect to Azure Sentinel"""
-        if not AZURE_AVAILABLE:
+        if not AZURE_AVAILABLE and not self.rest_url:
             logger.error("Azure SDK not available")
             return False
         
         try:
-            # Create Azure credentials
-            if self.config.client_id and self.config.client_secret and self.config.tenant_id:
-                self.credential = ClientSecretCredential(
-                    tenant_id=self.config.tenant_id,
-                    client_id=self.config.client_id,
-                    client_secret=self.config.client_secret
+            if self.rest_url:
+                self.session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        ssl=ssl.create_default_context() if self.config.ssl_verify else False,
+                        limit=self.config.page_concurrency * 2
+                    ),
+                    headers={"Authorization": f"Bearer {self.config.token}"},
+                    timeout=aiohttp.ClientTimeout(total=self.config.timeout)
                 )
             else:
-                self.credential = DefaultAzureCredential()
-            
-            # Create Logs Query client
-            self.client = LogsQueryClient(self.credential)
+                # Create Azure credentials
+                if self.config.client_id and self.config.client_secret and self.config.tenant_id:
+                    self.credential = ClientSecretCredential(
+                        tenant_id=self.config.tenant_id,
+                        client_id=self.config.client_id,
+                        client_secret=self.config.client_secret
+                    )
+                else:
+                    self.credential = DefaultAzureCredential()
+                
+                # Create Logs Query client
+                self.client = LogsQueryClient(self.credential)
             
             # Test connection with a simple query
-            test_query = "SecurityEvent | take 1"
-            await asyncio.to_thread(
-                self.client.query_workspace,
-                workspace_id=self.config.workspace_id,
-                query=test_query,
-                timespan=timedelta(minutes=5)
-            )
+            await self._run_kql("SecurityEvent | take 1", timedelta(minutes=5))
             
             self.connected = True
             logger.info(f"Connected to Azure Sentinel workspace: {self.config.workspace_id}")
@@ -567,6 +774,9 @@ class AzureSentinelConnector(SIEMConnectorBase):
         try:
             if self.client:
                 self.client.close()
+            if self.session:
+                await self.session.close()
+                self.session = None
             self.connected = False
             return True
         except Exception as e:
@@ -575,35 +785,13 @@ class AzureSentinelConnector(SIEMConnectorBase):
     
     async def execute_query(self, query: Dict[str, Any], **kwargs) -> Dict[str, Any]:
         """Execute KQL query in Azure Sentinel"""
-        if not self.connected or not self.client:
+        if not self.connected or not (self.client or self.session):
             raise Exception("Not connected to Azure Sentinel")
         
         try:
             # Build KQL query
             kql_query = self._build_kql_query(query)
-            
-            # Set timespan
-            timespan = timedelta(hours=24)  # Default 24 hours
-            if "timespan" in query:
-                timespan = self._parse_timespan(query["timespan"])
-            
-            # Execute query
-            response = await asyncio.to_thread(
-                self.client.query_workspace,
-                workspace_id=self.config.workspace_id,
-                query=kql_query,
-                timespan=timespan
-            )
-            
-            # Process results
-            results = []
-            if response.tables:
-                table = response.tables[0]
-                for row in table.rows:
-                    result = {}
-                    for i, column in enumerate(table.columns):
-                        result[column.name] = row[i]
-                    results.append(result)
+            results = await self._run_kql(kql_query, self._query_timespan(query))
             
             return {
                 "hits": {
@@ -620,10 +808,83 @@ class AzureSentinelConnector(SIEMConnectorBase):
         except Exception as e:
             logger.error(f"Azure Sentinel query execution failed: {e}")
             raise
+
+    async def iter_pages(
+        self,
+        query: Dict[str, Any],
+        page_size: Optional[int] = None,
+        max_results: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream KQL results page by page.
+
+        Log Analytics has no server-side cursor, so the result set is sized
+        with ``count`` and continued through ``row_number()`` windows over a
+        serialized, time-sorted result; windows are fetched concurrently.
+        """
+        if not self.connected or not (self.client or self.session):
+            raise Exception("Not connected to Azure Sentinel")
+
+        page_size = page_size or self.config.page_size
+        timespan = self._query_timespan(query)
+        base_query = self._build_kql_query(query, include_limit=False)
+        sort_field = query.get("sort_by", "TimeGenerated")
+
+        count_rows = await self._run_kql(f"{base_query} | count", timespan)
+        total = int(count_rows[0].get("Count", 0)) if count_rows else 0
+        if max_results:
+            total = min(total, max_results)
+
+        async def fetch_page(offset: int, count: int) -> List[Dict[str, Any]]:
+            window_query = (
+                f"{base_query} | sort by {sort_field} desc | serialize"
+                f" | extend _page_rn = row_number()"
+                f" | where _page_rn between ({offset + 1} .. {offset + count})"
+                f" | project-away _page_rn"
+            )
+            return await self._run_kql(window_query, timespan)
+
+        async for page in fetch_pages_concurrently(
+            fetch_page, total, page_size, kwargs.get("concurrency", self.config.page_concurrency)
+        ):
+            yield page
+
+    async def _run_kql(self, kql_query: str, timespan: timedelta) -> List[Dict[str, Any]]:
+        """Run a KQL query and return the primary table as row dicts"""
+        if self.session:
+            payload = {"query": kql_query, "timespan": f"PT{int(timespan.total_seconds())}S"}
+            async with self.session.post(self.rest_url, json=payload) as response:
+                if response.status != 200:
+                    raise Exception(f"Log Analytics query failed: {response.status}")
+                data = await response.json()
+            tables = data.get("tables", [])
+            if not tables:
+                return []
+            columns = [column["name"] for column in tables[0]["columns"]]
+            return [dict(zip(columns, row, strict=True)) for row in tables[0]["rows"]]
+
+        response = await asyncio.to_thread(
+            self.client.query_workspace,
+            workspace_id=self.config.workspace_id,
+            query=kql_query,
+            timespan=timespan
+        )
+        if not response.tables:
+            return []
+        table = response.tables[0]
+        columns = [column.name if hasattr(column, "name") else column for column in table.columns]
+        return [dict(zip(columns, row, strict=True)) for row in table.rows]
+
+    def _query_timespan(self, query: Dict[str, Any]) -> timedelta:
+        """Resolve the query timespan, defaulting to 24 hours"""
+        if "timespan" in query:
+            return self._parse_timespan(query["timespan"])
+        return timedelta(hours=24)
     
     async def get_schema(self) -> Dict[str, Any]:
         """Get Azure Sentinel schema information"""
-        if not self.connected or not self.client:
+        if not self.connected or not (self.client or self.session):
             raise Exception("Not connected to Azure Sentinel")
         
         try:
@@ -635,21 +896,11 @@ class AzureSentinelConnector(SIEMConnectorBase):
             | take 50
             """
             
-            response = await asyncio.to_thread(
-                self.client.query_workspace,
-                workspace_id=self.config.workspace_id,
-                query=schema_query,
-                timespan=timedelta(days=1)
-            )
-            
-            tables = []
-            if response.tables:
-                table = response.tables[0]
-                for row in table.rows:
-                    tables.append({
-                        "name": row[0],
-                        "record_count": row[1]
-                    })
+            rows = await self._run_kql(schema_query, timedelta(days=1))
+            tables = [
+                {"name": row.get("TableName"), "record_count": row.get("count_")}
+                for row in rows
+            ]
             
             return {
                 "platform": "azure_sentinel",
@@ -661,7 +912,7 @@ class AzureSentinelConnector(SIEMConnectorBase):
             logger.error(f"Error getting Azure Sentinel schema: {e}")
             return {}
     
-    def _build_kql_query(self, query: Dict[str, Any]) -> str:
+    def _build_kql_query(self, query: Dict[str, Any], include_limit: bool = True) -> str:
         """Build KQL query from structured query"""
         if "query" in query and isinstance(query["query"], str):
             return query["query"]
@@ -684,8 +935,9 @@ class AzureSentinelConnector(SIEMConnectorBase):
             kql_parts.append(f"| where {' and '.join(conditions)}")
         
         # Add limit
-        limit = query.get("size", 100)
-        kql_parts.append(f"| take {limit}")
+        if include_limit:
+            limit = query.get("size", 100)
+            kql_parts.append(f"| take {limit}")
         
         return " ".join(kql_parts)
     
@@ -711,15 +963,12 @@ class AzureSentinelConnector(SIEMConnectorBase):
         return None
     
     def _parse_timespan(self, timespan_str: str) -> timedelta:
-        """Parse timespan string to timedelta"""
-        if timespan_str == "P1D":
-            return timedelta(days=1)
-        elif timespan_str == "PT1H":
-            return timedelta(hours=1)
-        elif timespan_str == "P7D":
-            return timedelta(days=7)
-        else:
+        """Parse an ISO 8601 duration (e.g. P1D, PT1H, PT15M) to timedelta"""
+        match = ISO_DURATION.match(timespan_str or "")
+        if not match or not any(match.groups()):
             return timedelta(hours=24)
+        days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+        return timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
 
 
 class DataNormalizer:
@@ -953,23 +1202,20 @@ class StreamingProcessor:
     async def process_stream(self, connector: SIEMConnectorBase, query: Dict[str, Any]):
         """Process streaming data from SIEM"""
         try:
+            platform = connector.__class__.__name__.lower().replace("connector", "")
             while True:
-                # Execute query to get latest events
-                results = await connector.execute_query(query)
-                
-                # Process each event
-                for hit in results.get("hits", {}).get("hits", []):
-                    raw_event = hit.get("_source", {})
-                    
-                    # Normalize event
-                    normalized = self.normalizer.normalize_event(raw_event, connector.__class__.__name__.lower().replace("connector", ""))
-                    
-                    # Notify subscribers
-                    for callback in self.subscribers:
-                        try:
-                            await callback(normalized)
-                        except Exception as e:
-                            logger.error(f"Error in stream callback: {e}")
+                # Pull the latest events page by page so only a few pages are in memory
+                async for page in connector.iter_pages(query):
+                    for raw_event in page:
+                        # Normalize event
+                        normalized = self.normalizer.normalize_event(raw_event, platform)
+                        
+                        # Notify subscribers
+                        for callback in self.subscribers:
+                            try:
+                                await callback(normalized)
+                            except Exception as e:
+                                logger.error(f"Error in stream callback: {e}")
                 
                 # Wait before next poll
                 await asyncio.sleep(30)  # Poll every 30 seconds
@@ -987,5 +1233,6 @@ __all__ = [
     'AzureSentinelConnector',
     'DataNormalizer',
     'StreamingProcessor',
-    'create_siem_connector'
+    'create_siem_connector',
+    'fetch_pages_concurrently'
 ]
@@ -9,6 +9,8 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 
 from .base import BaseSIEMConnector
+from ..core.query.estimator import ResultEstimate, reservoir_sample
+from ..core.query.projection import apply_source_filter, get_source_includes, project_document
 from mock.connectors.elasticsearch_fixed import MockElasticsearchConnector
 
 logger = logging.getLogger(__name__)
@@ -91,6 +93,12 @@ class MockSIEMConnector(BaseSIEMConnector):
             # Execute search via mock Elasticsearch
             result = self.mock_es.search(target_index, search_body)
             
+            # Honour _source includes like a real cluster would
+            fields = get_source_includes(search_body)
+            if fields:
+                for hit in result["hits"]["hits"]:
+                    hit["_source"] = project_document(hit.get("_source", {}), fields)
+            
             logger.debug(f"🔍 Mock query executed: {len(result['hits']['hits'])} results from {target_index}")
             
             return result
@@ -194,7 +202,7 @@ class MockSIEMConnector(BaseSIEMConnector):
         General query method for dashboard and other generic queries
         
         Args:
-            query_params: Query parameters (size, type, filters, etc.)
+            query_params: Query parameters (size, type, filters, fields, etc.)
             
         Returns:
             List of results
@@ -203,8 +211,9 @@ class MockSIEMConnector(BaseSIEMConnector):
             if not self.connected or not self.mock_es:
                 await self.connect()
             
-            # Extract parameters (no size limit!)
-            size = query_params.get('size', None)  # None = unlimited
+            # Extract parameters (None = unlimited; callers size this from a fetch plan)
+            size = query_params.get('size', None)
+            sample = bool(query_params.get('sample')) and size is not None
             query_type = query_params.get('type', 'general')
             filters = query_params.get('filters', {})
             
@@ -253,12 +262,16 @@ class MockSIEMConnector(BaseSIEMConnector):
                     else:
                         es_query["query"]["bool"]["filter"] = filter_clauses
             
-            # Execute query
-            result = await self.execute_query(es_query, size=size)
+            # Only ship the fields the caller reads
+            es_query = apply_source_filter(es_query, query_params.get('fields'))
+            
+            # Execute query (the generators live in-process, so sampling is a reservoir pass)
+            result = await self.execute_query(es_query, size=None if sample else size)
             
             # Extract hits and return as list
             if "hits" in result and "hits" in result["hits"]:
-                return [hit["_source"] for hit in result["hits"]["hits"]]
+                records = [hit["_source"] for hit in result["hits"]["hits"]]
+                return reservoir_sample(records, size) if sample else records
             else:
                 return []
                 
@@ -266,6 +279,29 @@ class MockSIEMConnector(BaseSIEMConnector):
             logger.error(f"❌ Mock query failed: {e}")
             return []
     
+    async def estimate_result_size(
+        self,
+        query: Dict[str, Any],
+        distinct_fields: Optional[List[str]] = None,
+        index: Optional[str] = None
+    ) -> ResultEstimate:
+        """
+        Pre-flight result size via the mock cluster's _count
+        
+        Args:
+            query: Query in Elasticsearch DSL format
+            distinct_fields: Fields whose cardinality is wanted (not tracked by the mock)
+            index: Target index
+            
+        Returns:
+            Exact document count
+        """
+        if not self.connected or not self.mock_es:
+            return ResultEstimate()
+        
+        response = self.mock_es.count(index or "security-logs-demo", query)
+        return ResultEstimate(total=response["count"], exact=True, method="count")
+    
     def test_connection(self) -> bool:
         """
         Test if connection is working
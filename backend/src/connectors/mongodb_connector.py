@@ -6,8 +6,8 @@ Designed for high-performance queries on large datasets
 
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Union
+from datetime import datetime, timedelta, timezone
 import pymongo
 from pymongo import MongoClient
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -16,6 +16,11 @@ import os
 import time
 from contextlib import asynccontextmanager
 from .base import BaseSIEMConnector
+from .mongodb_planner import MongoQueryPlanner
+from ..core.monitoring.metrics import COUNTER, GAUGE, MetricFamily, get_registry
+from ..core.query.codegen import MongoQuery
+from ..core.query.estimator import ResultEstimate
+from ..core.query.projection import get_source_includes, strip_source_filter, to_mongo_projection
 
 logger = logging.getLogger(__name__)
 
@@ -64,6 +69,21 @@ class MongoDBConnector(BaseSIEMConnector):
         self.max_retries = int(os.getenv("MONGODB_MAX_RETRIES", "3"))
         self.retry_delay = float(os.getenv("MONGODB_RETRY_DELAY", "1.0"))
         
+        # Bulk migration settings
+        self.migration_chunk_size = int(os.getenv("MONGODB_MIGRATION_CHUNK_SIZE", "10000"))
+        self.migration_writers = int(os.getenv("MONGODB_MIGRATION_WRITERS", "4"))
+        
+        # Pre-flight counts stop here; anything above is "large" for fetch planning
+        self.estimate_count_cap = int(os.getenv("MONGODB_ESTIMATE_COUNT_CAP", "100000"))
+        
+        # Data retention enforced by TTL indexes (0 = keep forever)
+        self.retention_days = int(os.getenv("MONGODB_RETENTION_DAYS", "0"))
+        
+        # Query shape tracking, derived indexes and explain() verification
+        self.query_planner = MongoQueryPlanner(
+            slow_query_threshold=float(os.getenv("MONGODB_SLOW_QUERY_SECONDS", "1.0"))
+        )
+        
         # Collection names for different types of SIEM data
         self.collection_names = {
             "events": "siem_events",
@@ -74,6 +94,14 @@ class MongoDBConnector(BaseSIEMConnector):
             "metadata": "system_metadata"
         }
         
+        # /metrics: query latency is recorded per collection, connection_stats read on scrape
+        registry = get_registry()
+        self.query_seconds = registry.histogram(
+            "mongodb_query_duration_seconds", "MongoDB query latency per collection type",
+            ("collection",), unit="seconds"
+        )
+        registry.register_collector(self.collect_metrics)
+        
     async def initialize(self) -> bool:
         """Initialize MongoDB connection and setup collections"""
         return await self.connect()
@@ -144,18 +172,12 @@ class MongoDBConnector(BaseSIEMConnector):
             collection = self.db[collection_name]
             self.collections[collection_key] = collection
             
-            # Create indexes based on collection type
+            # Create indexes based on collection type; time-windowed lookups
+            # on severity/user/IP get compound indexes from the query planner
             if collection_key == "events":
-                # SIEM events - optimize for time-based and field queries
                 await collection.create_index([("@timestamp", -1)])
-                await collection.create_index([("event.severity", 1)])
-                await collection.create_index([("source.ip", 1)])
                 await collection.create_index([("destination.ip", 1)])
                 await collection.create_index([("event.category", 1)])
-                await collection.create_index([
-                    ("@timestamp", -1), 
-                    ("event.severity", 1)
-                ])
                 
             elif collection_key == "alerts":
                 # Security alerts - optimize for status and severity queries
@@ -165,18 +187,19 @@ class MongoDBConnector(BaseSIEMConnector):
                 await collection.create_index([("alert_type", 1)])
                 
             elif collection_key == "users":
-                # User activities - optimize for user and time queries
-                await collection.create_index([("user.name", 1)])
                 await collection.create_index([("@timestamp", -1)])
                 await collection.create_index([("user.ip", 1)])
                 await collection.create_index([("event.action", 1)])
                 
             elif collection_key == "network":
-                # Network traffic - optimize for IP and protocol queries
-                await collection.create_index([("source.ip", 1)])
-                await collection.create_index([("destination.ip", 1)])
                 await collection.create_index([("network.protocol", 1)])
                 await collection.create_index([("@timestamp", -1)])
+            
+            await self.query_planner.load_existing_indexes(collection_key, collection)
+            await self.query_planner.ensure_baseline_indexes(collection_key, collection)
+            
+            if self.retention_days > 0 and collection_key != "metadata":
+                await self.query_planner.ensure_ttl_index(collection, self.retention_days)
                 
         logger.info("✅ Collections and indexes created successfully")
     
@@ -252,33 +275,57 @@ class MongoDBConnector(BaseSIEMConnector):
                 return False
             
             collection = self.collections.get(collection_type)
-            if not collection:
+            if collection is None:
                 logger.error(f"❌ Unknown collection type: {collection_type}")
                 return False
             
             logger.info(f"🔄 Migrating {len(dataset)} records to MongoDB collection: {collection_type}")
             
-            # Add migration metadata
+            # Add migration metadata; ISO timestamps become BSON dates so range
+            # queries and TTL expiry work on them
+            migration_time = datetime.now()
             for record in dataset:
-                record["_migration_timestamp"] = datetime.now()
+                record["_migration_timestamp"] = migration_time
                 record["_source"] = "dataset_migration"
+                timestamp = record.get("@timestamp")
+                if isinstance(timestamp, str):
+                    try:
+                        record["@timestamp"] = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+                    except ValueError:
+                        pass
             
-            # Batch insert for better performance
-            batch_size = 1000
-            total_inserted = 0
+            # Large unordered chunks written by a bounded pool of concurrent writers
+            chunk_size = max(1, self.migration_chunk_size)
+            chunks = [dataset[i:i + chunk_size] for i in range(0, len(dataset), chunk_size)]
+            writers = asyncio.Semaphore(max(1, self.migration_writers))
+            progress = {"inserted": 0, "failed_chunks": 0}
+            started = time.time()
             
-            for i in range(0, len(dataset), batch_size):
-                batch = dataset[i:i + batch_size]
-                try:
-                    result = await collection.insert_many(batch, ordered=False)
-                    total_inserted += len(result.inserted_ids)
-                    
-                    if i % (batch_size * 10) == 0:  # Log every 10 batches
-                        logger.info(f"📈 Migrated {total_inserted}/{len(dataset)} records...")
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ Batch insert failed for batch {i//batch_size}: {e}")
-                    continue
+            async def write_chunk(index: int, chunk: List[Dict]) -> None:
+                async with writers:
+                    try:
+                        result = await collection.insert_many(chunk, ordered=False)
+                        progress["inserted"] += len(result.inserted_ids)
+                    except pymongo.errors.BulkWriteError as e:
+                        # Unordered writes keep going past bad documents
+                        progress["inserted"] += e.details.get("nInserted", 0)
+                        logger.warning(
+                            f"⚠️ Chunk {index} had {len(e.details.get('writeErrors', []))} write errors"
+                        )
+                    except Exception as e:
+                        progress["failed_chunks"] += 1
+                        logger.warning(f"⚠️ Batch insert failed for chunk {index}: {e}")
+                        return
+                    logger.info(f"📈 Migrated {progress['inserted']}/{len(dataset)} records...")
+            
+            await asyncio.gather(*(write_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+            total_inserted = progress["inserted"]
+            elapsed = time.time() - started
+            logger.info(
+                f"⚡ Wrote {total_inserted} records in {elapsed:.2f}s "
+                f"({total_inserted / elapsed if elapsed else 0:.0f} records/s, "
+                f"{len(chunks)} chunks, {self.migration_writers} writers)"
+            )
             
             # Create summary document
             summary = {
@@ -286,6 +333,7 @@ class MongoDBConnector(BaseSIEMConnector):
                 "collection_type": collection_type,
                 "total_records": len(dataset),
                 "successfully_inserted": total_inserted,
+                "failed_chunks": progress["failed_chunks"],
                 "migration_source": "huggingface_dataset",
                 "status": "completed"
             }
@@ -299,8 +347,8 @@ class MongoDBConnector(BaseSIEMConnector):
             logger.error(f"❌ Migration failed: {e}")
             return False
     
-    async def execute_query(self, query: Dict[str, Any], size: int = 100) -> List[Dict]:
-        """Execute SIEM query against MongoDB with retry logic and monitoring"""
+    async def execute_query(self, query: Union[Dict[str, Any], MongoQuery], size: int = 100) -> List[Dict]:
+        """Execute SIEM query (ES-style dict or lowered MongoQuery) against MongoDB with retry logic and monitoring"""
         max_attempts = self.max_retries + 1
         
         for attempt in range(max_attempts):
@@ -319,19 +367,46 @@ class MongoDBConnector(BaseSIEMConnector):
                         logger.error("❌ Not connected to MongoDB")
                         return []
                 
-                # Parse the query to determine which collection to use
-                collection_type = self._determine_collection_type(query)
+                if isinstance(query, MongoQuery):
+                    # Lowered from the shared query IR: filter, projection and sort are ready
+                    projection = query.projection
+                    mongo_query = query.filter_at()
+                    collection_type = self._determine_collection_type(mongo_query)
+                    sort = list(query.sort)
+                    size = min(size, query.limit) if query.limit else size
+                    sample = query.sample
+                else:
+                    # Requested _source includes become a projection; the directive itself
+                    # must not influence collection routing or filters
+                    projection = to_mongo_projection(get_source_includes(query))
+                    filter_query = strip_source_filter(query)
+                    
+                    # Parse the query to determine which collection to use
+                    collection_type = self._determine_collection_type(filter_query)
+                    
+                    # Convert SIEM query to MongoDB query
+                    mongo_query = self._convert_to_mongo_query(filter_query)
+                    sort = [("@timestamp", -1)]
+                    sample = False
                 collection = self.collections.get(collection_type, self.collections["events"])
                 
-                # Convert SIEM query to MongoDB query
-                mongo_query = self._convert_to_mongo_query(query)
-                
                 if attempt == 0:  # Log only on first attempt
                     logger.info(f"🔍 Executing MongoDB query on {collection_type}: {mongo_query}")
                 
+                # Build indexes for frequent shapes in the background
+                shape = self.query_planner.shape_of(collection_type, mongo_query, sort)
+                self.query_planner.schedule_index(shape, collection)
+                
                 # Execute query with timeout and performance monitoring
                 query_start = time.time()
-                cursor = collection.find(mongo_query).limit(size).sort("@timestamp", -1)
+                if sample:
+                    # Uniform sample chosen server-side instead of the newest ``size`` documents
+                    pipeline = [{"$match": mongo_query}, {"$sample": {"size": size}}]
+                    if projection:
+                        pipeline.append({"$project": projection})
+                    cursor = collection.aggregate(pipeline)
+                else:
+                    cursor = collection.find(mongo_query, projection).limit(size).sort(sort)
                 
                 # Execute with timeout
                 results = await asyncio.wait_for(
@@ -340,6 +415,12 @@ class MongoDBConnector(BaseSIEMConnector):
                 )
                 
                 query_time = time.time() - query_start
+                self.query_seconds.labels(collection_type).record(query_time)
+                
+                # Track the shape and verify its plan with explain() in the background
+                self.query_planner.record(shape, query_time, len(results))
+                if not sample:
+                    self.query_planner.schedule_explain(shape, collection, mongo_query, sort, size, query_time)
                 
                 # Convert ObjectId to string for JSON serialization
                 for result in results:
@@ -396,6 +477,41 @@ class MongoDBConnector(BaseSIEMConnector):
         
         return []
     
+    async def estimate_result_size(
+        self,
+        query: Union[Dict[str, Any], MongoQuery],
+        distinct_fields: Optional[List[str]] = None
+    ) -> ResultEstimate:
+        """Pre-flight count: collection metadata when unfiltered, a capped count_documents otherwise"""
+        if not self.connected or not self.collections:
+            return ResultEstimate()
+        
+        if isinstance(query, MongoQuery):
+            mongo_query = query.filter_at()
+            collection_type = self._determine_collection_type(mongo_query)
+        else:
+            filter_query = strip_source_filter(query)
+            collection_type = self._determine_collection_type(filter_query)
+            mongo_query = self._convert_to_mongo_query(filter_query)
+        collection = self.collections.get(collection_type, self.collections["events"])
+        
+        if not mongo_query:
+            total = await collection.estimated_document_count()
+            estimate = ResultEstimate(total=total, exact=False, method="index_stats")
+        else:
+            total = await collection.count_documents(mongo_query, limit=self.estimate_count_cap)
+            estimate = ResultEstimate(total=total, exact=total < self.estimate_count_cap, method="count")
+        
+        for field_name in distinct_fields or []:
+            groups = await collection.aggregate([
+                {"$match": mongo_query},
+                {"$group": {"_id": f"${field_name}"}},
+                {"$count": "distinct"}
+            ]).to_list(length=1)
+            estimate.cardinality[field_name] = groups[0]["distinct"] if groups else 0
+        
+        return estimate
+    
     def _determine_collection_type(self, query: Dict[str, Any]) -> str:
         """Determine which MongoDB collection to query based on query content"""
         query_str = str(query).lower()
@@ -413,8 +529,12 @@ class MongoDBConnector(BaseSIEMConnector):
         """Convert SIEM query to MongoDB query format"""
         mongo_query = {}
         
+        # Structured ES-style bool queries map onto indexable predicates
+        if isinstance(siem_query.get("query"), dict):
+            mongo_query.update(self._convert_bool_query(siem_query["query"]))
+        
         # Handle text search
-        if "query" in siem_query and siem_query["query"]:
+        elif "query" in siem_query and siem_query["query"]:
             query_text = siem_query["query"]
             if query_text != "*":
                 # Create text search across multiple fields
@@ -448,8 +568,63 @@ class MongoDBConnector(BaseSIEMConnector):
         if "severity" in siem_query:
             mongo_query["event.severity"] = siem_query["severity"]
         
+        # Handle user / source IP filters (indexed together with @timestamp)
+        if "user" in siem_query:
+            mongo_query["user.name"] = siem_query["user"]
+        if "source_ip" in siem_query:
+            mongo_query["source.ip"] = siem_query["source_ip"]
+        
+        return mongo_query
+    
+    def _convert_bool_query(self, es_query: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert term/match/range clauses of an ES bool query to equality and range predicates"""
+        bool_query = es_query.get("bool", {})
+        clauses = []
+        for occur in ("must", "filter"):
+            value = bool_query.get(occur, [])
+            clauses.extend(value if isinstance(value, list) else [value])
+        if not bool_query:
+            clauses.append(es_query)
+        
+        mongo_query = {}
+        for clause in clauses:
+            if not isinstance(clause, dict):
+                continue
+            for kind in ("term", "match", "match_phrase"):
+                if kind in clause:
+                    field, value = next(iter(clause[kind].items()))
+                    if isinstance(value, dict):
+                        value = value.get("value", value.get("query"))
+                    mongo_query[field] = value
+            if "terms" in clause:
+                field, values = next(iter(clause["terms"].items()))
+                mongo_query[field] = {"$in": list(values)}
+            if "range" in clause:
+                field, bounds = next(iter(clause["range"].items()))
+                condition = {}
+                for op in ("gt", "gte", "lt", "lte"):
+                    if op in bounds:
+                        condition[f"${op}"] = self._coerce_range_value(bounds[op])
+                if condition:
+                    mongo_query[field] = condition
         return mongo_query
     
+    @staticmethod
+    def _coerce_range_value(value: Any) -> Any:
+        """Resolve ES date math like ``now-24h`` into datetimes"""
+        if not isinstance(value, str):
+            return value
+        if value == "now":
+            return datetime.now(timezone.utc)
+        if value.startswith("now-") and value[-1] in "mhd" and value[4:-1].isdigit():
+            amount = int(value[4:-1])
+            unit = {"m": "minutes", "h": "hours", "d": "days"}[value[-1]]
+            return datetime.now(timezone.utc) - timedelta(**{unit: amount})
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    
     async def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics for all collections"""
         try:
@@ -509,25 +684,41 @@ class MongoDBConnector(BaseSIEMConnector):
             return {"error": str(e)}
     
     async def cleanup_old_data(self, days_to_keep: int = 30) -> bool:
-        """Clean up old data to manage storage"""
+        """Expire old data through TTL indexes instead of bulk deletes"""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-            
-            total_deleted = 0
+            configured = 0
             for collection_key, collection in self.collections.items():
                 if collection_key == "metadata":
-                    continue  # Don't delete metadata
-                
-                result = await collection.delete_many({
-                    "@timestamp": {"$lt": cutoff_date}
-                })
+                    continue  # Don't expire metadata
                 
-                total_deleted += result.deleted_count
-                logger.info(f"🗑️ Deleted {result.deleted_count} old records from {collection_key}")
+                if await self.query_planner.ensure_ttl_index(collection, days_to_keep):
+                    configured += 1
+                    logger.info(f"🗑️ {collection_key}: documents older than {days_to_keep} days expire via TTL")
             
-            logger.info(f"✅ Cleanup completed: {total_deleted} total records deleted")
-            return True
+            self.retention_days = days_to_keep
+            logger.info(f"✅ Cleanup configured: TTL retention on {configured} collections")
+            return configured > 0
             
         except Exception as e:
             logger.error(f"❌ Cleanup failed: {e}")
             return False
+    
+    def collect_metrics(self) -> List[MetricFamily]:
+        """connection_stats as metric families for /metrics"""
+        stats = self.connection_stats
+        labels = {"database": self.database_name}
+        return [
+            MetricFamily("mongodb_queries", COUNTER, "MongoDB query attempts by outcome")
+            .add({**labels, "outcome": "success"}, stats["successful_queries"])
+            .add({**labels, "outcome": "failure"}, stats["failed_queries"]),
+            MetricFamily("mongodb_connection_failures", GAUGE, "Failed connection attempts since the last successful connect")
+            .add(labels, stats["connection_failures"]),
+            MetricFamily("mongodb_consecutive_failures", GAUGE, "Health-check failures since the last success")
+            .add(labels, stats["consecutive_failures"]),
+            MetricFamily("mongodb_connected", GAUGE, "1 while the MongoDB client is connected")
+            .add(labels, self.connected),
+        ]
+    
+    def get_query_plan_report(self) -> Dict[str, Any]:
+        """Query shapes, derived indexes and slow/COLLSCAN findings"""
+        return self.query_planner.get_report()
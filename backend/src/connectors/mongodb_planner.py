@@ -0,0 +1,376 @@
+"""
+MongoDB Query Planner
+Derives compound indexes from the query shapes the connector actually issues,
+verifies index coverage with explain() and reports slow or COLLSCAN plans.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TIME_FIELD = "@timestamp"
+
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+# Equality fields we filter on together with a time window (ESR-ordered:
+# equality first, then the @timestamp sort/range key)
+BASELINE_SHAPES = {
+    "events": [["event.severity"], ["user.name"], ["source.ip"]],
+    "users": [["user.name"], ["source.ip"]],
+    "network": [["source.ip"], ["destination.ip"]],
+    "alerts": [["event.severity"]],
+}
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """Value-free signature of a MongoDB filter + sort"""
+    collection: str
+    equality: Tuple[str, ...]
+    ranges: Tuple[str, ...]
+    sort: Tuple[Tuple[str, int], ...]
+    unindexable: bool = False  # $or/$regex/$text filters
+
+    def index_keys(self) -> List[Tuple[str, int]]:
+        """Compound index following the equality-sort-range rule"""
+        keys = [(name, 1) for name in self.equality]
+        for name, direction in self.sort:
+            if name not in self.equality:
+                keys.append((name, direction))
+        for name in self.ranges:
+            if name not in dict(keys):
+                keys.append((name, 1))
+        return keys
+
+    def describe(self) -> str:
+        parts = [f"eq={','.join(self.equality) or '-'}", f"range={','.join(self.ranges) or '-'}"]
+        if self.sort:
+            parts.append("sort=" + ",".join(f"{name}:{direction}" for name, direction in self.sort))
+        return f"{self.collection}[{' '.join(parts)}]"
+
+
+@dataclass
+class ShapeStats:
+    """Execution statistics per query shape"""
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    index_name: Optional[str] = None
+    collscan: Optional[bool] = None
+    docs_examined: int = 0
+    returned: int = 0
+    explained_at: Optional[datetime] = None
+    last_seen: datetime = field(default_factory=datetime.now)
+
+
+class MongoQueryPlanner:
+    """
+    Tracks query shapes, creates the compound indexes they need and checks
+    the winning plan with explain()
+    """
+
+    def __init__(
+        self,
+        min_shape_count: int = 3,
+        max_derived_indexes: int = 8,
+        slow_query_threshold: float = 1.0,
+        explain_interval: float = 600.0
+    ):
+        self.min_shape_count = min_shape_count
+        self.max_derived_indexes = max_derived_indexes
+        self.slow_query_threshold = slow_query_threshold
+        self.explain_interval = explain_interval
+
+        self.shape_stats: Dict[QueryShape, ShapeStats] = {}
+        self.indexed_keys: Dict[str, set] = {}
+        self.derived_indexes: Dict[str, int] = {}
+        self.findings = deque(maxlen=200)
+        self._pending: set = set()
+        self._indexing: Dict[QueryShape, asyncio.Task] = {}
+
+    # ------------------------------------------------------------------
+    # Shapes
+    # ------------------------------------------------------------------
+
+    def shape_of(
+        self,
+        collection: str,
+        mongo_filter: Dict[str, Any],
+        sort: Optional[List[Tuple[str, int]]] = None
+    ) -> QueryShape:
+        """Reduce a filter to its value-free shape"""
+        equality, ranges, unindexable = [], [], False
+        for name, condition in mongo_filter.items():
+            if name.startswith("$"):
+                unindexable = True
+                continue
+            if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+                if set(condition) & RANGE_OPERATORS:
+                    ranges.append(name)
+                elif "$in" in condition or "$eq" in condition:
+                    equality.append(name)
+                else:
+                    unindexable = True
+            else:
+                equality.append(name)
+        return QueryShape(
+            collection=collection,
+            equality=tuple(sorted(equality)),
+            ranges=tuple(sorted(ranges)),
+            sort=tuple(sort or ()),
+            unindexable=unindexable
+        )
+
+    def record(self, shape: QueryShape, execution_time: float, returned: int) -> ShapeStats:
+        """Record one execution of a shape"""
+        stats = self.shape_stats.setdefault(shape, ShapeStats())
+        stats.count += 1
+        stats.total_time += execution_time
+        stats.max_time = max(stats.max_time, execution_time)
+        stats.returned = returned
+        stats.last_seen = datetime.now()
+        return stats
+
+    # ------------------------------------------------------------------
+    # Index management
+    # ------------------------------------------------------------------
+
+    async def load_existing_indexes(self, collection_key: str, collection) -> None:
+        """Register the key patterns of indexes already present on a collection"""
+        try:
+            indexes = await collection.index_information()
+        except Exception as e:
+            logger.debug(f"Could not list indexes for {collection_key}: {e}")
+            return
+        known = self.indexed_keys.setdefault(collection_key, set())
+        for info in indexes.values():
+            known.add(tuple(
+                (name, direction if isinstance(direction, str) else int(direction))
+                for name, direction in info.get("key", [])
+            ))
+
+    async def ensure_baseline_indexes(self, collection_key: str, collection) -> None:
+        """Create the time + severity/user/source IP compound indexes"""
+        for equality in BASELINE_SHAPES.get(collection_key, []):
+            shape = QueryShape(
+                collection=collection_key,
+                equality=tuple(equality),
+                ranges=(TIME_FIELD,),
+                sort=((TIME_FIELD, -1),)
+            )
+            await self._create_index(collection_key, collection, shape.index_keys())
+
+    def _wants_index(self, shape: QueryShape) -> bool:
+        """True if a shape is frequent, indexable and not yet covered by an index"""
+        if shape.unindexable or not (shape.equality or shape.ranges):
+            return False
+        stats = self.shape_stats.get(shape)
+        if not stats or stats.count < self.min_shape_count:
+            return False
+        if self._covered(shape.collection, shape.index_keys()):
+            return False
+        return self.derived_indexes.get(shape.collection, 0) < self.max_derived_indexes
+
+    def schedule_index(self, shape: QueryShape, collection) -> None:
+        """Build a frequent shape's index in the background; the query does not wait for it"""
+        if shape in self._indexing or not self._wants_index(shape):
+            return
+        task = asyncio.create_task(self.maybe_create_index(shape, collection))
+        self._indexing[shape] = task
+        task.add_done_callback(lambda _: self._indexing.pop(shape, None))
+
+    async def maybe_create_index(self, shape: QueryShape, collection) -> bool:
+        """Create the compound index for a frequent shape if none covers it"""
+        if not self._wants_index(shape):
+            return False
+
+        keys = shape.index_keys()
+        created = await self._create_index(shape.collection, collection, keys)
+        if created:
+            self.derived_indexes[shape.collection] = self.derived_indexes.get(shape.collection, 0) + 1
+            logger.info(f"📇 Created index {keys} for frequent query shape {shape.describe()}")
+        return created
+
+    async def ensure_ttl_index(self, collection, days_to_keep: int, field_name: str = TIME_FIELD) -> bool:
+        """Create or retune the TTL index that expires documents by time"""
+        expire_after = int(days_to_keep * 86400)
+        index_name = f"ttl_{field_name.lstrip('@')}"
+        try:
+            existing = await collection.index_information()
+            current = existing.get(index_name)
+            if current is None:
+                await collection.create_index(
+                    [(field_name, 1)], name=index_name, expireAfterSeconds=expire_after
+                )
+            elif current.get("expireAfterSeconds") != expire_after:
+                await collection.database.command({
+                    "collMod": collection.name,
+                    "index": {"name": index_name, "expireAfterSeconds": expire_after}
+                })
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to set TTL index on {collection.name}: {e}")
+            return False
+
+    async def _create_index(self, collection_key: str, collection, keys: List[Tuple[str, int]]) -> bool:
+        known = self.indexed_keys.setdefault(collection_key, set())
+        if tuple(keys) in known:
+            return False
+        try:
+            await collection.create_index(keys)
+            known.add(tuple(keys))
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not create index {keys} on {collection_key}: {e}")
+            return False
+
+    def _covered(self, collection_key: str, keys: List[Tuple[str, int]]) -> bool:
+        """True if an existing index has ``keys`` as its prefix"""
+        for existing in self.indexed_keys.get(collection_key, set()):
+            if list(existing[:len(keys)]) == keys:
+                return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Plan verification
+    # ------------------------------------------------------------------
+
+    def schedule_explain(
+        self,
+        shape: QueryShape,
+        collection,
+        mongo_filter: Dict[str, Any],
+        sort: List[Tuple[str, int]],
+        limit: int,
+        execution_time: float
+    ) -> None:
+        """Explain a shape in the background on first sight, when stale or when slow"""
+        stats = self.shape_stats.get(shape)
+        if stats is None or shape in self._pending:
+            return
+        stale = (
+            stats.explained_at is None
+            or (datetime.now() - stats.explained_at).total_seconds() > self.explain_interval
+        )
+        if not stale and execution_time < self.slow_query_threshold:
+            return
+
+        self._pending.add(shape)
+        task = asyncio.create_task(self.explain(shape, collection, mongo_filter, sort, limit, execution_time))
+        task.add_done_callback(lambda _: self._pending.discard(shape))
+
+    async def explain(
+        self,
+        shape: QueryShape,
+        collection,
+        mongo_filter: Dict[str, Any],
+        sort: List[Tuple[str, int]],
+        limit: int,
+        execution_time: float = 0.0
+    ) -> Dict[str, Any]:
+        """Run explain() for a query and summarize its winning plan"""
+        try:
+            plan = await collection.find(mongo_filter).sort(sort).limit(limit).explain()
+        except Exception as e:
+            logger.debug(f"explain() failed for {shape.describe()}: {e}")
+            return {}
+
+        summary = self.summarize_plan(plan)
+        stats = self.shape_stats.setdefault(shape, ShapeStats())
+        stats.explained_at = datetime.now()
+        stats.collscan = summary["collscan"]
+        stats.index_name = summary["index_name"]
+        stats.docs_examined = summary["docs_examined"]
+
+        if summary["collscan"] or execution_time >= self.slow_query_threshold:
+            self._report(shape, summary, execution_time)
+        return summary
+
+    @staticmethod
+    def summarize_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract stages, index and examined/returned counts from explain output"""
+        winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+        # Slot-based engine nests the classic plan under queryPlan
+        winning = winning.get("queryPlan", winning)
+
+        stages, index_name = [], None
+        pending = [winning]
+        while pending:
+            stage = pending.pop()
+            if not isinstance(stage, dict):
+                continue
+            stages.append(stage.get("stage"))
+            index_name = index_name or stage.get("indexName")
+            if "inputStage" in stage:
+                pending.append(stage["inputStage"])
+            pending.extend(stage.get("inputStages", []))
+
+        execution = plan.get("executionStats", {})
+        docs_examined = execution.get("totalDocsExamined", 0)
+        returned = execution.get("nReturned", 0)
+        return {
+            "stages": [stage for stage in stages if stage],
+            "collscan": "COLLSCAN" in stages,
+            "index_name": index_name,
+            "covered": "FETCH" not in stages and "COLLSCAN" not in stages,
+            "docs_examined": docs_examined,
+            "returned": returned,
+            "examined_ratio": (docs_examined / returned) if returned else float(docs_examined),
+            "execution_ms": execution.get("executionTimeMillis")
+        }
+
+    def _report(self, shape: QueryShape, summary: Dict[str, Any], execution_time: float) -> None:
+        finding = {
+            "shape": shape.describe(),
+            "collscan": summary["collscan"],
+            "index_name": summary["index_name"],
+            "docs_examined": summary["docs_examined"],
+            "returned": summary["returned"],
+            "execution_time": execution_time,
+            "suggested_index": shape.index_keys() if not shape.unindexable else None,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.findings.append(finding)
+
+        reason = "COLLSCAN" if summary["collscan"] else "slow plan"
+        logger.warning(
+            f"🐌 MongoDB {reason} for {shape.describe()}: examined {summary['docs_examined']} "
+            f"docs for {summary['returned']} results in {execution_time:.3f}s"
+        )
+
+        try:
+            from ..core.monitoring.performance_profiler import QueryType, get_profiler
+            get_profiler().record(
+                QueryType.DATABASE_QUERY,
+                f"mongodb:{shape.collection}",
+                execution_time,
+                query_id=f"mongodb_explain_{int(time.time() * 1000)}",
+                metadata=finding
+            )
+        except Exception as e:
+            logger.debug(f"Profiler unavailable for MongoDB plan report: {e}")
+
+    def get_report(self) -> Dict[str, Any]:
+        """Shape statistics and recent findings"""
+        shapes = []
+        for shape, stats in sorted(self.shape_stats.items(), key=lambda item: -item[1].count):
+            shapes.append({
+                "shape": shape.describe(),
+                "count": stats.count,
+                "avg_time": stats.total_time / stats.count if stats.count else 0.0,
+                "max_time": stats.max_time,
+                "index_name": stats.index_name,
+                "collscan": stats.collscan,
+                "docs_examined": stats.docs_examined
+            })
+        return {
+            "shapes": shapes,
+            "derived_indexes": dict(self.derived_indexes),
+            "findings": list(self.findings)
+        }
@@ -6,20 +6,32 @@ load balancing, failover, and correlation capabilities.
 
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
 from datetime import datetime, timedelta
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import Enum
 import hashlib
+import inspect
 import json
 import time
 from concurrent.futures import TimeoutError as FuturesTimeoutError
 
 from .base import BaseSIEMConnector
 from .factory import create_connector, get_available_platforms
+from ..core.monitoring.metrics import COUNTER, GAUGE, MetricFamily, get_registry
+from ..core.monitoring.tracing import CLIENT, current_span, traced
+from ..core.query.codegen import backend_for, get_translation_cache
+from ..core.query.estimator import FETCH_SKIP, FetchPlan, get_limit_negotiator, shape_query
+from ..core.query.ir import QueryIR
+from ..core.query.projection import project_document
+from ..core.resilience.circuit_breaker import CircuitBreakerConfig, CircuitBreakerOpenError, CircuitState
+from ..core.resilience.concurrency import BackendGuard, LoadShedError, get_backend_guard
 
 logger = logging.getLogger(__name__)
 
+# Connector search methods -> whether they accept a ``fields`` projection
+_FIELDS_SUPPORT: Dict[Any, bool] = {}
+
 
 class SourcePriority(Enum):
     """Data source priority levels"""
@@ -37,32 +49,19 @@ class LoadBalanceStrategy(Enum):
     RANDOM = "random"
 
 
-@dataclass
-class CircuitBreakerState:
-    """Circuit breaker state for a data source"""
-    state: str = "CLOSED"  # CLOSED, OPEN, HALF_OPEN
-    failure_count: int = 0
-    last_failure_time: Optional[float] = None
-    next_attempt_time: Optional[float] = None
-    success_count_in_half_open: int = 0
-    failure_threshold: int = 5
-    recovery_timeout: int = 60  # seconds
-    success_threshold: int = 3  # successful calls to close circuit
-
 @dataclass
 class SourceConfig:
     """Configuration for a single data source"""
     connector_type: str
     priority: SourcePriority
     enabled: bool = True
-    max_concurrent_queries: int = 10
+    max_concurrent_queries: int = 10  # ceiling for the source's adaptive concurrency limit
     timeout_seconds: int = 30
     retry_attempts: int = 3
     health_check_interval: int = 60  # seconds
     weight: float = 1.0  # Load balancing weight
     tags: Set[str] = field(default_factory=set)
     metadata: Dict[str, Any] = field(default_factory=dict)
-    circuit_breaker: CircuitBreakerState = field(default_factory=CircuitBreakerState)
 
 
 @dataclass
@@ -119,8 +118,22 @@ class MultiSourceManager:
         self.source_response_times: Dict[str, List[float]] = {}
         self.source_load_scores: Dict[str, float] = {}
         
-        # Circuit breaker management
-        self.circuit_breakers: Dict[str, CircuitBreakerState] = {}
+        # Circuit breaker + adaptive concurrency limit per source
+        self.source_guards: Dict[str, BackendGuard] = {}
+        
+        # Lowered IR queries, shared by every source speaking the same backend
+        self.translation_cache = get_translation_cache()
+        
+        # /metrics: per-source latency is recorded as queries finish, source_stats read on scrape
+        registry = get_registry()
+        self.query_seconds = registry.histogram(
+            "source_query_duration_seconds", "Query latency per data source",
+            ("source", "connector_type", "outcome"), unit="seconds"
+        )
+        registry.register_collector(self.collect_metrics)
+        
+        # Pre-flight size estimates -> per-source limit, sample rate or aggregation-only fetch
+        self.limit_negotiator = get_limit_negotiator()
         
         logger.info("🔗 MultiSourceManager initialized with enhanced features")
     
@@ -199,7 +212,7 @@ class MultiSourceManager:
                 }
                 
                 # Initialize circuit breaker and performance tracking
-                self.circuit_breakers[source_id] = CircuitBreakerState()
+                self._create_guard(source_id, config)
                 self.source_response_times[source_id] = []
                 self.source_load_scores[source_id] = 1.0
                 
@@ -221,6 +234,18 @@ class MultiSourceManager:
                 logger.warning("⚠️ DEMO: No real sources discovered, adding dataset fallback")
                 await self._add_fallback_dataset()
     
+    def _create_guard(self, source_id: str, config: SourceConfig) -> BackendGuard:
+        """Breaker (opens after 5 straight failures, probes after 60s) and concurrency limit for a source"""
+        # Own namespace, so a source called "elasticsearch" never shares the connector preset's guard
+        key = f"source:{source_id}"
+        guard = get_backend_guard(
+            key,
+            CircuitBreakerConfig(name=key, failure_threshold=5, success_threshold=3, timeout_seconds=60.0),
+            max_limit=config.max_concurrent_queries
+        )
+        self.source_guards[source_id] = guard
+        return guard
+    
     def _get_default_weight(self, platform: str) -> float:
         """Get default weight for a platform"""
         weights = {
@@ -256,7 +281,7 @@ class MultiSourceManager:
             }
             
             # Initialize circuit breaker and performance tracking  
-            self.circuit_breakers[source_id] = CircuitBreakerState()
+            self._create_guard(source_id, config)
             self.source_response_times[source_id] = []
             self.source_load_scores[source_id] = 1.0
             
@@ -304,25 +329,29 @@ class MultiSourceManager:
                 self.source_stats[source_id]["error_count"] += 1
                 logger.error(f"❌ Health check failed for {source_id}: {e}")
                 # Update circuit breaker on health check failure
+                await self.source_guards[source_id].record_failure(e)
                 self._record_failure(source_id)
     
     async def query_all_sources(
         self,
-        query: str,
+        query: Union[str, QueryIR],
         filters: Optional[Dict[str, Any]] = None,
         limit: int = 1000,
         timeout: float = 30.0,
-        correlation_fields: Optional[List[str]] = None
+        correlation_fields: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
     ) -> AggregatedResult:
         """
         Query all available sources and aggregate results
         
         Args:
-            query: Search query
+            query: Search text, or a QueryIR lowered once per backend and
+                executed natively by each connector
             filters: Additional filters
             limit: Maximum records per source
             timeout: Query timeout in seconds
             correlation_fields: Fields to use for result correlation
+            fields: Fields to return; pushed down to connectors that support it
             
         Returns:
             Aggregated results from all sources
@@ -333,7 +362,14 @@ class MultiSourceManager:
         logger.info(f"🔍 Multi-source query [{query_id}]: {query}")
         
         # Check query cache first
-        query_cache_key = self._generate_cache_key(query, filters, limit)
+        if fields and correlation_fields:
+            # Correlation needs its keys even when the caller did not ask for them
+            fields = list(dict.fromkeys(list(fields) + list(correlation_fields)))
+        if isinstance(query, QueryIR):
+            query = query.with_size(limit)
+            if fields:
+                query = replace(query, fields=tuple(fields))
+        query_cache_key = self._generate_cache_key(query, filters, limit, fields)
         cached_result = self._get_cached_result(query_cache_key)
         if cached_result:
             logger.info(f"⚡ Cache HIT for query [{query_id}]")
@@ -357,12 +393,16 @@ class MultiSourceManager:
                 metadata={"error": "No available sources (health/circuit breaker)"}
             )
         
+        # Plan once: lower the IR a single time per backend, not per source
+        native_queries = self._lower_for_sources(query, selected_sources)
+        
         # Execute queries in parallel with enhanced error handling
         tasks = []
         for source_id in selected_sources:
             task = asyncio.create_task(
-                self._query_single_source_with_circuit_breaker(
-                    source_id, query, filters, limit, timeout
+                self._query_single_source(
+                    source_id, query, filters, limit, timeout, fields,
+                    native_queries.get(self.source_configs[source_id].connector_type)
                 )
             )
             tasks.append(task)
@@ -381,7 +421,7 @@ class MultiSourceManager:
                     task.cancel()
             results = [Exception("Query timeout") for _ in selected_sources]
         
-        # Process results with circuit breaker updates
+        # Process results with load score updates (breakers are updated by the source guards)
         successful_results = []
         failed_sources = []
         
@@ -414,7 +454,7 @@ class MultiSourceManager:
         # Store query in history
         self.query_history.append({
             "query_id": query_id,
-            "query": query,
+            "query": self._describe_query(query),
             "execution_time": execution_time,
             "sources_queried": len(selected_sources),
             "sources_successful": len(successful_results),
@@ -435,12 +475,68 @@ class MultiSourceManager:
         
         return aggregated
     
-    def _generate_cache_key(self, query: str, filters: Optional[Dict[str, Any]], limit: int) -> str:
+    @staticmethod
+    def _accepts_fields(method) -> bool:
+        """Check whether a connector search method takes a ``fields`` argument"""
+        func = getattr(method, "__func__", method)
+        cached = _FIELDS_SUPPORT.get(func)
+        if cached is None:
+            try:
+                cached = "fields" in inspect.signature(func).parameters
+            except (TypeError, ValueError):
+                cached = False
+            _FIELDS_SUPPORT[func] = cached
+        return cached
+    
+    def _lower_for_sources(self, query: Union[str, QueryIR], source_ids: List[str]) -> Dict[str, Any]:
+        """Native query per connector type for an IR query (empty for text queries)"""
+        if not isinstance(query, QueryIR):
+            return {}
+        
+        native_queries = {}
+        for source_id in source_ids:
+            connector_type = self.source_configs[source_id].connector_type
+            backend = backend_for(connector_type)
+            if connector_type in native_queries or not backend:
+                continue
+            try:
+                native_queries[connector_type] = self.translation_cache.lower(query, backend)
+            except Exception as e:
+                logger.error(f"❌ Could not lower query for {connector_type}: {e}")
+        return native_queries
+    
+    @staticmethod
+    def _describe_query(query: Union[str, QueryIR]) -> str:
+        return f"ir:{query.fingerprint}" if isinstance(query, QueryIR) else query
+    
+    @staticmethod
+    def _response_records(response: Any) -> List[Dict[str, Any]]:
+        """Flatten connector responses (record lists or ES-style hits) into records"""
+        if isinstance(response, list):
+            return response
+        if not isinstance(response, dict):
+            return []
+        hits = response.get("hits", [])
+        if isinstance(hits, dict):
+            hits = hits.get("hits", [])
+        return [
+            hit.get("_source", hit) if isinstance(hit, dict) else hit
+            for hit in hits
+        ]
+    
+    def _generate_cache_key(
+        self,
+        query: Union[str, QueryIR],
+        filters: Optional[Dict[str, Any]],
+        limit: int,
+        fields: Optional[List[str]] = None
+    ) -> str:
         """Generate cache key for query result caching"""
         cache_data = {
-            "query": query,
+            "query": self._describe_query(query),
             "filters": filters or {},
-            "limit": limit
+            "limit": limit,
+            "fields": fields or []
         }
         cache_str = json.dumps(cache_data, sort_keys=True)
         return hashlib.md5(cache_str.encode()).hexdigest()[:12]
@@ -474,7 +570,6 @@ class MultiSourceManager:
     def _get_available_sources(self) -> List[str]:
         """Get sources that are healthy and pass circuit breaker check"""
         available = []
-        current_time = time.time()
         
         for source_id in self.sources.keys():
             if not self.source_configs[source_id].enabled:
@@ -483,19 +578,8 @@ class MultiSourceManager:
             if not self.source_health[source_id]:
                 continue
                 
-            # Check circuit breaker
-            cb = self.circuit_breakers[source_id]
-            
-            if cb.state == "OPEN":
-                if cb.next_attempt_time and current_time >= cb.next_attempt_time:
-                    # Transition to HALF_OPEN
-                    cb.state = "HALF_OPEN"
-                    cb.success_count_in_half_open = 0
-                    logger.info(f"🔄 Circuit breaker HALF_OPEN for {source_id}")
-                    available.append(source_id)
-                # else: circuit still open, skip source
-            else:
-                # CLOSED or HALF_OPEN
+            # Skip sources whose circuit is open and not yet due a probe
+            if self.source_guards[source_id].available:
                 available.append(source_id)
                 
         return available
@@ -532,9 +616,7 @@ class MultiSourceManager:
         return sum(times[-10:]) / len(times[-10:])  # Last 10 queries
     
     def _record_success(self, source_id: str, execution_time: float):
-        """Record successful query execution"""
-        cb = self.circuit_breakers[source_id]
-        
+        """Record successful query execution for load balancing"""
         # Update response times
         self.source_response_times[source_id].append(execution_time)
         if len(self.source_response_times[source_id]) > 50:
@@ -543,80 +625,32 @@ class MultiSourceManager:
         # Update load score based on performance
         avg_time = self._get_avg_response_time(source_id)
         self.source_load_scores[source_id] = max(0.1, 1.0 / (avg_time + 0.1))
-        
-        if cb.state == "HALF_OPEN":
-            cb.success_count_in_half_open += 1
-            if cb.success_count_in_half_open >= cb.success_threshold:
-                # Close circuit
-                cb.state = "CLOSED"
-                cb.failure_count = 0
-                cb.next_attempt_time = None
-                logger.info(f"✅ Circuit breaker CLOSED for {source_id}")
-        elif cb.state == "CLOSED":
-            # Reset failure count on success
-            cb.failure_count = 0
     
     def _record_failure(self, source_id: str):
-        """Record failed query execution"""
-        cb = self.circuit_breakers[source_id]
-        cb.failure_count += 1
-        cb.last_failure_time = time.time()
-        
+        """Record failed or rejected query execution for load balancing"""
         # Decrease load score on failure
         self.source_load_scores[source_id] *= 0.8
-        
-        if cb.state == "CLOSED" and cb.failure_count >= cb.failure_threshold:
-            # Open circuit
-            cb.state = "OPEN"
-            cb.next_attempt_time = time.time() + cb.recovery_timeout
-            logger.warning(f"⚠️ Circuit breaker OPEN for {source_id} (failures: {cb.failure_count})")
-        elif cb.state == "HALF_OPEN":
-            # Return to OPEN on any failure in HALF_OPEN
-            cb.state = "OPEN"
-            cb.next_attempt_time = time.time() + cb.recovery_timeout
-            logger.warning(f"⚠️ Circuit breaker OPEN again for {source_id}")
-    
-    async def _query_single_source_with_circuit_breaker(
-        self,
-        source_id: str,
-        query: str,
-        filters: Optional[Dict[str, Any]],
-        limit: int,
-        timeout: float
-    ) -> QueryResult:
-        """Query single source with circuit breaker protection"""
-        cb = self.circuit_breakers[source_id]
-        
-        if cb.state == "OPEN":
-            # Circuit is open, return failure immediately
-            return QueryResult(
-                source_id=source_id,
-                connector_type=self.source_configs[source_id].connector_type,
-                data=[],
-                execution_time=0.0,
-                success=False,
-                error="Circuit breaker is OPEN"
-            )
-        
-        # Proceed with normal query execution
-        return await self._query_single_source(
-            source_id, query, filters, limit, timeout
-        )
     
+    @traced("source.query", kind=CLIENT)
     async def _query_single_source(
         self,
         source_id: str,
-        query: str,
+        query: Union[str, QueryIR],
         filters: Optional[Dict[str, Any]],
         limit: int,
-        timeout: float
+        timeout: float,
+        fields: Optional[List[str]] = None,
+        native_query: Any = None
     ) -> QueryResult:
         """Query a single data source"""
         start_time = datetime.now()
+        span = current_span()
+        query_id = None
         
         try:
             connector = self.sources[source_id]
             config = self.source_configs[source_id]
+            span.set_attributes({"source.id": source_id, "source.type": config.connector_type, "limit": limit})
             
             # Track active query
             if source_id not in self.active_queries:
@@ -625,23 +659,58 @@ class MultiSourceManager:
             query_id = f"{source_id}_{start_time.timestamp()}"
             self.active_queries[source_id].add(query_id)
             
-            # Execute query (adapt based on connector type)
-            if hasattr(connector, 'search'):
-                data = await connector.search(query, limit=limit)
-            elif hasattr(connector, 'query'):
-                data = await connector.query(query, limit=limit)
-            else:
-                # Generic query method
-                data = await connector.execute_query(query, limit=limit)
+            # Execute query (adapt based on connector type) under the source's breaker and concurrency limit
+            if native_query is None and isinstance(query, QueryIR):
+                raise ValueError(f"No code generator for {config.connector_type}")
+            
+            async def run_query() -> Tuple[Any, Optional[FetchPlan], Optional[Dict[str, Any]]]:
+                plan = None
+                aggregations = None
+                if native_query is not None:
+                    # Already lowered for this backend; size the fetch before running it
+                    plan = await self.limit_negotiator.negotiate(
+                        connector, native_query, limit,
+                        key=(source_id, self._describe_query(query))
+                    )
+                    if plan.mode == FETCH_SKIP:
+                        data = []
+                    else:
+                        data = connector.execute_query(shape_query(native_query, plan), size=plan.limit)
+                        if inspect.isawaitable(data):
+                            data = await data
+                        if isinstance(data, dict):
+                            aggregations = data.get("aggregations") or None
+                        data = self._response_records(data)
+                elif hasattr(connector, 'search'):
+                    if fields and self._accepts_fields(connector.search):
+                        data = await connector.search(query, limit=limit, fields=fields)
+                    else:
+                        data = await connector.search(query, limit=limit)
+                elif hasattr(connector, 'query'):
+                    data = await connector.query(query, limit=limit)
+                else:
+                    # Generic query method
+                    data = await connector.execute_query(query, limit=limit)
+                return data, plan, aggregations
             
-            # Clean up tracking
-            self.active_queries[source_id].discard(query_id)
+            # The timeout sits inside the guard, so a hung backend counts against its breaker
+            async with self.source_guards[source_id].admit():
+                try:
+                    data, plan, aggregations = await asyncio.wait_for(run_query(), timeout)
+                except asyncio.TimeoutError:
+                    raise asyncio.TimeoutError(f"{source_id} did not answer within {timeout}s") from None
+            
+            # Project locally for connectors that cannot push fields down
+            if fields and isinstance(data, list):
+                data = [project_document(record, fields) for record in data]
             
             # Update stats
             execution_time = (datetime.now() - start_time).total_seconds()
             self.source_stats[source_id]["queries_executed"] += 1
             self.source_stats[source_id]["total_execution_time"] += execution_time
             self.source_stats[source_id]["last_query_time"] = start_time.isoformat()
+            self.query_seconds.labels(source_id, config.connector_type, "success").record(execution_time)
+            span.set_attribute("result.count", len(data) if isinstance(data, list) else 0)
             
             return QueryResult(
                 source_id=source_id,
@@ -650,15 +719,37 @@ class MultiSourceManager:
                 execution_time=execution_time,
                 success=True,
                 metadata={
-                    "query": query,
-                    "limit": limit,
-                    "filters": filters
+                    "query": self._describe_query(query),
+                    "limit": plan.limit if plan else limit,
+                    "filters": filters,
+                    **({"fetch_plan": plan.as_dict()} if plan else {}),
+                    **({"aggregations": aggregations} if aggregations else {})
                 }
             )
             
+        except CircuitBreakerOpenError as e:
+            # Rejected before reaching the backend: breaker open or load shed
+            rejected = "load_shed" if isinstance(e, LoadShedError) else "circuit_open"
+            span.set_attribute("source.rejected", rejected)
+            logger.warning(f"🚦 Query to {source_id} rejected: {e}")
+            
+            return QueryResult(
+                source_id=source_id,
+                connector_type=self.source_configs[source_id].connector_type,
+                data=[],
+                execution_time=(datetime.now() - start_time).total_seconds(),
+                success=False,
+                error=str(e),
+                metadata={"rejected": rejected}
+            )
+            
         except Exception as e:
             execution_time = (datetime.now() - start_time).total_seconds()
             self.source_stats[source_id]["error_count"] += 1
+            self.query_seconds.labels(
+                source_id, self.source_configs[source_id].connector_type, "error"
+            ).record(execution_time)
+            span.record_exception(e)
             
             logger.error(f"❌ Query failed for {source_id}: {e}")
             
@@ -670,6 +761,11 @@ class MultiSourceManager:
                 success=False,
                 error=str(e)
             )
+        
+        finally:
+            # Clean up tracking
+            if query_id is not None:
+                self.active_queries.get(source_id, set()).discard(query_id)
     
     async def _aggregate_results(
         self,
@@ -710,7 +806,13 @@ class MultiSourceManager:
             metadata={
                 "sources_queried": len(results),
                 "correlation_fields": correlation_fields,
-                "total_execution_time": total_execution_time
+                "total_execution_time": total_execution_time,
+                "fetch_plans": {
+                    r.source_id: r.metadata["fetch_plan"] for r in results if "fetch_plan" in r.metadata
+                },
+                "aggregations": {
+                    r.source_id: r.metadata["aggregations"] for r in results if "aggregations" in r.metadata
+                }
             }
         )
     
@@ -739,6 +841,26 @@ class MultiSourceManager:
         logger.info(f"🔄 Deduplicated {len(records)} -> {len(unique_records)} records")
         return unique_records
     
+    def collect_metrics(self) -> List[MetricFamily]:
+        """source_stats, health and breaker state as metric families for /metrics"""
+        queries = MetricFamily("source_queries", COUNTER, "Queries executed per data source")
+        errors = MetricFamily("source_errors", COUNTER, "Query and health-check errors per data source")
+        busy = MetricFamily("source_query_time_seconds", COUNTER, "Cumulative query time per data source", "seconds")
+        healthy = MetricFamily("source_healthy", GAUGE, "1 while the data source passes health checks")
+        circuit = MetricFamily("source_circuit_open", GAUGE, "1 while the source's circuit breaker is not closed")
+        in_flight = MetricFamily("source_active_queries", GAUGE, "Queries currently running per data source")
+        for source_id, config in list(self.source_configs.items()):
+            labels = {"source": source_id, "connector_type": config.connector_type}
+            stats = self.source_stats.get(source_id, {})
+            queries.add(labels, stats.get("queries_executed", 0))
+            errors.add(labels, stats.get("error_count", 0))
+            busy.add(labels, stats.get("total_execution_time", 0.0))
+            healthy.add(labels, self.source_health.get(source_id, False))
+            guard = self.source_guards.get(source_id)
+            circuit.add(labels, guard is not None and guard.breaker.state != CircuitState.CLOSED)
+            in_flight.add(labels, len(self.active_queries.get(source_id, ())))
+        return [queries, errors, busy, healthy, circuit, in_flight]
+    
     def get_source_status(self) -> Dict[str, Any]:
         """Get comprehensive status of all configured sources"""
         available_sources = self._get_available_sources()
@@ -752,6 +874,7 @@ class MultiSourceManager:
                 "cache_ttl": self.cache_ttl,
                 "recent_queries": len(self.query_history)
             },
+            "fetch_planning": self.limit_negotiator.get_stats(),
             "sources": {
                 source_id: {
                     "type": config.connector_type,
@@ -762,10 +885,11 @@ class MultiSourceManager:
                     "load_score": self.source_load_scores.get(source_id, 1.0),
                     "avg_response_time": self._get_avg_response_time(source_id),
                     "circuit_breaker": {
-                        "state": self.circuit_breakers[source_id].state,
-                        "failure_count": self.circuit_breakers[source_id].failure_count,
-                        "last_failure": self.circuit_breakers[source_id].last_failure_time
+                        "state": self.source_guards[source_id].breaker.state.value.upper(),
+                        "failure_count": self.source_guards[source_id].breaker.metrics.consecutive_failures,
+                        "last_failure": self.source_guards[source_id].breaker.metrics.last_failure_time
                     },
+                    "concurrency": self.source_guards[source_id].limiter.get_stats(),
                     "stats": self.source_stats[source_id],
                     "tags": list(config.tags)
                 }
@@ -807,6 +931,9 @@ class MultiSourceManager:
                 "last_query_time": None,
                 "error_count": 0
             }
+            self._create_guard(source_id, config)
+            self.source_response_times.setdefault(source_id, [])
+            self.source_load_scores.setdefault(source_id, 1.0)
             
             logger.info(f"✅ Added source: {source_id} ({connector_type})")
             return True
@@ -832,6 +959,7 @@ class MultiSourceManager:
             del self.source_configs[source_id]
             del self.source_health[source_id]
             del self.source_stats[source_id]
+            self.source_guards.pop(source_id, None)
             
             if source_id in self.active_queries:
                 del self.active_queries[source_id]
@@ -0,0 +1,344 @@
+"""
+Connector Registry
+Process-wide, ref-counted and health-checked connector instances keyed by
+kind + configuration, so callers share one connector instead of re-creating
+(and re-loading) it per request or per stream.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Callable, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConnectorKind:
+    """How to build, initialize, health-check and close one kind of connector"""
+    factory: Callable[[Dict[str, Any]], Any]
+    initializer: Optional[Callable[[Any], Any]] = None
+    health_check: Optional[Callable[[Any], Any]] = None
+    closer: Optional[Callable[[Any], Any]] = None
+
+
+@dataclass
+class RegistryEntry:
+    """A shared connector instance and its bookkeeping"""
+    key: str
+    kind: str
+    connector: Any
+    owned: bool = True
+    ref_count: int = 0
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    last_health_check: float = 0.0
+    healthy: bool = True
+
+
+class ConnectorRegistry:
+    """
+    Shares connector instances across the process
+
+    Instances are created lazily on first ``acquire``, health-checked at most
+    every ``health_check_interval`` seconds and replaced when unhealthy.
+    Released instances stay cached for ``idle_ttl`` seconds before being closed.
+    """
+
+    def __init__(self, health_check_interval: float = 30.0, idle_ttl: float = 300.0):
+        self.health_check_interval = health_check_interval
+        self.idle_ttl = idle_ttl
+
+        self.kinds: Dict[str, ConnectorKind] = {}
+        self.entries: Dict[str, RegistryEntry] = {}
+        self._by_instance: Dict[int, RegistryEntry] = {}
+        self._retired: List[RegistryEntry] = []
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        self.stats = {
+            "created": 0,
+            "reused": 0,
+            "replaced_unhealthy": 0,
+            "closed": 0,
+            "failed_creations": 0
+        }
+
+    # ------------------------------------------------------------------
+    # Configuration
+    # ------------------------------------------------------------------
+
+    def register_kind(
+        self,
+        kind: str,
+        factory: Callable[[Dict[str, Any]], Any],
+        initializer: Optional[Callable[[Any], Any]] = None,
+        health_check: Optional[Callable[[Any], Any]] = None,
+        closer: Optional[Callable[[Any], Any]] = None
+    ) -> None:
+        """Register how to build a connector kind"""
+        self.kinds[kind] = ConnectorKind(factory, initializer, health_check, closer)
+
+    @staticmethod
+    def make_key(kind: str, config: Optional[Dict[str, Any]] = None) -> str:
+        """Stable key for a connector kind and its configuration"""
+        encoded = json.dumps(config or {}, sort_keys=True, default=str)
+        return f"{kind}:{hashlib.sha1(encoded.encode()).hexdigest()[:12]}"
+
+    def adopt(self, kind: str, config: Optional[Dict[str, Any]], connector: Any) -> str:
+        """
+        Register an instance created elsewhere (e.g. at app startup)
+
+        Adopted instances are shared but never closed by the registry.
+        """
+        key = self.make_key(kind, config)
+        entry = RegistryEntry(key=key, kind=kind, connector=connector, owned=False)
+        self._replace(key, entry)
+        logger.info(f"🔗 Registry adopted existing {kind} connector [{key}]")
+        return key
+
+    # ------------------------------------------------------------------
+    # Acquire / release
+    # ------------------------------------------------------------------
+
+    async def acquire(self, kind: str, config: Optional[Dict[str, Any]] = None) -> Any:
+        """Get a shared connector, creating and initializing it on first use"""
+        key = self.make_key(kind, config)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            entry = self.entries.get(key)
+            if entry is not None and not await self._is_healthy(entry):
+                logger.warning(f"⚠️ Registry connector {key} unhealthy, replacing it")
+                self.stats["replaced_unhealthy"] += 1
+                await self._retire(entry)
+                entry = None
+
+            if entry is None:
+                entry = await self._create(kind, key, config or {})
+            else:
+                self.stats["reused"] += 1
+
+            entry.ref_count += 1
+            entry.last_used = time.time()
+
+        await self.sweep()
+        return entry.connector
+
+    async def release(self, connector: Any) -> None:
+        """Drop one reference to a connector obtained from ``acquire``"""
+        entry = self._by_instance.get(id(connector))
+        if entry is None:
+            return
+        entry.ref_count = max(0, entry.ref_count - 1)
+        entry.last_used = time.time()
+
+        if entry.ref_count == 0 and entry in self._retired:
+            await self._close(entry)
+        await self.sweep()
+
+    @asynccontextmanager
+    async def lease(self, kind: str, config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Any]:
+        """``async with registry.lease(kind, config) as connector:``"""
+        connector = await self.acquire(kind, config)
+        try:
+            yield connector
+        finally:
+            await self.release(connector)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def sweep(self) -> int:
+        """Close idle owned connectors and retired ones nobody holds any more"""
+        now = time.time()
+        closed = 0
+        for key, entry in list(self.entries.items()):
+            if entry.owned and entry.ref_count == 0 and now - entry.last_used > self.idle_ttl:
+                self.entries.pop(key, None)
+                await self._close(entry)
+                closed += 1
+        for entry in list(self._retired):
+            if entry.ref_count == 0:
+                await self._close(entry)
+                closed += 1
+        return closed
+
+    async def close_all(self) -> None:
+        """Close every owned connector (application shutdown)"""
+        for entry in list(self.entries.values()) + list(self._retired):
+            await self._close(entry)
+        self.entries.clear()
+        self._retired.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Registry contents and counters"""
+        now = time.time()
+        return {
+            "entries": [
+                {
+                    "key": entry.key,
+                    "kind": entry.kind,
+                    "ref_count": entry.ref_count,
+                    "owned": entry.owned,
+                    "healthy": entry.healthy,
+                    "age_seconds": round(now - entry.created_at, 1),
+                    "idle_seconds": round(now - entry.last_used, 1) if entry.ref_count == 0 else 0.0
+                }
+                for entry in self.entries.values()
+            ],
+            "retired": len(self._retired),
+            "stats": dict(self.stats)
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _create(self, kind: str, key: str, config: Dict[str, Any]) -> RegistryEntry:
+        spec = self.kinds.get(kind)
+        if spec is None:
+            raise KeyError(f"Unknown connector kind: {kind}")
+
+        try:
+            connector = await _maybe_await(spec.factory(config))
+            if spec.initializer:
+                ready = await _maybe_await(spec.initializer(connector))
+                if ready is False:
+                    raise RuntimeError(f"{kind} connector failed to initialize")
+        except Exception:
+            self.stats["failed_creations"] += 1
+            raise
+
+        entry = RegistryEntry(key=key, kind=kind, connector=connector, last_health_check=time.time())
+        self._replace(key, entry)
+        self.stats["created"] += 1
+        logger.info(f"🔌 Registry created {kind} connector [{key}]")
+        return entry
+
+    def _replace(self, key: str, entry: RegistryEntry) -> None:
+        previous = self.entries.get(key)
+        if previous is not None and previous is not entry:
+            self._retired.append(previous)
+        self.entries[key] = entry
+        self._by_instance[id(entry.connector)] = entry
+
+    async def _is_healthy(self, entry: RegistryEntry) -> bool:
+        if time.time() - entry.last_health_check < self.health_check_interval:
+            return entry.healthy
+
+        spec = self.kinds.get(entry.kind)
+        check = spec.health_check if spec and spec.health_check else _default_health_check
+        try:
+            entry.healthy = bool(await _maybe_await(check(entry.connector)))
+        except Exception as e:
+            logger.debug(f"Health check failed for {entry.key}: {e}")
+            entry.healthy = False
+        entry.last_health_check = time.time()
+        # Adopted instances are managed by their owner; keep sharing them
+        return entry.healthy or not entry.owned
+
+    async def _retire(self, entry: RegistryEntry) -> None:
+        if self.entries.get(entry.key) is entry:
+            self.entries.pop(entry.key)
+        if entry.ref_count == 0:
+            await self._close(entry)
+        else:
+            self._retired.append(entry)
+
+    async def _close(self, entry: RegistryEntry) -> None:
+        if entry in self._retired:
+            self._retired.remove(entry)
+        self._by_instance.pop(id(entry.connector), None)
+        if not entry.owned:
+            return
+
+        spec = self.kinds.get(entry.kind)
+        try:
+            if spec and spec.closer:
+                await _maybe_await(spec.closer(entry.connector))
+            else:
+                for method in ("disconnect", "cleanup", "close"):
+                    if hasattr(entry.connector, method):
+                        await _maybe_await(getattr(entry.connector, method)())
+                        break
+            self.stats["closed"] += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Error closing {entry.kind} connector [{entry.key}]: {e}")
+
+
+async def _maybe_await(value: Any) -> Any:
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def _default_health_check(connector: Any) -> bool:
+    for method in ("test_connection", "is_available"):
+        if hasattr(connector, method):
+            return await _maybe_await(getattr(connector, method)())
+    return True
+
+
+# ----------------------------------------------------------------------
+# Built-in connector kinds
+# ----------------------------------------------------------------------
+
+def _create_dataset_connector(config: Dict[str, Any]):
+    from .dataset_connector import DatasetConnector
+    return DatasetConnector(**config)
+
+
+def _create_multi_source_manager(config: Dict[str, Any]):
+    from .multi_source_manager import MultiSourceManager
+    return MultiSourceManager(**config)
+
+
+async def _multi_source_healthy(manager) -> bool:
+    return any(manager.source_health.values()) if manager.source_health else bool(manager.sources)
+
+
+def _create_elasticsearch_client(config: Dict[str, Any]):
+    from elasticsearch import Elasticsearch
+    return Elasticsearch(
+        [config.get("url", "http://localhost:9200")],
+        request_timeout=config.get("request_timeout", 10),
+        max_retries=config.get("max_retries", 2),
+        retry_on_timeout=True,
+        headers={'Accept': 'application/json'}
+    )
+
+
+async def _elasticsearch_ping(client) -> bool:
+    return await asyncio.to_thread(client.ping)
+
+
+connector_registry = ConnectorRegistry()
+connector_registry.register_kind(
+    "dataset",
+    _create_dataset_connector,
+    initializer=lambda connector: connector.connect()
+)
+connector_registry.register_kind(
+    "multi_source",
+    _create_multi_source_manager,
+    initializer=lambda manager: manager.initialize(),
+    health_check=_multi_source_healthy,
+    closer=lambda manager: manager.cleanup()
+)
+connector_registry.register_kind(
+    "elasticsearch_client",
+    _create_elasticsearch_client,
+    initializer=_elasticsearch_ping,
+    health_check=_elasticsearch_ping
+)
+
+
+def get_connector_registry() -> ConnectorRegistry:
+    """Get the process-wide connector registry"""
+    return connector_registry
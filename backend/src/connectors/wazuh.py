@@ -11,6 +11,8 @@ from typing import Dict, List, Any, Optional
 
 import requests
 
+from ..core.resilience.concurrency import get_backend_guard
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +29,7 @@ class WazuhConnector:
         
         self.session = requests.Session()
         self.token = self._authenticate()
+        self.guard = get_backend_guard("wazuh")
 
     def is_available(self) -> bool:
         """Return True when authentication succeeded."""
@@ -38,7 +41,7 @@ class WazuhConnector:
             return {"hits": [], "total": 0}
 
         try:
-            return await asyncio.to_thread(self._search_alerts, limit)
+            return await self.guard.call(asyncio.to_thread, self._search_alerts, limit)
         except Exception as exc:
             logger.warning("Wazuh search failed: %s", exc)
             return {"hits": [], "total": 0}
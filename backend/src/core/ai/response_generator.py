@@ -6,11 +6,17 @@ Uses Google Gemini AI for intelligent SIEM analysis and response generation
 import os
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple, AsyncIterator
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import asyncio
 import re
+import threading
+
+from ..monitoring.tracing import tracer, traced
+from ..resilience.circuit_breaker import CircuitBreakerOpenError
+from ..resilience.concurrency import get_backend_guard
+from ..stage_scheduler import DEFAULT_AI_TIMEOUT
 
 # Import Google AI library
 try:
@@ -21,6 +27,15 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_CHUNK_WORDS = 6
+MAX_SUMMARY_CHARS = 1000
+
+
+def chunk_text(text: str, words: int = SUMMARY_CHUNK_WORDS) -> List[str]:
+    """Split text into word groups that concatenate back to the (right-stripped) text"""
+    tokens = re.findall(r"\s*\S+", text)
+    return ["".join(tokens[i:i + words]) for i in range(0, len(tokens), words)]
+
 
 @dataclass
 class AnalysisContext:
@@ -37,12 +52,22 @@ class AnalysisContext:
 class ResponseGenerator:
     """AI-powered response generator for SIEM analysis"""
     
-    def __init__(self):
-        """Initialize the response generator"""
+    def __init__(self, ai_timeout: float = DEFAULT_AI_TIMEOUT):
+        """
+        Initialize the response generator
+        
+        Args:
+            ai_timeout: Seconds to wait for a Gemini call before using the templates
+        """
+        self.ai_timeout = ai_timeout
+        # Stream producers whose consumer left; kept referenced until their thread returns
+        self._draining: Set[asyncio.Task] = set()
         self.gemini_model = None
         self.initialized = False
         self.fallback_templates = self._load_fallback_templates()
         self.analysis_prompts = self._load_analysis_prompts()
+        # Breaker + adaptive concurrency limit for Gemini; rejected calls use the templates
+        self.gemini_guard = get_backend_guard("gemini")
         
         # Initialize Gemini if available
         if GEMINI_AVAILABLE:
@@ -63,6 +88,7 @@ class ResponseGenerator:
             logger.error(f"Failed to initialize Gemini AI: {e}")
             self.initialized = False
     
+    @traced("response.summary")
     async def generate_summary(
         self,
         results: List[Dict[str, Any]],
@@ -96,6 +122,65 @@ class ResponseGenerator:
             logger.error(f"Error generating summary: {e}")
             return self._generate_fallback_summary(results, query, intent)
     
+    async def stream_summary(
+        self,
+        results: List[Dict[str, Any]],
+        query: str,
+        intent: str,
+        context: Optional[AnalysisContext] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yield the summary incrementally
+        
+        Tokens come straight from Gemini when it is available; otherwise the template
+        summary is chunked by words so callers consume the same stream either way.
+        """
+        # Not entered: a current span held across yields would adopt the consumer's spans
+        span = tracer.start_span("response.stream_summary", {"results": len(results)})
+        try:
+            async for chunk in self._stream_summary(results, query, intent, context, span):
+                yield chunk
+        finally:
+            span.end()
+    
+    async def _stream_summary(
+        self,
+        results: List[Dict[str, Any]],
+        query: str,
+        intent: str,
+        context: Optional[AnalysisContext],
+        span: Any
+    ) -> AsyncIterator[str]:
+        if results and self.initialized and GEMINI_AVAILABLE:
+            emitted = False
+            try:
+                async for text in self._stream_ai_summary(results, query, intent, context):
+                    if not emitted:
+                        span.add_event("first_token", {"source": "gemini"})
+                    emitted = True
+                    yield text
+            except Exception as e:
+                span.record_exception(e)
+                logger.error(f"Gemini streaming error: {e}")
+            if emitted:
+                span.set_attribute("source", "gemini")
+                return
+        
+        span.set_attribute("source", "template")
+        try:
+            if not results:
+                summary = self._generate_empty_results_response(query, intent)
+            else:
+                summary = self._generate_template_summary(results, query, intent, context)
+        except Exception as e:
+            logger.error(f"Error generating summary: {e}")
+            summary = self._generate_fallback_summary(results, query, intent)
+        
+        for chunk in chunk_text(summary):
+            yield chunk
+            await asyncio.sleep(0)
+    
+    @traced("response.recommendations")
     async def generate_recommendations(
         self,
         results: List[Dict[str, Any]],
@@ -125,6 +210,7 @@ class ResponseGenerator:
             logger.error(f"Error generating recommendations: {e}")
             return self._generate_fallback_recommendations(intent)
     
+    @traced("response.threat_patterns")
     async def analyze_threat_patterns(
         self,
         results: List[Dict[str, Any]],
@@ -160,6 +246,7 @@ class ResponseGenerator:
             logger.error(f"Error analyzing threat patterns: {e}")
             return {"error": str(e)}
     
+    @traced("response.follow_ups")
     async def generate_follow_up_questions(
         self,
         query: str,
@@ -187,6 +274,22 @@ class ResponseGenerator:
             logger.error(f"Error generating follow-ups: {e}")
             return self._get_default_follow_ups(intent)
     
+    async def _generate_content(self, prompt: str) -> Any:
+        """
+        One Gemini call under its guard, abandoned after ``ai_timeout``
+        
+        The worker thread can't be interrupted, so the call keeps its Gemini slot until
+        the thread returns; only the caller stops waiting and falls back to a template.
+        """
+        call = asyncio.ensure_future(
+            self.gemini_guard.call(asyncio.to_thread, self.gemini_model.generate_content, prompt)
+        )
+        call.add_done_callback(lambda done: done.cancelled() or done.exception())
+        try:
+            return await asyncio.wait_for(asyncio.shield(call), self.ai_timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"Gemini did not answer within {self.ai_timeout}s") from None
+    
     async def _generate_ai_summary(
         self,
         results: List[Dict[str, Any]],
@@ -203,7 +306,7 @@ class ResponseGenerator:
         prompt = self._build_summary_prompt(query, intent, analysis_data, results[:5])  # Limit for token efficiency
         
         try:
-            response = await asyncio.to_thread(self.gemini_model.generate_content, prompt)
+            response = await self._generate_content(prompt)
             
             if response and response.text:
                 # Clean and validate response
@@ -217,6 +320,72 @@ class ResponseGenerator:
             logger.error(f"Gemini API error: {e}")
             return self._generate_template_summary(results, query, intent, context)
     
+    async def _stream_ai_summary(
+        self,
+        results: List[Dict[str, Any]],
+        query: str,
+        intent: str,
+        context: Optional[AnalysisContext] = None
+    ) -> AsyncIterator[str]:
+        """Relay Gemini's streamed chunks from its worker thread as they arrive"""
+        analysis_data = self._prepare_analysis_data(results, context)
+        prompt = self._build_summary_prompt(query, intent, analysis_data, results[:5])
+        
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stop = threading.Event()
+        
+        def produce() -> Optional[Exception]:
+            try:
+                for chunk in self.gemini_model.generate_content(prompt, stream=True):
+                    if stop.is_set():
+                        return None  # consumer is gone: stop pulling from the provider
+                    text = getattr(chunk, "text", "")
+                    if text:
+                        loop.call_soon_threadsafe(chunks.put_nowait, text)
+                loop.call_soon_threadsafe(chunks.put_nowait, finished)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+                return e
+            return None
+        
+        async def guarded():
+            # The stream holds its Gemini slot until the worker thread is done
+            try:
+                async with self.gemini_guard.admit():
+                    error = await asyncio.to_thread(produce)
+                    if error is not None:
+                        raise error  # counted by the breaker; the consumer already has it
+            except CircuitBreakerOpenError as e:
+                chunks.put_nowait(e)
+            except Exception:
+                pass
+        
+        producer = asyncio.create_task(guarded())
+        self._draining.add(producer)
+        producer.add_done_callback(self._draining.discard)
+        length = 0
+        try:
+            while length < MAX_SUMMARY_CHARS:
+                try:
+                    item = await asyncio.wait_for(chunks.get(), self.ai_timeout)
+                except asyncio.TimeoutError:
+                    raise asyncio.TimeoutError(f"Gemini stream stalled for {self.ai_timeout}s") from None
+                if item is finished:
+                    await producer
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                # Same cleanup as _clean_ai_response, applied per chunk
+                text = re.sub(r"\*{1,2}", "", item)
+                length += len(text)
+                yield text
+        finally:
+            # Cap reached, stalled or the client went away: the worker stops at its next chunk.
+            # The producer is left to finish so the Gemini slot is held until the thread returns.
+            stop.set()
+    
     async def _generate_ai_recommendations(
         self,
         results: List[Dict[str, Any]],
@@ -230,7 +399,7 @@ class ResponseGenerator:
         prompt = self._build_recommendations_prompt(query, intent, analysis_data, results[:3])
         
         try:
-            response = await asyncio.to_thread(self.gemini_model.generate_content, prompt)
+            response = await self._generate_content(prompt)
             
             if response and response.text:
                 recommendations = self._parse_ai_recommendations(response.text)
@@ -269,7 +438,7 @@ class ResponseGenerator:
         """
         
         try:
-            response = await asyncio.to_thread(self.gemini_model.generate_content, prompt)
+            response = await self._generate_content(prompt)
             if response and response.text:
                 # Try to parse JSON response
                 json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
@@ -305,7 +474,7 @@ class ResponseGenerator:
         """
         
         try:
-            response = await asyncio.to_thread(self.gemini_model.generate_content, prompt)
+            response = await self._generate_content(prompt)
             if response and response.text:
                 # Try to parse JSON array
                 json_match = re.search(r'\[.*\]', response.text, re.DOTALL)
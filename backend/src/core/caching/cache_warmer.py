@@ -17,6 +17,7 @@ import hashlib
 import random
 
 from .redis_manager import RedisManager, redis_manager
+from ..monitoring.metrics import COUNTER, GAUGE, MetricFamily, get_registry
 from ..monitoring.performance_profiler import performance_profiler, QueryType
 
 logger = logging.getLogger(__name__)
@@ -129,6 +130,8 @@ class IntelligentCacheWarmer:
         self.active_warming_tasks: Set[str] = set()
         self.warming_semaphore = asyncio.Semaphore(self.max_concurrent_warming)
         
+        get_registry().register_collector(self.collect_metrics)
+        
         logger.info("🧠 Intelligent Cache Warmer initialized")
     
     async def start(self):
@@ -442,20 +445,20 @@ class IntelligentCacheWarmer:
                 logger.info(f"🔥 Warming cache: {task.query_hash[:8]} (priority: {task.priority.name})")
                 
                 # Import here to avoid circular imports
-                from ..connectors.multi_source_manager import MultiSourceManager
-                
-                # Create a multi-source manager instance for warming
-                # In practice, you'd use the existing instance
-                manager = MultiSourceManager()
-                await manager.initialize()
+                from ..connectors.registry import get_connector_registry
+                from ..config import settings
                 
-                # Execute the query to warm the cache
-                result = await manager.query_all_sources(
-                    query=task.query,
-                    filters=task.filters,
-                    limit=100,  # Reasonable limit for warming
-                    timeout=30.0
-                )
+                # Share the application's multi-source manager (adopted at startup)
+                # instead of initializing a new one per warming task
+                registry = get_connector_registry()
+                async with registry.lease("multi_source", {"environment": settings.environment}) as manager:
+                    # Execute the query to warm the cache
+                    result = await manager.query_all_sources(
+                        query=task.query,
+                        filters=task.filters,
+                        limit=100,  # Reasonable limit for warming
+                        timeout=30.0
+                    )
                 
                 execution_time = time.time() - start_time
                 
@@ -557,6 +560,24 @@ class IntelligentCacheWarmer:
             "cache_hit_improvement": self._calculate_cache_improvement()
         }
     
+    def collect_metrics(self) -> List[MetricFamily]:
+        """warming_stats and task queues as metric families for /metrics"""
+        stats = self.warming_stats
+        return [
+            MetricFamily("cache_warming_tasks", COUNTER, "Cache warming tasks finished by outcome")
+            .add({"outcome": "success"}, stats["successful_tasks"])
+            .add({"outcome": "failure"}, stats["failed_tasks"]),
+            MetricFamily("cache_warming_bytes", COUNTER, "Approximate bytes of results warmed into the cache", "bytes")
+            .add({}, stats["bytes_warmed"]),
+            MetricFamily("cache_warming_time_saved_seconds", GAUGE, "Estimated query time saved by warming", "seconds")
+            .add({}, stats["time_saved"]),
+            MetricFamily("cache_warming_queue", GAUGE, "Warming tasks by state")
+            .add({"state": "pending"}, len(self.warming_tasks))
+            .add({"state": "active"}, len(self.active_warming_tasks)),
+            MetricFamily("cache_warming_tracked_queries", GAUGE, "Query shapes tracked for warming")
+            .add({}, len(self.query_analytics)),
+        ]
+    
     def _calculate_cache_improvement(self) -> Dict[str, Any]:
         """Calculate cache hit rate improvement from warming"""
         recent_successful = len([
@@ -14,6 +14,10 @@ import os
 from dataclasses import dataclass, field
 from enum import Enum
 
+from ..monitoring.histogram import LogLinearHistogram
+from ..monitoring.metrics import COUNTER, GAUGE, HISTOGRAM, MetricFamily, get_registry
+from ..monitoring.tracing import current_span, traced
+
 # Use aioredis for async Redis operations
 try:
     import aioredis
@@ -47,6 +51,14 @@ class RedisStats:
     last_connection_time: Optional[float] = None
     avg_response_time: float = 0.0
     response_times: List[float] = field(default_factory=list)
+    latency: LogLinearHistogram = field(default_factory=LogLinearHistogram)  # since start (/metrics)
+    
+    def record_response_time(self, response_time: float) -> None:
+        """Keep the last 100 response times and the all-time histogram"""
+        self.response_times.append(response_time)
+        if len(self.response_times) > 100:
+            self.response_times = self.response_times[-100:]
+        self.latency.record(response_time)
     
     @property
     def success_rate(self) -> float:
@@ -109,6 +121,7 @@ class RedisManager:
         
         # Performance and monitoring
         self.stats = RedisStats()
+        get_registry().register_collector(self.collect_metrics)
         self.local_cache: Dict[str, tuple[Any, float]] = {}  # key -> (value, expiry_time)
         self.max_local_cache_size = int(os.getenv("MAX_LOCAL_CACHE_SIZE", "1000"))
         
@@ -177,9 +190,7 @@ class RedisManager:
             response_time = time.time() - start_time
             
             # Update response time statistics
-            self.stats.response_times.append(response_time)
-            if len(self.stats.response_times) > 100:
-                self.stats.response_times = self.stats.response_times[-100:]
+            self.stats.record_response_time(response_time)
             
             self.stats.avg_response_time = sum(self.stats.response_times) / len(self.stats.response_times)
             
@@ -323,8 +334,10 @@ class RedisManager:
         query_json = json.dumps(query_data, sort_keys=True)
         return hashlib.sha256(query_json.encode()).hexdigest()[:16]
 
+    @traced("redis.get")
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache with smart failover"""
+        span = current_span()
         start_time = time.time()
         self.stats.total_operations += 1
         
@@ -337,11 +350,10 @@ class RedisManager:
                 if value is not None:
                     self.stats.successful_operations += 1
                     self.stats.cache_hits += 1
+                    span.set_attributes({"cache.hit": True, "cache.tier": "redis"})
                     
                     # Update response time stats
-                    self.stats.response_times.append(response_time)
-                    if len(self.stats.response_times) > 100:
-                        self.stats.response_times = self.stats.response_times[-100:]
+                    self.stats.record_response_time(response_time)
                     
                     parsed_value = json.loads(value)
                     
@@ -365,13 +377,16 @@ class RedisManager:
         local_value = self._get_from_local_cache(key)
         if local_value is not None:
             logger.debug(f"💾 Local cache HIT for key: {key}")
+            span.set_attributes({"cache.hit": True, "cache.tier": "local"})
             self.stats.cache_hits += 1
             self.stats.successful_operations += 1
             return local_value
         
         self.stats.cache_misses += 1
+        span.set_attribute("cache.hit", False)
         return None
 
+    @traced("redis.set")
     async def set(self, key: str, value: Any, ttl: int = None) -> bool:
         """Set value in cache with smart failover and adaptive TTL"""
         start_time = time.time()
@@ -395,9 +410,7 @@ class RedisManager:
                 self.stats.successful_operations += 1
                 
                 # Update response time stats
-                self.stats.response_times.append(response_time)
-                if len(self.stats.response_times) > 100:
-                    self.stats.response_times = self.stats.response_times[-100:]
+                self.stats.record_response_time(response_time)
                 
                 success = True
                 
@@ -693,6 +706,28 @@ class RedisManager:
         
         return base_stats
     
+    def collect_metrics(self) -> List[MetricFamily]:
+        """RedisStats as metric families for /metrics"""
+        stats = self.stats
+        return [
+            MetricFamily("redis_operations", COUNTER, "Redis cache operations by outcome")
+            .add({"outcome": "success"}, stats.successful_operations)
+            .add({"outcome": "failure"}, stats.failed_operations),
+            MetricFamily("redis_cache_lookups", COUNTER, "Cache lookups by result, including the local fallback")
+            .add({"result": "hit"}, stats.cache_hits)
+            .add({"result": "miss"}, stats.cache_misses),
+            MetricFamily("redis_connection_attempts", COUNTER, "Redis connection attempts")
+            .add({}, stats.connection_attempts),
+            MetricFamily("redis_connection_failures", COUNTER, "Failed Redis connection attempts")
+            .add({}, stats.connection_failures),
+            MetricFamily("redis_connected", GAUGE, "1 while the Redis connection is up")
+            .add({}, self.connection_state == RedisConnectionState.CONNECTED),
+            MetricFamily("redis_local_cache_entries", GAUGE, "Entries in the in-process fallback cache")
+            .add({}, len(self.local_cache)),
+            MetricFamily("redis_response_seconds", HISTOGRAM, "Redis round-trip time", "seconds")
+            .add({}, stats.latency),
+        ]
+
     async def get_performance_metrics(self) -> Dict[str, Any]:
         """Get detailed performance metrics for monitoring"""
         recent_times = self.stats.response_times[-50:] if self.stats.response_times else []
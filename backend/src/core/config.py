@@ -58,6 +58,9 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = Field(default=None, env="OPENAI_API_KEY")
     openai_model: str = Field(default="gpt-4-turbo-preview", env="OPENAI_MODEL")
     
+    # Upper bound for a single AI provider call from async code
+    ai_timeout: float = Field(default=15.0, env="AI_TIMEOUT")
+    
     # =============================================================================
     # 🗄️ DATABASE CONFIGURATION
     # =============================================================================
@@ -307,6 +310,7 @@ def get_ai_config() -> Dict[str, Any]:
     
     return {
         "enabled": True,
+        "timeout": settings.ai_timeout,
         "gemini": {
             "api_key": settings.gemini_api_key,
             "model": settings.gemini_model,
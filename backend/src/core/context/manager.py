@@ -3,30 +3,82 @@ Context Manager
 Manages conversation context for multi-turn interactions
 """
 
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime
+import heapq
 import json
 import logging
-from collections import defaultdict
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# Phrases marking a query as a refinement of the previous one (substring match)
+FOLLOW_UP_PHRASES = (
+    "filter", "only", "just", "also", "and", "but",
+    "show me more", "what about", "how about", "then",
+    "those", "these", "that", "this"
+)
+_FOLLOW_UP = re.compile("|".join(re.escape(phrase) for phrase in FOLLOW_UP_PHRASES))
+
+# Redis keys per conversation: {prefix}{id}:{part}
+_REDIS_PARTS = ("meta", "history", "entities", "filters")
+
 class ContextManager:
     """
     Manages conversation context and state for multi-turn interactions
     """
     
-    def __init__(self, max_history: int = 10, ttl_minutes: int = 30):
+    def __init__(
+        self,
+        max_history: int = 10,
+        ttl_minutes: int = 30,
+        max_entity_values: int = 20,
+        max_filters: int = 50,
+        max_conversations: int = 10000,
+        redis_client: Any = None,
+        redis_prefix: str = "kartavya:conversation:"
+    ):
         """
         Initialize context manager
         
         Args:
             max_history: Maximum conversation history to maintain
             ttl_minutes: Time to live for conversations in minutes
+            max_entity_values: Values remembered per entity type (oldest dropped)
+            max_filters: Active filters remembered per conversation (oldest dropped)
+            max_conversations: Conversations kept in memory (soonest-expiring evicted)
+            redis_client: Optional async Redis client for write-through persistence; cached
+                conversations are version-checked against it so workers see each other's turns
+            redis_prefix: Key prefix for persisted conversations
         """
         self.conversations = {}
         self.max_history = max_history
         self.ttl_minutes = ttl_minutes
+        self.max_entity_values = max_entity_values
+        self.max_filters = max_filters
+        self.max_conversations = max_conversations
+        
+        # One heap entry per conversation; stale deadlines are re-pushed when they surface
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._clock = time.monotonic
+        
+        self.redis = redis_client
+        self.redis_prefix = redis_prefix
+        self.stats = {"created": 0, "updates": 0, "expired": 0, "evicted": 0,
+                      "restored": 0, "refreshed": 0, "redis_writes": 0, "redis_errors": 0}
+    
+    def attach_redis(self, redis_client: Any, prefix: Optional[str] = None) -> None:
+        """Enable write-through persistence (deltas only) to Redis"""
+        self.redis = redis_client
+        if prefix:
+            self.redis_prefix = prefix
+        logger.info("✅ Conversation context write-through to Redis enabled")
+    
+    @property
+    def ttl_seconds(self) -> int:
+        return int(self.ttl_minutes * 60)
         
     async def get_context(self, conversation_id: str) -> Dict[str, Any]:
         """
@@ -38,12 +90,20 @@ class ContextManager:
         Returns:
             Conversation context dictionary
         """
-        # Clean expired conversations
+        # Drop conversations whose deadline has passed (heap top only)
         self._cleanup_expired()
         
-        if conversation_id not in self.conversations:
+        context = self.conversations.get(conversation_id)
+        if context is not None:
+            if self.redis is None or await self._is_current(context):
+                return context
+            # Another worker wrote a turn since this copy was loaded
+            self.stats["refreshed"] += 1
+        
+        context = await self._restore_context(conversation_id)
+        if context is None:
             # Create new conversation context
-            self.conversations[conversation_id] = {
+            context = {
                 "id": conversation_id,
                 "created_at": datetime.now(),
                 "last_updated": datetime.now(),
@@ -52,8 +112,12 @@ class ContextManager:
                 "filters": {},
                 "state": {}
             }
+            self.stats["created"] += 1
         
-        return self.conversations[conversation_id]
+        self.conversations[conversation_id] = context
+        self._schedule_expiry(conversation_id)
+        self._enforce_capacity()
+        return context
     
     async def update_context(
         self,
@@ -72,36 +136,60 @@ class ContextManager:
         context = await self.get_context(conversation_id)
         
         # Add to history
-        context["history"].append({
+        turn = {
             "timestamp": datetime.now().isoformat(),
             "query": query,
             "intent": response.get("intent"),
             "entities": response.get("entities", []),
             "results_count": response.get("results_count", 0),
             "siem_query": response.get("siem_query")
-        })
+        }
+        history = context["history"]
+        history.append(turn)
         
         # Maintain max history
-        if len(context["history"]) > self.max_history:
-            context["history"] = context["history"][-self.max_history:]
+        if len(history) > self.max_history:
+            del history[:-self.max_history]
         
-        # Update entities (merge with existing)
+        # Update entities (merge with existing; a repeated value becomes the most recent)
+        changed_entities = set()
         for entity in response.get("entities", []):
             entity_type = entity.get("type")
             entity_value = entity.get("value")
             
             if entity_type and entity_value:
-                if entity_type not in context["entities"]:
-                    context["entities"][entity_type] = []
-                if entity_value not in context["entities"][entity_type]:
-                    context["entities"][entity_type].append(entity_value)
+                values = context["entities"].setdefault(entity_type, [])
+                if values and values[-1] == entity_value:
+                    continue
+                if entity_value in values:
+                    values.remove(entity_value)
+                values.append(entity_value)
+                if len(values) > self.max_entity_values:
+                    del values[:-self.max_entity_values]
+                changed_entities.add(entity_type)
         
         # Update filters if any
-        if "filters" in response:
-            context["filters"].update(response["filters"])
+        changed_filters = {}
+        dropped_filters = []
+        filters = context["filters"]
+        for key, value in (response.get("filters") or {}).items():
+            if key not in filters or filters[key] != value:
+                filters.pop(key, None)
+                filters[key] = value
+                changed_filters[key] = value
+        while len(filters) > self.max_filters:
+            oldest = next(iter(filters))
+            del filters[oldest]
+            changed_filters.pop(oldest, None)
+            dropped_filters.append(oldest)
         
         # Update last activity
         context["last_updated"] = datetime.now()
+        self._schedule_expiry(conversation_id)
+        self.stats["updates"] += 1
+        
+        if self.redis is not None:
+            await self._write_delta(context, turn, changed_entities, changed_filters, dropped_filters)
         
         logger.debug(f"Updated context for conversation {conversation_id}")
     
@@ -184,14 +272,15 @@ class ContextManager:
             Enhanced query with context
         """
         context = await self.get_context(conversation_id)
-        last_query = await self.get_last_query(conversation_id)
+        history = context["history"]
+        last_query = history[-1] if history else None
         
         # Check if this is a follow-up query
         is_follow_up = self._is_follow_up_query(new_query, last_query)
         
         enhanced_query = {
             "query": new_query,
-            "entities": new_entities,
+            "entities": list(new_entities),
             "context_entities": context.get("entities", {}),
             "filters": context.get("filters", {}),
             "is_follow_up": is_follow_up,
@@ -200,18 +289,15 @@ class ContextManager:
         
         # If it's a follow-up, merge entities
         if is_follow_up and last_query:
-            # Preserve entities from last query if not overridden
+            # Preserve the latest context value of every entity type the new query lacks
+            new_types = {e.get("type") for e in new_entities}
             for entity_type, values in context.get("entities", {}).items():
-                # Check if new query has this entity type
-                new_has_type = any(e.get("type") == entity_type for e in new_entities)
-                if not new_has_type:
-                    # Add from context
-                    for value in values[-1:]:  # Take last value
-                        enhanced_query["entities"].append({
-                            "type": entity_type,
-                            "value": value,
-                            "from_context": True
-                        })
+                if entity_type not in new_types and values:
+                    enhanced_query["entities"].append({
+                        "type": entity_type,
+                        "value": values[-1],
+                        "from_context": True
+                    })
         
         return enhanced_query
     
@@ -230,22 +316,11 @@ class ContextManager:
             return False
         
         # Check for follow-up indicators
-        follow_up_phrases = [
-            "filter", "only", "just", "also", "and", "but",
-            "show me more", "what about", "how about", "then",
-            "those", "these", "that", "this"
-        ]
-        
-        query_lower = new_query.lower()
-        for phrase in follow_up_phrases:
-            if phrase in query_lower:
-                return True
-        
-        # Check if query is very short (likely referencing context)
-        if len(new_query.split()) <= 3:
+        if _FOLLOW_UP.search(new_query.lower()):
             return True
         
-        return False
+        # Check if query is very short (likely referencing context)
+        return len(new_query.split()) <= 3
     
     async def clear_context(self, conversation_id: str) -> None:
         """
@@ -256,24 +331,151 @@ class ContextManager:
         """
         if conversation_id in self.conversations:
             del self.conversations[conversation_id]
+            self._deadlines.pop(conversation_id, None)
             logger.info(f"Cleared context for conversation {conversation_id}")
+        
+        if self.redis is not None:
+            try:
+                await self.redis.delete(*self._redis_keys(conversation_id).values())
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"⚠️ Failed to delete persisted context {conversation_id}: {e}")
+    
+    def _schedule_expiry(self, conversation_id: str) -> None:
+        """Move a conversation's deadline; the heap entry is only added once"""
+        deadline = self._clock() + self.ttl_seconds
+        if conversation_id not in self._deadlines:
+            heapq.heappush(self._expiry_heap, (deadline, conversation_id))
+        self._deadlines[conversation_id] = deadline
     
     def _cleanup_expired(self) -> None:
-        """Remove expired conversations"""
-        now = datetime.now()
-        expired = []
-        
-        for conv_id, context in self.conversations.items():
-            last_updated = context.get("last_updated", context.get("created_at"))
-            if isinstance(last_updated, datetime):
-                age = now - last_updated
-                if age > timedelta(minutes=self.ttl_minutes):
-                    expired.append(conv_id)
-        
-        for conv_id in expired:
-            del self.conversations[conv_id]
+        """Remove expired conversations (O(log n) per expiry, nothing when none are due)"""
+        now = self._clock()
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, conv_id = heapq.heappop(heap)
+            deadline = self._deadlines.get(conv_id)
+            if deadline is None:
+                continue  # cleared or evicted already
+            if deadline > now:
+                heapq.heappush(heap, (deadline, conv_id))  # touched since it was scheduled
+                continue
+            del self._deadlines[conv_id]
+            self.conversations.pop(conv_id, None)
+            self.stats["expired"] += 1
             logger.debug(f"Expired conversation {conv_id}")
     
+    def _enforce_capacity(self) -> None:
+        """Evict the soonest-expiring conversations beyond ``max_conversations``"""
+        heap = self._expiry_heap
+        while len(self.conversations) > self.max_conversations and heap:
+            deadline, conv_id = heapq.heappop(heap)
+            current = self._deadlines.get(conv_id)
+            if current is None:
+                continue
+            if current > deadline:
+                heapq.heappush(heap, (current, conv_id))
+                continue
+            del self._deadlines[conv_id]
+            self.conversations.pop(conv_id, None)
+            self.stats["evicted"] += 1
+            logger.debug(f"Evicted conversation {conv_id} (capacity)")
+    
+    def _redis_keys(self, conversation_id: str) -> Dict[str, str]:
+        return {part: f"{self.redis_prefix}{conversation_id}:{part}" for part in _REDIS_PARTS}
+    
+    async def _write_delta(
+        self,
+        context: Dict[str, Any],
+        turn: Dict[str, Any],
+        changed_entities: set,
+        changed_filters: Dict[str, Any],
+        dropped_filters: List[str]
+    ) -> None:
+        """Persist one turn: append to the history list and rewrite only what changed"""
+        keys = self._redis_keys(context["id"])
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(keys["meta"], mapping={
+                "created_at": context["created_at"].isoformat(),
+                "last_updated": context["last_updated"].isoformat(),
+            })
+            pipe.hincrby(keys["meta"], "version", 1)
+            pipe.rpush(keys["history"], json.dumps(turn, default=str))
+            pipe.ltrim(keys["history"], -self.max_history, -1)
+            if changed_entities:
+                pipe.hset(keys["entities"], mapping={
+                    entity_type: json.dumps(context["entities"][entity_type], default=str)
+                    for entity_type in changed_entities
+                })
+            if changed_filters:
+                pipe.hset(keys["filters"], mapping={
+                    key: json.dumps(value, default=str) for key, value in changed_filters.items()
+                })
+            if dropped_filters:
+                pipe.hdel(keys["filters"], *dropped_filters)
+            for key in keys.values():
+                pipe.expire(key, self.ttl_seconds)
+            version = int((await pipe.execute())[1])
+            # A gap means another worker wrote in between: reload on next access
+            context["version"] = version if version == (context.get("version") or 0) + 1 else None
+            self.stats["redis_writes"] += 1
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"⚠️ Context write-through failed for {context['id']}: {e}")
+    
+    async def _is_current(self, context: Dict[str, Any]) -> bool:
+        """True unless Redis holds a newer version of this conversation than the local copy"""
+        try:
+            version = await self.redis.hget(self._redis_keys(context["id"])["meta"], "version")
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"⚠️ Context version check failed for {context['id']}: {e}")
+            return True
+        return version is None or int(version) == context.get("version")
+    
+    async def _restore_context(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Rebuild a conversation persisted by another worker or before a restart"""
+        if self.redis is None:
+            return None
+        keys = self._redis_keys(conversation_id)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hgetall(keys["meta"])
+            pipe.lrange(keys["history"], 0, -1)
+            pipe.hgetall(keys["entities"])
+            pipe.hgetall(keys["filters"])
+            meta, history, entities, filters = await pipe.execute()
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"⚠️ Failed to restore context {conversation_id}: {e}")
+            return None
+        if not meta:
+            return None
+        
+        def text(value: Any) -> str:
+            return value.decode() if isinstance(value, bytes) else value
+        
+        meta = {text(k): text(v) for k, v in meta.items()}
+        self.stats["restored"] += 1
+        return {
+            "id": conversation_id,
+            "created_at": datetime.fromisoformat(meta["created_at"]),
+            "last_updated": datetime.fromisoformat(meta["last_updated"]),
+            "history": [json.loads(text(item)) for item in history][-self.max_history:],
+            "entities": {text(k): json.loads(text(v)) for k, v in entities.items()},
+            "filters": {text(k): json.loads(text(v)) for k, v in filters.items()},
+            "state": {},
+            "version": int(meta.get("version", 0))
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active_conversations": len(self.conversations),
+            "write_through": self.redis is not None,
+        }
+    
     async def export_context(self, conversation_id: str) -> str:
         """
         Export conversation context as JSON
@@ -317,6 +519,8 @@ class ContextManager:
                 context_data["last_updated"] = datetime.fromisoformat(context_data["last_updated"])
             
             self.conversations[conversation_id] = context_data
+            self._schedule_expiry(conversation_id)
+            self._enforce_capacity()
             logger.info(f"Imported context for conversation {conversation_id}")
             
         except Exception as e:
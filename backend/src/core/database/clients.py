@@ -176,14 +176,14 @@ class MongoDBClient:
         try:
             collection = self.database["siem_logs"]
             
-            # Create indexes for common queries
+            # Create indexes for common queries. Lookups are always time-windowed
+            # and sorted by timestamp, so equality fields lead the compound keys
             indexes = [
                 ("timestamp", -1),
                 ("event_type", 1),
-                ("severity", 1),
-                ("source_ip", 1),
-                ("user", 1),
-                [("timestamp", -1), ("severity", 1)]  # Compound index
+                [("severity", 1), ("timestamp", -1)],
+                [("user", 1), ("timestamp", -1)],
+                [("source_ip", 1), ("timestamp", -1)]
             ]
             
             for index in indexes:
@@ -0,0 +1,49 @@
+"""
+ECS Mapping
+Maps flat dataset records onto Elastic Common Schema fields; shared by the
+dataset connector and the bulk ingest pipeline
+"""
+
+from datetime import datetime
+from typing import Dict, Any
+
+
+def record_to_ecs(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a flat dataset record onto ECS fields, keeping unmapped keys under ``metadata``"""
+    ecs_record = {
+        "@timestamp": datetime.now().isoformat(),
+        "event": {},
+        "source": {},
+        "destination": {},
+        "network": {},
+        "user": {},
+        "host": {},
+        "metadata": {"dataset": "security_logs"}
+    }
+
+    for key, value in record.items():
+        if value is None or value == '':
+            continue
+
+        key_lower = str(key).lower()
+
+        if 'timestamp' in key_lower or 'time' in key_lower:
+            ecs_record["@timestamp"] = str(value)
+        elif 'severity' in key_lower or 'level' in key_lower:
+            ecs_record["event"]["severity"] = str(value).lower()
+        elif 'action' in key_lower or 'activity' in key_lower:
+            ecs_record["event"]["action"] = str(value).lower()
+        elif 'src_ip' in key_lower or 'source_ip' in key_lower:
+            ecs_record["source"]["ip"] = str(value)
+        elif 'dst_ip' in key_lower or 'dest_ip' in key_lower:
+            ecs_record["destination"]["ip"] = str(value)
+        elif 'protocol' in key_lower:
+            ecs_record["network"]["protocol"] = str(value).lower()
+        elif 'user' in key_lower:
+            ecs_record["user"]["name"] = str(value)
+        elif 'message' in key_lower or 'description' in key_lower:
+            ecs_record["message"] = str(value)
+        else:
+            ecs_record["metadata"][key] = value
+
+    return ecs_record
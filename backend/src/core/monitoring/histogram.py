@@ -0,0 +1,236 @@
+"""
+Latency Histograms
+HDR-style log-linear histograms with fixed memory, O(1) recording and O(buckets)
+quantiles, plus a ring of per-window histograms for "last N minutes" views
+"""
+
+import math
+import time
+from array import array
+from typing import Dict, List, Any, Optional, Iterable, Sequence, Tuple
+
+# Default Prometheus bucket bounds (seconds)
+DEFAULT_PROMETHEUS_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LogLinearHistogram:
+    """
+    Counts values in buckets whose width grows with the value
+
+    Every power of two between ``lowest`` and ``highest`` is split into ``sub_buckets``
+    equal buckets, so any recorded value is reproduced within ``1 / sub_buckets``
+    relative error. Values below ``lowest`` share the first bucket and values above
+    ``highest`` the last. Recording is a ``frexp`` and an array increment; nothing is
+    allocated or copied after construction.
+    """
+
+    __slots__ = ("lowest", "highest", "sub_buckets", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, lowest: float = 1e-5, highest: float = 120.0, sub_buckets: int = 16):
+        self.lowest = lowest
+        self.highest = highest
+        self.sub_buckets = sub_buckets
+        magnitudes = max(1, math.ceil(math.log2(highest / lowest)))
+        self.counts = array("Q", bytes(8 * (magnitudes * sub_buckets + 2)))
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def index(self, value: float) -> int:
+        """Bucket index for a value"""
+        scaled = value / self.lowest
+        if scaled < 1.0:
+            return 0
+        mantissa, exponent = math.frexp(scaled)  # scaled = mantissa * 2**exponent, mantissa in [0.5, 1)
+        index = (exponent - 1) * self.sub_buckets + int((mantissa * 2 - 1) * self.sub_buckets) + 1
+        return min(index, len(self.counts) - 1)
+
+    def bounds(self, index: int) -> Tuple[float, float]:
+        """Lower and upper value of a bucket"""
+        if index == 0:
+            return 0.0, self.lowest
+        magnitude, sub = divmod(index - 1, self.sub_buckets)
+        base = self.lowest * (2 ** magnitude)
+        return base * (1 + sub / self.sub_buckets), base * (1 + (sub + 1) / self.sub_buckets)
+
+    def record(self, value: float) -> None:
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        """Estimate several quantiles (0..1) in one pass over the buckets"""
+        if not self.count:
+            return [0.0 for _ in qs]
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        results = [0.0] * len(qs)
+        position = 0
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            while position < len(order) and seen >= qs[order[position]] * self.count:
+                low, high = self.bounds(index)
+                results[order[position]] = min(max((low + high) / 2, self.min), self.max)
+                position += 1
+            if position == len(order):
+                break
+        for i in order[position:]:
+            results[i] = self.max
+        return results
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles((q,))[0]
+
+    def count_between(self, low: float, high: float = math.inf) -> int:
+        """Approximate count of values in ``[low, high)``, to bucket resolution"""
+        start = self.index(low)
+        end = len(self.counts) if high == math.inf else self.index(high)
+        return sum(self.counts[start:end])
+
+    def cumulative(self, bounds: Iterable[float] = DEFAULT_PROMETHEUS_BOUNDS) -> List[Tuple[float, int]]:
+        """
+        Cumulative counts at each upper bound (Prometheus ``le`` buckets, +Inf last)
+
+        ``le`` is inclusive, so the bucket holding the bound itself is counted; values
+        just above the bound in that bucket are too, within the histogram's resolution.
+        """
+        result = []
+        running = 0
+        position = 0
+        for bound in sorted(bounds):
+            end = max(position, self.index(bound) + 1)
+            running += sum(self.counts[position:end])
+            position = end
+            result.append((bound, running))
+        result.append((math.inf, self.count))
+        return result
+
+    def merge(self, other: "LogLinearHistogram") -> "LogLinearHistogram":
+        """Add another histogram with the same layout into this one"""
+        if len(other.counts) != len(self.counts):
+            raise ValueError("Histogram layouts differ")
+        counts = self.counts
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                counts[index] += bucket_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def empty_copy(self) -> "LogLinearHistogram":
+        return LogLinearHistogram(self.lowest, self.highest, self.sub_buckets)
+
+    def reset(self) -> None:
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        p50, p95, p99 = self.quantiles((0.5, 0.95, 0.99))
+        return {
+            "count": self.count,
+            "avg": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+        }
+
+
+class WindowedHistogram:
+    """
+    Ring of histograms, one per ``window_seconds`` slot, covering ``windows`` slots
+
+    The current slot is found from the clock; slots that have fallen out of range are
+    reset in place when the ring wraps onto them, so memory never grows. Histograms
+    are only allocated for slots that see traffic.
+    """
+
+    __slots__ = ("window_seconds", "windows", "_template", "_slots", "_epochs", "_errors", "_clock")
+
+    def __init__(self, window_seconds: float = 300.0, windows: int = 12,
+                 template: Optional[LogLinearHistogram] = None, clock=time.time):
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self._template = template or LogLinearHistogram()
+        self._slots: List[Optional[LogLinearHistogram]] = [None] * windows
+        self._epochs = [-1] * windows
+        self._errors = [0] * windows
+        self._clock = clock
+
+    def _current(self) -> Tuple[int, int]:
+        epoch = int(self._clock() // self.window_seconds)
+        return epoch, epoch % self.windows
+
+    def record(self, value: float, error: bool = False) -> None:
+        epoch, slot = self._current()
+        histogram = self._slots[slot]
+        if self._epochs[slot] != epoch:
+            if histogram is None:
+                histogram = self._slots[slot] = self._template.empty_copy()
+            else:
+                histogram.reset()
+            self._epochs[slot] = epoch
+            self._errors[slot] = 0
+        histogram.record(value)
+        if error:
+            self._errors[slot] += 1
+
+    def merged(self, seconds: Optional[float] = None) -> Tuple[LogLinearHistogram, int]:
+        """Histogram and error count over the last ``seconds`` (default: the whole ring)"""
+        epoch, _ = self._current()
+        span = self.windows if seconds is None else min(self.windows, max(1, math.ceil(seconds / self.window_seconds)))
+        merged = self._template.empty_copy()
+        errors = 0
+        for slot in range(self.windows):
+            histogram = self._slots[slot]
+            if histogram is not None and epoch - span < self._epochs[slot] <= epoch:
+                merged.merge(histogram)
+                errors += self._errors[slot]
+        return merged, errors
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Render Prometheus labels, escaping values"""
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def prometheus_histogram(
+    name: str,
+    help_text: str,
+    series: Iterable[Tuple[Dict[str, str], LogLinearHistogram]],
+    bounds: Iterable[float] = DEFAULT_PROMETHEUS_BOUNDS
+) -> List[str]:
+    """Prometheus text exposition lines for a family of histograms"""
+    bounds = tuple(bounds)
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series:
+        for bound, cumulative in histogram.cumulative(bounds):
+            le = "+Inf" if bound == math.inf else f"{bound:g}"
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+    return lines
@@ -0,0 +1,306 @@
+"""
+Metrics Registry
+One registry for counters, gauges and histograms with labels, rendered in the
+OpenMetrics text format for ``/metrics``
+"""
+
+import logging
+import math
+import threading
+import weakref
+from typing import Dict, List, Any, Optional, Callable, Iterable, Sequence, Tuple
+
+from .histogram import DEFAULT_PROMETHEUS_BOUNDS, LogLinearHistogram, format_labels
+
+logger = logging.getLogger(__name__)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class MetricFamily:
+    """
+    One named metric and its samples, as produced at scrape time
+
+    Collectors build these from the stats their objects already keep. Samples
+    with the same labels are combined, so several instances of a component can
+    report into one family: counters and histograms add up, gauges keep the
+    last value.
+    """
+
+    __slots__ = ("name", "kind", "help", "unit", "bounds", "samples")
+
+    def __init__(self, name: str, kind: str, help_text: str, unit: str = "",
+                 bounds: Sequence[float] = DEFAULT_PROMETHEUS_BOUNDS):
+        if kind not in (COUNTER, GAUGE, HISTOGRAM):
+            raise ValueError(f"Unknown metric type: {kind}")
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.unit = unit
+        self.bounds = tuple(bounds)
+        self.samples: Dict[LabelKey, Any] = {}
+
+    def add(self, labels: Optional[Dict[str, Any]], value: Any) -> "MetricFamily":
+        """Add a sample (a number, or a ``LogLinearHistogram`` for histograms)"""
+        key = tuple((name, str(label)) for name, label in (labels or {}).items())
+        existing = self.samples.get(key)
+        if existing is None or self.kind == GAUGE:
+            self.samples[key] = value
+        elif self.kind == HISTOGRAM:
+            # Never merge into a collector's live histogram
+            self.samples[key] = existing.empty_copy().merge(existing).merge(value)
+        else:
+            self.samples[key] = existing + value
+        return self
+
+    def merge(self, other: "MetricFamily") -> "MetricFamily":
+        if other.kind != self.kind:
+            raise ValueError(f"Metric {self.name} reported as both {self.kind} and {other.kind}")
+        for key, value in other.samples.items():
+            self.add(dict(key), value)
+        return self
+
+    def render(self, namespace: str = "") -> List[str]:
+        """OpenMetrics lines for this family"""
+        name = f"{namespace}_{self.name}" if namespace else self.name
+        lines = [f"# TYPE {name} {self.kind}"]
+        if self.unit:
+            lines.append(f"# UNIT {name} {self.unit}")
+        lines.append(f"# HELP {name} {self.help}")
+        for key, value in self.samples.items():
+            labels = dict(key)
+            if self.kind == COUNTER:
+                lines.append(f"{name}_total{format_labels(labels)} {_format_value(value)}")
+            elif self.kind == GAUGE:
+                lines.append(f"{name}{format_labels(labels)} {_format_value(value)}")
+            else:
+                for bound, cumulative in value.cumulative(self.bounds):
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(f"{name}_bucket{format_labels({**labels, 'le': le})} {cumulative}")
+                lines.append(f"{name}_count{format_labels(labels)} {value.count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {_format_value(value.sum)}")
+        return lines
+
+
+class _Value:
+    """Child of a counter or gauge: one labelled number"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Metric:
+    """A metric updated in place; children are created once per label combination"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), unit: str = ""):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.unit = unit
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> Any:
+        return _Value()
+
+    def labels(self, *values: Any, **labels: Any) -> Any:
+        """Child for one label combination (positional or by name)"""
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def family(self) -> MetricFamily:
+        family = self._empty_family()
+        for key, child in list(self._children.items()):
+            family.add(dict(zip(self.labelnames, key, strict=True)), self._sample(child))
+        return family
+
+    def _empty_family(self) -> MetricFamily:
+        return MetricFamily(self.name, self.kind, self.help, self.unit)
+
+    def _sample(self, child: Any) -> Any:
+        return child.value
+
+
+class Counter(_Metric):
+    kind = COUNTER
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = GAUGE
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    """Labelled ``LogLinearHistogram``s; bucket bounds only matter at render time"""
+
+    kind = HISTOGRAM
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), unit: str = "",
+                 bounds: Sequence[float] = DEFAULT_PROMETHEUS_BOUNDS):
+        super().__init__(name, help_text, labelnames, unit)
+        self.bounds = tuple(bounds)
+
+    def _new_child(self) -> LogLinearHistogram:
+        return LogLinearHistogram()
+
+    def record(self, value: float) -> None:
+        self.labels().record(value)
+
+    def _empty_family(self) -> MetricFamily:
+        return MetricFamily(self.name, self.kind, self.help, self.unit, self.bounds)
+
+    def _sample(self, child: LogLinearHistogram) -> LogLinearHistogram:
+        return child
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    """
+    Metrics updated in place plus collectors read at scrape time
+
+    Components that already keep their own counters register a collector that
+    turns them into families when ``/metrics`` is scraped, so the hot path pays
+    nothing extra. Bound-method collectors are held weakly and disappear with
+    their object.
+    """
+
+    def __init__(self, namespace: str = "kartavya"):
+        self.namespace = namespace
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Any] = []
+        self._lock = threading.Lock()
+        self.collector_errors = 0
+
+    def _get_or_create(self, cls, name: str, help_text: str, labelnames: Sequence[str], **kwargs) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+        if type(metric) is not cls or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} already registered as {metric.kind} {metric.labelnames}")
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = (), unit: str = "") -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames, unit=unit)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (), unit: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames, unit=unit)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), unit: str = "",
+                  bounds: Sequence[float] = DEFAULT_PROMETHEUS_BOUNDS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, unit=unit, bounds=bounds)
+
+    def register_collector(self, collector: Collector) -> None:
+        ref = weakref.WeakMethod(collector) if hasattr(collector, "__self__") else (lambda: collector)
+        with self._lock:
+            self._collectors.append(ref)
+
+    def unregister_collector(self, collector: Collector) -> None:
+        with self._lock:
+            self._collectors = [ref for ref in self._collectors if ref() not in (None, collector)]
+
+    def collect(self) -> List[MetricFamily]:
+        """Every family, merged by name and sorted"""
+        families: Dict[str, MetricFamily] = {}
+        for metric in list(self._metrics.values()):
+            families[metric.name] = metric.family()
+
+        dead = False
+        for ref in list(self._collectors):
+            collector = ref()
+            if collector is None:
+                dead = True
+                continue
+            try:
+                for family in collector():
+                    if family.name in families:
+                        families[family.name].merge(family)
+                    else:
+                        families[family.name] = family
+            except Exception as e:
+                self.collector_errors += 1
+                logger.error(f"❌ Metrics collector {collector} failed: {e}")
+        if dead:
+            with self._lock:
+                self._collectors = [ref for ref in self._collectors if ref() is not None]
+        return [families[name] for name in sorted(families)]
+
+    def render_openmetrics(self) -> str:
+        lines: List[str] = []
+        for family in self.collect():
+            lines.extend(family.render(self.namespace))
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "metrics": len(self._metrics),
+            "collectors": sum(1 for ref in self._collectors if ref() is not None),
+            "collector_errors": self.collector_errors
+        }
+
+
+# Global registry instance
+metrics_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the global metrics registry"""
+    return metrics_registry
@@ -7,16 +7,25 @@ import asyncio
 import logging
 import time
 import json
-import statistics
-from typing import Dict, List, Any, Optional, Callable
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable, Deque, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 from contextlib import asynccontextmanager
 import traceback
-import psutil
 import os
 
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    psutil = None
+    PSUTIL_AVAILABLE = False
+
+from .histogram import LogLinearHistogram, WindowedHistogram, prometheus_histogram, format_labels
+from .metrics import COUNTER, GAUGE, HISTOGRAM, MetricFamily, get_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +47,28 @@ class PerformanceLevel(str, Enum):
     CRITICAL = "critical"     # > 5s
 
 
+# Lower bound (seconds) of each level, for counting levels straight from a histogram
+LEVEL_BOUNDS = (
+    (PerformanceLevel.EXCELLENT, 0.0, 0.1),
+    (PerformanceLevel.GOOD, 0.1, 0.5),
+    (PerformanceLevel.ACCEPTABLE, 0.5, 2.0),
+    (PerformanceLevel.SLOW, 2.0, 5.0),
+    (PerformanceLevel.CRITICAL, 5.0, float('inf')),
+)
+
+def classify_latency(execution_time: float) -> PerformanceLevel:
+    """Performance level for an execution time in seconds"""
+    for level, _, upper in LEVEL_BOUNDS:
+        if execution_time < upper:
+            return level
+    return PerformanceLevel.CRITICAL
+
+
+# Rotation of the windowed histograms: 12 five-minute windows = the last hour
+WINDOW_SECONDS = 300.0
+WINDOW_COUNT = 12
+
+
 @dataclass
 class PerformanceMetric:
     """Individual performance measurement"""
@@ -55,29 +86,28 @@ class PerformanceMetric:
     @property
     def performance_level(self) -> PerformanceLevel:
         """Determine performance level based on execution time"""
-        if self.execution_time < 0.1:
-            return PerformanceLevel.EXCELLENT
-        elif self.execution_time < 0.5:
-            return PerformanceLevel.GOOD
-        elif self.execution_time < 2.0:
-            return PerformanceLevel.ACCEPTABLE
-        elif self.execution_time < 5.0:
-            return PerformanceLevel.SLOW
-        else:
-            return PerformanceLevel.CRITICAL
+        return classify_latency(self.execution_time)
 
 
 @dataclass
 class EndpointStats:
     """Statistics for a specific endpoint"""
     endpoint: str
+    query_type: str = QueryType.API_ENDPOINT.value
     total_requests: int = 0
     successful_requests: int = 0
     failed_requests: int = 0
     total_time: float = 0.0
     min_time: float = float('inf')
     max_time: float = 0.0
-    recent_times: List[float] = field(default_factory=list)
+    latency: LogLinearHistogram = field(default_factory=LogLinearHistogram)  # since start (Prometheus)
+    recent: WindowedHistogram = field(
+        default_factory=lambda: WindowedHistogram(WINDOW_SECONDS, WINDOW_COUNT)
+    )
+    # (timestamp, execution_time, success, query_id, error) of the latest requests
+    last_requests: Deque[Tuple[datetime, float, bool, str, Optional[str]]] = field(
+        default_factory=lambda: deque(maxlen=20)
+    )
     error_rates: Dict[str, int] = field(default_factory=dict)
     last_updated: datetime = field(default_factory=datetime.now)
     
@@ -97,10 +127,9 @@ class EndpointStats:
     
     @property
     def p95_response_time(self) -> float:
-        """Calculate 95th percentile response time"""
-        if not self.recent_times:
-            return 0.0
-        return statistics.quantiles(sorted(self.recent_times), n=20)[18]  # 95th percentile
+        """95th percentile response time over the last window"""
+        histogram, _ = self.recent.merged(WINDOW_SECONDS)
+        return histogram.quantile(0.95)
     
     @property
     def current_performance_level(self) -> PerformanceLevel:
@@ -123,8 +152,10 @@ class PerformanceProfiler:
     
     def __init__(self, max_metrics_history: int = 10000):
         self.max_metrics_history = max_metrics_history
-        self.metrics_history: List[PerformanceMetric] = []
+        # Only slow or failed requests are kept individually; latencies live in histograms
+        self.metrics_history: Deque[PerformanceMetric] = deque(maxlen=max_metrics_history)
         self.endpoint_stats: Dict[str, EndpointStats] = {}
+        self.overall = WindowedHistogram(WINDOW_SECONDS, WINDOW_COUNT)
         self.slow_query_threshold = 2.0  # seconds
         self.critical_query_threshold = 5.0  # seconds
         
@@ -138,7 +169,10 @@ class PerformanceProfiler:
         
         # System monitoring
         self.system_stats_history: List[Dict[str, Any]] = []
-        self.enable_system_monitoring = True
+        self.enable_system_monitoring = PSUTIL_AVAILABLE
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+        
+        get_registry().register_collector(self.collect_metrics)
         
         logger.info("Performance profiler initialized")
     
@@ -160,7 +194,7 @@ class PerformanceProfiler:
         
         if self.enable_system_monitoring:
             try:
-                process = psutil.Process()
+                process = self._process
                 start_memory = process.memory_info().rss / 1024 / 1024  # MB
                 start_cpu = process.cpu_percent()
             except Exception as e:
@@ -186,30 +220,24 @@ class PerformanceProfiler:
             
             if self.enable_system_monitoring and start_memory is not None:
                 try:
-                    process = psutil.Process()
+                    process = self._process
                     end_memory = process.memory_info().rss / 1024 / 1024  # MB
                     memory_delta = end_memory - start_memory
                     cpu_usage = process.cpu_percent()
                 except Exception:
                     pass
             
-            # Create performance metric
-            metric = PerformanceMetric(
-                query_id=query_id,
-                query_type=query_type,
-                endpoint=endpoint,
-                execution_time=execution_time,
-                timestamp=datetime.now(),
+            # Record the measurement
+            self.record(
+                query_type, endpoint, execution_time,
                 success=success,
                 error_message=error_message,
+                query_id=query_id,
                 metadata=metadata,
                 memory_usage=memory_delta,
                 cpu_usage=cpu_usage
             )
             
-            # Record the metric
-            self._record_metric(metric)
-            
             # Remove from active requests
             self.active_requests.pop(query_id, None)
             
@@ -221,92 +249,122 @@ class PerformanceProfiler:
                     f"🐌 Slow query detected [{query_id}]: {endpoint} took {execution_time:.3f}s"
                 )
     
-    def _record_metric(self, metric: PerformanceMetric):
-        """Record a performance metric"""
-        # Add to history
-        self.metrics_history.append(metric)
-        
-        # Limit history size
-        if len(self.metrics_history) > self.max_metrics_history:
-            self.metrics_history = self.metrics_history[-self.max_metrics_history:]
-        
-        # Update endpoint stats
-        endpoint = metric.endpoint
-        if endpoint not in self.endpoint_stats:
-            self.endpoint_stats[endpoint] = EndpointStats(endpoint=endpoint)
+    def record(
+        self,
+        query_type: QueryType,
+        endpoint: str,
+        execution_time: float,
+        success: bool = True,
+        error_message: Optional[str] = None,
+        query_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        memory_usage: Optional[float] = None,
+        cpu_usage: Optional[float] = None
+    ) -> None:
+        """Record one measurement: a few histogram increments, no copying"""
+        now = datetime.now()
+        stats = self.endpoint_stats.get(endpoint)
+        if stats is None:
+            stats = self.endpoint_stats[endpoint] = EndpointStats(
+                endpoint=endpoint, query_type=QueryType(query_type).value
+            )
         
-        stats = self.endpoint_stats[endpoint]
         stats.total_requests += 1
-        stats.total_time += metric.execution_time
-        stats.last_updated = metric.timestamp
-        
-        if metric.success:
+        stats.total_time += execution_time
+        stats.last_updated = now
+        if execution_time < stats.min_time:
+            stats.min_time = execution_time
+        if execution_time > stats.max_time:
+            stats.max_time = execution_time
+        
+        if success:
             stats.successful_requests += 1
         else:
             stats.failed_requests += 1
-            if metric.error_message:
-                error_key = metric.error_message[:50]  # Truncate error message
+            if error_message:
+                error_key = error_message[:50]  # Truncate error message
                 stats.error_rates[error_key] = stats.error_rates.get(error_key, 0) + 1
         
-        # Update min/max times
-        stats.min_time = min(stats.min_time, metric.execution_time)
-        stats.max_time = max(stats.max_time, metric.execution_time)
+        stats.latency.record(execution_time)
+        stats.recent.record(execution_time, error=not success)
+        self.overall.record(execution_time, error=not success)
+        
+        query_id = query_id or f"{endpoint}_{int(time.time() * 1000)}"
+        stats.last_requests.append((now, execution_time, success, query_id, error_message))
         
-        # Update recent times (keep last 100 for percentile calculations)
-        stats.recent_times.append(metric.execution_time)
-        if len(stats.recent_times) > 100:
-            stats.recent_times = stats.recent_times[-100:]
+        # Keep individual records only for requests worth looking at
+        if not success or execution_time > self.slow_query_threshold:
+            self.metrics_history.append(PerformanceMetric(
+                query_id=query_id,
+                query_type=query_type,
+                endpoint=endpoint,
+                execution_time=execution_time,
+                timestamp=now,
+                success=success,
+                error_message=error_message,
+                metadata=metadata or {},
+                memory_usage=memory_usage,
+                cpu_usage=cpu_usage
+            ))
+    
+    def _record_metric(self, metric: PerformanceMetric):
+        """Record a performance metric"""
+        self.record(
+            metric.query_type, metric.endpoint, metric.execution_time,
+            success=metric.success,
+            error_message=metric.error_message,
+            query_id=metric.query_id,
+            metadata=metric.metadata,
+            memory_usage=metric.memory_usage,
+            cpu_usage=metric.cpu_usage
+        )
+    
+    @staticmethod
+    def _level_distribution(histogram: LogLinearHistogram) -> Dict[str, int]:
+        return {level.value: histogram.count_between(low, high) for level, low, high in LEVEL_BOUNDS}
     
     def get_performance_summary(self, time_window_minutes: int = 60) -> Dict[str, Any]:
         """Get comprehensive performance summary"""
-        cutoff_time = datetime.now() - timedelta(minutes=time_window_minutes)
-        recent_metrics = [m for m in self.metrics_history if m.timestamp >= cutoff_time]
+        window_seconds = time_window_minutes * 60
+        overall, failed_requests = self.overall.merged(window_seconds)
         
-        if not recent_metrics:
+        if not overall.count:
             return {"error": "No metrics available in the specified time window"}
         
         # Overall stats
-        total_requests = len(recent_metrics)
-        successful_requests = sum(1 for m in recent_metrics if m.success)
-        failed_requests = total_requests - successful_requests
-        
-        execution_times = [m.execution_time for m in recent_metrics]
-        avg_response_time = statistics.mean(execution_times)
-        median_response_time = statistics.median(execution_times)
-        p95_response_time = statistics.quantiles(sorted(execution_times), n=20)[18] if len(execution_times) > 5 else max(execution_times)
-        
-        # Performance level distribution
-        performance_levels = {}
-        for level in PerformanceLevel:
-            performance_levels[level.value] = sum(1 for m in recent_metrics if m.performance_level == level)
-        
-        # Slow queries
-        slow_queries = [m for m in recent_metrics if m.execution_time > self.slow_query_threshold]
-        critical_queries = [m for m in recent_metrics if m.execution_time > self.critical_query_threshold]
-        
-        # Top slow endpoints
-        endpoint_response_times = {}
-        for metric in recent_metrics:
-            if metric.endpoint not in endpoint_response_times:
-                endpoint_response_times[metric.endpoint] = []
-            endpoint_response_times[metric.endpoint].append(metric.execution_time)
+        total_requests = overall.count
+        successful_requests = total_requests - failed_requests
+        median_response_time, p95_response_time, p99_response_time = overall.quantiles((0.5, 0.95, 0.99))
         
+        # Per-endpoint and per-query-type views, merged from the same windows
         slow_endpoints = []
-        for endpoint, times in endpoint_response_times.items():
-            avg_time = statistics.mean(times)
-            if avg_time > self.slow_query_threshold:
+        by_query_type: Dict[str, LogLinearHistogram] = {}
+        for endpoint, stats in self.endpoint_stats.items():
+            histogram, _ = stats.recent.merged(window_seconds)
+            if not histogram.count:
+                continue
+            if stats.query_type in by_query_type:
+                by_query_type[stats.query_type].merge(histogram)
+            else:
+                by_query_type[stats.query_type] = histogram.empty_copy().merge(histogram)
+            if histogram.mean > self.slow_query_threshold:
                 slow_endpoints.append({
                     "endpoint": endpoint,
-                    "avg_response_time": avg_time,
-                    "request_count": len(times),
-                    "max_response_time": max(times)
+                    "avg_response_time": histogram.mean,
+                    "request_count": histogram.count,
+                    "max_response_time": histogram.max
                 })
         
         slow_endpoints.sort(key=lambda x: x["avg_response_time"], reverse=True)
         
+        # Individually kept (slow or failed) requests in the window
+        cutoff_time = datetime.now() - timedelta(minutes=time_window_minutes)
+        notable = [m for m in self.metrics_history if m.timestamp >= cutoff_time]
+        slow_queries = [m for m in notable if m.execution_time > self.slow_query_threshold]
+        
         # Error analysis
         error_analysis = {}
-        for metric in recent_metrics:
+        for metric in notable:
             if not metric.success and metric.error_message:
                 error_key = metric.error_message[:50]
                 if error_key not in error_analysis:
@@ -336,14 +394,16 @@ class PerformanceProfiler:
                 "successful_requests": successful_requests,
                 "failed_requests": failed_requests,
                 "success_rate": (successful_requests / total_requests) * 100,
-                "avg_response_time": avg_response_time,
+                "avg_response_time": overall.mean,
                 "median_response_time": median_response_time,
                 "p95_response_time": p95_response_time,
+                "p99_response_time": p99_response_time,
             },
-            "performance_distribution": performance_levels,
+            "performance_distribution": self._level_distribution(overall),
+            "by_query_type": {query_type: histogram.summary() for query_type, histogram in by_query_type.items()},
             "slow_queries": {
-                "count": len(slow_queries),
-                "critical_count": len(critical_queries),
+                "count": overall.count_between(self.slow_query_threshold),
+                "critical_count": overall.count_between(self.critical_query_threshold),
                 "threshold": self.slow_query_threshold,
                 "examples": [
                     {
@@ -368,24 +428,12 @@ class PerformanceProfiler:
             return {"error": f"No statistics available for endpoint: {endpoint}"}
         
         stats = self.endpoint_stats[endpoint]
-        
-        # Get recent metrics for this endpoint
-        recent_metrics = [
-            m for m in self.metrics_history[-1000:] 
-            if m.endpoint == endpoint
-        ]
-        
-        # Response time distribution
-        response_times = [m.execution_time for m in recent_metrics]
-        
-        distribution = {}
-        for level in PerformanceLevel:
-            distribution[level.value] = sum(
-                1 for m in recent_metrics if m.performance_level == level
-            )
+        recent, _ = stats.recent.merged()
+        p50, p95, p99 = stats.latency.quantiles((0.5, 0.95, 0.99))
         
         return {
             "endpoint": endpoint,
+            "query_type": stats.query_type,
             "statistics": {
                 "total_requests": stats.total_requests,
                 "successful_requests": stats.successful_requests,
@@ -394,25 +442,70 @@ class PerformanceProfiler:
                 "avg_response_time": stats.avg_response_time,
                 "min_response_time": stats.min_time,
                 "max_response_time": stats.max_time,
+                "p50_response_time": p50,
                 "p95_response_time": stats.p95_response_time,
+                "p99_response_time": p99,
                 "current_performance_level": stats.current_performance_level.value,
                 "last_updated": stats.last_updated.isoformat()
             },
-            "performance_distribution": distribution,
+            "performance_distribution": self._level_distribution(recent),
             "recent_errors": dict(list(stats.error_rates.items())[:10]),
             "recent_metrics": [
                 {
-                    "query_id": m.query_id,
-                    "execution_time": m.execution_time,
-                    "timestamp": m.timestamp.isoformat(),
-                    "success": m.success,
-                    "performance_level": m.performance_level.value,
-                    "error": m.error_message
+                    "query_id": query_id,
+                    "execution_time": execution_time,
+                    "timestamp": timestamp.isoformat(),
+                    "success": success,
+                    "performance_level": classify_latency(execution_time).value,
+                    "error": error
                 }
-                for m in recent_metrics[-20:]
+                for timestamp, execution_time, success, query_id, error in stats.last_requests
             ]
         }
     
+    def export_prometheus(self, prefix: str = "kartavya") -> str:
+        """Latency histograms and outcome counters in Prometheus text format"""
+        series = [
+            ({"endpoint": endpoint, "query_type": stats.query_type}, stats.latency)
+            for endpoint, stats in sorted(self.endpoint_stats.items())
+        ]
+        lines = prometheus_histogram(
+            f"{prefix}_request_duration_seconds",
+            "Request latency by endpoint and query type",
+            series
+        )
+        lines += [
+            f"# HELP {prefix}_requests_total Requests by endpoint, query type and outcome",
+            f"# TYPE {prefix}_requests_total counter",
+        ]
+        for labels, _ in series:
+            stats = self.endpoint_stats[labels["endpoint"]]
+            for outcome, value in (("success", stats.successful_requests), ("error", stats.failed_requests)):
+                lines.append(f"{prefix}_requests_total{format_labels({**labels, 'outcome': outcome})} {value}")
+        lines += [
+            f"# HELP {prefix}_active_requests Requests currently in flight",
+            f"# TYPE {prefix}_active_requests gauge",
+            f"{prefix}_active_requests {len(self.active_requests)}",
+        ]
+        return "\n".join(lines) + "\n"
+    
+    def collect_metrics(self) -> List[MetricFamily]:
+        """Endpoint histograms and outcome counters as metric families for /metrics"""
+        duration = MetricFamily(
+            "request_duration_seconds", HISTOGRAM, "Request latency by endpoint and query type", "seconds"
+        )
+        requests = MetricFamily("requests", COUNTER, "Requests by endpoint, query type and outcome")
+        for endpoint, stats in list(self.endpoint_stats.items()):
+            labels = {"endpoint": endpoint, "query_type": stats.query_type}
+            duration.add(labels, stats.latency)
+            requests.add({**labels, "outcome": "success"}, stats.successful_requests)
+            requests.add({**labels, "outcome": "error"}, stats.failed_requests)
+        return [
+            duration,
+            requests,
+            MetricFamily("active_requests", GAUGE, "Requests currently in flight").add({}, len(self.active_requests)),
+        ]
+    
     def _get_system_stats(self) -> Dict[str, Any]:
         """Get current system statistics"""
         try:
@@ -445,9 +538,9 @@ class PerformanceProfiler:
                 },
                 "process": {
                     "pid": os.getpid(),
-                    "memory_rss": psutil.Process().memory_info().rss / 1024 / 1024,  # MB
-                    "memory_percent": psutil.Process().memory_percent(),
-                    "cpu_percent": psutil.Process().cpu_percent()
+                    "memory_rss": self._process.memory_info().rss / 1024 / 1024,  # MB
+                    "memory_percent": self._process.memory_percent(),
+                    "cpu_percent": self._process.cpu_percent()
                 }
             }
         except Exception as e:
@@ -502,22 +595,23 @@ class PerformanceProfiler:
         """Reset all performance statistics"""
         self.metrics_history.clear()
         self.endpoint_stats.clear()
+        self.overall = WindowedHistogram(WINDOW_SECONDS, WINDOW_COUNT)
         self.active_requests.clear()
         logger.info("🔄 Performance statistics reset")
     
     def get_health_status(self) -> Dict[str, Any]:
         """Get overall system health status"""
-        recent_metrics = self.metrics_history[-100:] if self.metrics_history else []
+        recent, failures = self.overall.merged(WINDOW_SECONDS)
         
-        if not recent_metrics:
+        if not recent.count:
             return {
                 "status": "unknown",
                 "message": "No recent metrics available"
             }
         
-        # Calculate health scores
-        success_rate = sum(1 for m in recent_metrics if m.success) / len(recent_metrics) * 100
-        avg_response_time = statistics.mean([m.execution_time for m in recent_metrics])
+        # Calculate health scores over the latest window
+        success_rate = (recent.count - failures) / recent.count * 100
+        avg_response_time = recent.mean
         
         # Determine overall health
         if success_rate > 95 and avg_response_time < 1.0:
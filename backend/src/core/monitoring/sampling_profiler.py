@@ -0,0 +1,343 @@
+"""
+Sampling Profiler
+Opt-in statistical CPU profiler for the running API process: a background thread
+samples every thread's stack and keeps collapsed-stack counts per time window,
+optionally attributed to the endpoint being served
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = frozenset({
+    "selectors.EpollSelector.select",
+    "selectors.KqueueSelector.select",
+    "selectors.PollSelector.select",
+    "selectors.SelectSelector.select",
+    "threading.Condition.wait",
+    "threading.Event.wait",
+    "queue.Queue.get",
+    "concurrent.futures.thread._worker",
+    "socket.socket.accept",
+})
+
+UNATTRIBUTED = "[unattributed]"
+TRUNCATED = "[truncated]"
+
+_current_endpoint: contextvars.ContextVar = contextvars.ContextVar("kartavya_profiled_endpoint", default=None)
+
+
+class SamplingProfiler:
+    """
+    Periodic stack sampler with windowed collapsed-stack output
+
+    Sampling costs one ``sys._current_frames()`` walk per interval and nothing on the
+    request path: requests are only tagged with their endpoint while the profiler
+    runs. Event-loop samples are attributed through the task that is running
+    (tasks inherit their creator's endpoint via a task factory); worker-pool samples
+    through callables wrapped with ``wrap()``. Counts live in a ring of
+    ``windows`` slots of ``window_seconds`` each, so memory is bounded by
+    ``windows * max_stacks`` however long it runs.
+    """
+
+    def __init__(self, interval: float = 0.01, window_seconds: float = 60.0, windows: int = 10,
+                 max_depth: int = 64, max_stacks: int = 10000, include_idle: bool = False,
+                 clock: Callable[[], float] = time.time):
+        self.interval = interval
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.include_idle = include_idle
+        self._clock = clock
+
+        self._slots: List[Counter] = [Counter() for _ in range(windows)]
+        self._epochs = [-1] * windows
+        self._labels: Dict[Any, str] = {}
+        self._task_endpoints: "weakref.WeakKeyDictionary[asyncio.Task, str]" = weakref.WeakKeyDictionary()
+        self._thread_endpoints: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._previous_factory = None
+        self._stop_at: Optional[float] = None
+
+        self.started_at: Optional[float] = None
+        self.stats = {"samples": 0, "stacks": 0, "idle_skipped": 0, "truncated": 0, "sampling_seconds": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, duration: Optional[float] = None) -> bool:
+        """
+        Start sampling; call from the event loop so its tasks can be attributed
+
+        ``duration`` stops the sampler automatically after that many seconds.
+        """
+        if self.running:
+            return False
+        if self._thread is not None:
+            self.stop()  # clean up a run that stopped on its own
+        if interval:
+            self.interval = interval
+        self._stop_at = time.monotonic() + duration if duration else None
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._previous_factory = self._loop.get_task_factory()
+            self._loop.set_task_factory(self._task_factory)
+        except RuntimeError:
+            self._loop = self._loop_thread = None
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"🔬 Sampling profiler started ({1 / self.interval:.0f} Hz)")
+        return True
+
+    def stop(self) -> bool:
+        if self._thread is None:
+            return False
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        if self._loop is not None and self._loop.get_task_factory() == self._task_factory:
+            self._loop.set_task_factory(self._previous_factory)
+        self._loop = self._loop_thread = self._previous_factory = None
+        self._task_endpoints = weakref.WeakKeyDictionary()
+        self._thread_endpoints.clear()
+        logger.info(f"🔬 Sampling profiler stopped after {self.stats['samples']} samples")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample_once()
+            if self._stop_at is not None and time.monotonic() >= self._stop_at:
+                self._stop.set()
+                # Restore the task factory from the loop's own thread
+                if self._loop is not None:
+                    self._loop.call_soon_threadsafe(self.stop)
+
+    # Endpoint attribution
+
+    @contextmanager
+    def request(self, endpoint: str) -> Iterator[None]:
+        """Tag the current task (and tasks it creates) as serving ``endpoint``"""
+        if not self.running:
+            yield
+            return
+        token = _current_endpoint.set(endpoint)
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            self._task_endpoints[task] = endpoint
+        try:
+            yield
+        finally:
+            _current_endpoint.reset(token)
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        endpoint = _current_endpoint.get()
+        if endpoint is not None:
+            self._task_endpoints[task] = endpoint
+        return task
+
+    def wrap(self, func: Callable) -> Callable:
+        """Attribute a callable sent to a worker thread to the submitting request's endpoint"""
+        endpoint = _current_endpoint.get() if self.running else None
+        if endpoint is None:
+            return func
+
+        @functools.wraps(func)
+        def attributed(*args, **kwargs):
+            ident = threading.get_ident()
+            self._thread_endpoints[ident] = endpoint
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._thread_endpoints.pop(ident, None)
+        return attributed
+
+    def _endpoint_of(self, thread_id: int) -> str:
+        endpoint = self._thread_endpoints.get(thread_id)
+        loop = self._loop
+        if endpoint is None and thread_id == self._loop_thread and loop is not None:
+            task = asyncio.current_task(loop)
+            if task is not None:
+                endpoint = self._task_endpoints.get(task)
+        return endpoint or UNATTRIBUTED
+
+    # Sampling
+
+    def _label(self, frame) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get("__name__", "?")
+            label = self._labels[code] = f"{module}.{code.co_qualname}"
+        return label
+
+    def _counter(self) -> Counter:
+        epoch = int(self._clock() // self.window_seconds)
+        slot = epoch % self.windows
+        if self._epochs[slot] != epoch:
+            self._slots[slot] = Counter()
+            self._epochs[slot] = epoch
+        return self._slots[slot]
+
+    def sample_once(self) -> int:
+        """Record one stack per thread (except the sampler's); returns stacks recorded"""
+        started = time.perf_counter()
+        own = threading.get_ident()
+        samples = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            leaf = self._label(frame)
+            if not self.include_idle and leaf in IDLE_FRAMES:
+                self.stats["idle_skipped"] += 1
+                continue
+            stack = []
+            depth = 0
+            while frame is not None and depth < self.max_depth:
+                stack.append(self._label(frame))
+                frame = frame.f_back
+                depth += 1
+            if frame is not None:
+                stack.append("…")
+            samples.append((self._endpoint_of(thread_id), ";".join(reversed(stack))))
+        with self._lock:
+            counts = self._counter()
+            for key in samples:
+                if key not in counts and len(counts) >= self.max_stacks:
+                    key = (key[0], TRUNCATED)
+                    self.stats["truncated"] += 1
+                counts[key] += 1
+        self.stats["samples"] += 1
+        self.stats["stacks"] += len(samples)
+        self.stats["sampling_seconds"] += time.perf_counter() - started
+        return len(samples)
+
+    # Output
+
+    def merged(self, seconds: Optional[float] = None) -> Counter:
+        """(endpoint, stack) counts over the last ``seconds`` (default: every window)"""
+        epoch = int(self._clock() // self.window_seconds)
+        span = self.windows if seconds is None else min(self.windows, max(1, math.ceil(seconds / self.window_seconds)))
+        merged: Counter = Counter()
+        with self._lock:
+            for slot in range(self.windows):
+                if epoch - span < self._epochs[slot] <= epoch:
+                    merged.update(self._slots[slot])
+        return merged
+
+    def collapsed(self, seconds: Optional[float] = None, by_endpoint: bool = False,
+                  endpoint: Optional[str] = None) -> str:
+        """
+        Collapsed stacks (``frame;frame;frame count`` per line) for flamegraph tools
+
+        ``by_endpoint`` roots every stack at the endpoint it was attributed to;
+        ``endpoint`` keeps only that endpoint's samples.
+        """
+        totals: Counter = Counter()
+        for (owner, stack), count in self.merged(seconds).items():
+            if endpoint is not None and owner != endpoint:
+                continue
+            totals[f"{owner};{stack}" if by_endpoint else stack] += count
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(totals.items()))
+
+    def top_functions(self, seconds: Optional[float] = None, limit: int = 20,
+                      endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Functions by samples on CPU (self) and on the stack (total)"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        samples = 0
+        for (owner, stack), count in self.merged(seconds).items():
+            if endpoint is not None and owner != endpoint:
+                continue
+            frames = stack.split(";")
+            samples += count
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        return [
+            {
+                "function": function,
+                "self": self_counts[function],
+                "total": total,
+                "self_percent": round(100 * self_counts[function] / samples, 2),
+                "total_percent": round(100 * total / samples, 2)
+            }
+            for function, total in sorted(
+                total_counts.items(), key=lambda item: (-self_counts[item[0]], -item[1])
+            )[:limit]
+        ]
+
+    def endpoints(self, seconds: Optional[float] = None) -> Dict[str, int]:
+        """Samples per attributed endpoint"""
+        totals: Counter = Counter()
+        for (owner, _), count in self.merged(seconds).items():
+            totals[owner] += count
+        return dict(totals.most_common())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._slots = [Counter() for _ in range(self.windows)]
+            self._epochs = [-1] * self.windows
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        elapsed = time.time() - self.started_at if self.running and self.started_at else 0.0
+        return {
+            **self.stats,
+            "running": self.running,
+            "enabled": sampling_enabled(),
+            "interval": self.interval,
+            "window_seconds": self.window_seconds,
+            "windows": self.windows,
+            "running_for": elapsed,
+            # Share of one core spent sampling
+            "overhead": self.stats["sampling_seconds"] / elapsed if elapsed else 0.0
+        }
+
+
+def sampling_enabled() -> bool:
+    """Whether the deployment allows the sampler to be started (``SAMPLING_PROFILER_ENABLED``)"""
+    return os.getenv("SAMPLING_PROFILER_ENABLED", "false").lower() == "true"
+
+
+# Global sampling profiler instance
+sampling_profiler = SamplingProfiler(
+    interval=float(os.getenv("SAMPLING_PROFILER_INTERVAL", "0.01")),
+    window_seconds=float(os.getenv("SAMPLING_PROFILER_WINDOW_SECONDS", "60")),
+    windows=int(os.getenv("SAMPLING_PROFILER_WINDOWS", "10"))
+)
+
+
+def get_sampling_profiler() -> SamplingProfiler:
+    """Get the global sampling profiler"""
+    return sampling_profiler
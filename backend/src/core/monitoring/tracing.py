@@ -0,0 +1,449 @@
+"""
+Request Tracing
+OpenTelemetry-compatible spans (W3C ``traceparent`` propagation, OTLP-shaped export)
+that cost one attribute check when tracing is disabled
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Deque, Iterable, NamedTuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Span kinds (OpenTelemetry names)
+INTERNAL = "internal"
+SERVER = "server"
+CLIENT = "client"
+
+TRACEPARENT = "traceparent"
+
+
+class SpanContext(NamedTuple):
+    """Identity of a span, as carried in a W3C ``traceparent``"""
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, header: Optional[str]) -> Optional["SpanContext"]:
+        """Parse ``00-<32 hex trace id>-<16 hex span id>-<flags>``; None if malformed"""
+        if not header or not isinstance(header, str):
+            return None
+        parts = header.strip().lower().split("-")
+        if len(parts) != 4 or parts[0] == "ff" or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            flags = int(parts[3], 16)
+            if int(parts[1], 16) == 0 or int(parts[2], 16) == 0:
+                return None
+        except ValueError:
+            return None
+        return cls(parts[1], parts[2], bool(flags & 1))
+
+
+class Span:
+    """
+    One timed operation
+
+    Entering the span (``with``) makes it the current span, so spans started
+    inside it - including in tasks created meanwhile - become its children.
+    A span that is not entered must be ended explicitly.
+    """
+
+    __slots__ = ("tracer", "name", "context", "parent_id", "kind", "start_ns", "end_ns",
+                 "attributes", "events", "status", "status_message", "_token")
+
+    is_recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, context: SpanContext, parent_id: Optional[str],
+                 kind: str = INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+                 start_ns: Optional[int] = None):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "UNSET"
+        self.status_message = ""
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> "Span":
+        self.attributes[key] = value
+        return self
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> "Span":
+        self.events.append({"name": name, "timeUnixNano": time.time_ns(), "attributes": attributes or {}})
+        return self
+
+    def set_status(self, status: str, message: str = "") -> "Span":
+        self.status = status
+        self.status_message = message
+        return self
+
+    def record_exception(self, exc: BaseException) -> "Span":
+        self.add_event("exception", {"exception.type": type(exc).__name__, "exception.message": str(exc)})
+        return self.set_status("ERROR", str(exc))
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end (or to now while running)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        self.tracer._export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            self.record_exception(exc)
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Exited in another context (e.g. an async generator closed elsewhere)
+                pass
+            self._token = None
+        self.end()
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """OTLP/JSON-shaped span (attributes flattened to a mapping)"""
+        return {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status, "message": self.status_message},
+            "resource": {"service.name": self.tracer.service_name},
+        }
+
+
+class _NonRecordingSpan(Span):
+    """Carries an unsampled trace's context so children follow the parent's decision"""
+
+    __slots__ = ()
+
+    is_recording = False
+
+    def set_attribute(self, key: str, value: Any) -> "Span":
+        return self
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> "Span":
+        return self
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> "Span":
+        return self
+
+    def set_status(self, status: str, message: str = "") -> "Span":
+        return self
+
+    def record_exception(self, exc: BaseException) -> "Span":
+        return self
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        self.end_ns = self.end_ns or end_ns or time.time_ns()
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled; every method does nothing"""
+
+    __slots__ = ()
+
+    is_recording = False
+    context = None
+    name = ""
+
+    def set_attribute(self, key: str, value: Any) -> "_NoopSpan":
+        return self
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> "_NoopSpan":
+        return self
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> "_NoopSpan":
+        return self
+
+    def set_status(self, status: str, message: str = "") -> "_NoopSpan":
+        return self
+
+    def record_exception(self, exc: BaseException) -> "_NoopSpan":
+        return self
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("kartavya_current_span", default=NOOP_SPAN)
+
+
+class InMemorySpanExporter:
+    """Keeps the most recent finished spans, grouped by trace on read"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def get_finished_spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        spans = list(self.spans)
+        if trace_id is None:
+            return spans
+        return [span for span in spans if span.context.trace_id == trace_id]
+
+    def get_trace(self, trace_id: str) -> Dict[str, Any]:
+        """Spans of one trace in start order, with the time spent in each"""
+        spans = sorted(self.get_finished_spans(trace_id), key=lambda s: s.start_ns)
+        if not spans:
+            return {"trace_id": trace_id, "spans": []}
+        start = spans[0].start_ns
+        end = max(span.end_ns or span.start_ns for span in spans)
+        return {
+            "trace_id": trace_id,
+            "duration_ms": round((end - start) / 1e6, 3),
+            "spans": [
+                {**span.to_dict(), "offsetMs": round((span.start_ns - start) / 1e6, 3)}
+                for span in spans
+            ],
+        }
+
+    def recent_traces(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Newest traces first: root span name, span count and duration"""
+        traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        for span in reversed(self.spans):
+            trace_id = span.context.trace_id
+            if trace_id in traces:
+                traces[trace_id].append(span)
+            elif len(traces) < limit:
+                traces[trace_id] = [span]
+        summaries = []
+        for trace_id, spans in traces.items():
+            span_ids = {span.context.span_id for span in spans}
+            root = next((s for s in spans if s.parent_id not in span_ids), spans[-1])
+            summaries.append({
+                "trace_id": trace_id,
+                "root": root.name,
+                "spans": len(spans),
+                "duration_ms": round(root.duration * 1000, 3),
+                "status": "ERROR" if any(span.status == "ERROR" for span in spans) else "OK",
+            })
+        return summaries
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FileSpanExporter:
+    """
+    Appends finished spans as JSON lines for offline analysis
+
+    Spans are buffered and written ``flush_every`` at a time so the event loop
+    only touches the file occasionally; ``shutdown()`` writes the remainder.
+    """
+
+    def __init__(self, path: Union[str, Path], flush_every: int = 64):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) < self.flush_every:
+                return
+            lines, self._buffer = self._buffer, []
+        self._write(lines)
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            self._write(lines)
+
+    def _write(self, lines: List[str]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+            self.written += len(lines)
+        except OSError as e:
+            logger.error(f"❌ Failed to write {len(lines)} spans to {self.path}: {e}")
+
+    def shutdown(self) -> None:
+        self.flush()
+
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to the exporters
+
+    Disabled by default. ``TRACING_ENABLED=true`` turns it on;
+    ``TRACING_EXPORTERS`` picks ``memory`` and/or ``file`` (``TRACING_FILE``), and
+    ``TRACING_SAMPLE_RATE`` samples new traces (continued traces follow the caller).
+    """
+
+    def __init__(self, service_name: str = "kartavya-siem", enabled: Optional[bool] = None,
+                 sample_rate: Optional[float] = None, exporters: Optional[Iterable[Any]] = None):
+        self.service_name = service_name
+        self.enabled = (
+            os.getenv("TRACING_ENABLED", "false").lower() == "true" if enabled is None else enabled
+        )
+        self.sample_rate = float(os.getenv("TRACING_SAMPLE_RATE", "1.0")) if sample_rate is None else sample_rate
+        self.memory: Optional[InMemorySpanExporter] = None
+        self.exporters: List[Any] = []
+        if exporters is None:
+            names = os.getenv("TRACING_EXPORTERS", "memory").lower().split(",")
+            exporters = []
+            if "memory" in names:
+                exporters.append(InMemorySpanExporter())
+            if "file" in names:
+                exporters.append(FileSpanExporter(os.getenv("TRACING_FILE", "logs/traces.jsonl")))
+        for exporter in exporters:
+            self.add_exporter(exporter)
+        self.stats = {"spans_started": 0, "spans_exported": 0, "export_errors": 0}
+
+    def add_exporter(self, exporter: Any) -> None:
+        self.exporters.append(exporter)
+        if self.memory is None and isinstance(exporter, InMemorySpanExporter):
+            self.memory = exporter
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Union[Span, SpanContext, None] = None,
+        kind: str = INTERNAL,
+    ) -> Union[Span, _NoopSpan]:
+        """Start a span under ``parent`` (default: the current span); use it with ``with`` or end() it"""
+        if not self.enabled:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        parent_context = parent if isinstance(parent, SpanContext) else parent.context
+        if parent_context is None:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        else:
+            trace_id, parent_id, sampled = parent_context
+        context = SpanContext(trace_id, f"{random.getrandbits(64):016x}", sampled)
+        if not sampled:
+            return _NonRecordingSpan(self, name, context, parent_id, kind)
+        self.stats["spans_started"] += 1
+        return Span(self, name, context, parent_id, kind, attributes)
+
+    def _export(self, span: Span) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                self.stats["export_errors"] += 1
+                logger.error(f"❌ Span exporter {type(exporter).__name__} failed: {e}")
+        self.stats["spans_exported"] += 1
+
+    def shutdown(self) -> None:
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "exporters": [type(exporter).__name__ for exporter in self.exporters],
+        }
+
+
+def current_span() -> Union[Span, _NoopSpan]:
+    """The span active in this context (a no-op span when there is none)"""
+    return _current_span.get()
+
+
+def inject(carrier: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the current span's ``traceparent`` to an outgoing message or header mapping"""
+    context = _current_span.get().context
+    if context is not None:
+        carrier[TRACEPARENT] = context.traceparent()
+    return carrier
+
+
+def extract(carrier: Optional[Dict[str, Any]]) -> Optional[SpanContext]:
+    """Remote parent from an incoming message or header mapping"""
+    if not carrier:
+        return None
+    return SpanContext.from_traceparent(carrier.get(TRACEPARENT))
+
+
+def traced(name: str, kind: str = INTERNAL) -> Callable:
+    """Run a function (sync or async) inside a span named ``name``"""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.start_span(name, kind=kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.start_span(name, kind=kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Global tracer instance
+tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the global tracer"""
+    return tracer
@@ -12,8 +12,23 @@ from enum import Enum
 from datetime import datetime
 import asyncio
 
+from .field_index import FieldIndex, field_similarity
+from ..platform.detector import add_field_mapping_listener
+
 logger = logging.getLogger(__name__)
 
+# RobustPlatformDetector semantic names -> entity types they extend
+DETECTED_ENTITY_TYPES = {
+    "timestamp": "timestamp",
+    "username": "username",
+    "source_ip": "ip_address",
+    "destination_ip": "ip_address",
+    "ip_address": "ip_address",
+    "hostname": "host",
+    "process_name": "process_name",
+    "event_id": "event_id",
+}
+
 
 class SIEMPlatform(Enum):
     """Supported SIEM platforms"""
@@ -58,6 +73,10 @@ class AdvancedSchemaMapper:
         self.custom_mappings = {}
         self.entity_type_mappings = self._load_entity_type_mappings()
         
+        # Per-platform field indexes, built lazily and extended incrementally
+        self.field_indexes: Dict[str, FieldIndex] = {}
+        add_field_mapping_listener(self.apply_detected_mappings)
+        
     async def initialize(self, siem_connector=None):
         """Initialize mapper with SIEM connector information"""
         if siem_connector:
@@ -157,21 +176,18 @@ class AdvancedSchemaMapper:
         """
         try:
             suggestions = []
-            platform_fields = self.field_mappings.get(platform.value, {})
-            
-            partial_lower = partial_field.lower()
-            
-            # Search through all field mappings
-            for entity_type, field_list in platform_fields.items():
-                for field in field_list:
-                    if partial_lower in field.lower():
-                        confidence = self._calculate_field_similarity(partial_field, field)
-                        suggestions.append({
-                            "field": field,
-                            "entity_type": entity_type,
-                            "confidence": confidence,
-                            "description": self._get_field_description(field, entity_type)
-                        })
+            index = self._get_field_index(platform.value)
+            
+            # Only fields containing the partial input are scored
+            for field in index.containing(partial_field):
+                confidence = self._calculate_field_similarity(partial_field, field)
+                for entity_type in index.tags(field):
+                    suggestions.append({
+                        "field": field,
+                        "entity_type": entity_type,
+                        "confidence": confidence,
+                        "description": self._get_field_description(field, entity_type)
+                    })
             
             # Sort by confidence and return top suggestions
             suggestions.sort(key=lambda x: x["confidence"], reverse=True)
@@ -340,6 +356,7 @@ class AdvancedSchemaMapper:
         """Integrate dynamically discovered schema information"""
         if platform.value not in self.field_mappings:
             self.field_mappings[platform.value] = {}
+        index = self._get_field_index(platform.value)
         
         # Process discovered fields
         for field_info in schema_info.get("fields", []):
@@ -355,11 +372,13 @@ class AdvancedSchemaMapper:
                     
                     if field_name not in self.field_mappings[platform.value][entity_type]:
                         self.field_mappings[platform.value][entity_type].append(field_name)
+                        index.add(field_name, tags=[entity_type])
     
     def _integrate_static_schema(self, platform: SIEMPlatform, schema_data: Dict[str, Any]):
         """Integrate static schema configuration"""
         if platform.value not in self.field_mappings:
             self.field_mappings[platform.value] = {}
+        index = self._get_field_index(platform.value)
         
         # Merge with existing mappings
         for entity_type, fields in schema_data.get("field_mappings", {}).items():
@@ -369,6 +388,7 @@ class AdvancedSchemaMapper:
             for field in fields:
                 if field not in self.field_mappings[platform.value][entity_type]:
                     self.field_mappings[platform.value][entity_type].append(field)
+                    index.add(field, tags=[entity_type])
     
     async def _get_fields_for_entity_type(
         self, 
@@ -404,17 +424,14 @@ class AdvancedSchemaMapper:
     ) -> Optional[str]:
         """Translate a single field name between platforms"""
         
-        # Find entity type for source field
-        source_fields = self.field_mappings.get(source_platform.value, {})
-        source_entity_type = None
+        # Find entity type for source field; only exact names and aliases count
+        index = self._get_field_index(source_platform.value)
+        known_field = index.resolve(source_field)
+        source_entity_types = index.tags(known_field) if known_field else []
         
-        for entity_type, fields in source_fields.items():
-            if source_field in fields:
-                source_entity_type = entity_type
-                break
-        
-        if not source_entity_type:
+        if not source_entity_types:
             return None
+        source_entity_type = source_entity_types[0]
         
         # Get target fields for same entity type
         target_fields = await self._get_fields_for_entity_type(
@@ -426,27 +443,38 @@ class AdvancedSchemaMapper:
     
     def _calculate_field_similarity(self, field1: str, field2: str) -> float:
         """Calculate similarity between two field names"""
-        field1_lower = field1.lower()
-        field2_lower = field2.lower()
-        
-        # Exact match
-        if field1_lower == field2_lower:
-            return 1.0
-        
-        # Substring match
-        if field1_lower in field2_lower or field2_lower in field1_lower:
-            shorter = min(len(field1_lower), len(field2_lower))
-            longer = max(len(field1_lower), len(field2_lower))
-            return shorter / longer
-        
-        # Character overlap
-        common_chars = set(field1_lower) & set(field2_lower)
-        total_chars = set(field1_lower) | set(field2_lower)
+        return field_similarity(field1, field2)
+    
+    def _get_field_index(self, platform_key: str) -> FieldIndex:
+        """Field index for a platform, built from the current mappings on first use"""
+        index = self.field_indexes.get(platform_key)
+        if index is None:
+            index = FieldIndex()
+            for entity_type, fields in self.field_mappings.get(platform_key, {}).items():
+                for field in fields:
+                    index.add(field, tags=[entity_type])
+            self.field_indexes[platform_key] = index
+        return index
+    
+    def apply_detected_mappings(self, detected: Dict[str, str]) -> None:
+        """Fold fields found by RobustPlatformDetector into the Elasticsearch mappings"""
+        platform_key = SIEMPlatform.ELASTICSEARCH.value
+        platform_fields = self.field_mappings.setdefault(platform_key, {})
+        index = self._get_field_index(platform_key)
         
-        if total_chars:
-            return len(common_chars) / len(total_chars)
+        added = 0
+        for semantic, field in detected.items():
+            entity_type = DETECTED_ENTITY_TYPES.get(semantic) or self._infer_entity_type_from_field(field)
+            if not entity_type:
+                continue
+            fields = platform_fields.setdefault(entity_type, [])
+            if field not in fields:
+                fields.append(field)
+                index.add(field, tags=[entity_type])
+                added += 1
         
-        return 0.0
+        if added:
+            logger.info(f"Schema mapper indexed {added} detected fields")
     
     def _get_field_description(self, field_name: str, entity_type: str) -> str:
         """Get description for a field"""
@@ -5,11 +5,12 @@ Extracts entities like IP addresses, usernames, time ranges, etc.
 
 import re
 from typing import Dict, List, Any, Optional, Union
-from datetime import datetime, timedelta
 import logging
 from dataclasses import dataclass
 import os
 
+from .time_parser import parse_time_expression
+
 # Optional spaCy support (flag-gated)
 _USE_SPACY = os.environ.get('ASSISTANT_USE_SPACY', 'false').lower() in ('1', 'true', 'yes')
 try:
@@ -105,17 +106,11 @@ class EntityExtractor:
                 r'\bftp://[^\s<>"{}|\\^`\[\]]+\b',
             ],
             
+            # Full time phrases come from the shared time parser (see extract_entities);
+            # these are only the vague hints smart defaults turn into a window
             'time_range': [
-                r'\b(?:last|past|previous)\s+(\d+)\s+(minute|hour|day|week|month|year)s?\b',
-                r'\b(today|yesterday|tomorrow)\b',
-                r'\b(this|last)\s+(hour|day|week|month|year)\b',
-                r'\bfrom\s+(\d{1,2}/\d{1,2}/\d{2,4})\s+to\s+(\d{1,2}/\d{1,2}/\d{2,4})\b',
-                r'\bsince\s+(\d{1,2}/\d{1,2}/\d{2,4})\b',
-                r'\bbetween\s+(.+?)\s+and\s+(.+?)\b',
-                # Enhanced patterns for smart defaults
                 r'\b(recent|recently|latest|current|now)\b',
                 r'\b(immediate|urgent|asap)\b',
-                r'\b(in the (last|past))\s*(\w+)\b'
             ],
             
             'severity': [
@@ -136,22 +131,6 @@ class EntityExtractor:
                 r'\b(compliance|audit|policy|regulation)\b'
             ]
         }
-        
-        # Time range parsing helpers
-        self.time_units = {
-            'minute': 'minutes',
-            'minutes': 'minutes', 
-            'hour': 'hours',
-            'hours': 'hours',
-            'day': 'days',
-            'days': 'days',
-            'week': 'weeks',
-            'weeks': 'weeks',
-            'month': 'months',
-            'months': 'months',
-            'year': 'years',
-            'years': 'years'
-        }
     
     def extract_entities(self, query: str) -> List[Entity]:
         """
@@ -210,6 +189,20 @@ class EntityExtractor:
                         )
                         entities.append(entity)
         
+        # The whole time phrase ("in the last 24 hours" -> "last 24 hours"), so builders
+        # re-parse the same text and hit the parser's memo
+        expression = parse_time_expression(query)
+        if expression is not None and expression.span[1] > expression.span[0]:
+            start, end = expression.span
+            value = query[start:end]
+            entities.append(Entity(
+                type='time_range',
+                value=value,
+                confidence=self._calculate_confidence('time_range', value, query),
+                start_pos=start,
+                end_pos=end
+            ))
+        
         # Remove duplicates and overlapping entities
         entities = self._remove_duplicates(entities)
         
@@ -224,34 +217,13 @@ class EntityExtractor:
         Extract and parse time range from query.
         
         Returns:
-            Dictionary with 'start_time', 'end_time', and 'relative' fields
+            Dictionary with 'start_time', 'end_time' (bucket-aligned), 'relative',
+            'description' and the date-math 'range'; None if no time phrase is present
         """
-        query_lower = query.lower()
-        
-        # Relative time patterns
-        relative_patterns = [
-            (r'\b(?:last|past|previous)\s+(\d+)\s+(minute|hour|day|week|month|year)s?\b', 'relative'),
-            (r'\b(today|yesterday)\b', 'keyword'),
-            (r'\b(this|last)\s+(hour|day|week|month|year)\b', 'relative_keyword'),
-        ]
-        
-        for pattern, time_type in relative_patterns:
-            match = re.search(pattern, query_lower)
-            if match:
-                return self._parse_relative_time(match, time_type)
-        
-        # Absolute time patterns
-        absolute_patterns = [
-            r'\bfrom\s+(\d{1,2}/\d{1,2}/\d{2,4})\s+to\s+(\d{1,2}/\d{1,2}/\d{2,4})\b',
-            r'\bsince\s+(\d{1,2}/\d{1,2}/\d{2,4})\b',
-        ]
-        
-        for pattern in absolute_patterns:
-            match = re.search(pattern, query_lower)
-            if match:
-                return self._parse_absolute_time(match)
-        
-        return None
+        expression = parse_time_expression(query)
+        if expression is None:
+            return None
+        return expression.window()
     
     def _clean_entity_value(self, entity_type: str, value: str) -> str:
         """Clean and normalize entity values."""
@@ -351,69 +323,6 @@ class EntityExtractor:
         
         return filtered
     
-    def _parse_relative_time(self, match, time_type: str) -> Dict[str, Any]:
-        """Parse relative time expressions."""
-        now = datetime.now()
-        
-        if time_type == 'relative':
-            amount = int(match.group(1))
-            unit = self.time_units.get(match.group(2).lower(), 'hours')
-            
-            if unit == 'minutes':
-                start_time = now - timedelta(minutes=amount)
-            elif unit == 'hours':
-                start_time = now - timedelta(hours=amount)
-            elif unit == 'days':
-                start_time = now - timedelta(days=amount)
-            elif unit == 'weeks':
-                start_time = now - timedelta(weeks=amount)
-            elif unit == 'months':
-                start_time = now - timedelta(days=amount * 30)  # Approximate
-            elif unit == 'years':
-                start_time = now - timedelta(days=amount * 365)  # Approximate
-            else:
-                start_time = now - timedelta(hours=1)  # Default
-                
-            return {
-                'start_time': start_time,
-                'end_time': now,
-                'relative': True,
-                'description': f"Last {amount} {unit}"
-            }
-            
-        elif time_type == 'keyword':
-            keyword = match.group(1)
-            if keyword == 'today':
-                start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                return {
-                    'start_time': start_time,
-                    'end_time': now,
-                    'relative': True,
-                    'description': 'Today'
-                }
-            elif keyword == 'yesterday':
-                start_time = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-                end_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                return {
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'relative': True,
-                    'description': 'Yesterday'
-                }
-        
-        return None
-    
-    def _parse_absolute_time(self, match) -> Dict[str, Any]:
-        """Parse absolute time expressions."""
-        # This is a simplified implementation
-        # In production, you'd want more robust date parsing
-        return {
-            'start_time': None,
-            'end_time': None,
-            'relative': False,
-            'description': 'Absolute time range'
-        }
-    
     def get_entity_summary(self, entities: List[Entity]) -> Dict[str, List[str]]:
         """Get a summary of extracted entities by type."""
         summary = {}
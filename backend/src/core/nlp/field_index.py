@@ -0,0 +1,199 @@
+"""
+Field Name Index
+Prefix trie plus character n-gram index over SIEM field names and aliases, so
+schema mappers resolve and rank fields without scanning every known field.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Iterable, Set, Tuple
+
+
+def field_similarity(field1: str, field2: str) -> float:
+    """Similarity between two field names (1.0 exact, length ratio for substrings, else character overlap)"""
+    field1_lower = field1.lower()
+    field2_lower = field2.lower()
+
+    if field1_lower == field2_lower:
+        return 1.0
+
+    if field1_lower in field2_lower or field2_lower in field1_lower:
+        shorter = min(len(field1_lower), len(field2_lower))
+        longer = max(len(field1_lower), len(field2_lower))
+        return shorter / longer
+
+    common_chars = set(field1_lower) & set(field2_lower)
+    total_chars = set(field1_lower) | set(field2_lower)
+    if total_chars:
+        return len(common_chars) / len(total_chars)
+    return 0.0
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids", "terminal")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: Set[int] = set()       # fields with any indexed term under this prefix
+        self.terminal: Set[int] = set()  # fields whose full name or alias ends here
+
+
+class FieldIndex:
+    """
+    Incremental index over field names
+
+    Each field is indexed under its full name, its aliases and (for prefix
+    lookups only) its dotted segments. Ids follow insertion order so results
+    come back in the same order a linear scan over the source mappings would
+    produce.
+    """
+
+    def __init__(self, ngram: int = 3):
+        self.ngram = ngram
+        self._names: List[str] = []
+        self._terms: List[Tuple[str, ...]] = []
+        self._ids: Dict[str, int] = {}
+        self._tags: Dict[int, List[str]] = {}
+        self._root = _TrieNode()
+        self._grams: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, field: str) -> bool:
+        return field.lower() in self._ids
+
+    def add(self, field: str, aliases: Iterable[str] = (), tags: Iterable[str] = ()) -> bool:
+        """Index a field (or attach new aliases/tags to a known one); True if the field is new"""
+        key = field.lower()
+        field_id = self._ids.get(key)
+        is_new = field_id is None
+        if is_new:
+            field_id = len(self._names)
+            self._ids[key] = field_id
+            self._names.append(field)
+            self._terms.append((key,))
+            self._tags[field_id] = []
+            self._insert(key, field_id, full=True)
+            for segment in key.split(".")[1:]:
+                self._insert(segment, field_id, full=False)
+
+        for alias in aliases:
+            alias = alias.lower()
+            if alias and alias not in self._terms[field_id]:
+                self._terms[field_id] += (alias,)
+                self._insert(alias, field_id, full=True)
+
+        field_tags = self._tags[field_id]
+        for tag in tags:
+            if tag not in field_tags:
+                field_tags.append(tag)
+        return is_new
+
+    def resolve(self, term: str) -> Optional[str]:
+        """The field whose full name or an alias is exactly ``term`` (case-insensitive)"""
+        node = self._root
+        for char in term.lower():
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return self._names[min(node.terminal)] if node.terminal else None
+
+    def tags(self, field: str) -> List[str]:
+        field_id = self._ids.get(field.lower())
+        return list(self._tags[field_id]) if field_id is not None else []
+
+    def with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """Fields having a name, alias or dotted segment starting with ``prefix``"""
+        node = self._root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return self._names_for(node.ids, limit)
+
+    def containing(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """Fields whose name or an alias contains ``text`` as a substring"""
+        return self._names_for(self._containing_ids(text.lower()), limit)
+
+    def within(self, text: str) -> List[str]:
+        """Fields whose full name or an alias occurs as a substring of ``text``"""
+        text = text.lower()
+        found: Set[int] = set()
+        for start in range(len(text)):
+            node = self._root
+            for char in text[start:]:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                found |= node.terminal
+        return self._names_for(found)
+
+    def related(self, text: str) -> List[str]:
+        """Fields that contain ``text`` or are contained in it, in insertion order"""
+        text = text.lower()
+        ids = self._containing_ids(text) | {self._ids[name.lower()] for name in self.within(text)}
+        return self._names_for(ids)
+
+    def similar(self, text: str, limit: int = 10, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Top-``limit`` fields by ``field_similarity``
+
+        Candidates come from substring matches in both directions plus the
+        fields sharing the most n-grams with ``text``; only those are scored.
+        """
+        text = text.lower()
+        candidates = self._containing_ids(text) | {self._ids[name.lower()] for name in self.within(text)}
+
+        overlap: Counter = Counter()
+        for gram in self._grams_of(text):
+            for field_id in self._grams.get(gram, ()):
+                overlap[field_id] += 1
+        candidates.update(field_id for field_id, _ in overlap.most_common(limit * 4))
+
+        scored = []
+        for field_id in candidates:
+            score = max(field_similarity(text, term) for term in self._terms[field_id])
+            if score >= min_score:
+                scored.append((field_id, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return [(self._names[field_id], score) for field_id, score in scored[:limit]]
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _insert(self, term: str, field_id: int, full: bool) -> None:
+        node = self._root
+        for char in term:
+            node = node.children.setdefault(char, _TrieNode())
+            node.ids.add(field_id)
+        if full:
+            node.terminal.add(field_id)
+            for gram in self._grams_of(term):
+                self._grams.setdefault(gram, set()).add(field_id)
+
+    def _grams_of(self, text: str) -> Set[str]:
+        if len(text) < self.ngram:
+            return {text} if text else set()
+        return {text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)}
+
+    def _containing_ids(self, text: str) -> Set[int]:
+        if len(text) < self.ngram:
+            # Too short for the n-gram postings; short inputs are rare and the scan is cheap
+            return {i for i, terms in enumerate(self._terms) if any(text in term for term in terms)}
+
+        postings = sorted((self._grams.get(gram, set()) for gram in self._grams_of(text)), key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return set()
+        return {i for i in candidates if any(text in term for term in self._terms[i])}
+
+    def _names_for(self, ids: Iterable[int], limit: Optional[int] = None) -> List[str]:
+        ordered = sorted(ids)
+        if limit is not None:
+            ordered = ordered[:limit]
+        return [self._names[i] for i in ordered]
@@ -0,0 +1,128 @@
+"""
+Intent Classification Benchmark
+Accuracy and throughput regression harness for IntentClassifier over a labeled query corpus.
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from typing import Dict, List, Tuple, Optional, Any
+
+from .intent_classifier import IntentClassifier, QueryIntent
+
+# (query, expected intent) pairs drawn from analyst-style questions
+LABELED_QUERIES: List[Tuple[str, QueryIntent]] = [
+    ("Show me failed login attempts from last hour", QueryIntent.SHOW_FAILED_LOGINS),
+    ("Show failed login attempts from user admin", QueryIntent.SHOW_FAILED_LOGINS),
+    ("any brute force against the domain controller?", QueryIntent.SHOW_FAILED_LOGINS),
+    ("event 4625 on SRV-DC01 today", QueryIntent.SHOW_FAILED_LOGINS),
+    ("ssh denied for root on web servers", QueryIntent.SHOW_FAILED_LOGINS),
+    ("accounts with wrong password in the last 24 hours", QueryIntent.SHOW_FAILED_LOGINS),
+    ("which account lock events happened this morning", QueryIntent.SHOW_FAILED_LOGINS),
+    ("recent failed authentication for finance users", QueryIntent.SHOW_FAILED_LOGINS),
+    ("List all successful authentication events today", QueryIntent.SHOW_SUCCESSFUL_LOGINS),
+    ("successful login for mike.chen this week", QueryIntent.SHOW_SUCCESSFUL_LOGINS),
+    ("windows event 4624 for service accounts", QueryIntent.SHOW_SUCCESSFUL_LOGINS),
+    ("ssh accepted connections from external ips", QueryIntent.SHOW_SUCCESSFUL_LOGINS),
+    ("Get system performance metrics", QueryIntent.GET_SYSTEM_METRICS),
+    ("cpu usage on database hosts", QueryIntent.GET_SYSTEM_METRICS),
+    ("memory utilization across the web tier", QueryIntent.GET_SYSTEM_METRICS),
+    ("system health of domain controllers", QueryIntent.GET_SYSTEM_METRICS),
+    ("Search for network traffic anomalies", QueryIntent.NETWORK_TRAFFIC),
+    ("firewall block events from 10.0.0.5", QueryIntent.NETWORK_TRAFFIC),
+    ("port scan against the dmz", QueryIntent.NETWORK_TRAFFIC),
+    ("bandwidth spikes after midnight", QueryIntent.NETWORK_TRAFFIC),
+    ("tcp connection attempts to port 3389", QueryIntent.NETWORK_TRAFFIC),
+    ("Show me security alerts", QueryIntent.SECURITY_ALERTS),
+    ("critical security alerts in the last day", QueryIntent.SECURITY_ALERTS),
+    ("ransomware on finance workstations", QueryIntent.SECURITY_ALERTS),
+    ("suspicious activity on HR-WORKSTATION", QueryIntent.SECURITY_ALERTS),
+    ("intrusion attempt against the vpn gateway", QueryIntent.SECURITY_ALERTS),
+    ("Find user activity for admin accounts", QueryIntent.USER_ACTIVITY),
+    ("privilege escalation by contractors", QueryIntent.USER_ACTIVITY),
+    ("process creation events 4688 on IT-ADMIN-01", QueryIntent.USER_ACTIVITY),
+    ("powershell execution by non admins", QueryIntent.USER_ACTIVITY),
+    ("file deletion on the shared drive", QueryIntent.USER_ACTIVITY),
+    ("Display system errors from yesterday", QueryIntent.SYSTEM_ERRORS),
+    ("application crash on the billing server", QueryIntent.SYSTEM_ERRORS),
+    ("service restart events on exchange", QueryIntent.SYSTEM_ERRORS),
+    ("blue screen reports this week", QueryIntent.SYSTEM_ERRORS),
+    ("antivirus detect events on laptops", QueryIntent.MALWARE_DETECTION),
+    ("malicious file downloads from email", QueryIntent.MALWARE_DETECTION),
+    ("signature match alerts from the edr", QueryIntent.MALWARE_DETECTION),
+    ("threat hunt for lateral movement", QueryIntent.THREAT_HUNTING),
+    ("hunt for beaconing hosts", QueryIntent.THREAT_HUNTING),
+    ("apt activity targeting finance", QueryIntent.THREAT_HUNTING),
+    ("investigate the incident on FINANCE-WS01", QueryIntent.THREAT_HUNTING),
+    ("compliance audit for the payment servers", QueryIntent.COMPLIANCE_CHECK),
+    ("pci compliance gaps", QueryIntent.COMPLIANCE_CHECK),
+    ("policy violation by contractors", QueryIntent.COMPLIANCE_CHECK),
+    ("audit trail for config changes", QueryIntent.COMPLIANCE_CHECK),
+    ("show logs from web01", QueryIntent.SEARCH_LOGS),
+    ("list events from the last 15 minutes", QueryIntent.SEARCH_LOGS),
+    ("display records for host SRV-DC01", QueryIntent.SEARCH_LOGS),
+    ("hello there", QueryIntent.UNKNOWN),
+]
+
+# Accuracy the current pattern set reaches on LABELED_QUERIES; regressions fail below it
+BASELINE_ACCURACY = 0.9
+
+
+def evaluate(
+    classifier: Optional[IntentClassifier] = None,
+    corpus: Optional[List[Tuple[str, QueryIntent]]] = None,
+    rounds: int = 20
+) -> Dict[str, Any]:
+    """
+    Measure accuracy and throughput of ``classify_many`` over a labeled corpus
+
+    Args:
+        classifier: Classifier to evaluate (a fresh one by default)
+        corpus: (query, expected intent) pairs (LABELED_QUERIES by default)
+        rounds: Timed passes over the corpus
+
+    Returns:
+        Accuracy, per-intent misses and queries/second
+    """
+    classifier = classifier or IntentClassifier()
+    corpus = corpus or LABELED_QUERIES
+    queries = [query for query, _ in corpus]
+
+    predictions = classifier.classify_many(queries)
+    misses = [
+        {"query": query, "expected": expected.value, "predicted": predicted.value}
+        for (query, expected), (predicted, _) in zip(corpus, predictions)
+        if predicted != expected
+    ]
+
+    started = time.perf_counter()
+    for _ in range(max(1, rounds)):
+        classifier.classify_many(queries)
+    elapsed = time.perf_counter() - started
+    classified = len(queries) * max(1, rounds)
+
+    return {
+        "queries": len(corpus),
+        "accuracy": round(1 - len(misses) / len(corpus), 4),
+        "baseline_accuracy": BASELINE_ACCURACY,
+        "misses": misses,
+        "misses_by_intent": dict(Counter(miss["expected"] for miss in misses)),
+        "queries_per_second": round(classified / elapsed, 1),
+        "mean_latency_us": round(elapsed / classified * 1e6, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """``python -m src.core.nlp.intent_benchmark``; exits non-zero below baseline accuracy"""
+    parser = argparse.ArgumentParser(description="Benchmark intent classification")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    report = evaluate(rounds=args.rounds)
+    print(json.dumps(report, indent=2))
+    return 0 if report["accuracy"] >= BASELINE_ACCURACY else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,10 +10,26 @@ import json
 import logging
 from pathlib import Path
 from datetime import datetime, timedelta
-import re
+
+from .field_index import FieldIndex
+from .time_parser import parse_time_expression
+from ..platform.detector import add_field_mapping_listener
 
 logger = logging.getLogger(__name__)
 
+# RobustPlatformDetector semantic names -> mapping keys they extend
+DETECTED_MAPPING_KEYS = {
+    "timestamp": ["timestamp"],
+    "username": ["user", "username"],
+    "source_ip": ["ip"],
+    "destination_ip": ["ip"],
+    "ip_address": ["ip"],
+    "hostname": ["host"],
+    "process_name": ["process_name"],
+    "event_id": ["event_id"],
+    "event_category": ["event_category"],
+}
+
 class SchemaMapper:
     """
     Maps natural language entities to SIEM schema fields
@@ -32,6 +48,13 @@ class SchemaMapper:
         self.field_cache = {}
         self.discovered_fields = {}
         
+        # Indexes replace linear substring scans over mapping keys / discovered fields
+        self.key_index = FieldIndex()
+        for key in self.mappings:
+            self.key_index.add(key)
+        self.discovered_index = FieldIndex()
+        add_field_mapping_listener(self.apply_detected_mappings)
+        
     def _load_mappings(self) -> Dict:
         """Load schema mappings from file or use defaults"""
         mapping_path = Path(self.mapping_file)
@@ -169,6 +192,9 @@ class SchemaMapper:
                     # It's sync, call it directly
                     self.discovered_fields = connector.get_field_mappings()
                 
+                for field in self.discovered_fields or {}:
+                    self.discovered_index.add(field)
+                
                 # Safely get the length of discovered fields
                 if isinstance(self.discovered_fields, dict):
                     field_count = len(self.discovered_fields.get('properties', {}))
@@ -178,6 +204,29 @@ class SchemaMapper:
         except Exception as e:
             logger.warning(f"Could not discover schema from SIEM: {e}")
     
+    def apply_detected_mappings(self, detected: Dict[str, str]) -> None:
+        """
+        Fold fields found by RobustPlatformDetector into the mappings
+        
+        Args:
+            detected: Semantic name -> discovered field (only new or changed ones)
+        """
+        changed = False
+        for semantic, field in detected.items():
+            for key in DETECTED_MAPPING_KEYS.get(semantic, [semantic]):
+                mapping = self.mappings.setdefault(key, {"elastic": [], "fields": []})
+                if key not in self.key_index:
+                    self.key_index.add(key)
+                for platform_key in ("elastic", "fields"):
+                    platform_fields = mapping.setdefault(platform_key, [])
+                    if field not in platform_fields:
+                        platform_fields.append(field)
+                        changed = True
+        
+        if changed:
+            self.field_cache.clear()
+            logger.info(f"Schema mapper picked up {len(detected)} detected field mappings")
+    
     def map_entity_to_fields(
         self,
         entity: str,
@@ -210,14 +259,14 @@ class SchemaMapper:
             else:
                 fields.extend(mapping.get("fields", []))
         
-        # Try to find mapping by entity value
+        # Try to find mapping by entity value (keys inside the value or containing it)
         entity_lower = entity.lower()
-        for key, mapping in self.mappings.items():
-            if key in entity_lower or entity_lower in key:
-                if platform in mapping:
-                    fields.extend(mapping[platform])
-                else:
-                    fields.extend(mapping.get("fields", []))
+        for key in self.key_index.related(entity_lower):
+            mapping = self.mappings[key]
+            if platform in mapping:
+                fields.extend(mapping[platform])
+            else:
+                fields.extend(mapping.get("fields", []))
         
         # Remove duplicates while preserving order
         seen = set()
@@ -277,25 +326,9 @@ class SchemaMapper:
         Returns:
             Dictionary with 'gte' and 'lte' time bounds
         """
-        now = datetime.now()
-        time_lower = time_expression.lower()
-        
-        # Common time patterns
-        patterns = {
-            r"last (\d+) hour": lambda m: {"gte": f"now-{m.group(1)}h", "lte": "now"},
-            r"last (\d+) day": lambda m: {"gte": f"now-{m.group(1)}d", "lte": "now"},
-            r"last (\d+) week": lambda m: {"gte": f"now-{int(m.group(1))*7}d", "lte": "now"},
-            r"last (\d+) month": lambda m: {"gte": f"now-{int(m.group(1))*30}d", "lte": "now"},
-            r"yesterday": lambda m: {"gte": "now-1d/d", "lte": "now-1d/d"},
-            r"today": lambda m: {"gte": "now/d", "lte": "now"},
-            r"this week": lambda m: {"gte": "now/w", "lte": "now"},
-            r"this month": lambda m: {"gte": "now/M", "lte": "now"},
-        }
-        
-        for pattern, handler in patterns.items():
-            match = re.search(pattern, time_lower)
-            if match:
-                return handler(match)
+        expression = parse_time_expression(time_expression)
+        if expression:
+            return expression.range()
         
         # Default to last 24 hours
         return {"gte": "now-24h", "lte": "now"}
@@ -315,18 +348,16 @@ class SchemaMapper:
         partial_lower = partial_term.lower()
         
         # Search in mappings
-        for key, mapping in self.mappings.items():
-            if partial_lower in key:
-                if platform in mapping:
-                    suggestions.extend(mapping[platform])
-                else:
-                    suggestions.extend(mapping.get("fields", []))
+        for key in self.key_index.containing(partial_lower):
+            mapping = self.mappings[key]
+            if platform in mapping:
+                suggestions.extend(mapping[platform])
+            else:
+                suggestions.extend(mapping.get("fields", []))
         
         # Search in discovered fields
         if self.discovered_fields:
-            for field in self.discovered_fields:
-                if partial_lower in field.lower():
-                    suggestions.append(field)
+            suggestions.extend(self.discovered_index.containing(partial_lower))
         
         # Remove duplicates and return
         return list(set(suggestions))[:10]  # Return top 10 suggestions
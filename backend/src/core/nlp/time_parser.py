@@ -0,0 +1,338 @@
+"""
+Time Expression Parser
+One compiled tokenizer and small grammar for relative ("last 24 hours", "2 days ago", "24h"),
+calendar ("today", "this week"), absolute ("on 2024-01-05", "from 01/05/2024 to 01/07/2024") and
+business-hours phrases, with memoized results and bucket-aligned windows.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+from ..query.ir import DEFAULT_TIME_FIELD, TimeRange, resolve_date_math
+
+logger = logging.getLogger(__name__)
+
+# Working hours used by business-hours / after-hours phrases (local time, Mon-Fri)
+BUSINESS_HOURS = (9, 17)
+BUSINESS_DAYS = frozenset(range(5))
+MAX_HOUR_WINDOWS = 62  # longer spans are not expanded into per-day windows
+
+# Window applied when a phrase only restricts hours ("logins after hours")
+DEFAULT_WINDOW = "now-24h"
+
+# Alignment bucket per window length: the largest unit that is at most 1/24 of the window,
+# so aligning never widens a window by more than ~4%
+ALIGNMENT_BUCKETS = ((24 * 86400, "d"), (24 * 3600, "h"), (24 * 60, "m"))
+
+UNIT_NAMES = {"s": "second", "m": "minute", "h": "hour", "d": "day", "w": "week", "M": "month", "y": "year"}
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800, "M": 2592000, "y": 31536000}
+
+_UNIT_WORDS = {
+    "s": ("sec", "secs", "second", "seconds"),
+    "m": ("min", "mins", "minute", "minutes"),
+    "h": ("hr", "hrs", "hour", "hours"),
+    "d": ("day", "days"),
+    "w": ("wk", "wks", "week", "weeks"),
+    "M": ("mo", "month", "months"),
+    "y": ("yr", "yrs", "year", "years"),
+}
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "fifteen": 15,
+    "twenty": 20, "thirty": 30, "couple": 2, "few": 3,
+}
+_KEYWORDS = {
+    "last": "LAST", "past": "LAST", "previous": "LAST",
+    "this": "THIS", "current": "THIS",
+    "today": "TODAY", "yesterday": "YESTERDAY",
+    "since": "SINCE", "from": "FROM", "between": "BETWEEN", "and": "AND", "ago": "AGO", "on": "ON",
+    "to": "TO", "until": "TO", "till": "TO", "through": "TO",
+}
+_WORD_KINDS: Dict[str, Tuple[str, Any]] = {
+    **{word: (kind, None) for word, kind in _KEYWORDS.items()},
+    **{word: ("NUMBER", value) for word, value in _NUMBER_WORDS.items()},
+    **{word: ("UNIT", unit) for unit, words in _UNIT_WORDS.items() for word in words},
+}
+
+# Single pass tokenizer; alternatives are tried in order at each position
+_TOKENIZER = re.compile(r"""
+    (?P<DATE>\d{4}-\d{1,2}-\d{1,2}(?:[t\s]\d{1,2}:\d{2}(?::\d{2})?)?z?|\d{1,2}/\d{1,2}/\d{2,4})
+  | (?P<AFTER_HOURS>(?:after|off|non[\s-]?business)[\s-]+hours
+        |outside\s+(?:of\s+)?(?:business|working|office|work)\s+hours|overnight)
+  | (?P<BUSINESS_HOURS>(?:business|working|office|work)\s+hours)
+  | (?P<DURATION>\d+[smhdwy]\b)
+  | (?P<NUMBER>\d+)
+  | (?P<WORD>[a-z]+)
+""", re.VERBOSE)
+_ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})(?:[t\s](\d{1,2}):(\d{2})(?::(\d{2}))?)?")
+_US_DATE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{2,4})")
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    value: Any
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class TimeExpression:
+    """
+    A parsed time phrase
+
+    Bounds are ES date math (``now-24h``, ``now/d``) for relative and calendar phrases
+    and ISO strings for absolute dates, so one parse serves every request.
+    """
+    start: Optional[str]
+    end: Optional[str] = "now"
+    description: str = ""
+    relative: bool = True
+    hours: Optional[str] = None  # "business" | "after" | None
+    span: Tuple[int, int] = (0, 0)
+
+    def range(self) -> Dict[str, str]:
+        """Elasticsearch range bounds"""
+        bounds = {"gte": self.start}
+        if self.end is not None:
+            # A rounded end ("now/d") is exclusive; "lte" would round it up to the end of the day
+            bounds["lt" if "/" in self.end else "lte"] = self.end
+        return bounds
+
+    def time_range(self, field: str = DEFAULT_TIME_FIELD) -> TimeRange:
+        return TimeRange(start=self.start, end=self.end, field=field)
+
+    def seconds(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Window length"""
+        start, end = self.resolve(now)
+        if start is None or end is None:
+            return None
+        return (end - start).total_seconds()
+
+    @property
+    def bucket(self) -> str:
+        """Alignment unit for this window"""
+        length = self.seconds() or 0
+        for threshold, unit in ALIGNMENT_BUCKETS:
+            if length >= threshold:
+                return unit
+        return "s"
+
+    def resolve(self, now: Optional[datetime] = None, aligned: bool = False
+                ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        Absolute (start, end)
+
+        ``aligned`` floors the start and ceils the end to :attr:`bucket`, so every
+        request inside one bucket resolves to the same window (and the same cache keys).
+        """
+        now = now or datetime.now()
+        start, end = resolve_date_math(self.start, now), resolve_date_math(self.end, now)
+        if not aligned:
+            return start, end
+        unit = self.bucket
+        if start is not None:
+            start = resolve_date_math(f"now/{unit}", start)
+        if end is not None:
+            floored = resolve_date_math(f"now/{unit}", end)
+            end = floored if floored == end else floored + timedelta(seconds=_UNIT_SECONDS[unit])
+        return start, end
+
+    def window(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Bucket-aligned bounds plus the phrase"s description and date-math range"""
+        start_time, end_time = self.resolve(now, aligned=True)
+        window = {
+            "start_time": start_time,
+            "end_time": end_time,
+            "relative": self.relative,
+            "description": self.description,
+            "range": self.range()
+        }
+        if self.hours:
+            window["hours"] = self.hours
+        return window
+
+    def aligned(self) -> "TimeExpression":
+        """Same window with the start rounded down to :attr:`bucket` in date math"""
+        if not self.relative or not self.start or "/" in self.start or not self.start.startswith("now"):
+            return self
+        return replace(self, start=f"{self.start}/{self.bucket}")
+
+    def hour_windows(self, now: Optional[datetime] = None
+                     ) -> Optional[List[Tuple[datetime, datetime]]]:
+        """
+        Working-hour windows inside the (aligned) window, one per business day
+
+        Returns None when the phrase has no hours restriction or spans too many days.
+        """
+        if not self.hours:
+            return None
+        start, end = self.resolve(now, aligned=True)
+        if start is None or end is None:
+            return None
+        opening, closing = BUSINESS_HOURS
+        windows = []
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            if day.weekday() in BUSINESS_DAYS:
+                window_start = max(start, day.replace(hour=opening))
+                window_end = min(end, day.replace(hour=closing))
+                if window_start < window_end:
+                    windows.append((window_start, window_end))
+            if len(windows) > MAX_HOUR_WINDOWS:
+                logger.warning(f"⚠️ '{self.description}' spans too many days to restrict by hours")
+                return None
+            day += timedelta(days=1)
+        return windows
+
+
+def tokenize(text: str) -> List[Token]:
+    """Lower-cased tokens; unknown words are kept as WORD tokens"""
+    tokens = []
+    for match_ in _TOKENIZER.finditer(text.lower()):
+        kind = match_.lastgroup
+        value: Any = match_.group()
+        if kind == "NUMBER":
+            value = int(value)
+        elif kind == "DURATION":
+            value = (int(value[:-1]), value[-1])
+        elif kind == "WORD":
+            kind, mapped = _WORD_KINDS.get(value, ("WORD", value))
+            value = value if mapped is None else mapped
+        tokens.append(Token(kind, value, match_.start(), match_.end()))
+    return tokens
+
+
+def parse_time_expression(text: Any) -> Optional[TimeExpression]:
+    """
+    Parse the first time phrase in ``text`` (memoized per text)
+
+    Returns None when the text holds no time phrase; ``span`` indexes into ``text``.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None
+    return _parse_cached(text)
+
+
+def get_parser_stats() -> Dict[str, int]:
+    info = _parse_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+
+@lru_cache(maxsize=2048)
+def _parse_cached(text: str) -> Optional[TimeExpression]:
+    tokens = tokenize(text)
+    hours = None
+    for token in tokens:
+        if token.kind == "BUSINESS_HOURS":
+            hours = "business"
+        elif token.kind == "AFTER_HOURS":
+            hours = "after"
+
+    expression = _parse_window(tokens)
+    if expression is None and text.strip().isdigit():
+        # Bare number: hours (query parameter convention)
+        expression = _rolling(int(text), "h", (text.index(text.strip()), len(text.rstrip())))
+    if expression is None and hours:
+        expression = TimeExpression(DEFAULT_WINDOW, "now", "Last 24 hours")
+    if expression is None:
+        return None
+    if hours:
+        label = "business hours" if hours == "business" else "after hours"
+        expression = replace(expression, hours=hours, description=f"{expression.description} ({label})")
+    return expression
+
+
+def _parse_window(tokens: List[Token]) -> Optional[TimeExpression]:
+    """First window production in the token stream"""
+    kinds = [token.kind for token in tokens]
+
+    def at(position: int, *expected: str) -> bool:
+        return kinds[position:position + len(expected)] == list(expected)
+
+    for i, token in enumerate(tokens):
+        kind = token.kind
+        if kind == "LAST":
+            if at(i + 1, "NUMBER", "UNIT"):
+                return _rolling(tokens[i + 1].value, tokens[i + 2].value, _span(tokens, i, i + 2))
+            if at(i + 1, "DURATION"):
+                return _rolling(*tokens[i + 1].value, _span(tokens, i, i + 1))
+            if at(i + 1, "UNIT"):
+                return _rolling(1, tokens[i + 1].value, _span(tokens, i, i + 1))
+        elif kind == "THIS" and at(i + 1, "UNIT"):
+            unit = tokens[i + 1].value
+            return TimeExpression(f"now/{unit}", "now", f"This {UNIT_NAMES[unit]}",
+                                  span=_span(tokens, i, i + 1))
+        elif kind == "NUMBER" and at(i + 1, "UNIT", "AGO"):
+            amount, unit = token.value, tokens[i + 1].value
+            return TimeExpression(f"now-{amount}{unit}", "now",
+                                  f"Since {amount} {_plural(amount, unit)} ago", span=_span(tokens, i, i + 2))
+        elif kind == "NUMBER" and at(i + 1, "UNIT") and len(tokens) == 2:
+            # "24 hours" on its own (builder parameters)
+            return _rolling(token.value, tokens[i + 1].value, _span(tokens, i, i + 1))
+        elif kind == "DURATION":
+            return _rolling(*token.value, _span(tokens, i, i))
+        elif kind == "TODAY":
+            return TimeExpression("now/d", "now", "Today", span=_span(tokens, i, i))
+        elif kind == "YESTERDAY":
+            return TimeExpression("now-1d/d", "now/d", "Yesterday", span=_span(tokens, i, i))
+        elif kind == "SINCE":
+            if at(i + 1, "DATE"):
+                start = _iso(tokens[i + 1].value)
+                if start:
+                    return TimeExpression(start, "now", f"Since {start[:10]}", relative=False,
+                                          span=_span(tokens, i, i + 1))
+            elif at(i + 1, "YESTERDAY"):
+                return TimeExpression("now-1d/d", "now", "Since yesterday", span=_span(tokens, i, i + 1))
+        elif kind == "ON" and at(i + 1, "DATE"):
+            start = _iso(tokens[i + 1].value)
+            if start:
+                return TimeExpression(start, _iso(start[:10], end_of_day=True), f"On {start[:10]}",
+                                      relative=False, span=_span(tokens, i, i + 1))
+        elif kind in ("FROM", "BETWEEN") and at(i + 1, "DATE") and len(tokens) > i + 3 \
+                and tokens[i + 2].kind in ("TO", "AND") and tokens[i + 3].kind == "DATE":
+            start = _iso(tokens[i + 1].value)
+            end = _iso(tokens[i + 3].value, end_of_day=True)
+            if start and end:
+                return TimeExpression(start, end, f"{start[:10]} to {end[:10]}", relative=False,
+                                      span=_span(tokens, i, i + 3))
+    return None
+
+
+def _rolling(amount: int, unit: str, span: Tuple[int, int]) -> TimeExpression:
+    return TimeExpression(f"now-{amount}{unit}", "now", f"Last {amount} {_plural(amount, unit)}", span=span)
+
+
+def _plural(amount: int, unit: str) -> str:
+    name = UNIT_NAMES[unit]
+    return name if amount == 1 else f"{name}s"
+
+
+def _span(tokens: List[Token], first: int, last: int) -> Tuple[int, int]:
+    return tokens[first].start, tokens[last].end
+
+
+def _iso(value: str, end_of_day: bool = False) -> Optional[str]:
+    """ISO timestamp for ISO or US (m/d/y) dates; date-only ends cover the whole day"""
+    try:
+        iso = _ISO_DATE.fullmatch(value.rstrip("z"))
+        if iso:
+            year, month, day, hour, minute, second = iso.groups()
+            moment = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+            has_time = hour is not None
+        else:
+            us = _US_DATE.fullmatch(value)
+            if not us:
+                return None
+            month, day, year = (int(part) for part in us.groups())
+            moment = datetime(year + 2000 if year < 100 else year, month, day)
+            has_time = False
+    except ValueError:
+        return None
+    if end_of_day and not has_time:
+        moment = moment.replace(hour=23, minute=59, second=59)
+    return moment.isoformat()
@@ -10,6 +10,12 @@ import logging
 from datetime import datetime, timedelta
 
 from .intent_classifier import QueryIntent
+from .time_parser import parse_time_expression
+from ..query.codegen import get_translation_cache
+from ..query.ir import (
+    QueryIR, IRBuilder, Aggregation, SortKey, TimeRange,
+    aggregation, exists, match, multi_match, optimize, query_string, terms, wildcard
+)
 
 logger = logging.getLogger(__name__)
 
@@ -78,77 +84,83 @@ class WindowsQueryBuilder:
             Elasticsearch DSL query optimized for Windows Beats data
         """
         try:
-            # Base query structure for winlogbeat data
-            query_dsl = {
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"match": {"beat.name": "winlogbeat"}},
-                            {"match": {"event.provider": "Microsoft-Windows-Security-Auditing"}}
-                        ],
-                        "filter": [],
-                        "should": [],
-                        "minimum_should_match": 0
-                    }
-                },
-                "sort": [{"@timestamp": {"order": "desc"}}],
-                "size": 100
-            }
-            
-            # Add intent-specific filters
-            self._add_intent_filters(query_dsl, intent)
-            
-            # Add entity filters
-            self._add_entity_filters(query_dsl, entities)
-            
-            # Add time range filter
-            self._add_time_filter(query_dsl, time_range or self.default_time_range)
-            
-            # Add keyword search if no specific intent
-            if intent == QueryIntent.UNKNOWN or intent == QueryIntent.SEARCH_LOGS:
-                self._add_keyword_search(query_dsl, query_text)
-            
+            ir = self.build_ir(intent, entities, query_text, time_range)
             logger.info(f"Built Windows query for intent: {intent.value}")
-            return query_dsl
+            return get_translation_cache().lower(ir, "elasticsearch")
             
         except Exception as e:
             logger.error(f"Failed to build Windows query: {e}")
             return self._build_fallback_query(query_text, time_range)
     
-    def _add_intent_filters(self, query_dsl: Dict[str, Any], intent: QueryIntent) -> None:
+    def build_ir(
+        self,
+        intent: QueryIntent,
+        entities: List[Dict[str, Any]],
+        query_text: str,
+        time_range: Optional[str] = None,
+        aggregations: Optional[List[Aggregation]] = None
+    ) -> QueryIR:
+        """Build the backend-neutral form of the Windows Security query."""
+        # Base query structure for winlogbeat data
+        query = IRBuilder(size=100)
+        query.must.extend([
+            match("beat.name", "winlogbeat"),
+            match("event.provider", "Microsoft-Windows-Security-Auditing")
+        ])
+        query.minimum_should_match = 0
+        query.sort.append(SortKey("@timestamp", "desc"))
+        
+        # Add intent-specific filters
+        self._add_intent_filters(query, intent)
+        
+        # Add entity filters
+        self._add_entity_filters(query, entities)
+        
+        # Add time range filter
+        self._add_time_filter(query, time_range or self.default_time_range)
+        
+        # Add keyword search if no specific intent
+        if intent == QueryIntent.UNKNOWN or intent == QueryIntent.SEARCH_LOGS:
+            self._add_keyword_search(query, query_text)
+        
+        if aggregations:
+            query.aggregations.extend(aggregations)
+            query.size = 0  # No hits needed for aggregation-only query
+        
+        return optimize(query.build())
+    
+    def _add_intent_filters(self, query: IRBuilder, intent: QueryIntent) -> None:
         """Add Windows event ID filters based on intent."""
         event_ids = self.event_mappings.get(intent)
         if event_ids:
-            query_dsl["query"]["bool"]["must"].append({
-                "terms": {"event.code": event_ids}
-            })
+            query.must.append(terms("event.code", event_ids))
         
         # Add specific intent logic
         if intent == QueryIntent.SHOW_FAILED_LOGINS:
             # Also check for common failure reasons
-            query_dsl["query"]["bool"]["should"].extend([
-                {"match": {"winlog.event_data.Status": "0xC000006D"}},  # Bad username
-                {"match": {"winlog.event_data.Status": "0xC000006A"}},  # Bad password
-                {"match": {"winlog.event_data.SubStatus": "0xC0000064"}}, # User does not exist
-                {"match": {"winlog.event_data.SubStatus": "0xC000006A"}}, # Bad password
+            query.should.extend([
+                match("winlog.event_data.Status", "0xC000006D"),  # Bad username
+                match("winlog.event_data.Status", "0xC000006A"),  # Bad password
+                match("winlog.event_data.SubStatus", "0xC0000064"),  # User does not exist
+                match("winlog.event_data.SubStatus", "0xC000006A"),  # Bad password
             ])
             
         elif intent == QueryIntent.USER_ACTIVITY:
             # Add process and user-related events
-            query_dsl["query"]["bool"]["should"].extend([
-                {"exists": {"field": "winlog.event_data.ProcessName"}},
-                {"exists": {"field": "winlog.event_data.TargetUserName"}},
-                {"match": {"event.category": "process"}}
+            query.should.extend([
+                exists("winlog.event_data.ProcessName"),
+                exists("winlog.event_data.TargetUserName"),
+                match("event.category", "process")
             ])
             
         elif intent == QueryIntent.GET_SYSTEM_METRICS:
             # Switch to metricbeat for system metrics
-            query_dsl["query"]["bool"]["must"] = [
-                {"match": {"beat.name": "metricbeat"}},
-                {"exists": {"field": "system.cpu"}}
+            query.must = [
+                match("beat.name", "metricbeat"),
+                exists("system.cpu")
             ]
     
-    def _add_entity_filters(self, query_dsl: Dict[str, Any], entities: List[Dict[str, Any]]) -> None:
+    def _add_entity_filters(self, query: IRBuilder, entities: List[Dict[str, Any]]) -> None:
         """Add filters based on extracted entities."""
         for entity in entities:
             entity_type = entity.get("type", "").lower()
@@ -158,102 +170,71 @@ class WindowsQueryBuilder:
                 continue
                 
             if entity_type == "user" or entity_type == "username":
-                query_dsl["query"]["bool"]["should"].extend([
-                    {"match": {"user.name": entity_value}},
-                    {"match": {"winlog.event_data.TargetUserName": entity_value}},
-                    {"match": {"winlog.event_data.SubjectUserName": entity_value}},
-                    {"wildcard": {"user.name": f"*{entity_value}*"}}
+                query.should.extend([
+                    match("user.name", entity_value),
+                    match("winlog.event_data.TargetUserName", entity_value),
+                    match("winlog.event_data.SubjectUserName", entity_value),
+                    wildcard("user.name", f"*{entity_value}*")
                 ])
-                query_dsl["query"]["bool"]["minimum_should_match"] = 1
+                query.minimum_should_match = 1
                 
             elif entity_type == "ip" or entity_type == "ip_address":
-                query_dsl["query"]["bool"]["should"].extend([
-                    {"match": {"source.ip": entity_value}},
-                    {"match": {"destination.ip": entity_value}},
-                    {"match": {"client.ip": entity_value}},
-                    {"match": {"winlog.event_data.IpAddress": entity_value}}
+                query.should.extend([
+                    match("source.ip", entity_value),
+                    match("destination.ip", entity_value),
+                    match("client.ip", entity_value),
+                    match("winlog.event_data.IpAddress", entity_value)
                 ])
-                query_dsl["query"]["bool"]["minimum_should_match"] = 1
+                query.minimum_should_match = 1
                 
             elif entity_type == "hostname" or entity_type == "computer":
-                query_dsl["query"]["bool"]["must"].append({
-                    "multi_match": {
-                        "query": entity_value,
-                        "fields": ["host.name", "agent.hostname", "winlog.computer_name"]
-                    }
-                })
+                query.must.append(multi_match(
+                    entity_value,
+                    ["host.name", "agent.hostname", "winlog.computer_name"]
+                ))
                 
             elif entity_type == "process":
-                query_dsl["query"]["bool"]["should"].extend([
-                    {"match": {"process.name": entity_value}},
-                    {"match": {"winlog.event_data.ProcessName": entity_value}},
-                    {"wildcard": {"process.name": f"*{entity_value}*"}}
+                query.should.extend([
+                    match("process.name", entity_value),
+                    match("winlog.event_data.ProcessName", entity_value),
+                    wildcard("process.name", f"*{entity_value}*")
                 ])
-                query_dsl["query"]["bool"]["minimum_should_match"] = 1
+                query.minimum_should_match = 1
     
-    def _add_time_filter(self, query_dsl: Dict[str, Any], time_range: str) -> None:
+    def _add_time_filter(self, query: IRBuilder, time_range: str) -> None:
         """Add time range filter to query."""
-        # Parse different time formats
-        time_patterns = {
-            r'(\d+)\s*(hour|hr|h)s?': lambda m: f"now-{m.group(1)}h",
-            r'(\d+)\s*(day|d)s?': lambda m: f"now-{m.group(1)}d", 
-            r'(\d+)\s*(week|w)s?': lambda m: f"now-{m.group(1)}w",
-            r'(\d+)\s*(minute|min|m)s?': lambda m: f"now-{m.group(1)}m",
-            r'last\s+(\d+)\s*(hour|hr|h)s?': lambda m: f"now-{m.group(1)}h",
-            r'last\s+(\d+)\s*(day|d)s?': lambda m: f"now-{m.group(1)}d",
-            r'today': lambda m: "now/d",
-            r'yesterday': lambda m: "now-1d/d"
-        }
-        
-        gte_value = f"now-{time_range}"
-        
-        # Try to parse human-readable time
-        for pattern, converter in time_patterns.items():
-            match = re.search(pattern, time_range.lower())
-            if match:
-                gte_value = converter(match)
-                break
+        expression = parse_time_expression(time_range)
+        if expression:
+            query.time_range = expression.time_range()
+            return
         
-        query_dsl["query"]["bool"]["filter"].append({
-            "range": {
-                "@timestamp": {
-                    "gte": gte_value,
-                    "lte": "now"
-                }
-            }
-        })
+        # Unparsed values are passed through as date math
+        query.time_range = TimeRange(start=f"now-{time_range}", end="now")
     
-    def _add_keyword_search(self, query_dsl: Dict[str, Any], query_text: str) -> None:
+    def _add_keyword_search(self, query: IRBuilder, query_text: str) -> None:
         """Add keyword search for general queries."""
         # Clean query text
         cleaned_query = re.sub(r'\b(show|find|search|list|get|display)\b', '', query_text, flags=re.IGNORECASE)
         cleaned_query = cleaned_query.strip()
         
         if cleaned_query:
-            query_dsl["query"]["bool"]["should"].extend([
-                {
-                    "multi_match": {
-                        "query": cleaned_query,
-                        "fields": [
-                            "message^2",
-                            "winlog.event_data.*",
-                            "event.original",
-                            "user.name",
-                            "process.name",
-                            "host.name"
-                        ],
-                        "type": "best_fields",
-                        "fuzziness": "AUTO"
-                    }
-                },
-                {
-                    "query_string": {
-                        "query": f"*{cleaned_query}*",
-                        "fields": ["message", "winlog.event_data.*"]
-                    }
-                }
+            query.should.extend([
+                multi_match(
+                    cleaned_query,
+                    [
+                        "message^2",
+                        "winlog.event_data.*",
+                        "event.original",
+                        "user.name",
+                        "process.name",
+                        "host.name"
+                    ],
+                    type="best_fields",
+                    fuzziness="AUTO"
+                ),
+                query_string(f"*{cleaned_query}*", ["message", "winlog.event_data.*"])
             ])
-            query_dsl["query"]["bool"]["minimum_should_match"] = 1
+            query.minimum_should_match = 1
     
     def _build_fallback_query(self, query_text: str, time_range: Optional[str]) -> Dict[str, Any]:
         """Build fallback query when main query building fails."""
@@ -294,52 +275,35 @@ class WindowsQueryBuilder:
         time_range: str = "24h"
     ) -> Dict[str, Any]:
         """Build aggregation query for dashboard widgets."""
-        base_query = self.build_query(intent, entities, "", time_range)
-        
         # Add aggregations based on intent
-        aggregations = {}
+        aggregations = []
         
         if intent == QueryIntent.SHOW_FAILED_LOGINS:
-            aggregations = {
-                "failed_logins_over_time": {
-                    "date_histogram": {
-                        "field": "@timestamp",
-                        "calendar_interval": "1h"
-                    }
-                },
-                "top_source_ips": {
-                    "terms": {
-                        "field": "source.ip.keyword",
-                        "size": 10
-                    }
-                },
-                "failed_users": {
-                    "terms": {
-                        "field": "winlog.event_data.TargetUserName.keyword",
-                        "size": 10
-                    }
-                }
-            }
+            aggregations = [
+                aggregation("failed_logins_over_time", "date_histogram", "@timestamp", calendar_interval="1h"),
+                aggregation("top_source_ips", "terms", "source.ip.keyword", size=10),
+                aggregation("failed_users", "terms", "winlog.event_data.TargetUserName.keyword", size=10)
+            ]
         elif intent == QueryIntent.GET_SYSTEM_METRICS:
-            aggregations = {
-                "avg_cpu": {
-                    "avg": {"field": "system.cpu.total.pct"}
-                },
-                "avg_memory": {
-                    "avg": {"field": "system.memory.used.pct"}
-                },
-                "cpu_over_time": {
-                    "date_histogram": {
-                        "field": "@timestamp", 
-                        "calendar_interval": "5m"
-                    },
-                    "aggs": {
-                        "avg_cpu": {"avg": {"field": "system.cpu.total.pct"}}
-                    }
-                }
-            }
+            aggregations = [
+                aggregation("avg_cpu", "avg", "system.cpu.total.pct"),
+                aggregation("avg_memory", "avg", "system.memory.used.pct"),
+                aggregation(
+                    "cpu_over_time", "date_histogram", "@timestamp",
+                    children=(aggregation("avg_cpu", "avg", "system.cpu.total.pct"),),
+                    calendar_interval="5m"
+                )
+            ]
+        
+        try:
+            ir = self.build_ir(intent, entities, "", time_range, aggregations)
+            base_query = get_translation_cache().lower(ir, "elasticsearch")
+        except Exception as e:
+            logger.error(f"Failed to build Windows aggregation query: {e}")
+            base_query = self._build_fallback_query("", time_range)
+            base_query["aggs"] = {}
         
-        base_query["aggs"] = aggregations
-        base_query["size"] = 0  # No hits needed for aggregation-only query
+        # No hits needed for aggregation-only query
+        base_query["size"] = 0
         
         return base_query
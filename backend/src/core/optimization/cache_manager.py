@@ -17,6 +17,9 @@ import pickle
 import gzip
 from contextlib import asynccontextmanager
 
+from ..monitoring.metrics import COUNTER, GAUGE, MetricFamily, get_registry
+from ..monitoring.tracing import current_span, traced
+
 # Redis imports (with fallback)
 try:
     import redis.asyncio as redis
@@ -83,6 +86,14 @@ class CacheManager:
         self.metrics = CacheMetrics()
         self.connected = False
         
+        # Shared /metrics registry: operation latency is recorded, CacheMetrics read on scrape
+        registry = get_registry()
+        self.operation_seconds = registry.histogram(
+            "cache_operation_duration_seconds", "Cache manager operation latency",
+            ("operation", "success"), unit="seconds"
+        )
+        registry.register_collector(self.collect_metrics)
+        
         # Performance monitoring
         self.performance_stats = {
             "query_times": [],
@@ -120,6 +131,7 @@ class CacheManager:
             self.connected = False
             return False
     
+    @traced("cache.get")
     async def get(
         self, 
         key: str, 
@@ -163,6 +175,7 @@ class CacheManager:
             self.metrics.errors += 1
             return default
     
+    @traced("cache.set")
     async def set(
         self, 
         key: str, 
@@ -390,6 +403,24 @@ class CacheManager:
         
         return self.metrics
     
+    def collect_metrics(self) -> List[MetricFamily]:
+        """CacheMetrics as metric families for /metrics"""
+        metrics = self.metrics
+        return [
+            MetricFamily("cache_lookups", COUNTER, "Cache manager lookups by result")
+            .add({"result": "hit"}, metrics.hits)
+            .add({"result": "miss"}, metrics.misses),
+            MetricFamily("cache_writes", COUNTER, "Cache manager writes by operation")
+            .add({"operation": "set"}, metrics.sets)
+            .add({"operation": "delete"}, metrics.deletes),
+            MetricFamily("cache_errors", COUNTER, "Cache manager operation errors")
+            .add({}, metrics.errors),
+            MetricFamily("cache_local_entries", GAUGE, "Entries in the local fallback cache")
+            .add({}, len(self.local_cache)),
+            MetricFamily("cache_redis_memory_bytes", GAUGE, "Redis used_memory at the last get_metrics()", "bytes")
+            .add({}, metrics.memory_usage),
+        ]
+    
     def _build_key(self, key: str) -> str:
         """Build full cache key with prefix"""
         return f"{self.config.key_prefix}{key}"
@@ -435,6 +466,9 @@ class CacheManager:
     
     def _update_performance_stats(self, operation: str, duration: float, success: bool):
         """Update performance statistics"""
+        self.operation_seconds.labels(operation, "true" if success else "false").record(duration)
+        if operation == "get":
+            current_span().set_attribute("cache.hit", success)
         self.performance_stats["cache_operations"].append({
             "operation": operation,
             "duration": duration,
@@ -470,9 +504,13 @@ class CacheManager:
 class QueryOptimizer:
     """Query optimization and result caching"""
     
-    def __init__(self, cache_manager: CacheManager):
+    def __init__(self, cache_manager: CacheManager, rewriter=None):
         self.cache_manager = cache_manager
         self.query_stats = {}
+        if rewriter is None:
+            from ..query.rewriter import QueryRewriter
+            rewriter = QueryRewriter()
+        self.rewriter = rewriter
         
     async def optimize_query(self, query: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
         """Optimize query and return cache key"""
@@ -551,33 +589,20 @@ class QueryOptimizer:
     
     async def _apply_optimizations(self, query: Dict[str, Any]) -> Dict[str, Any]:
         """Apply query optimizations"""
-        optimized = query.copy()
-        
-        # Optimize Elasticsearch queries
-        if "query" in optimized and "bool" in optimized["query"]:
-            bool_query = optimized["query"]["bool"]
-            
-            # Move range queries to filter context for better caching
-            if "must" in bool_query:
-                must_queries = bool_query["must"]
-                filter_queries = bool_query.get("filter", [])
-                
-                new_must = []
-                for q in must_queries:
-                    if "range" in q or "term" in q:
-                        filter_queries.append(q)
-                    else:
-                        new_must.append(q)
-                
-                bool_query["must"] = new_must
-                bool_query["filter"] = filter_queries
+        metadata = query.get("_metadata", {})
+        optimized, report = self.rewriter.rewrite(
+            query,
+            intent=metadata.get("query_type"),
+            view=metadata.get("view", "event_list")
+        )
+        optimized = dict(optimized)
         
         # Add query optimization hints
-        if "_metadata" not in optimized:
-            optimized["_metadata"] = {}
-        
+        optimized["_metadata"] = dict(optimized.get("_metadata", {}))
         optimized["_metadata"]["optimized"] = True
         optimized["_metadata"]["optimization_time"] = datetime.now().isoformat()
+        if report.rules:
+            optimized["_metadata"]["rewrite"] = report.as_dict()
         
         return optimized
 
@@ -3,26 +3,66 @@ Conversational Pipeline
 Main orchestrator that connects all NLP and SIEM components
 """
 
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator
+import asyncio
+import json
 import logging
+import os
 import time
 from datetime import datetime
 
+from .query.estimator import FETCH_SKIP, FetchPlan, get_limit_negotiator, shape_query
+from .query.plan_cache import QueryPlanCache, canonicalize
+from .stage_scheduler import DEFAULT_AI_TIMEOUT, StageScheduler
+from .monitoring.tracing import tracer
+
 logger = logging.getLogger(__name__)
 
+# Per-process NLP components for process-pool stages
+_worker_components: Dict[str, Any] = {}
+
+
+def _run_nlp_stage(stage: str, query: str) -> Any:
+    """Run an NLP stage inside a pool worker, building its components once per process"""
+    if "intent" not in _worker_components:
+        from .nlp.intent_classifier import IntentClassifier
+        from .nlp.entity_extractor import EntityExtractor
+        _worker_components["intent"] = IntentClassifier()
+        _worker_components["entities"] = EntityExtractor()
+    
+    if stage == "intent":
+        return _worker_components["intent"].classify_intent(query)
+    if stage == "entities":
+        return _worker_components["entities"].extract_entities(query)
+    return _worker_components["entities"].extract_time_range(query)
+
 class ConversationalPipeline:
     """
     Main pipeline that orchestrates the entire NLP to SIEM flow
     """
     
-    def __init__(self):
-        """Initialize the pipeline components"""
+    def __init__(self, ai_timeout: float = DEFAULT_AI_TIMEOUT):
+        """
+        Initialize the pipeline components
+        
+        Args:
+            ai_timeout: Seconds the AI stage may take (the app passes ``settings.ai_timeout``)
+        """
         self.intent_classifier = None
         self.entity_extractor = None
         self.schema_mapper = None
         self.query_builder = None
         self.query_validator = None
         self.ambiguity_resolver = None
+        self.field_requirements = None
+        self.query_rewriter = None
+        self.plan_cache = QueryPlanCache()
+        self.limit_negotiator = get_limit_negotiator()
+        self.stage_scheduler = StageScheduler(
+            max_workers=int(os.getenv("NLP_STAGE_WORKERS", "0")) or None,
+            executor=os.getenv("NLP_STAGE_EXECUTOR", "thread"),
+            ai_timeout=ai_timeout
+        )
         self.initialized = False
     
     async def initialize(self) -> None:
@@ -35,6 +75,7 @@ class ConversationalPipeline:
             from .nlp.smart_defaults import AdvancedQueryPreprocessor
             from .query.builder import QueryBuilder
             from .query.validator import QueryValidator
+            from .query.rewriter import QueryRewriter
             from .query.advanced_builder import AdvancedQueryBuilder, QueryValidator as AdvancedValidator
             from .ai.response_generator import ResponseGenerator
             
@@ -47,7 +88,12 @@ class ConversationalPipeline:
             self.advanced_query_builder = AdvancedQueryBuilder()
             self.query_validator = QueryValidator()
             self.advanced_validator = AdvancedValidator()
-            self.response_generator = ResponseGenerator()
+            self.field_requirements = self.advanced_query_builder.field_requirements
+            self.query_rewriter = QueryRewriter(
+                validator=self.query_validator,
+                field_requirements=self.field_requirements
+            )
+            self.response_generator = ResponseGenerator(ai_timeout=self.stage_scheduler.ai_timeout)
             
             self.initialized = True
             logger.info("Pipeline initialized successfully")
@@ -76,6 +122,24 @@ class ConversationalPipeline:
         Returns:
             Processed result dictionary
         """
+        with tracer.start_span("pipeline.process", {"query.length": len(query)}) as span:
+            result = await self._process(query, context, user_context, filters)
+            if span.is_recording:
+                span.set_attributes({
+                    key: result[key] for key in ("intent", "confidence", "plan_cache", "query_valid")
+                    if key in result
+                })
+                if "error" in result:
+                    span.set_status("ERROR", result["error"])
+            return result
+    
+    async def _process(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]],
+        user_context: Optional[Dict[str, Any]],
+        filters: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
         if not self.initialized:
             await self.initialize()
         
@@ -86,28 +150,55 @@ class ConversationalPipeline:
             "processing_time": 0
         }
         
+        run = self.stage_scheduler.start()
+        
         try:
+            built_at = datetime.now()
+            
+            # Steps 1-2: intent, entities and time range are independent; run them concurrently off the loop
+            intent_future = run.cpu("intent", *self._nlp_stage_call("intent", query))
+            entities_future = run.cpu("entities", *self._nlp_stage_call("entities", query))
+            time_future = run.cpu("time_range", *self._nlp_stage_call("time_range", query))
+            
             # Step 1: Intent Classification
-            intent, confidence = self.intent_classifier.classify_intent(query)
+            intent, confidence = await intent_future
             result["intent"] = intent.value if hasattr(intent, 'value') else str(intent)
             result["confidence"] = confidence
             
             # Store intent for AI suggestions
             self._last_intent = result["intent"]
             
+            # Repeat question shape: bind this question's values into the cached plan
+            canonical, plan_scope = None, None
+            if self.plan_cache is not None and not (context and context.get("history")):
+                canonical = canonicalize(query)
+                plan_scope = self._plan_scope(result["intent"], user_context)
+                cached = self.plan_cache.lookup(canonical, query, plan_scope)
+                if cached is not None:
+                    entities_future.cancel()
+                    time_future.cancel()
+                    result.update(cached)
+                    result["plan_cache"] = "hit"
+                    result["stage_timings"] = run.as_dict()
+                    result["processing_time"] = time.time() - start_time
+                    return result
+            
             # Step 2: Entity Extraction
-            raw_entities = self.entity_extractor.extract_entities(query)
+            raw_entities, time_range = await asyncio.gather(entities_future, time_future)
             # Convert Entity objects to dictionaries for consistent processing
             entities = [entity.to_dict() for entity in raw_entities]
             result["entities"] = entities
+            if time_range:
+                result["time_range"] = self._serialize_time_range(time_range)
             
             # Step 3: SMART DEFAULTS - Apply AI intelligence before clarification
-            processed_query = self.query_preprocessor.preprocess_query(
-                query=query,
-                intent=result["intent"],
-                entities=entities,
-                user_context=user_context
-            )
+            with run.inline("smart_defaults"):
+                processed_query = self.query_preprocessor.preprocess_query(
+                    query=query,
+                    intent=result["intent"],
+                    entities=entities,
+                    user_context=user_context
+                )
             
             # Update result with AI enhancements
             result["processed_query"] = processed_query["processed_query"]
@@ -119,6 +210,7 @@ class ConversationalPipeline:
                 clarifications = await self._get_clarifications(query, entities)
                 result["needs_clarification"] = True
                 result["clarifications"] = clarifications
+                result["stage_timings"] = run.as_dict()
                 return result
             
             # Step 5: Apply context if available
@@ -132,26 +224,41 @@ class ConversationalPipeline:
                 for field in result["ai_enhancements"]["suggested_fields"]:
                     enhanced_entities.append({"type": field, "value": "*", "confidence": 0.5})
             
-            field_mappings = await self.schema_mapper.map_entities(enhanced_entities)
+            with run.inline("schema_mapping"):
+                field_mappings = await self.schema_mapper.map_entities(enhanced_entities)
             result["field_mappings"] = field_mappings
             
             # Step 7: Build query (with AI enhancements)
-            siem_query = await self.build_query(
-                intent=result["intent"],
-                entities=enhanced_entities,
-                field_mappings=field_mappings,
-                context=context,
-                ai_enhancements=result["ai_enhancements"]  # Pass AI enhancements to query builder
-            )
+            with run.inline("query_build"):
+                siem_query = await self.build_query(
+                    intent=result["intent"],
+                    entities=enhanced_entities,
+                    field_mappings=field_mappings,
+                    context=context,
+                    ai_enhancements=result["ai_enhancements"]  # Pass AI enhancements to query builder
+                )
+            
+            # Step 7b: Cost-based rewrite (filter context, exact terms, bounded time range)
+            if self.query_rewriter:
+                with run.inline("rewrite"):
+                    siem_query, rewrite_report = self.query_rewriter.rewrite(siem_query, result["intent"])
+                if rewrite_report.rules:
+                    result["query_cost"] = rewrite_report.as_dict()
             result["siem_query"] = siem_query
             
             # Step 8: Validate query
-            is_valid, validation_error = await self.validate_query(siem_query)
+            with run.inline("validation"):
+                is_valid, validation_error = await self.validate_query(siem_query)
             result["query_valid"] = is_valid
             if not is_valid:
                 result["validation_error"] = validation_error
             
+            if canonical is not None and is_valid:
+                stored = self.plan_cache.store(canonical, query, result, built_at, plan_scope)
+                result["plan_cache"] = "miss" if stored else "uncacheable"
+            
             # Calculate processing time
+            result["stage_timings"] = run.as_dict()
             result["processing_time"] = time.time() - start_time
             
             return result
@@ -159,9 +266,35 @@ class ConversationalPipeline:
         except Exception as e:
             logger.error(f"Pipeline processing error: {e}")
             result["error"] = str(e)
+            result["stage_timings"] = run.as_dict()
             result["processing_time"] = time.time() - start_time
             return result
     
+    def _nlp_stage_call(self, stage: str, query: str) -> Tuple[Any, ...]:
+        """Callable and arguments for an NLP stage on the scheduler's pool"""
+        if self.stage_scheduler.executor_kind == "process":
+            # Bound methods would pickle the whole component per call; workers keep their own
+            return (_run_nlp_stage, stage, query)
+        if stage == "intent":
+            return (self.intent_classifier.classify_intent, query)
+        if stage == "entities":
+            return (self.entity_extractor.extract_entities, query)
+        return (self.entity_extractor.extract_time_range, query)
+    
+    @staticmethod
+    def _serialize_time_range(time_range: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in time_range.items()
+        }
+    
+    @staticmethod
+    def _plan_scope(intent: str, user_context: Optional[Dict[str, Any]]) -> str:
+        """Plan cache partition: same shape only reuses plans for the same intent and user context"""
+        if not user_context:
+            return intent
+        return f"{intent}|{json.dumps(user_context, sort_keys=True, default=str)}"
+    
     async def build_query(
         self,
         intent: str,
@@ -184,24 +317,44 @@ class ConversationalPipeline:
         """
         # Use advanced query builder if available
         if hasattr(self, 'advanced_query_builder') and self.advanced_query_builder:
-            return self.advanced_query_builder.build_query(
+            query = self.advanced_query_builder.build_query(
+                intent=intent,
+                entities=entities,
+                field_mappings=field_mappings,
+                context=context
+            )
+        else:
+            # Fallback to basic query builder
+            if not self.query_builder:
+                from .query.builder import QueryBuilder
+                self.query_builder = QueryBuilder()
+            
+            query = await self.query_builder.build(
                 intent=intent,
                 entities=entities,
                 field_mappings=field_mappings,
                 context=context
             )
         
-        # Fallback to basic query builder
-        if not self.query_builder:
-            from .query.builder import QueryBuilder
-            self.query_builder = QueryBuilder()
+        return self._apply_projection(query, intent, field_mappings)
+    
+    def _apply_projection(
+        self,
+        query: Dict[str, Any],
+        intent: str,
+        field_mappings: Optional[Dict[str, List[str]]]
+    ) -> Dict[str, Any]:
+        """Limit returned fields to those the result formatters read"""
+        if not self.field_requirements or not isinstance(query, dict):
+            return query
         
-        return await self.query_builder.build(
+        from .query.projection import apply_source_filter
+        fields = self.field_requirements.fields_for(
             intent=intent,
-            entities=entities,
-            field_mappings=field_mappings,
-            context=context
+            view="event_list",
+            field_mappings=field_mappings
         )
+        return apply_source_filter(query, fields)
     
     async def validate_query(
         self,
@@ -227,6 +380,43 @@ class ConversationalPipeline:
         
         return await self.query_validator.validate(query)
     
+    async def fetch_results(
+        self,
+        connector: Any,
+        query: Dict[str, Any],
+        size: Optional[int] = None,
+        group_by: Optional[List[str]] = None,
+        summarize: bool = False
+    ) -> Tuple[Any, FetchPlan]:
+        """
+        Execute a validated query with a negotiated fetch plan
+        
+        The source is asked for its result size first. Event lists (chat, /query,
+        streams) always run as plain ``size=N``; callers that ``summarize`` (reports,
+        dashboards) may instead get a uniform sample to scale counts from, or
+        aggregations only, for oversized results.
+        
+        Args:
+            connector: SIEM connector exposing ``execute_query``
+            query: Validated SIEM query
+            size: Results the caller asked for (None = as many as the budget allows)
+            group_by: Facets to bucket on if the plan turns aggregation-only
+            summarize: Caller reads ``aggregations`` and scales counts with ``plan.scale``
+            
+        Returns:
+            Tuple of (raw connector results, fetch plan)
+        """
+        plan = await self.limit_negotiator.negotiate(
+            connector, query, size, group_by=group_by,
+            key=(id(connector), json.dumps(query, sort_keys=True, default=str)),
+            allow_aggregation=summarize, sampling=summarize
+        )
+        if plan.mode == FETCH_SKIP:
+            return {"hits": {"total": {"value": 0, "relation": "eq"}, "hits": []}}, plan
+        
+        results = await connector.execute_query(query=shape_query(query, plan, group_by), size=plan.limit)
+        return results, plan
+    
     async def format_results(
         self,
         results: Dict[str, Any],
@@ -557,6 +747,7 @@ class ConversationalPipeline:
     
     async def cleanup(self) -> None:
         """Cleanup pipeline resources"""
+        self.stage_scheduler.shutdown()
         self.initialized = False
         logger.info("Pipeline cleaned up")
     
@@ -694,6 +885,22 @@ class ConversationalPipeline:
             logger.error(f"Failed to generate summary: {e}")
             return f"Found {len(results)} results for your query."
     
+    async def stream_summary(
+        self,
+        results: List[Dict[str, Any]],
+        query: str,
+        intent: str
+    ) -> AsyncIterator[str]:
+        """Yield the summary in chunks as the response generator produces them"""
+        if getattr(self, 'response_generator', None):
+            async for chunk in self.response_generator.stream_summary(results=results, query=query, intent=intent):
+                yield chunk
+            return
+        
+        from .ai.response_generator import chunk_text
+        for chunk in chunk_text(await self.generate_summary(results=results, query=query, intent=intent)):
+            yield chunk
+    
     async def create_visualizations(
         self,
         data: List[Dict[str, Any]],
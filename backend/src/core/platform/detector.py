@@ -7,7 +7,8 @@ NO FALLBACKS, NO STATIC VALUES - ALL DYNAMIC DETECTION.
 import asyncio
 import logging
 import platform
-from typing import Dict, List, Any, Optional, Set
+import weakref
+from typing import Dict, List, Any, Optional, Set, Callable
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
@@ -15,6 +16,31 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# Callbacks told about newly discovered or changed semantic -> field mappings
+_field_mapping_listeners: List[Any] = []
+
+
+def add_field_mapping_listener(callback: Callable[[Dict[str, str]], None]) -> None:
+    """
+    Subscribe to field mappings discovered by any RobustPlatformDetector
+
+    Bound methods are held weakly so subscribing does not keep their owner alive.
+    """
+    ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+    _field_mapping_listeners.append(ref)
+
+
+def _notify_field_mapping_listeners(changes: Dict[str, str]) -> None:
+    for ref in list(_field_mapping_listeners):
+        callback = ref()
+        if callback is None:
+            _field_mapping_listeners.remove(ref)
+            continue
+        try:
+            callback(changes)
+        except Exception as e:
+            logger.warning(f"⚠️ Field mapping listener failed: {e}")
+
 
 class PlatformType(Enum):
     """Detected platform types"""
@@ -57,6 +83,7 @@ class RobustPlatformDetector:
         self.platform_info: Optional[PlatformInfo] = None
         self.detection_cache: Dict[str, Any] = {}
         self.last_detection = None
+        self._announced_mappings: Dict[str, str] = {}
         
         # Detection patterns - NO static values, all dynamic
         self.platform_indicators = {
@@ -105,6 +132,7 @@ class RobustPlatformDetector:
         
         # Step 5: Generate dynamic field mappings
         field_mappings = await self._generate_field_mappings(available_indices, platform_type)
+        self._announce_field_mappings(field_mappings)
         
         # Step 6: Detect capabilities
         capabilities = await self._detect_capabilities(available_indices, platform_type)
@@ -134,6 +162,16 @@ class RobustPlatformDetector:
         
         return self.platform_info
     
+    def _announce_field_mappings(self, field_mappings: Dict[str, str]) -> None:
+        """Push only new or changed mappings to subscribed schema mappers"""
+        changes = {
+            semantic: field for semantic, field in field_mappings.items()
+            if self._announced_mappings.get(semantic) != field
+        }
+        if changes:
+            self._announced_mappings.update(changes)
+            _notify_field_mapping_listeners(changes)
+    
     async def _detect_indices(self) -> List[str]:
         """Dynamically detect all available Elasticsearch indices"""
         if not self.es_client:
@@ -4,12 +4,20 @@ Generates complex queries with optimized performance and security validation
 """
 
 from typing import Dict, List, Any, Optional, Tuple, Union
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 from dataclasses import dataclass
 from enum import Enum
 import json
 
+from .codegen import get_translation_cache
+from .ir import (
+    QueryIR, IRBuilder, Predicate, Aggregation, SortKey, TimeRange,
+    aggregation, match, optimize, prefix, range_, term, wildcard
+)
+from .projection import FieldRequirements
+from ..nlp.time_parser import parse_time_expression
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,6 +41,18 @@ class SIEMPlatform(Enum):
     GENERIC = "generic"
 
 
+# Code generator used for each platform (Wazuh runs on Elasticsearch)
+PLATFORM_CODEGENS = {
+    SIEMPlatform.ELASTICSEARCH: "elasticsearch",
+    SIEMPlatform.WAZUH: "elasticsearch",
+    SIEMPlatform.SPLUNK: "spl",
+    SIEMPlatform.QRADAR: "aql",
+    SIEMPlatform.SENTINEL: "kql",
+}
+
+GENERIC_OPERATORS = {"eq": "term", "in": "terms"}
+
+
 @dataclass
 class QueryComponent:
     """Individual query component"""
@@ -67,6 +87,8 @@ class AdvancedQueryBuilder:
         self.field_mappings = self._load_field_mappings()
         self.query_templates = self._load_query_templates()
         self.security_rules = self._load_security_rules()
+        self.field_requirements = FieldRequirements()
+        self._last_query_type = QueryType.SIMPLE_SEARCH
         
     def build_query(
         self,
@@ -90,56 +112,87 @@ class AdvancedQueryBuilder:
             Complete SIEM query dictionary
         """
         try:
-            # Initialize query context
-            if not query_context:
-                query_context = QueryContext()
-                
-            # Determine query type
-            query_type = self._determine_query_type(intent, entities)
+            ir = self.build_ir(intent, entities, field_mappings, context, query_context)
             
-            # Build base query components
-            components = self._build_query_components(entities, field_mappings)
-            
-            # Apply time range filters
-            time_components = self._build_time_filters(entities, context)
-            if time_components:
-                components.extend(time_components)
-                
-            # Build platform-specific query
-            if self.platform == SIEMPlatform.ELASTICSEARCH:
-                query = self._build_elasticsearch_query(components, query_type, query_context)
-            elif self.platform == SIEMPlatform.SPLUNK:
-                query = self._build_splunk_query(components, query_type, query_context)
-            elif self.platform == SIEMPlatform.QRADAR:
-                query = self._build_qradar_query(components, query_type, query_context)
-            elif self.platform == SIEMPlatform.SENTINEL:
-                query = self._build_sentinel_query(components, query_type, query_context)
-            elif self.platform == SIEMPlatform.WAZUH:
-                query = self._build_wazuh_query(components, query_type, query_context)
+            # Lower for the configured platform; translations are cached per IR
+            if self.platform == SIEMPlatform.GENERIC:
+                query = self._build_generic_query(ir)
             else:
-                query = self._build_generic_query(components, query_type, query_context)
-                
-            # Apply query optimization
-            query = self._optimize_query(query, query_type)
+                query = get_translation_cache().lower(ir, PLATFORM_CODEGENS[self.platform])
             
             # Store metadata separately (don't add to query DSL as it breaks Elasticsearch)
             # Metadata will be added to response later by the connector
             self._last_query_metadata = {
                 "intent": intent,
-                "query_type": query_type.value,
+                "query_type": self._last_query_type.value,
                 "platform": self.platform.value,
                 "generated_at": datetime.now().isoformat(),
                 "entities_count": len(entities),
-                "components_count": len(components)
+                "components_count": len(ir.predicates()) + (1 if ir.time_range else 0),
+                "ir_fingerprint": ir.fingerprint
             }
             
-            logger.info(f"Built {query_type.value} query for {self.platform.value}")
+            logger.info(f"Built {self._last_query_type.value} query for {self.platform.value}")
             return query
             
         except Exception as e:
             logger.error(f"Error building query: {e}")
             return self._build_fallback_query(intent, entities)
     
+    def build_ir(
+        self,
+        intent: str,
+        entities: List[Dict[str, Any]],
+        field_mappings: Dict[str, List[str]],
+        context: Optional[Dict[str, Any]] = None,
+        query_context: Optional[QueryContext] = None
+    ) -> QueryIR:
+        """
+        Build and optimize the backend-neutral query for this request
+        
+        The result can be lowered for any backend with ``core.query.codegen``,
+        so multi-source fan-out plans once instead of once per platform.
+        """
+        # Initialize query context
+        if not query_context:
+            query_context = QueryContext()
+            
+        # Determine query type
+        query_type = self._determine_query_type(intent, entities)
+        self._last_query_type = query_type
+        
+        query = IRBuilder(size=query_context.size_limit)
+        
+        # Build base query components
+        for component in self._build_query_components(entities, field_mappings):
+            node = self._component_node(component)
+            if component.logic == "AND":
+                # Exact and range matches don't need scoring: filter context is cacheable
+                query.add("filter" if component.operator in ("term", "range") else "must", node)
+            elif component.logic == "OR":
+                query.should.append(node)
+            elif component.logic == "NOT":
+                query.must_not.append(node)
+        
+        # Apply time range
+        query.time_range = self._build_time_filters(entities, context)
+        
+        # Add aggregations for statistical queries
+        if query_type in [QueryType.AGGREGATION, QueryType.STATISTICAL, QueryType.TIME_SERIES]:
+            query.aggregations.extend(self._build_aggregations(query_type))
+        
+        # Add sorting
+        query.sort.extend([SortKey("@timestamp", "desc"), SortKey("_score")])
+        
+        # Only ship the columns the response formatter and visualizations read
+        fields = self.field_requirements.fields_for(
+            intent=intent, platform=self.platform.value, field_mappings=field_mappings
+        )
+        if fields:
+            query.fields = list(fields)
+        
+        return optimize(query.build())
+    
     def _determine_query_type(self, intent: str, entities: List[Dict[str, Any]]) -> QueryType:
         """Determine the optimal query type based on intent and entities"""
         
@@ -233,316 +286,71 @@ class AdvancedQueryBuilder:
         self, 
         entities: List[Dict[str, Any]], 
         context: Optional[Dict[str, Any]] = None
-    ) -> List[QueryComponent]:
-        """Build time-based filter components"""
-        components = []
-        
+    ) -> TimeRange:
+        """Build the time window, kept as date math so repeated questions share a translation"""
         # Look for time range entities
-        time_entities = [e for e in entities if e.get("type") == "time_range"]
-        
-        if time_entities:
-            for time_entity in time_entities:
-                # Parse time range from entity value
-                time_range = self._parse_time_range(time_entity.get("value"))
-                if time_range:
-                    component = QueryComponent(
-                        field="@timestamp",
-                        operator="range",
-                        value={
-                            "gte": time_range["start"].isoformat(),
-                            "lte": time_range["end"].isoformat()
-                        }
-                    )
-                    components.append(component)
-        
-        # Default time range if none specified
-        elif not time_entities:
-            # Default to last 24 hours
-            now = datetime.now()
-            start_time = now - timedelta(days=1)
-            
-            component = QueryComponent(
-                field="@timestamp",
-                operator="range",
-                value={
-                    "gte": start_time.isoformat(),
-                    "lte": now.isoformat()
-                }
-            )
-            components.append(component)
-        
-        return components
-    
-    def _build_elasticsearch_query(
-        self, 
-        components: List[QueryComponent], 
-        query_type: QueryType, 
-        context: QueryContext
-    ) -> Dict[str, Any]:
-        """Build Elasticsearch-specific query"""
-        
-        query = {
-            "query": {
-                "bool": {
-                    "must": [],
-                    "filter": [],
-                    "should": [],
-                    "must_not": []
-                }
-            },
-            "size": context.size_limit,
-            "_source": ["@timestamp", "message", "host.name", "event.*", "user.*", "source.*"]
-        }
-        
-        # Build bool query clauses
-        for component in components:
-            clause = self._build_elasticsearch_clause(component)
-            
-            if component.logic == "AND":
-                if component.operator == "range" or component.field == "@timestamp":
-                    query["query"]["bool"]["filter"].append(clause)
-                else:
-                    query["query"]["bool"]["must"].append(clause)
-            elif component.logic == "OR":
-                query["query"]["bool"]["should"].append(clause)
-            elif component.logic == "NOT":
-                query["query"]["bool"]["must_not"].append(clause)
-        
-        # Add aggregations for statistical queries
-        if query_type in [QueryType.AGGREGATION, QueryType.STATISTICAL, QueryType.TIME_SERIES]:
-            query["aggs"] = self._build_elasticsearch_aggregations(query_type, components)
-        
-        # Add sorting
-        query["sort"] = [
-            {"@timestamp": {"order": "desc"}},
-            "_score"
-        ]
-        
-        return query
+        for time_entity in (e for e in entities if e.get("type") == "time_range"):
+            # Parse time range from entity value
+            time_range = self._parse_time_range(str(time_entity.get("value", "")))
+            if time_range:
+                return TimeRange(start=time_range["start"], end=time_range["end"])
+        
+        # Default to last 24 hours
+        return TimeRange(start="now-24h", end="now")
     
-    def _build_elasticsearch_clause(self, component: QueryComponent) -> Dict[str, Any]:
-        """Build individual Elasticsearch query clause"""
-        
+    def _component_node(self, component: QueryComponent) -> Predicate:
+        """Translate a query component into an IR predicate"""
         if component.operator == "term":
-            return {"term": {component.field + ".keyword": {"value": component.value, "boost": component.boost}}}
-        elif component.operator == "match":
-            return {"match": {component.field: {"query": component.value, "boost": component.boost}}}
+            return term(component.field, component.value, boost=component.boost, keyword=True)
         elif component.operator == "wildcard":
-            return {"wildcard": {component.field + ".keyword": {"value": component.value, "boost": component.boost}}}
-        elif component.operator == "range":
-            return {"range": {component.field: component.value}}
+            return wildcard(component.field, component.value, boost=component.boost, keyword=True)
         elif component.operator == "prefix":
-            return {"prefix": {component.field + ".keyword": {"value": component.value, "boost": component.boost}}}
+            return prefix(component.field, component.value, boost=component.boost, keyword=True)
+        elif component.operator == "range":
+            return range_(component.field, **component.value)
         else:
-            return {"match": {component.field: {"query": component.value, "boost": component.boost}}}
+            return match(component.field, component.value, boost=component.boost)
     
-    def _build_elasticsearch_aggregations(self, query_type: QueryType, components: List[QueryComponent]) -> Dict[str, Any]:
-        """Build Elasticsearch aggregations"""
-        aggs = {}
-        
+    def _build_aggregations(self, query_type: QueryType) -> List[Aggregation]:
+        """Build aggregations for the query type"""
         if query_type == QueryType.TIME_SERIES:
-            aggs["events_over_time"] = {
-                "date_histogram": {
-                    "field": "@timestamp",
-                    "interval": "1h",
-                    "min_doc_count": 0
-                }
-            }
+            return [aggregation("events_over_time", "date_histogram", "@timestamp", interval="1h", min_doc_count=0)]
         
         elif query_type == QueryType.AGGREGATION:
-            # Top users aggregation
-            aggs["top_users"] = {
-                "terms": {
-                    "field": "user.name.keyword",
-                    "size": 10
-                }
-            }
-            
-            # Top source IPs
-            aggs["top_source_ips"] = {
-                "terms": {
-                    "field": "source.ip.keyword",
-                    "size": 10
-                }
-            }
+            # Top users and source IPs
+            return [
+                aggregation("top_users", "terms", "user.name.keyword", size=10),
+                aggregation("top_source_ips", "terms", "source.ip.keyword", size=10)
+            ]
         
         elif query_type == QueryType.STATISTICAL:
-            aggs["event_stats"] = {
-                "stats": {
-                    "field": "event.severity"
-                }
-            }
-            
-            aggs["event_count_by_severity"] = {
-                "terms": {
-                    "field": "event.severity.keyword",
-                    "size": 10
-                }
-            }
-        
-        return aggs
-    
-    def _build_splunk_query(
-        self, 
-        components: List[QueryComponent], 
-        query_type: QueryType, 
-        context: QueryContext
-    ) -> Dict[str, Any]:
-        """Build Splunk-specific query"""
-        
-        # Build base search
-        search_parts = ["search"]
-        
-        for component in components:
-            if component.field == "@timestamp":
-                # Handle time range specially in Splunk
-                continue
-            
-            if component.operator == "term":
-                search_parts.append(f'{component.field}="{component.value}"')
-            elif component.operator == "match":
-                search_parts.append(f'{component.field}=*{component.value}*')
-            elif component.operator == "wildcard":
-                search_parts.append(f'{component.field}={component.value}')
-            else:
-                search_parts.append(f'{component.field}="{component.value}"')
-        
-        query = {
-            "search": " ".join(search_parts),
-            "earliest_time": "-24h",
-            "latest_time": "now",
-            "count": context.size_limit
-        }
-        
-        # Add statistical commands for aggregations
-        if query_type in [QueryType.AGGREGATION, QueryType.STATISTICAL]:
-            query["search"] += " | stats count by user, source_ip"
-        elif query_type == QueryType.TIME_SERIES:
-            query["search"] += " | timechart count by severity"
-        
-        return query
-    
-    def _build_qradar_query(
-        self, 
-        components: List[QueryComponent], 
-        query_type: QueryType, 
-        context: QueryContext
-    ) -> Dict[str, Any]:
-        """Build IBM QRadar AQL query"""
-        
-        fields = ["QIDNAME(qid)", "LOGSOURCENAME(logsourceid)", "sourceip", "destinationip", "username"]
-        conditions = []
-        
-        for component in components:
-            if component.operator == "term":
-                conditions.append(f"{component.field} = '{component.value}'")
-            elif component.operator == "match":
-                conditions.append(f"{component.field} ILIKE '%{component.value}%'")
-            elif component.operator == "range":
-                if component.field == "@timestamp":
-                    # QRadar uses START/STOP time
-                    continue
-        
-        where_clause = " AND ".join(conditions) if conditions else "1=1"
-        
-        query = {
-            "query_expression": f"SELECT {', '.join(fields)} FROM events WHERE {where_clause}",
-            "range": "LAST 24 HOURS"
-        }
-        
-        return query
-    
-    def _build_sentinel_query(
-        self, 
-        components: List[QueryComponent], 
-        query_type: QueryType, 
-        context: QueryContext
-    ) -> Dict[str, Any]:
-        """Build Azure Sentinel KQL query"""
-        
-        table = "SecurityEvent"  # Default table
-        filters = []
-        
-        for component in components:
-            if component.operator == "term":
-                filters.append(f'{component.field} == "{component.value}"')
-            elif component.operator == "match":
-                filters.append(f'{component.field} contains "{component.value}"')
-            elif component.operator == "range":
-                if component.field == "@timestamp":
-                    filters.append(f'TimeGenerated between (ago(24h) .. now())')
-        
-        where_clause = " and ".join(filters) if filters else ""
-        
-        query = {
-            "query": f"{table} | where {where_clause} | limit {context.size_limit}",
-            "timespan": "P1D"  # Last 1 day
-        }
+            return [
+                aggregation("event_stats", "stats", "event.severity"),
+                aggregation("event_count_by_severity", "terms", "event.severity.keyword", size=10)
+            ]
         
-        # Add aggregations for statistical queries
-        if query_type in [QueryType.AGGREGATION, QueryType.STATISTICAL]:
-            query["query"] += " | summarize count() by Account, IpAddress"
-        
-        return query
-    
-    def _build_wazuh_query(
-        self, 
-        components: List[QueryComponent], 
-        query_type: QueryType, 
-        context: QueryContext
-    ) -> Dict[str, Any]:
-        """Build Wazuh-specific query (Elasticsearch-based)"""
-        # Wazuh uses Elasticsearch backend, so reuse ES query building
-        return self._build_elasticsearch_query(components, query_type, context)
+        return []
     
-    def _build_generic_query(
-        self, 
-        components: List[QueryComponent], 
-        query_type: QueryType, 
-        context: QueryContext
-    ) -> Dict[str, Any]:
+    def _build_generic_query(self, ir: QueryIR) -> Dict[str, Any]:
         """Build generic query structure"""
         
         query = {
             "type": "generic",
             "conditions": [],
-            "limit": context.size_limit,
-            "time_range": "24h"
+            "limit": ir.size,
+            "time_range": f"{ir.time_range.seconds // 3600}h" if ir.time_range and ir.time_range.seconds else "24h"
         }
         
-        for component in components:
-            condition = {
-                "field": component.field,
-                "operator": component.operator,
-                "value": component.value,
-                "logic": component.logic
-            }
-            query["conditions"].append(condition)
-        
-        return query
-    
-    def _optimize_query(self, query: Dict[str, Any], query_type: QueryType) -> Dict[str, Any]:
-        """Apply query optimizations"""
-        
-        # Add performance hints for Elasticsearch
-        if self.platform == SIEMPlatform.ELASTICSEARCH:
-            # Prefer filter context over query context for exact matches
-            if "query" in query and "bool" in query["query"]:
-                bool_query = query["query"]["bool"]
-                
-                # Move term queries to filter context
-                must_queries = bool_query.get("must", [])
-                filter_queries = bool_query.get("filter", [])
-                
-                optimized_must = []
-                for q in must_queries:
-                    if "term" in q or "range" in q:
-                        filter_queries.append(q)
-                    else:
-                        optimized_must.append(q)
-                
-                bool_query["must"] = optimized_must
-                bool_query["filter"] = filter_queries
+        for occur, logic in (("must", "AND"), ("filter", "AND"), ("should", "OR"), ("must_not", "NOT")):
+            for node in getattr(ir.root, occur):
+                if not isinstance(node, Predicate):
+                    continue
+                query["conditions"].append({
+                    "field": node.field,
+                    "operator": GENERIC_OPERATORS.get(node.op, node.op),
+                    "value": node.bounds if node.op == "range" else node.value,
+                    "logic": logic
+                })
         
         return query
     
@@ -574,20 +382,11 @@ class AdvancedQueryBuilder:
         
         return query
     
-    def _parse_time_range(self, time_value: str) -> Optional[Dict[str, datetime]]:
-        """Parse time range from string value"""
-        now = datetime.now()
-        
-        # Simple time range parsing
-        if "last hour" in time_value.lower():
-            return {"start": now - timedelta(hours=1), "end": now}
-        elif "last 24 hours" in time_value.lower():
-            return {"start": now - timedelta(hours=24), "end": now}
-        elif "last week" in time_value.lower():
-            return {"start": now - timedelta(weeks=1), "end": now}
-        elif "today" in time_value.lower():
-            start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            return {"start": start_of_day, "end": now}
+    def _parse_time_range(self, time_value: str) -> Optional[Dict[str, str]]:
+        """Parse time range from string value into date math bounds"""
+        expression = parse_time_expression(time_value)
+        if expression:
+            return {"start": expression.start, "end": expression.end}
         
         return None
     
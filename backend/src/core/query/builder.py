@@ -1,12 +1,19 @@
 """
 Query Builder
-Builds Elasticsearch DSL queries from NLP components
+Builds SIEM queries from NLP components via the shared query IR (lowered to Elasticsearch DSL)
 """
 
 from typing import Dict, List, Any, Optional
 import logging
 from datetime import datetime
 
+from .codegen import get_translation_cache
+from .ir import (
+    QueryIR, IRBuilder, Predicate, Aggregation, SortKey, TimeRange,
+    aggregation, any_of, exists, match, optimize, range_
+)
+from ..nlp.time_parser import parse_time_expression
+
 logger = logging.getLogger(__name__)
 
 class QueryBuilder:
@@ -70,19 +77,19 @@ class QueryBuilder:
         Returns:
             SIEM query dictionary
         """
-        # Start with base query structure
-        query = {
-            "query": {
-                "bool": {
-                    "must": [],
-                    "filter": [],
-                    "should": [],
-                    "must_not": []
-                }
-            },
-            "size": 100,
-            "sort": [{"@timestamp": {"order": "desc"}}]
-        }
+        ir = self.build_ir(intent, entities, field_mappings, context)
+        return get_translation_cache().lower(ir, "elasticsearch")
+    
+    def build_ir(
+        self,
+        intent: str,
+        entities: List[Dict[str, Any]],
+        field_mappings: Dict[str, List[str]],
+        context: Optional[Dict[str, Any]] = None
+    ) -> QueryIR:
+        """Build the backend-neutral query once; lower it with ``core.query.codegen``"""
+        query = IRBuilder(size=100)
+        query.sort.append(SortKey("@timestamp", "desc"))
         
         # Add intent-based clauses
         self._add_intent_clauses(query, intent)
@@ -93,62 +100,60 @@ class QueryBuilder:
         # Add time range
         time_range = self._extract_time_range(entities)
         if time_range:
-            query["query"]["bool"]["filter"].append({
-                "range": {
-                    "@timestamp": time_range
-                }
-            })
+            query.time_range = TimeRange(
+                start=time_range.get("gte", time_range.get("gt")),
+                end=time_range.get("lte", time_range.get("lt"))
+            )
+        self._apply_hour_restriction(query, entities)
         
         # Add context filters if available
         if context and context.get("filters"):
             self._apply_context_filters(query, context["filters"])
         
-        # Clean up empty clauses
-        query = self._clean_query(query)
-        
         # Add aggregations if needed
         if self._should_aggregate(intent):
-            query["aggs"] = self._build_aggregations(intent, entities)
+            query.aggregations.extend(self._build_aggregations(intent, entities))
         
-        return query
+        # Empty clauses are dropped (match_all fallback) when lowering
+        return optimize(query.build())
     
-    def _add_intent_clauses(self, query: Dict, intent: str) -> None:
+    def _add_intent_clauses(self, query: IRBuilder, intent: str) -> None:
         """Add clauses based on intent"""
         intent_mappings = {
             "failed_login": [
-                {"match": {"event.action": "authentication_failure"}},
-                {"match": {"event.outcome": "failure"}}
+                match("event.action", "authentication_failure"),
+                match("event.outcome", "failure")
             ],
             "successful_login": [
-                {"match": {"event.action": "authentication_success"}},
-                {"match": {"event.outcome": "success"}}
+                match("event.action", "authentication_success"),
+                match("event.outcome", "success")
             ],
             "malware": [
-                {"match": {"event.category": "malware"}}
+                match("event.category", "malware")
             ],
             "threat": [
-                {"exists": {"field": "threat.indicator"}}
+                exists("threat.indicator")
             ],
             "network": [
-                {"match": {"event.category": "network"}}
+                match("event.category", "network")
             ],
             "vpn": [
-                {"match": {"service.name": "vpn"}}
+                match("service.name", "vpn")
             ],
             "anomaly": [
-                {"match": {"event.action": "anomaly"}}
+                match("event.action", "anomaly")
             ]
         }
         
         # Find matching intent
         for key, clauses in intent_mappings.items():
             if key in intent.lower():
-                query["query"]["bool"]["must"].extend(clauses)
+                query.must.extend(clauses)
                 break
     
     def _add_entity_clauses(
         self,
-        query: Dict,
+        query: IRBuilder,
         entities: List[Dict[str, Any]],
         field_mappings: Dict[str, List[str]]
     ) -> None:
@@ -170,35 +175,18 @@ class QueryBuilder:
                 
                 if len(fields) == 1:
                     # Single field match
-                    field = fields[0]
-                    if ":" in field:
-                        # Field has value specified
-                        field_name, field_value = field.split(":", 1)
-                        query["query"]["bool"]["must"].append({
-                            "match": {field_name: field_value}
-                        })
-                    else:
-                        # Use entity value
-                        query["query"]["bool"]["must"].append({
-                            "match": {field: entity_value}
-                        })
+                    query.must.append(self._field_clause(fields[0], entity_value))
                 elif len(fields) > 1:
-                    # Multiple fields - use should clause
-                    should_clauses = []
-                    for field in fields:
-                        if ":" in field:
-                            field_name, field_value = field.split(":", 1)
-                            should_clauses.append({
-                                "match": {field_name: field_value}
-                            })
-                        else:
-                            should_clauses.append({
-                                "match": {field: entity_value}
-                            })
-                    
-                    query["query"]["bool"]["must"].append({
-                        "bool": {"should": should_clauses, "minimum_should_match": 1}
-                    })
+                    # Multiple fields - any of them may match
+                    query.must.append(any_of(*(self._field_clause(field, entity_value) for field in fields)))
+    
+    @staticmethod
+    def _field_clause(field: str, entity_value: Any) -> Predicate:
+        """Match clause for a mapped field; ``field:value`` mappings carry their own value"""
+        if ":" in field:
+            field_name, field_value = field.split(":", 1)
+            return match(field_name, field_value)
+        return match(field, entity_value)
     
     def _extract_time_range(self, entities: List[Dict[str, Any]]) -> Optional[Dict[str, str]]:
         """Extract time range from entities"""
@@ -216,50 +204,39 @@ class QueryBuilder:
     
     def _parse_time_string(self, time_str: str) -> Dict[str, str]:
         """Parse natural language time string"""
-        time_lower = time_str.lower()
-        
-        if "hour" in time_lower:
-            if "1" in time_lower or "one" in time_lower:
-                return {"gte": "now-1h", "lte": "now"}
-            elif "24" in time_lower:
-                return {"gte": "now-24h", "lte": "now"}
-        elif "day" in time_lower:
-            if "1" in time_lower or "one" in time_lower or "yesterday" in time_lower:
-                return {"gte": "now-1d", "lte": "now"}
-            elif "7" in time_lower or "week" in time_lower:
-                return {"gte": "now-7d", "lte": "now"}
-        elif "month" in time_lower:
-            return {"gte": "now-30d", "lte": "now"}
+        expression = parse_time_expression(time_str)
+        if expression:
+            return expression.range()
         
         # Default
         return {"gte": "now-24h", "lte": "now"}
     
-    def _apply_context_filters(self, query: Dict, filters: Dict[str, Any]) -> None:
+    def _apply_hour_restriction(self, query: IRBuilder, entities: List[Dict[str, Any]]) -> None:
+        """Business-hours / after-hours phrases become per-day windows on the timestamp"""
+        for entity in entities:
+            if entity.get("type") != "time_range" or not isinstance(entity.get("value"), str):
+                continue
+            expression = parse_time_expression(entity["value"])
+            windows = expression.hour_windows() if expression else None
+            if not windows:
+                continue
+            hours = any_of(*(
+                range_("@timestamp", gte=start.isoformat(), lt=end.isoformat())
+                for start, end in windows
+            ))
+            if expression.hours == "business":
+                query.filter.append(hours)
+            else:
+                query.must_not.append(hours)
+            return
+    
+    def _apply_context_filters(self, query: IRBuilder, filters: Dict[str, Any]) -> None:
         """Apply filters from context"""
         for field, value in filters.items():
             if field == "severity":
-                query["query"]["bool"]["filter"].append({
-                    "match": {"event.severity": value}
-                })
+                query.filter.append(match("event.severity", value))
             elif field == "host":
-                query["query"]["bool"]["filter"].append({
-                    "match": {"host.name": value}
-                })
-    
-    def _clean_query(self, query: Dict) -> Dict:
-        """Remove empty clauses from query"""
-        bool_query = query["query"]["bool"]
-        
-        # Remove empty arrays
-        for clause in ["must", "filter", "should", "must_not"]:
-            if clause in bool_query and not bool_query[clause]:
-                del bool_query[clause]
-        
-        # If no clauses, add match_all
-        if not any(bool_query.get(c) for c in ["must", "filter", "should", "must_not"]):
-            query["query"] = {"match_all": {}}
-        
-        return query
+                query.filter.append(match("host.name", value))
     
     def _should_aggregate(self, intent: str) -> bool:
         """Check if aggregations should be added"""
@@ -268,36 +245,17 @@ class QueryBuilder:
         ]
         return any(term in intent.lower() for term in aggregate_intents)
     
-    def _build_aggregations(self, intent: str, entities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _build_aggregations(self, intent: str, entities: List[Dict[str, Any]]) -> List[Aggregation]:
         """Build aggregations based on intent"""
-        aggs = {}
-        
         if "top" in intent.lower():
             # Top N aggregation
-            aggs["top_items"] = {
-                "terms": {
-                    "field": "source.ip",
-                    "size": 10
-                }
-            }
+            return [aggregation("top_items", "terms", "source.ip", size=10)]
         elif "trend" in intent.lower() or "time" in intent.lower():
             # Time series aggregation
-            aggs["time_series"] = {
-                "date_histogram": {
-                    "field": "@timestamp",
-                    "calendar_interval": "1h"
-                }
-            }
-        else:
-            # Default: count by severity
-            aggs["severity_breakdown"] = {
-                "terms": {
-                    "field": "event.severity",
-                    "size": 5
-                }
-            }
+            return [aggregation("time_series", "date_histogram", "@timestamp", calendar_interval="1h")]
         
-        return aggs
+        # Default: count by severity
+        return [aggregation("severity_breakdown", "terms", "event.severity", size=5)]
     
     def build_simple_search(self, search_string: str) -> Dict[str, Any]:
         """Build a simple text search query"""
@@ -0,0 +1,928 @@
+"""
+Query Code Generators
+Lower a QueryIR into each backend's native form (Elasticsearch DSL, SPL, AQL, KQL,
+MongoDB and an in-process dataset predicate) and cache translations per IR fingerprint.
+"""
+
+import copy
+import fnmatch
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from .ir import (
+    QueryIR, Predicate, Node, TimeRange, Aggregation,
+    DEFAULT_TIME_FIELD, parse_date_math, resolve_date_math
+)
+from .estimator import reservoir_sample
+from .projection import to_mongo_projection, project_document
+
+logger = logging.getLogger(__name__)
+
+RANGE_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+# Connector / platform names mapped onto the code generator that speaks their language
+PLATFORM_BACKENDS = {
+    "elasticsearch": "elasticsearch",
+    "wazuh": "elasticsearch",
+    "mock": "elasticsearch",
+    "opensearch": "elasticsearch",
+    "splunk": "spl",
+    "qradar": "aql",
+    "sentinel": "kql",
+    "mongodb": "mongo",
+    "dataset": "dataset",
+}
+
+
+def backend_for(platform: str) -> Optional[str]:
+    """Code generator name for a connector type, or None if it has no native lowering"""
+    return PLATFORM_BACKENDS.get((platform or "").lower())
+
+
+def _plain(field_name: str) -> str:
+    """Field name without the Elasticsearch ``.keyword`` sub-field or ``^boost`` suffix"""
+    field_name = field_name.split("^", 1)[0]
+    return field_name[: -len(".keyword")] if field_name.endswith(".keyword") else field_name
+
+
+def _text_fields(predicate: Predicate) -> List[str]:
+    """Concrete fields of a multi-field predicate (``_all`` and patterns dropped)"""
+    return [_plain(name) for name in predicate.fields if "*" not in name and name != "_all"]
+
+
+def _thaw(value: Any) -> Any:
+    return [_thaw(item) for item in value] if isinstance(value, tuple) else value
+
+
+def _options(predicate: Predicate, *skip: str) -> Dict[str, Any]:
+    return {key: _thaw(value) for key, value in predicate.options if key not in skip}
+
+
+def _strip_wildcards(value: Any) -> str:
+    return str(value).strip("*")
+
+
+def _glob_regex(pattern: Any) -> str:
+    """Anchored regular expression for a wildcard (glob) pattern"""
+    return "^" + fnmatch.translate(str(pattern)).replace("\\Z", "$")
+
+
+def _group(part: str) -> str:
+    """Parenthesize a lowered expression unless it already is one group"""
+    if " " not in part or (part.startswith("(") and part.endswith(")") and part.count("(") == 1):
+        return part
+    return f"({part})"
+
+
+def _any_of(alternatives: List[str], joiner: str) -> Optional[str]:
+    if not alternatives:
+        return None
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(" + f" {joiner} ".join(map(_group, alternatives)) + ")"
+
+
+# ----------------------------------------------------------------------------
+# Elasticsearch
+# ----------------------------------------------------------------------------
+
+class ElasticsearchCodegen:
+    """Query DSL search bodies (Elasticsearch, Wazuh, OpenSearch)"""
+
+    backend = "elasticsearch"
+
+    def lower(self, ir: QueryIR, now: Optional[datetime] = None) -> Dict[str, Any]:
+        root = self.node(ir.root)["bool"]
+        if ir.time_range:
+            root.setdefault("filter", []).append(self.time_clause(ir.time_range))
+
+        body: Dict[str, Any] = {
+            "query": {"bool": root} if root else {"match_all": {}},
+            "size": ir.size,
+        }
+        if ir.sort:
+            body["sort"] = [
+                "_score" if key.field == "_score" else {key.field: {"order": key.order}}
+                for key in ir.sort
+            ]
+        source: Dict[str, Any] = {}
+        if ir.fields and ir.size != 0:
+            source["includes"] = list(ir.fields)
+        if ir.excludes:
+            source["excludes"] = list(ir.excludes)
+        if source:
+            body["_source"] = source
+        if ir.aggregations:
+            body["aggs"] = {agg.name: self.aggregation(agg) for agg in ir.aggregations}
+        return body
+
+    def node(self, node: Node) -> Dict[str, Any]:
+        if isinstance(node, Predicate):
+            return self.predicate(node)
+        bool_query: Dict[str, Any] = {}
+        for occur in ("must", "filter", "should", "must_not"):
+            clauses = getattr(node, occur)
+            if clauses:
+                bool_query[occur] = [self.node(clause) for clause in clauses]
+        if node.minimum_should_match is not None:
+            bool_query["minimum_should_match"] = node.minimum_should_match
+        return {"bool": bool_query}
+
+    def predicate(self, p: Predicate) -> Dict[str, Any]:
+        op = p.op
+        if op in ("eq", "wildcard", "prefix"):
+            kind = {"eq": "term", "wildcard": "wildcard", "prefix": "prefix"}[op]
+            name = p.field + ".keyword" if p.option("keyword") else p.field
+            boost = p.option("boost")
+            value = _thaw(p.value)
+            return {kind: {name: {"value": value, "boost": boost} if boost is not None else value}}
+        if op == "in":
+            return {"terms": {p.field: list(p.values)}}
+        if op == "match":
+            options = _options(p)
+            return {"match": {p.field: {"query": p.value, **options} if options else p.value}}
+        if op == "phrase":
+            return {"match_phrase": {p.field: p.value}}
+        if op == "text":
+            return {"multi_match": {"query": p.value, "fields": list(p.fields), **_options(p)}}
+        if op == "exists":
+            return {"exists": {"field": p.field}}
+        if op == "range":
+            return {"range": {p.field: p.bounds}}
+        if op == "query_string":
+            body = {"query": p.value}
+            if p.fields:
+                body["fields"] = list(p.fields)
+            body.update(_options(p))
+            return {"query_string": body}
+        if op == "raw":
+            return json.loads(p.value)
+        raise ValueError(f"Unsupported predicate: {op}")
+
+    @staticmethod
+    def time_clause(time_range: TimeRange) -> Dict[str, Any]:
+        bounds = {}
+        if time_range.start is not None:
+            bounds["gte"] = time_range.start
+        if time_range.end is not None:
+            bounds["lt" if "/" in str(time_range.end) else "lte"] = time_range.end
+        return {"range": {time_range.field: bounds}}
+
+    def aggregation(self, agg: Aggregation) -> Dict[str, Any]:
+        body = {"field": agg.field} if agg.field else {}
+        body.update({key: _thaw(value) for key, value in agg.params})
+        lowered: Dict[str, Any] = {agg.kind: body}
+        if agg.children:
+            lowered["aggs"] = {child.name: self.aggregation(child) for child in agg.children}
+        return lowered
+
+
+# ----------------------------------------------------------------------------
+# Splunk SPL
+# ----------------------------------------------------------------------------
+
+def _spl_quote(value: Any) -> str:
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class SplunkCodegen:
+    """Splunk search strings with earliest/latest time modifiers"""
+
+    backend = "spl"
+    UNITS = {"s": "s", "m": "m", "h": "h", "d": "d", "w": "w", "M": "mon", "y": "y"}
+
+    def lower(self, ir: QueryIR, now: Optional[datetime] = None) -> Dict[str, Any]:
+        search = "search " + (self.node(ir.root) or "*")
+
+        metrics, by_fields, timechart = self._aggregation_parts(ir.aggregations)
+        if timechart:
+            search += f" | timechart span={timechart} {', '.join(metrics)}"
+        elif ir.aggregations:
+            search += f" | stats {', '.join(metrics)}"
+            if by_fields:
+                search += f" by {', '.join(by_fields)}"
+        elif ir.fields:
+            search += f" | fields {', '.join(_plain(name) for name in ir.fields)}"
+
+        query: Dict[str, Any] = {"search": search, "count": ir.size}
+        if ir.time_range:
+            earliest = self.time_modifier(ir.time_range.start)
+            latest = self.time_modifier(ir.time_range.end)
+            if earliest:
+                query["earliest_time"] = earliest
+            query["latest_time"] = latest or "now"
+        return query
+
+    def node(self, node: Node) -> str:
+        if isinstance(node, Predicate):
+            return self.predicate(node)
+        parts = [part for part in map(self.node, node.required) if part]
+        if node.should_required:
+            alternatives = _any_of([part for part in map(self.node, node.should) if part], "OR")
+            if alternatives:
+                parts.append(alternatives)
+        parts.extend(f"NOT {_group(part)}" for part in map(self.node, node.must_not) if part)
+        return " ".join(parts)
+
+    def predicate(self, p: Predicate) -> str:
+        name = _plain(p.field)
+        if p.op == "eq":
+            return f"{name}={_spl_quote(p.value)}"
+        if p.op == "in":
+            return "(" + " OR ".join(f"{name}={_spl_quote(value)}" for value in p.values) + ")"
+        if p.op in ("match", "phrase"):
+            return f"{name}={_spl_quote('*' + _strip_wildcards(p.value) + '*')}"
+        if p.op == "wildcard":
+            return f"{name}={_spl_quote(p.value)}"
+        if p.op == "prefix":
+            return f"{name}={_spl_quote(str(p.value) + '*')}"
+        if p.op == "exists":
+            return f"{name}=*"
+        if p.op == "range":
+            return " ".join(f"{name}{RANGE_OPERATORS[op]}{value}" for op, value in p.bounds.items()
+                            if op in RANGE_OPERATORS)
+        if p.op == "text":
+            return _spl_quote(p.value)
+        if p.op == "query_string":
+            return str(p.value)
+        logger.debug(f"SPL lowering skipped {p.op} predicate")
+        return ""
+
+    def time_modifier(self, expr: Any) -> Optional[str]:
+        if expr is None:
+            return None
+        if isinstance(expr, datetime):
+            return expr.strftime("%m/%d/%Y:%H:%M:%S")
+        parsed = parse_date_math(expr)
+        if parsed is None:
+            return str(expr)
+        amount, unit, rounding = parsed
+        modifier = f"{amount:+d}{self.UNITS[unit]}" if unit else ""
+        if rounding:
+            modifier += f"@{self.UNITS[rounding]}"
+        return modifier or "now"
+
+    def _aggregation_parts(self, aggs: Tuple[Aggregation, ...]) -> Tuple[List[str], List[str], Optional[str]]:
+        metrics, by_fields, timechart = ["count"], [], None
+        for agg in _walk_aggregations(aggs):
+            if agg.kind == "terms":
+                by_fields.append(_plain(agg.field))
+            elif agg.kind == "date_histogram":
+                timechart = agg.param("calendar_interval") or agg.param("fixed_interval") or agg.param("interval") or "1h"
+            elif agg.kind in ("avg", "sum", "min", "max"):
+                metrics.append(f"{agg.kind}({_plain(agg.field)})")
+            elif agg.kind == "stats":
+                metrics.extend(f"{fn}({_plain(agg.field)})" for fn in ("min", "max", "avg", "sum"))
+            elif agg.kind == "cardinality":
+                metrics.append(f"dc({_plain(agg.field)})")
+        return metrics, by_fields, timechart
+
+
+# ----------------------------------------------------------------------------
+# QRadar AQL
+# ----------------------------------------------------------------------------
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _like(pattern: str) -> str:
+    return _sql_literal(pattern.replace("%", "\\%").replace("*", "%").replace("?", "_"))
+
+
+class QRadarCodegen:
+    """QRadar Ariel (AQL) search expressions"""
+
+    backend = "aql"
+    DEFAULT_COLUMNS = [
+        "QIDNAME(qid)", "LOGSOURCENAME(logsourceid)", "starttime", "sourceip", "destinationip", "username"
+    ]
+    IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+    def lower(self, ir: QueryIR, now: Optional[datetime] = None) -> Dict[str, Any]:
+        group_by = [self.column(agg.field) for agg in _walk_aggregations(ir.aggregations) if agg.kind == "terms"]
+        metrics = [
+            f"{agg.kind.upper()}({self.column(agg.field)})"
+            for agg in _walk_aggregations(ir.aggregations) if agg.kind in ("avg", "sum", "min", "max")
+        ]
+        if ir.aggregations:
+            columns = group_by + metrics + ["COUNT(*) AS event_count"]
+        else:
+            columns = [self.column(name) for name in ir.fields] if ir.fields else list(self.DEFAULT_COLUMNS)
+
+        expression = f"SELECT {', '.join(columns)} FROM events"
+        where = self.node(ir.root)
+        if where:
+            expression += f" WHERE {where}"
+        if group_by:
+            expression += f" GROUP BY {', '.join(group_by)}"
+        elif not ir.aggregations:
+            expression += " ORDER BY starttime DESC"
+        expression += f" LIMIT {ir.size or 1}"
+
+        query: Dict[str, Any] = {"query_expression": expression}
+        if ir.time_range:
+            query["range"] = self.time_clause(ir.time_range, now)
+            query["query_expression"] += " " + query["range"]
+        return query
+
+    def column(self, field_name: str) -> str:
+        name = _plain(field_name)
+        return name if self.IDENTIFIER.match(name) else f'"{name}"'
+
+    def node(self, node: Node) -> str:
+        if isinstance(node, Predicate):
+            return self.predicate(node)
+        parts = [part for part in map(self.node, node.required) if part]
+        if node.should_required:
+            alternatives = _any_of([part for part in map(self.node, node.should) if part], "OR")
+            if alternatives:
+                parts.append(alternatives)
+        parts.extend(f"NOT {_group(part)}" for part in map(self.node, node.must_not) if part)
+        if len(parts) > 1:
+            return "(" + " AND ".join(parts) + ")"
+        return parts[0] if parts else ""
+
+    def predicate(self, p: Predicate) -> str:
+        column = self.column(p.field) if p.field else ""
+        if p.op == "eq":
+            return f"{column} = {_sql_literal(p.value)}"
+        if p.op == "in":
+            return f"{column} IN ({', '.join(_sql_literal(value) for value in p.values)})"
+        if p.op in ("match", "phrase"):
+            return f"{column} ILIKE {_like('*' + _strip_wildcards(p.value) + '*')}"
+        if p.op == "wildcard":
+            return f"{column} ILIKE {_like(str(p.value))}"
+        if p.op == "prefix":
+            return f"{column} ILIKE {_like(str(p.value) + '*')}"
+        if p.op == "exists":
+            return f"{column} IS NOT NULL"
+        if p.op == "range":
+            return " AND ".join(f"{column} {RANGE_OPERATORS[op]} {_sql_literal(value)}"
+                                for op, value in p.bounds.items() if op in RANGE_OPERATORS)
+        if p.op in ("text", "query_string"):
+            pattern = _like("*" + _strip_wildcards(p.value) + "*")
+            columns = [self.column(name) for name in _text_fields(p)] or ["UTF8(payload)"]
+            return "(" + " OR ".join(f"{name} ILIKE {pattern}" for name in columns) + ")"
+        logger.debug(f"AQL lowering skipped {p.op} predicate")
+        return ""
+
+    @staticmethod
+    def time_clause(time_range: TimeRange, now: Optional[datetime] = None) -> str:
+        seconds = time_range.seconds
+        if seconds is not None:
+            if seconds % 86400 == 0:
+                return f"LAST {seconds // 86400} DAYS"
+            if seconds % 3600 == 0:
+                return f"LAST {seconds // 3600} HOURS"
+            return f"LAST {max(1, -(-seconds // 60))} MINUTES"
+        start, end = _closed_window(time_range, now)
+        return f"START '{start:%Y-%m-%d %H:%M:%S}' STOP '{end:%Y-%m-%d %H:%M:%S}'"
+
+
+def _closed_window(time_range: TimeRange, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    Absolute window for backends that need one
+
+    An open end ("now") is pushed out to whole days past the start, so the
+    lowering only changes when the start does and stays cacheable.
+    """
+    now = now or datetime.now(timezone.utc)
+    start, end = time_range.resolve(now)
+    start = start or datetime.fromtimestamp(0, timezone.utc if now.tzinfo else None)
+    if time_range.end in (None, "now"):
+        days = max(1, -(-(now - start) // timedelta(days=1)))
+        end = start + timedelta(days=days)
+    return start, end or now
+
+
+# ----------------------------------------------------------------------------
+# Microsoft Sentinel KQL
+# ----------------------------------------------------------------------------
+
+def _kql_string(value: Any) -> str:
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class SentinelCodegen:
+    """Kusto (KQL) queries for Microsoft Sentinel / Log Analytics"""
+
+    backend = "kql"
+    TABLE = "SecurityEvent"
+    TIME_COLUMN = "TimeGenerated"
+    IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+    ROUNDING = {"d": "startofday", "w": "startofweek", "M": "startofmonth", "y": "startofyear"}
+    SPANS = {"s": "s", "m": "m", "h": "h", "d": "d"}
+
+    def lower(self, ir: QueryIR, now: Optional[datetime] = None) -> Dict[str, Any]:
+        parts = [self.TABLE]
+        if ir.time_range:
+            parts.append(f"| where {self.time_condition(ir.time_range)}")
+        where = self.node(ir.root)
+        if where:
+            parts.append(f"| where {where}")
+
+        if ir.aggregations:
+            metrics, by_terms = ["count()"], []
+            for agg in _walk_aggregations(ir.aggregations):
+                if agg.kind == "terms":
+                    by_terms.append(self.column(agg.field))
+                elif agg.kind == "date_histogram":
+                    interval = agg.param("calendar_interval") or agg.param("fixed_interval") or agg.param("interval") or "1h"
+                    by_terms.append(f"bin({self.column(agg.field)}, {interval})")
+                elif agg.kind in ("avg", "sum", "min", "max"):
+                    metrics.append(f"{agg.kind}({self.column(agg.field)})")
+                elif agg.kind == "cardinality":
+                    metrics.append(f"dcount({self.column(agg.field)})")
+            summarize = f"| summarize {', '.join(metrics)}"
+            if by_terms:
+                summarize += f" by {', '.join(by_terms)}"
+            parts.append(summarize)
+        else:
+            if ir.fields:
+                parts.append(f"| project {', '.join(self.column(name) for name in ir.fields)}")
+            orders = [f"{self.column(key.field)} {key.order}" for key in ir.sort if key.field != "_score"]
+            if orders:
+                parts.append(f"| order by {', '.join(orders)}")
+            parts.append(f"| take {ir.size}")
+
+        query: Dict[str, Any] = {"query": " ".join(parts)}
+        if ir.time_range:
+            query["timespan"] = self.timespan(ir.time_range, now)
+        return query
+
+    def column(self, field_name: str) -> str:
+        name = _plain(field_name)
+        if name == DEFAULT_TIME_FIELD:
+            return self.TIME_COLUMN
+        return name if self.IDENTIFIER.match(name) else f"['{name}']"
+
+    def node(self, node: Node) -> str:
+        if isinstance(node, Predicate):
+            return self.predicate(node)
+        parts = [part for part in map(self.node, node.required) if part]
+        if node.should_required:
+            alternatives = _any_of([part for part in map(self.node, node.should) if part], "or")
+            if alternatives:
+                parts.append(alternatives)
+        parts.extend(f"not {_group(part)}" for part in map(self.node, node.must_not) if part)
+        if len(parts) > 1:
+            return "(" + " and ".join(parts) + ")"
+        return parts[0] if parts else ""
+
+    def predicate(self, p: Predicate) -> str:
+        column = self.column(p.field) if p.field else ""
+        if p.op == "eq":
+            value = p.value if isinstance(p.value, (int, float)) and not isinstance(p.value, bool) else _kql_string(p.value)
+            return f"{column} == {value}"
+        if p.op == "in":
+            return f"{column} in ({', '.join(_kql_string(value) for value in p.values)})"
+        if p.op in ("match", "phrase"):
+            return f"{column} contains {_kql_string(_strip_wildcards(p.value))}"
+        if p.op == "wildcard":
+            return f"{column} matches regex {_kql_string(_glob_regex(p.value))}"
+        if p.op == "prefix":
+            return f"{column} startswith {_kql_string(p.value)}"
+        if p.op == "exists":
+            return f"isnotempty({column})"
+        if p.op == "range":
+            return " and ".join(f"{column} {RANGE_OPERATORS[op]} {value}"
+                                for op, value in p.bounds.items() if op in RANGE_OPERATORS)
+        if p.op in ("text", "query_string"):
+            needle = _kql_string(_strip_wildcards(p.value))
+            columns = [self.column(name) for name in _text_fields(p)]
+            if not columns:
+                return f"* contains {needle}"
+            return "(" + " or ".join(f"{name} contains {needle}" for name in columns) + ")"
+        logger.debug(f"KQL lowering skipped {p.op} predicate")
+        return ""
+
+    def time_condition(self, time_range: TimeRange) -> str:
+        column = self.column(time_range.field)
+        condition = f"{column} >= {self.time_expression(time_range.start)}" if time_range.start else ""
+        if time_range.end not in (None, "now"):
+            operator = "<" if time_range.end_exclusive else "<="
+            upper = f"{column} {operator} {self.time_expression(time_range.end)}"
+            condition = f"{condition} and {upper}" if condition else upper
+        return condition or "true"
+
+    def time_expression(self, expr: Any) -> str:
+        if isinstance(expr, datetime):
+            return f"datetime({expr.isoformat()})"
+        parsed = parse_date_math(expr)
+        if parsed is None:
+            return f"datetime({expr})"
+        amount, unit, rounding = parsed
+        base = "now()"
+        if unit:
+            if unit in self.SPANS:
+                span = f"{abs(amount)}{self.SPANS[unit]}"
+            else:
+                span = f"{abs(amount) * {'w': 7, 'M': 30, 'y': 365}[unit]}d"
+            base = f"ago({span})" if amount < 0 else f"now({span})"
+        if rounding in self.ROUNDING:
+            return f"{self.ROUNDING[rounding]}({base})"
+        if rounding:
+            return f"bin({base}, 1{rounding})"
+        return base
+
+    @staticmethod
+    def timespan(time_range: TimeRange, now: Optional[datetime] = None) -> str:
+        """ISO 8601 duration covering the window"""
+        seconds = time_range.seconds
+        if seconds is None:
+            start, end = _closed_window(time_range, now)
+            seconds = int((end - start).total_seconds())
+        if seconds % 86400 == 0:
+            return f"P{seconds // 86400}D"
+        if seconds % 3600 == 0:
+            return f"PT{seconds // 3600}H"
+        if seconds % 60 == 0:
+            return f"PT{seconds // 60}M"
+        return f"PT{max(1, seconds)}S"
+
+
+# ----------------------------------------------------------------------------
+# MongoDB
+# ----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class MongoQuery:
+    """Lowered MongoDB find(); the time window is resolved per execution"""
+    filter: Dict[str, Any]
+    projection: Optional[Dict[str, int]] = None
+    sort: Tuple[Tuple[str, int], ...] = ((DEFAULT_TIME_FIELD, -1),)
+    limit: int = 100
+    time_range: Optional[TimeRange] = None
+    sample: bool = False  # uniform ``$sample`` of ``limit`` matches instead of the newest
+
+    def filter_at(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        if not self.time_range:
+            return copy.deepcopy(self.filter)
+        start, end = self.time_range.resolve(now)
+        window = {}
+        if start is not None:
+            window["$gte"] = start
+        if end is not None:
+            window["$lt" if self.time_range.end_exclusive else "$lte"] = end
+        if not window:
+            return copy.deepcopy(self.filter)
+        time_filter = {self.time_range.field: window}
+        if not self.filter:
+            return time_filter
+        if list(self.filter) == ["$and"]:
+            return {"$and": copy.deepcopy(self.filter["$and"]) + [time_filter]}
+        return {"$and": [copy.deepcopy(self.filter), time_filter]}
+
+
+class MongoCodegen:
+    """MongoDB filter documents with projection, sort and limit"""
+
+    backend = "mongo"
+
+    def lower(self, ir: QueryIR, now: Optional[datetime] = None) -> MongoQuery:
+        sort = tuple(
+            (_plain(key.field), -1 if key.order == "desc" else 1) for key in ir.sort if key.field != "_score"
+        ) or ((DEFAULT_TIME_FIELD, -1),)
+        return MongoQuery(
+            filter=self.node(ir.root),
+            projection=to_mongo_projection(list(ir.fields)) if ir.fields else None,
+            sort=sort,
+            limit=ir.size,
+            time_range=ir.time_range,
+        )
+
+    def node(self, node: Node) -> Dict[str, Any]:
+        if isinstance(node, Predicate):
+            return self.predicate(node)
+        parts = [part for part in map(self.node, node.required) if part]
+        if node.should_required:
+            alternatives = [part for part in map(self.node, node.should) if part]
+            if alternatives:
+                parts.append(alternatives[0] if len(alternatives) == 1 else {"$or": alternatives})
+        excluded = [part for part in map(self.node, node.must_not) if part]
+        if excluded:
+            parts.append({"$nor": excluded})
+        if not parts:
+            return {}
+        return parts[0] if len(parts) == 1 else {"$and": parts}
+
+    def predicate(self, p: Predicate) -> Dict[str, Any]:
+        name = _plain(p.field)
+        if p.op in ("eq", "match", "phrase"):
+            # Equality keeps the predicate indexable, as in MongoDBConnector._convert_bool_query
+            return {name: p.value}
+        if p.op == "in":
+            return {name: {"$in": list(p.values)}}
+        if p.op == "wildcard":
+            return {name: {"$regex": _glob_regex(p.value), "$options": "i"}}
+        if p.op == "prefix":
+            return {name: {"$regex": "^" + re.escape(str(p.value))}}
+        if p.op == "exists":
+            return {name: {"$exists": True}}
+        if p.op == "range":
+            return {name: {f"${op}": value for op, value in p.bounds.items() if op in RANGE_OPERATORS}}
+        if p.op in ("text", "query_string"):
+            pattern = {"$regex": re.escape(_strip_wildcards(p.value)), "$options": "i"}
+            fields = _text_fields(p) or ["message"]
+            return {"$or": [{name: pattern} for name in fields]} if len(fields) > 1 else {fields[0]: pattern}
+        logger.debug(f"MongoDB lowering skipped {p.op} predicate")
+        return {}
+
+
+# ----------------------------------------------------------------------------
+# Dataset store (in-process records)
+# ----------------------------------------------------------------------------
+
+Matcher = Callable[[Dict[str, Any]], bool]
+
+
+def lookup(record: Dict[str, Any], path: str) -> Any:
+    """Dotted-path lookup that also accepts flat keys (``source.ip`` / ``source_ip``)"""
+    if path in record:
+        return record[path]
+    value: Any = record
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            value = None
+            break
+        value = value[part]
+    if value is None:
+        value = record.get(path.replace(".", "_"))
+    return value
+
+
+def _as_list(value: Any) -> List[Any]:
+    return value if isinstance(value, list) else [value]
+
+
+def _as_time(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    """Aware times converted to UTC wall time; naive ones are taken as UTC already"""
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+
+
+def _compare(left: Any, op: str, right: Any) -> bool:
+    try:
+        left_value, right_value = float(left), float(right)
+    except (TypeError, ValueError):
+        left_time, right_time = _as_time(left), _as_time(right)
+        if left_time is not None and right_time is not None:
+            left_value, right_value = _naive_utc(left_time), _naive_utc(right_time)
+        else:
+            left_value, right_value = str(left), str(right)
+    return {
+        "gt": left_value > right_value, "gte": left_value >= right_value,
+        "lt": left_value < right_value, "lte": left_value <= right_value,
+    }[op]
+
+
+@dataclass(frozen=True)
+class RecordPredicate:
+    """Compiled filter over in-memory records; ``bind()`` fixes the time window"""
+    matcher: Matcher
+    time_range: Optional[TimeRange] = None
+    fields: Optional[Tuple[str, ...]] = None
+    limit: int = 100
+    sample: bool = False  # reservoir-sample the matches instead of taking the first ``limit``
+
+    def bind(self, now: Optional[datetime] = None) -> Matcher:
+        if not self.time_range:
+            return self.matcher
+        start, end = self.time_range.resolve(now)
+        start = _naive_utc(start) if start else None
+        end = _naive_utc(end) if end else None
+        time_field = self.time_range.field
+        exclusive = self.time_range.end_exclusive
+        matcher = self.matcher
+
+        def matches(record: Dict[str, Any]) -> bool:
+            stamp = _as_time(lookup(record, time_field))
+            if stamp is not None:
+                stamp = _naive_utc(stamp)
+                if (start and stamp < start) or (end and (stamp >= end if exclusive else stamp > end)):
+                    return False
+            return matcher(record)
+        return matches
+
+    def filter(self, records: List[Dict[str, Any]], size: Optional[int] = None,
+               now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """First ``size`` matching records (or a uniform sample of them), projected to the requested fields"""
+        matches = self.bind(now)
+        limit = size or self.limit
+        if self.sample:
+            sampled = reservoir_sample((record for record in records if matches(record)), limit)
+            return [project_document(record, list(self.fields)) for record in sampled] if self.fields else sampled
+        results = []
+        for record in records:
+            if matches(record):
+                results.append(project_document(record, list(self.fields)) if self.fields else record)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def count(self, records: List[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+        """Number of matching records, without projecting or collecting them"""
+        matches = self.bind(now)
+        return sum(1 for record in records if matches(record))
+
+
+class DatasetCodegen:
+    """Python predicates for the in-process dataset store"""
+
+    backend = "dataset"
+
+    def lower(self, ir: QueryIR, now: Optional[datetime] = None) -> RecordPredicate:
+        return RecordPredicate(self.node(ir.root), ir.time_range, ir.fields, ir.size)
+
+    def node(self, node: Node) -> Matcher:
+        if isinstance(node, Predicate):
+            return self.predicate(node)
+        required = [self.node(child) for child in node.required]
+        should = [self.node(child) for child in node.should]
+        excluded = [self.node(child) for child in node.must_not]
+        needed = min(node.should_required, len(should))
+
+        def matches(record: Dict[str, Any]) -> bool:
+            if not all(check(record) for check in required):
+                return False
+            if any(check(record) for check in excluded):
+                return False
+            if needed:
+                hits = 0
+                for check in should:
+                    if check(record):
+                        hits += 1
+                        if hits >= needed:
+                            break
+                return hits >= needed
+            return True
+        return matches
+
+    def predicate(self, p: Predicate) -> Matcher:
+        name = _plain(p.field)
+        op = p.op
+        if op == "eq":
+            wanted = str(p.value)
+            return lambda record: any(str(value) == wanted for value in _as_list(lookup(record, name)))
+        if op == "in":
+            wanted_set = {str(value) for value in p.values}
+            return lambda record: any(str(value) in wanted_set for value in _as_list(lookup(record, name)))
+        if op == "match":
+            tokens = str(p.value).lower().split()
+            require_all = str(p.option("operator", "or")).lower() == "and"
+            combine = all if require_all else any
+
+            def match_tokens(record: Dict[str, Any]) -> bool:
+                text = str(lookup(record, name) or "").lower()
+                return bool(tokens) and combine(token in text for token in tokens)
+            return match_tokens
+        if op == "phrase":
+            needle = str(p.value).lower()
+            return lambda record: needle in str(lookup(record, name) or "").lower()
+        if op in ("wildcard", "prefix"):
+            pattern = str(p.value).lower() + ("*" if op == "prefix" else "")
+            return lambda record: any(
+                value is not None and fnmatch.fnmatchcase(str(value).lower(), pattern)
+                for value in _as_list(lookup(record, name))
+            )
+        if op == "exists":
+            return lambda record: lookup(record, name) is not None
+        if op == "range":
+            bounds = [(bound, value) for bound, value in p.bounds.items() if bound in RANGE_OPERATORS]
+            resolved = [(bound, resolve_date_math(value, datetime.now(timezone.utc)) if isinstance(value, str)
+                         and value.startswith("now") else value) for bound, value in bounds]
+
+            def in_range(record: Dict[str, Any]) -> bool:
+                value = lookup(record, name)
+                return value is not None and all(_compare(value, bound, limit) for bound, limit in resolved)
+            return in_range
+        if op in ("text", "query_string"):
+            needle = _strip_wildcards(p.value).lower()
+            fields = _text_fields(p)
+            if not fields:
+                return lambda record: needle in json.dumps(record, default=str).lower()
+            return lambda record: any(needle in str(lookup(record, name) or "").lower() for name in fields)
+        logger.debug(f"Dataset lowering ignores {op} predicate")
+        return lambda record: True
+
+
+def _walk_aggregations(aggs: Tuple[Aggregation, ...]) -> List[Aggregation]:
+    walked = []
+    for agg in aggs:
+        walked.append(agg)
+        walked.extend(_walk_aggregations(agg.children))
+    return walked
+
+
+CODEGENS: Dict[str, Any] = {
+    codegen.backend: codegen
+    for codegen in (
+        ElasticsearchCodegen(), SplunkCodegen(), QRadarCodegen(),
+        SentinelCodegen(), MongoCodegen(), DatasetCodegen(),
+    )
+}
+
+
+# Backends whose lowering turns non-relative windows into absolute ones via _closed_window
+CLOSED_WINDOW_BACKENDS = (QRadarCodegen.backend, SentinelCodegen.backend)
+
+
+def lower(ir: QueryIR, backend: str, now: Optional[datetime] = None) -> Any:
+    """Lower an IR for one backend (uncached)"""
+    try:
+        codegen = CODEGENS[backend]
+    except KeyError as e:
+        raise ValueError(f"No code generator for backend '{backend}'") from e
+    return codegen.lower(ir, now)
+
+
+class TranslationCache:
+    """
+    LRU of lowered queries keyed on (backend, IR fingerprint)
+
+    Relative windows stay symbolic in every lowering, so one entry serves
+    every request for the same question. Windows that need an absolute clock
+    (rounded date math such as "today") add their resolved start to the key,
+    and backends that close an open window (AQL START/STOP, KQL timespan) add
+    the closed window, which grows a day at a time.
+    Dict-shaped translations are handed out as copies because callers
+    decorate them in place.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, Optional[str]], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def lower(self, ir: QueryIR, backend: str, now: Optional[datetime] = None) -> Any:
+        key = (backend, ir.fingerprint, self._clock_key(ir, backend, now))
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return copy.deepcopy(cached) if isinstance(cached, dict) else cached
+
+        translated = lower(ir, backend, now)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._entries[key] = translated
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return copy.deepcopy(translated) if isinstance(translated, dict) else translated
+
+    @staticmethod
+    def _clock_key(ir: QueryIR, backend: str, now: Optional[datetime]) -> Optional[str]:
+        time_range = ir.time_range
+        if not time_range:
+            return None
+        if backend in CLOSED_WINDOW_BACKENDS and time_range.seconds is None:
+            start, end = _closed_window(time_range, now)
+            return f"{start.isoformat()}/{end.isoformat()}"
+        if not time_range.needs_clock:
+            return None
+        start, _ = time_range.resolve(now)
+        return start.isoformat() if start else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+_translation_cache: Optional[TranslationCache] = None
+
+
+def get_translation_cache() -> TranslationCache:
+    """Process-wide translation cache shared by the builders and multi-source fan-out"""
+    global _translation_cache
+    if _translation_cache is None:
+        _translation_cache = TranslationCache()
+    return _translation_cache
@@ -0,0 +1,307 @@
+"""
+Result Size Estimation
+Pre-flight count / cardinality estimates and the fetch plans negotiated from them, so
+oversized result sets are sampled or aggregated at the source instead of truncated after transfer.
+"""
+
+import copy
+import inspect
+import logging
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Any, Optional, Iterable, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Breakdown returned in aggregation-only mode when the query carries no aggregations
+DEFAULT_FACETS = ("event.category", "event.outcome", "host.name")
+
+# Fetch modes, cheapest last
+FETCH_FULL = "full"            # everything matching fits the budget
+FETCH_SAMPLE = "sample"        # fetch a uniform sample of ``limit`` records
+FETCH_AGGREGATE = "aggregate"  # too many to sample usefully: buckets only, no hits
+FETCH_SKIP = "skip"            # nothing matches; don't call the source at all
+
+
+@dataclass
+class ResultEstimate:
+    """How many records a query would return, and how that number was obtained"""
+    total: Optional[int] = None
+    exact: bool = False
+    method: str = "unknown"  # count | index_stats | scan | sample | unknown
+    cardinality: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def known(self) -> bool:
+        return self.total is not None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "exact": self.exact,
+            "method": self.method,
+            "cardinality": dict(self.cardinality),
+        }
+
+
+@dataclass
+class FetchPlan:
+    """Per-source fetch decision derived from an estimate and the caller's budget"""
+    mode: str
+    limit: int
+    sample_rate: float = 1.0
+    estimate: ResultEstimate = field(default_factory=ResultEstimate)
+
+    def scale(self, count: int) -> int:
+        """Extrapolate a count measured on the fetched records to the full result set"""
+        if self.mode != FETCH_SAMPLE or not self.sample_rate:
+            return count
+        return int(round(count / self.sample_rate))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "limit": self.limit,
+            "sample_rate": round(self.sample_rate, 6),
+            "estimate": self.estimate.as_dict(),
+        }
+
+
+def reservoir_sample(items: Iterable[T], k: int, rng: Optional[random.Random] = None) -> List[T]:
+    """Uniform sample of ``k`` items from a stream of unknown length (Algorithm R)"""
+    if k <= 0:
+        return []
+    rng = rng or random
+    reservoir: List[T] = []
+    for seen, item in enumerate(items):
+        if seen < k:
+            reservoir.append(item)
+        else:
+            slot = rng.randint(0, seen)
+            if slot < k:
+                reservoir[slot] = item
+    return reservoir
+
+
+def is_search_body(query: Any) -> bool:
+    """Elasticsearch-style request body (the only native form with aggregations)"""
+    if not isinstance(query, dict) or not isinstance(query.get("query", {}), dict):
+        return False
+    return "query" in query or "aggs" in query or "aggregations" in query
+
+
+def random_sampler(query: Dict[str, Any], rate: float, seed: Optional[int] = None,
+                   seed_field: str = "_seq_no") -> Dict[str, Any]:
+    """
+    Wrap a search body in a ``random_score`` sampler keeping roughly ``rate`` of the hits
+
+    ``random_score`` yields a uniform score in [0, 1); with ``boost_mode: replace`` and
+    ``min_score: 1 - rate`` the cluster drops the rest before they are collected.
+    """
+    body = copy.deepcopy(query)
+    random_score: Dict[str, Any] = {}
+    if seed is not None:
+        random_score = {"seed": seed, "field": seed_field}
+    body["query"] = {
+        "function_score": {
+            "query": body.get("query", {"match_all": {}}),
+            "random_score": random_score,
+            "boost_mode": "replace",
+            "min_score": round(1.0 - min(max(rate, 0.0), 1.0), 6),
+        }
+    }
+    return body
+
+
+def aggregation_only(
+    query: Dict[str, Any],
+    group_by: Optional[List[str]] = None,
+    cardinality: Optional[Dict[str, int]] = None,
+    max_buckets: int = 50,
+    time_field: str = "@timestamp",
+    interval: str = "1h"
+) -> Dict[str, Any]:
+    """
+    Search body returning buckets and the total only (``size: 0``)
+
+    Existing aggregations are kept; otherwise a terms aggregation per ``group_by`` field
+    (``DEFAULT_FACETS`` if None; sized from its estimated cardinality) and an event timeline are added.
+    """
+    body = copy.deepcopy(query)
+    body["size"] = 0
+    body["track_total_hits"] = True
+    body.pop("sort", None)
+    body.pop("_source", None)
+
+    if not body.get("aggs") and not body.get("aggregations"):
+        cardinality = cardinality or {}
+        aggs: Dict[str, Any] = {}
+        for name in DEFAULT_FACETS if group_by is None else group_by:
+            buckets = min(max(cardinality.get(name, max_buckets), 1), max_buckets)
+            aggs[f"by_{name}"] = {"terms": {"field": name, "size": buckets}}
+        aggs["timeline"] = {
+            "date_histogram": {"field": time_field, "fixed_interval": interval, "min_doc_count": 1}
+        }
+        body["aggs"] = aggs
+    return body
+
+
+def shape_query(query: Any, plan: FetchPlan, group_by: Optional[List[str]] = None,
+                seed: Optional[int] = None) -> Any:
+    """Rewrite a native query so the source itself honours ``plan``"""
+    from .codegen import MongoQuery, RecordPredicate
+
+    if isinstance(query, (RecordPredicate, MongoQuery)):
+        return replace(query, limit=plan.limit, sample=plan.mode == FETCH_SAMPLE)
+    if not is_search_body(query):
+        return query
+    if plan.mode == FETCH_AGGREGATE:
+        return aggregation_only(query, group_by, plan.estimate.cardinality)
+    if plan.mode == FETCH_SAMPLE:
+        body = random_sampler(query, plan.sample_rate, seed)
+    else:
+        body = copy.deepcopy(query)
+    body["size"] = plan.limit
+    return body
+
+
+class LimitNegotiator:
+    """
+    Pre-flight size estimation and fetch planning
+
+    Connectors opt in by exposing ``estimate_result_size(query, distinct_fields=None)``
+    returning a ``ResultEstimate``; ``count_documents(query)`` (``_count``) is used otherwise.
+    Estimates are cached briefly per caller-supplied key so dashboards refreshing the same
+    query don't pay for a count on every poll; zero counts are never cached.
+    """
+
+    def __init__(
+        self,
+        max_fetch: int = 1000,
+        aggregate_above: int = 100_000,
+        estimate_ttl: float = 30.0,
+        max_cached: int = 256
+    ):
+        self.max_fetch = max_fetch
+        self.aggregate_above = aggregate_above
+        self.estimate_ttl = estimate_ttl
+        self.max_cached = max_cached
+        self._estimates: "OrderedDict[Any, Tuple[float, ResultEstimate]]" = OrderedDict()
+        self.stats = {"estimates": 0, "cache_hits": 0, "failures": 0,
+                      FETCH_FULL: 0, FETCH_SAMPLE: 0, FETCH_AGGREGATE: 0, FETCH_SKIP: 0}
+
+    async def estimate(
+        self,
+        connector: Any,
+        query: Any,
+        distinct_fields: Optional[List[str]] = None,
+        key: Optional[Any] = None
+    ) -> ResultEstimate:
+        """Ask the source how big the result would be (unknown if it cannot tell)"""
+        if key is not None:
+            cached = self._estimates.get(key)
+            if cached and time.monotonic() - cached[0] < self.estimate_ttl:
+                self._estimates.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return cached[1]
+
+        self.stats["estimates"] += 1
+        estimate = ResultEstimate()
+        try:
+            probe = getattr(connector, "estimate_result_size", None)
+            if callable(probe):
+                result = probe(query, distinct_fields=distinct_fields)
+                if inspect.isawaitable(result):
+                    result = await result
+                estimate = result or ResultEstimate()
+            elif callable(getattr(connector, "count_documents", None)) and is_search_body(query):
+                total = connector.count_documents(query)
+                if inspect.isawaitable(total):
+                    total = await total
+                estimate = ResultEstimate(total=int(total), exact=True, method="count")
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.warning(f"⚠️ Result size estimation failed: {e}")
+            return ResultEstimate()
+
+        # A zero is not cached: within the TTL it would skip events that have since arrived
+        if key is not None and estimate.known and estimate.total:
+            self._estimates[key] = (time.monotonic(), estimate)
+            while len(self._estimates) > self.max_cached:
+                self._estimates.popitem(last=False)
+        return estimate
+
+    def plan(self, estimate: ResultEstimate, requested: Optional[int] = None,
+             aggregatable: bool = False, sampling: bool = True) -> FetchPlan:
+        """
+        Choose how to fetch given an estimate and the caller's requested size
+
+        ``requested=None`` (dashboards asking for "everything") is capped at ``max_fetch``.
+        ``sampling=False`` is for plain event lists: an oversized result is fetched as
+        the first ``budget`` records in query order (plain ``size=N``), never sampled.
+        """
+        budget = min(requested, self.max_fetch) if requested else self.max_fetch
+        total = estimate.total
+
+        if total is None:
+            plan = FetchPlan(FETCH_FULL, budget, 1.0, estimate)
+        elif total <= 0 and estimate.exact:
+            plan = FetchPlan(FETCH_SKIP, 0, 1.0, estimate)
+        elif total <= budget:
+            # The whole budget, not the count: the estimate may be cached and new events keep arriving
+            plan = FetchPlan(FETCH_FULL, budget, 1.0, estimate)
+        elif not sampling:
+            plan = FetchPlan(FETCH_FULL, budget, 1.0, estimate)
+        elif aggregatable and total > self.aggregate_above:
+            plan = FetchPlan(FETCH_AGGREGATE, 0, 0.0, estimate)
+        else:
+            plan = FetchPlan(FETCH_SAMPLE, budget, budget / total, estimate)
+
+        self.stats[plan.mode] += 1
+        return plan
+
+    async def negotiate(
+        self,
+        connector: Any,
+        query: Any,
+        requested: Optional[int] = None,
+        group_by: Optional[List[str]] = None,
+        key: Optional[Any] = None,
+        allow_aggregation: bool = True,
+        sampling: bool = True
+    ) -> FetchPlan:
+        """
+        Estimate, then plan; aggregation-only mode needs an aggregatable native query
+
+        Cardinalities of the ``group_by`` facets are only fetched once a plan turns out
+        aggregation-only, where they size the terms buckets. The plan gets its own copy
+        of the estimate, so the cached one is never extended in place.
+        """
+        estimate = await self.estimate(connector, query, key=key)
+        plan = self.plan(estimate, requested, allow_aggregation and is_search_body(query), sampling)
+        facets = list(DEFAULT_FACETS if group_by is None else group_by)
+        missing = [name for name in facets if name not in estimate.cardinality]
+        if plan.mode == FETCH_AGGREGATE and missing:
+            detail = await self.estimate(connector, query, missing)
+            estimate = replace(estimate, cardinality={**estimate.cardinality, **detail.cardinality})
+            plan = replace(plan, estimate=estimate)
+        return plan
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "cached_estimates": len(self._estimates)}
+
+
+# Global negotiator instance
+_limit_negotiator: Optional[LimitNegotiator] = None
+
+
+def get_limit_negotiator() -> LimitNegotiator:
+    """Get the shared limit negotiator"""
+    global _limit_negotiator
+    if _limit_negotiator is None:
+        _limit_negotiator = LimitNegotiator()
+    return _limit_negotiator
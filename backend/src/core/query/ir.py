@@ -0,0 +1,586 @@
+"""
+Query Intermediate Representation
+Backend-neutral, typed query form (filter tree + time range + projection + aggregations)
+that the query builders produce once per request and the code generators lower per backend.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+# Predicate operators understood by every code generator
+OPERATORS = (
+    "eq",           # exact value (keyword / numeric)
+    "in",           # any of several exact values
+    "match",        # analyzed full-text match on one field
+    "phrase",       # analyzed phrase match on one field
+    "text",         # full-text match across several fields
+    "wildcard",     # glob pattern on one field
+    "prefix",       # value prefix on one field
+    "exists",       # field is present
+    "range",        # bounded comparison (gt/gte/lt/lte)
+    "query_string", # free-form search expression
+    "raw",          # opaque Elasticsearch clause lifted from existing DSL
+)
+
+OCCURS = ("must", "filter", "should", "must_not")
+
+DEFAULT_TIME_FIELD = "@timestamp"
+
+_DATE_MATH = re.compile(r"^now(?:([+-])(\d+)([smhdwMy]))?(?:/([smhdwMy]))?$")
+_UNIT_SECONDS = {
+    "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400,
+    "M": 30 * 86400, "y": 365 * 86400,
+}
+
+
+def _freeze(value: Any) -> Any:
+    """Turn lists and dicts into hashable tuples"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """Leaf condition on one field (or a field list for ``text``/``query_string``)"""
+    op: str
+    field: str = ""
+    value: Any = None
+    fields: Tuple[str, ...] = ()
+    options: Tuple[Tuple[str, Any], ...] = ()
+
+    def option(self, name: str, default: Any = None) -> Any:
+        for key, value in self.options:
+            if key == name:
+                return value
+        return default
+
+    @property
+    def values(self) -> Tuple[Any, ...]:
+        """Value(s) as a tuple, for ``eq`` and ``in`` alike"""
+        return self.value if isinstance(self.value, tuple) else (self.value,)
+
+    @property
+    def bounds(self) -> Dict[str, Any]:
+        """Range bounds as a dict (``range`` only)"""
+        return dict(self.value or ())
+
+
+@dataclass(frozen=True)
+class BoolNode:
+    """Boolean combination with Elasticsearch occur semantics"""
+    must: Tuple["Node", ...] = ()
+    filter: Tuple["Node", ...] = ()
+    should: Tuple["Node", ...] = ()
+    must_not: Tuple["Node", ...] = ()
+    minimum_should_match: Optional[int] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.must or self.filter or self.should or self.must_not)
+
+    @property
+    def required(self) -> Tuple["Node", ...]:
+        """Conjunctive clauses (scoring or not)"""
+        return self.must + self.filter
+
+    @property
+    def should_required(self) -> int:
+        """How many ``should`` clauses a match needs (0 means they only score)"""
+        if not self.should:
+            return 0
+        if self.minimum_should_match is not None:
+            return self.minimum_should_match
+        return 0 if self.required else 1
+
+
+Node = Union[Predicate, BoolNode]
+
+
+@dataclass(frozen=True)
+class TimeRange:
+    """Time window on the event timestamp; bounds are ES date math or ISO strings"""
+    start: Optional[str] = None
+    end: Optional[str] = "now"
+    field: str = DEFAULT_TIME_FIELD
+
+    @property
+    def is_relative(self) -> bool:
+        """True for ``now-N<unit>`` .. ``now`` windows with no rounding"""
+        return _relative_seconds(self.start) is not None and self.end in (None, "now")
+
+    @property
+    def needs_clock(self) -> bool:
+        """True when lowering to absolute times depends on the current time beyond "now-N" offsets"""
+        if self.is_relative:
+            return False
+        return any(isinstance(bound, str) and bound.startswith("now") and bound != "now"
+                   for bound in (self.start, self.end))
+
+    @property
+    def seconds(self) -> Optional[int]:
+        """Window length for relative windows"""
+        return _relative_seconds(self.start) if self.is_relative else None
+
+    @property
+    def end_exclusive(self) -> bool:
+        """A rounded end ("now/d") is the first instant outside the window, as in the ES lowering"""
+        return isinstance(self.end, str) and "/" in self.end
+
+    def resolve(self, now: Optional[datetime] = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        Absolute (start, end) for backends without date math
+
+        ``now`` defaults to the current UTC time, since Elasticsearch rounds date math in
+        UTC; naive ISO bounds are read as UTC when ``now`` is aware.
+        """
+        now = now or datetime.now(timezone.utc)
+        return (_same_zone(resolve_date_math(self.start, now), now),
+                _same_zone(resolve_date_math(self.end, now), now))
+
+
+@dataclass(frozen=True)
+class Aggregation:
+    """Named aggregation; ``kind`` is the Elasticsearch aggregation type"""
+    name: str
+    kind: str
+    field: str = ""
+    params: Tuple[Tuple[str, Any], ...] = ()
+    children: Tuple["Aggregation", ...] = ()
+
+    def param(self, name: str, default: Any = None) -> Any:
+        for key, value in self.params:
+            if key == name:
+                return value
+        return default
+
+
+@dataclass(frozen=True)
+class SortKey:
+    field: str
+    order: str = "desc"
+
+
+@dataclass(frozen=True)
+class QueryIR:
+    """One request's query, independent of the backend that will run it"""
+    root: BoolNode = BoolNode()
+    time_range: Optional[TimeRange] = None
+    fields: Optional[Tuple[str, ...]] = None
+    excludes: Tuple[str, ...] = ()
+    aggregations: Tuple[Aggregation, ...] = ()
+    size: int = 100
+    sort: Tuple[SortKey, ...] = ()
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Stable digest of the whole IR, used as the translation cache key"""
+        return hashlib.blake2b(repr(self).encode("utf-8"), digest_size=12).hexdigest()
+
+    def with_size(self, size: int) -> "QueryIR":
+        return self if size == self.size else replace(self, size=size)
+
+    def predicates(self) -> List[Predicate]:
+        """All leaf predicates, depth first"""
+        found: List[Predicate] = []
+        stack: List[Node] = [self.root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Predicate):
+                found.append(node)
+            else:
+                for occur in reversed(OCCURS):
+                    stack.extend(reversed(getattr(node, occur)))
+        return found
+
+
+# ----------------------------------------------------------------------------
+# Construction helpers
+# ----------------------------------------------------------------------------
+
+def _options(**options: Any) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(sorted((key, _freeze(value)) for key, value in options.items() if value is not None))
+
+
+def term(field_name: str, value: Any, boost: Optional[float] = None, keyword: bool = False) -> Predicate:
+    """Exact match; ``keyword`` targets the ``.keyword`` sub-field on Elasticsearch"""
+    return Predicate("eq", field_name, _freeze(value), options=_options(boost=boost, keyword=keyword or None))
+
+
+def terms(field_name: str, values: List[Any]) -> Predicate:
+    return Predicate("in", field_name, _freeze(list(values)))
+
+
+def match(field_name: str, value: Any, **options: Any) -> Predicate:
+    return Predicate("match", field_name, _freeze(value), options=_options(**options))
+
+
+def phrase(field_name: str, value: str) -> Predicate:
+    return Predicate("phrase", field_name, value)
+
+
+def multi_match(value: str, fields: List[str], **options: Any) -> Predicate:
+    return Predicate("text", value=value, fields=tuple(fields), options=_options(**options))
+
+
+def wildcard(field_name: str, pattern: str, boost: Optional[float] = None, keyword: bool = False) -> Predicate:
+    return Predicate("wildcard", field_name, pattern, options=_options(boost=boost, keyword=keyword or None))
+
+
+def prefix(field_name: str, value: str, boost: Optional[float] = None, keyword: bool = False) -> Predicate:
+    return Predicate("prefix", field_name, value, options=_options(boost=boost, keyword=keyword or None))
+
+
+def exists(field_name: str) -> Predicate:
+    return Predicate("exists", field_name)
+
+
+def range_(field_name: str, **bounds: Any) -> Predicate:
+    return Predicate("range", field_name, _options(**bounds))
+
+
+def query_string(value: str, fields: Optional[List[str]] = None, **options: Any) -> Predicate:
+    return Predicate("query_string", value=value, fields=tuple(fields or ()), options=_options(**options))
+
+
+def any_of(*nodes: Node, minimum: int = 1) -> BoolNode:
+    return BoolNode(should=tuple(nodes), minimum_should_match=minimum)
+
+
+def aggregation(name: str, kind: str, field_name: str = "", children: Tuple[Aggregation, ...] = (),
+                **params: Any) -> Aggregation:
+    return Aggregation(name, kind, field_name, _options(**params), tuple(children))
+
+
+class IRBuilder:
+    """
+    Mutable accumulator for the builders
+
+    Mirrors the ``bool`` lists the builders used to append to, then freezes
+    everything into a :class:`QueryIR` with :meth:`build`.
+    """
+
+    def __init__(self, size: int = 100):
+        self.must: List[Node] = []
+        self.filter: List[Node] = []
+        self.should: List[Node] = []
+        self.must_not: List[Node] = []
+        self.minimum_should_match: Optional[int] = None
+        self.time_range: Optional[TimeRange] = None
+        self.fields: Optional[List[str]] = None
+        self.excludes: List[str] = []
+        self.aggregations: List[Aggregation] = []
+        self.size = size
+        self.sort: List[SortKey] = []
+
+    def add(self, occur: str, *nodes: Node) -> "IRBuilder":
+        getattr(self, occur).extend(nodes)
+        return self
+
+    def build(self) -> QueryIR:
+        return QueryIR(
+            root=BoolNode(
+                must=tuple(self.must),
+                filter=tuple(self.filter),
+                should=tuple(self.should),
+                must_not=tuple(self.must_not),
+                minimum_should_match=self.minimum_should_match,
+            ),
+            time_range=self.time_range,
+            fields=tuple(self.fields) if self.fields else None,
+            excludes=tuple(self.excludes),
+            aggregations=tuple(self.aggregations),
+            size=self.size,
+            sort=tuple(self.sort),
+        )
+
+
+# ----------------------------------------------------------------------------
+# Time helpers
+# ----------------------------------------------------------------------------
+
+def _relative_seconds(expr: Any) -> Optional[int]:
+    match_ = _DATE_MATH.match(expr) if isinstance(expr, str) else None
+    if not match_ or match_.group(4) or match_.group(1) != "-":
+        return None
+    return int(match_.group(2)) * _UNIT_SECONDS[match_.group(3)]
+
+
+def parse_date_math(expr: str) -> Optional[Tuple[int, Optional[str], Optional[str]]]:
+    """Split ``now[-N<unit>][/<unit>]`` into (signed amount, unit, rounding unit)"""
+    match_ = _DATE_MATH.match(expr) if isinstance(expr, str) else None
+    if not match_:
+        return None
+    sign, amount, unit, rounding = match_.groups()
+    signed = (int(amount) if amount else 0) * (-1 if sign == "-" else 1)
+    return signed, unit, rounding
+
+
+def resolve_date_math(expr: Any, now: datetime) -> Optional[datetime]:
+    """Resolve ES date math or ISO strings; months and years are approximated"""
+    if expr is None or isinstance(expr, datetime):
+        return expr
+    parsed = parse_date_math(expr)
+    if parsed is None:
+        try:
+            return datetime.fromisoformat(str(expr).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    amount, unit, rounding = parsed
+    moment = now + timedelta(seconds=amount * _UNIT_SECONDS[unit]) if unit else now
+    if rounding:
+        moment = _round_down(moment, rounding)
+    return moment
+
+
+def _same_zone(moment: Optional[datetime], now: datetime) -> Optional[datetime]:
+    """``moment`` made comparable with ``now`` (both aware or both naive, in UTC)"""
+    if moment is None or (moment.tzinfo is None) == (now.tzinfo is None):
+        return moment
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _round_down(moment: datetime, unit: str) -> datetime:
+    if unit == "s":
+        return moment.replace(microsecond=0)
+    if unit == "m":
+        return moment.replace(second=0, microsecond=0)
+    if unit == "h":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "w":
+        return day - timedelta(days=day.weekday())
+    if unit == "M":
+        return day.replace(day=1)
+    if unit == "y":
+        return day.replace(month=1, day=1)
+    return day
+
+
+# ----------------------------------------------------------------------------
+# Lifting existing Elasticsearch DSL
+# ----------------------------------------------------------------------------
+
+def from_es_dsl(query: Dict[str, Any], time_field: str = DEFAULT_TIME_FIELD) -> QueryIR:
+    """
+    Lift an Elasticsearch search body into the IR
+
+    A top-level range on ``time_field`` becomes the IR time range; clauses
+    without an IR equivalent are carried as ``raw`` predicates so the
+    Elasticsearch lowering stays lossless.
+    """
+    root = _lift_node(query.get("query") or {"match_all": {}})
+    if not isinstance(root, BoolNode):
+        root = BoolNode(must=(root,)) if root is not None else BoolNode()
+
+    time_range = None
+    remaining = []
+    for clause in root.filter:
+        if (time_range is None and isinstance(clause, Predicate) and clause.op == "range"
+                and clause.field == time_field):
+            bounds = clause.bounds
+            time_range = TimeRange(
+                start=bounds.get("gte", bounds.get("gt")),
+                end=bounds.get("lte", bounds.get("lt")),
+                field=time_field,
+            )
+            continue
+        remaining.append(clause)
+    root = replace(root, filter=tuple(remaining))
+
+    source = query.get("_source")
+    fields, excludes = None, ()
+    if isinstance(source, dict):
+        fields = tuple(source.get("includes") or ()) or None
+        excludes = tuple(source.get("excludes") or ())
+    elif isinstance(source, list):
+        fields = tuple(source) or None
+
+    sort = []
+    for entry in query.get("sort") or ():
+        if isinstance(entry, str):
+            sort.append(SortKey(entry))
+        elif isinstance(entry, dict):
+            for name, spec in entry.items():
+                order = spec.get("order", "desc") if isinstance(spec, dict) else spec
+                sort.append(SortKey(name, order))
+
+    aggs = tuple(_lift_aggs(query.get("aggs") or query.get("aggregations") or {}))
+    return QueryIR(
+        root=root,
+        time_range=time_range,
+        fields=fields,
+        excludes=excludes,
+        aggregations=aggs,
+        size=query.get("size", 100),
+        sort=tuple(sort),
+    )
+
+
+def _lift_node(clause: Dict[str, Any]) -> Optional[Node]:
+    if not isinstance(clause, dict) or len(clause) != 1:
+        return _raw(clause)
+    kind, body = next(iter(clause.items()))
+
+    if kind == "match_all":
+        return None
+    if kind == "bool":
+        children = {}
+        for occur in OCCURS:
+            value = body.get(occur, [])
+            value = value if isinstance(value, list) else [value]
+            children[occur] = tuple(node for node in map(_lift_node, value) if node is not None)
+        msm = body.get("minimum_should_match")
+        return BoolNode(minimum_should_match=msm if isinstance(msm, int) else None, **children)
+    if kind == "exists":
+        return exists(body.get("field", ""))
+    if kind == "multi_match":
+        options = {key: value for key, value in body.items() if key not in ("query", "fields")}
+        return multi_match(body.get("query", ""), body.get("fields", []), **options)
+    if kind == "query_string":
+        options = {key: value for key, value in body.items() if key not in ("query", "fields")}
+        return query_string(body.get("query", ""), body.get("fields"), **options)
+    if not isinstance(body, dict) or len(body) != 1:
+        return _raw(clause)
+
+    field_name, spec = next(iter(body.items()))
+    keyword = field_name.endswith(".keyword")
+    base = field_name[: -len(".keyword")] if keyword else field_name
+    if kind == "terms":
+        return terms(field_name, spec)
+    if kind == "range":
+        return range_(field_name, **spec)
+    if kind == "match_phrase" and not isinstance(spec, dict):
+        return phrase(field_name, spec)
+    if kind == "match":
+        if isinstance(spec, dict):
+            options = {key: value for key, value in spec.items() if key != "query"}
+            return match(field_name, spec.get("query"), **options)
+        return match(field_name, spec)
+    if kind in ("term", "wildcard", "prefix"):
+        boost = None
+        if isinstance(spec, dict):
+            if set(spec) - {"value", "boost"}:
+                return _raw(clause)
+            spec, boost = spec.get("value"), spec.get("boost")
+        make = {"term": term, "wildcard": wildcard, "prefix": prefix}[kind]
+        return make(base, spec, boost=boost, keyword=keyword)
+    return _raw(clause)
+
+
+def _raw(clause: Any) -> Predicate:
+    return Predicate("raw", value=json.dumps(clause, sort_keys=True, default=str))
+
+
+def _lift_aggs(aggs: Dict[str, Any]) -> List[Aggregation]:
+    lifted = []
+    for name, spec in aggs.items():
+        children = tuple(_lift_aggs(spec.get("aggs") or spec.get("aggregations") or {}))
+        kinds = [key for key in spec if key not in ("aggs", "aggregations")]
+        if not kinds:
+            continue
+        kind = kinds[0]
+        body = dict(spec[kind])
+        field_name = body.pop("field", "")
+        lifted.append(aggregation(name, kind, field_name, children, **body))
+    return lifted
+
+
+# ----------------------------------------------------------------------------
+# Optimization
+# ----------------------------------------------------------------------------
+
+def optimize(ir: QueryIR) -> QueryIR:
+    """
+    Normalize the filter tree once per request
+
+    - hoists purely conjunctive sub-trees into their parent
+    - drops duplicate clauses and empty sub-trees
+    - folds OR'd exact matches on the same field into one ``in``
+    - promotes a time-field range in the root filter to the IR time range
+    """
+    root = _optimize_bool(ir.root)
+    time_range = ir.time_range
+    if time_range is None:
+        for clause in root.filter:
+            if isinstance(clause, Predicate) and clause.op == "range" and clause.field == DEFAULT_TIME_FIELD:
+                bounds = clause.bounds
+                time_range = TimeRange(
+                    start=bounds.get("gte", bounds.get("gt")), end=bounds.get("lte", bounds.get("lt"))
+                )
+                root = replace(root, filter=tuple(c for c in root.filter if c is not clause))
+                break
+    if root == ir.root and time_range == ir.time_range:
+        return ir
+    return replace(ir, root=root, time_range=time_range)
+
+
+def _optimize_bool(node: BoolNode) -> BoolNode:
+    occurs: Dict[str, List[Node]] = {occur: [] for occur in OCCURS}
+    for occur in OCCURS:
+        for child in getattr(node, occur):
+            if isinstance(child, BoolNode):
+                child = _optimize_bool(child)
+                if child.is_empty:
+                    continue
+                if occur in ("must", "filter") and not child.should and not child.must_not:
+                    # AND inside AND: hoist (filter context absorbs scoring clauses)
+                    occurs[occur].extend(child.must)
+                    occurs["filter"].extend(child.filter)
+                    continue
+                if (occur == "should" and child.should_required == 1 and not child.required
+                        and not child.must_not and node.should_required <= 1):
+                    # OR inside OR
+                    occurs["should"].extend(child.should)
+                    continue
+            occurs[occur].append(child)
+
+    deduped = {occur: _dedupe(clauses) for occur, clauses in occurs.items()}
+    msm = node.minimum_should_match
+    if deduped["should"] and (msm == 1 or (msm is None and not (deduped["must"] or deduped["filter"]))):
+        deduped["should"] = _fold_exact_matches(deduped["should"])
+    if msm is not None and msm > len(deduped["should"]):
+        msm = len(deduped["should"])
+    return BoolNode(minimum_should_match=msm, **{occur: tuple(c) for occur, c in deduped.items()})
+
+
+def _dedupe(clauses: List[Node]) -> List[Node]:
+    seen = set()
+    unique = []
+    for clause in clauses:
+        if clause not in seen:
+            seen.add(clause)
+            unique.append(clause)
+    return unique
+
+
+def _fold_exact_matches(clauses: List[Node]) -> List[Node]:
+    by_field: Dict[str, List[Predicate]] = {}
+    for clause in clauses:
+        if isinstance(clause, Predicate) and clause.op in ("eq", "in") and not clause.options:
+            by_field.setdefault(clause.field, []).append(clause)
+
+    folded = []
+    emitted = set()
+    for clause in clauses:
+        group = by_field.get(clause.field) if isinstance(clause, Predicate) else None
+        if not group or clause not in group or len(group) == 1:
+            folded.append(clause)
+            continue
+        if clause.field in emitted:
+            continue
+        emitted.add(clause.field)
+        values = []
+        for predicate in group:
+            values.extend(value for value in predicate.values if value not in values)
+        folded.append(terms(clause.field, values))
+    return folded
@@ -0,0 +1,345 @@
+"""
+Query Plan Cache
+Maps canonicalized natural-language questions to parameterized pipeline results so
+repeat question shapes skip classification, extraction, mapping, building and validation.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from ..nlp.time_parser import parse_time_expression
+
+logger = logging.getLogger(__name__)
+
+# Result keys captured in a plan; per-request keys (query, timestamp, timing) are rebuilt
+PLAN_KEYS = (
+    "intent", "confidence", "entities", "time_range", "processed_query", "ai_enhancements",
+    "field_mappings", "siem_query", "query_valid", "validation_error"
+)
+
+# Entities replaced by placeholders: (type, pattern); the value is the last group
+PLACEHOLDER_PATTERNS: List[Tuple[str, "re.Pattern"]] = [
+    ("hash", re.compile(r'\b(?:[a-f0-9]{64}|[a-f0-9]{40}|[a-f0-9]{32})\b', re.IGNORECASE)),
+    ("ip", re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')),
+    ("user", re.compile(r'\b(?:user(?:name)?|account)[:\s]+([a-z0-9_.-]+)\b', re.IGNORECASE)),
+    ("host", re.compile(r'\b(?:host(?:name)?|server|computer)[:\s]+([a-z0-9][a-z0-9_.-]*)\b', re.IGNORECASE)),
+    ("port", re.compile(r'\bport[:\s]+(\d{1,5})\b', re.IGNORECASE)),
+]
+
+# Words after "user"/"host" that describe the question rather than name an entity
+RESERVED_WORDS = {
+    "activity", "activities", "behavior", "behaviour", "action", "actions", "accounts",
+    "login", "logins", "logon", "logons", "metric", "metrics", "performance", "health",
+    "status", "load", "stat", "stats", "creation", "deletion", "modification", "lock",
+    "disabled", "expired", "events", "logs", "errors", "with", "and", "or", "on", "in",
+    "for", "from", "to", "the", "is", "was", "that", "who", "which",
+}
+
+_UNIT_SECONDS = {"minute": 60, "hour": 3600, "day": 86400, "week": 604800, "month": 2592000}
+_UNIT_ALIASES = {"min": "minute", "mins": "minute", "minute": "minute", "hr": "hour", "hrs": "hour",
+                 "hour": "hour", "day": "day", "week": "week", "month": "month"}
+_NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                 "six": 6, "seven": 7, "ten": 10, "twelve": 12, "fifteen": 15, "thirty": 30}
+
+RELATIVE_TIME = re.compile(
+    r'\b(?:(?:in|over|during|for|within)\s+the\s+)?(?:last|past|previous)\s+'
+    r'(?:(\d+|a|an|one|two|three|four|five|six|seven|ten|twelve|fifteen|thirty)\s+)?'
+    r'(mins?|minutes?|hrs?|hours?|days?|weeks?|months?)\b'
+)
+CALENDAR_TIME = re.compile(r'\b(today|yesterday|this\s+(?:hour|day|week|month|year))\b')
+STOPWORDS = {
+    "show", "me", "all", "the", "please", "find", "list", "get", "display", "give",
+    "retrieve", "what", "are", "were", "any", "of", "a", "an", "can", "you", "i", "want",
+    "to", "see", "in", "for"
+}
+_WORD = re.compile(r"[@\w.:\-/]+")
+
+# Dates written in the question: ISO (optionally with a time) or US m/d/y
+DATE_LITERAL = re.compile(
+    r'\b(\d{4})-(\d{1,2})-(\d{1,2})(?:[tT\s](\d{1,2}):(\d{2})(?::(\d{2}))?)?'
+    r'|\b(\d{1,2})/(\d{1,2})/(\d{2,4})\b'
+)
+
+_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?')
+_SLOT = re.compile(r'\\u0000([pt])([^\\]+)\\u0000')
+
+
+@dataclass
+class CanonicalQuery:
+    """A question reduced to its shape plus the entity values cut out of it"""
+    text: str
+    params: List[Tuple[str, str]]
+    calendar: bool = False
+    dates: Tuple[datetime, ...] = ()
+
+    def key(self, scope: str = "") -> str:
+        return f"{scope}|{self.text}" if scope else self.text
+
+
+@dataclass
+class QueryPlan:
+    """Serialized result template with entity and time slots"""
+    template: str
+    param_types: Tuple[str, ...]
+    created_at: float = field(default_factory=time.time)
+    valid_until: Optional[datetime] = None
+    time_range: bool = False  # result had a time_range; re-derived from the question on a hit
+    hits: int = 0
+
+
+def canonicalize(query: str) -> CanonicalQuery:
+    """
+    Lowercase, normalize time phrases and replace entity values with placeholders
+
+    "failed logins last hour" and "show failed logins in the last 1 hour" both
+    become "failed logins @last:1h".
+    """
+    params: List[Tuple[str, str]] = []
+    text = query.strip()
+    dates = _date_literals(text)
+
+    for entity_type, pattern in PLACEHOLDER_PATTERNS:
+        def replace(match: "re.Match") -> str:
+            group = match.lastindex or 0
+            value = match.group(group)
+            if value.lower() in RESERVED_WORDS:
+                return match.group(0)
+            params.append((entity_type, value))
+            start, end = match.start(group) - match.start(), match.end(group) - match.start()
+            whole = match.group(0)
+            return f"{whole[:start]}@{entity_type}{whole[end:]}"
+        text = pattern.sub(replace, text)
+
+    text = text.lower()
+
+    def relative(match: "re.Match") -> str:
+        amount = match.group(1)
+        count = int(amount) if amount and amount.isdigit() else _NUMBER_WORDS.get(amount or "", 1)
+        unit = _UNIT_ALIASES[match.group(2).rstrip("s")]
+        seconds = count * _UNIT_SECONDS[unit]
+        for suffix, size in (("d", 86400), ("h", 3600), ("m", 60)):
+            if seconds % size == 0:
+                return f" @last:{seconds // size}{suffix} "
+        return f" @last:{seconds}s "
+
+    text = RELATIVE_TIME.sub(relative, text)
+    calendar = bool(CALENDAR_TIME.search(text))
+    text = CALENDAR_TIME.sub(lambda m: " @cal:" + re.sub(r"\s+", "_", m.group(1)) + " ", text)
+
+    words = [w.strip(".,?!;:") if not w.startswith("@") else w for w in _WORD.findall(text)]
+    canonical = " ".join(w for w in words if w and w not in STOPWORDS)
+    return CanonicalQuery(text=canonical, params=params, calendar=calendar, dates=dates)
+
+
+def _date_literals(text: str) -> Tuple[datetime, ...]:
+    """Moments a question names outright; date-only literals cover start and end of day"""
+    moments = []
+    for match in DATE_LITERAL.finditer(text):
+        try:
+            if match.group(1):
+                year, month, day, hour, minute, second = match.groups()[:6]
+                moment = datetime(int(year), int(month), int(day),
+                                  int(hour or 0), int(minute or 0), int(second or 0))
+                has_time = hour is not None
+            else:
+                month, day, year = (int(part) for part in match.groups()[6:])
+                moment = datetime(year + 2000 if year < 100 else year, month, day)
+                has_time = False
+        except ValueError:
+            continue
+        moments.append(moment)
+        if not has_time:
+            moments.append(moment.replace(hour=23, minute=59, second=59))
+    return tuple(moments)
+
+
+class QueryPlanCache:
+    """
+    LRU cache of parameterized pipeline results keyed by canonical question
+
+    Plans are only stored when every placeholder value can be located in the
+    result (and nowhere in another spelling), so binding new values reproduces
+    what a full pipeline run would have built. ``time_range`` is re-derived from the
+    question by the time parser on every hit, so calendar phrases stay on their
+    bucket boundaries; other timestamps derived from "now" are stored as offsets
+    from build time and re-anchored. Dates the question names outright stay as
+    written (they are part of the key already).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._plans: "OrderedDict[str, QueryPlan]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "uncacheable": 0,
+            "evictions": 0,
+            "hit_time_total_us": 0.0
+        }
+
+    def lookup(self, canonical: CanonicalQuery, query: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        """Bind ``query``'s values into the cached plan for its shape, or None on a miss"""
+        started = time.perf_counter()
+        key = canonical.key(scope)
+        plan = self._plans.get(key)
+
+        if plan is None or not self._is_fresh(plan) or plan.param_types != tuple(t for t, _ in canonical.params):
+            if plan is not None:
+                self._plans.pop(key, None)
+            self.stats["misses"] += 1
+            return None
+
+        self._plans.move_to_end(key)
+        values = [value for _, value in canonical.params]
+        now = self.clock()
+
+        def fill(match: "re.Match") -> str:
+            if match.group(1) == "p":
+                return json.dumps(values[int(match.group(2))])[1:-1]
+            return (now + timedelta(seconds=float(match.group(2)))).isoformat()
+
+        result = json.loads(_SLOT.sub(fill, plan.template))
+        if plan.time_range:
+            expression = parse_time_expression(query)
+            if expression is not None:
+                result["time_range"] = {
+                    key: value.isoformat() if isinstance(value, datetime) else value
+                    for key, value in expression.window(now).items()
+                }
+        suffix = result.pop("_suffix", None)
+        if suffix is not None:
+            result["processed_query"] = query + suffix
+        _relocate_entities(result.get("entities"), query)
+        plan.hits += 1
+        self.stats["hits"] += 1
+        self.stats["hit_time_total_us"] += (time.perf_counter() - started) * 1e6
+        return result
+
+    def store(
+        self,
+        canonical: CanonicalQuery,
+        query: str,
+        result: Dict[str, Any],
+        built_at: datetime,
+        scope: str = ""
+    ) -> bool:
+        """Parameterize a finished pipeline result and cache it; False if unsafe to reuse"""
+        plan = self._parameterize(canonical, query, result, built_at)
+        if plan is None:
+            self.stats["uncacheable"] += 1
+            return False
+
+        key = canonical.key(scope)
+        self._plans[key] = plan
+        self._plans.move_to_end(key)
+        self.stats["stored"] += 1
+        while len(self._plans) > self.max_entries:
+            self._plans.popitem(last=False)
+            self.stats["evictions"] += 1
+        return True
+
+    def clear(self) -> None:
+        self._plans.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **{k: v for k, v in self.stats.items() if k != "hit_time_total_us"},
+            "entries": len(self._plans),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "avg_hit_us": round(self.stats["hit_time_total_us"] / hits, 1) if hits else 0.0
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _is_fresh(self, plan: QueryPlan) -> bool:
+        if time.time() - plan.created_at > self.ttl_seconds:
+            return False
+        return plan.valid_until is None or self.clock() < plan.valid_until
+
+    def _parameterize(
+        self,
+        canonical: CanonicalQuery,
+        query: str,
+        result: Dict[str, Any],
+        built_at: datetime
+    ) -> Optional[QueryPlan]:
+        values = [value for _, value in canonical.params]
+        if len(set(v.lower() for v in values)) != len(values):
+            return None  # same value twice: can't tell the slots apart
+
+        plan_result = {key: result[key] for key in PLAN_KEYS if key in result}
+        # Aligned bounds can't be shifted by an offset ("today" starts at midnight, not 5h ago)
+        has_time_range = plan_result.pop("time_range", None) is not None
+        processed = plan_result.pop("processed_query", None)
+        if isinstance(processed, str):
+            if not processed.startswith(query):
+                return None
+            plan_result["_suffix"] = processed[len(query):]
+
+        try:
+            template = json.dumps(plan_result, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+        if "\\u0000" in template:
+            return None
+
+        literal = set(canonical.dates)
+
+        def offset(match: "re.Match") -> str:
+            try:
+                moment = datetime.fromisoformat(match.group(0))
+            except ValueError:
+                return match.group(0)
+            if moment.replace(microsecond=0) in literal:
+                return match.group(0)  # a date the user typed, not one derived from "now"
+            return f"\\u0000t{(moment - built_at).total_seconds():.6f}\\u0000"
+
+        template = _TIMESTAMP.sub(offset, template)
+
+        for index, value in enumerate(values):
+            escaped = re.escape(json.dumps(value)[1:-1])
+            pattern = re.compile(r'(?<![\w.\-])' + escaped + r'(?![\w\-]|\.\w)')
+            template, count = pattern.subn(f"\\\\u0000p{index}\\\\u0000", template)
+            # Every value must be located, and no other spelling of it may remain
+            if count == 0 or re.search(escaped, _SLOT.sub("", template), re.IGNORECASE):
+                return None
+
+        valid_until = None
+        if canonical.calendar:
+            # "today"/"this week" plans are anchored to the calendar; drop them at midnight
+            valid_until = (built_at + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        return QueryPlan(
+            template=template,
+            param_types=tuple(t for t, _ in canonical.params),
+            valid_until=valid_until,
+            time_range=has_time_range
+        )
+
+
+def _relocate_entities(entities: Any, query: str) -> None:
+    """Point entity spans at the new question's wording"""
+    if not isinstance(entities, list):
+        return
+    lowered = query.lower()
+    for entity in entities:
+        value = entity.get("value") if isinstance(entity, dict) else None
+        if isinstance(value, str) and value:
+            position = lowered.find(value.lower())
+            if position >= 0:
+                entity["start_pos"] = position
+                entity["end_pos"] = position + len(value)
@@ -0,0 +1,241 @@
+"""
+Field Projection
+Derives the fields each intent/view actually reads and pushes them down to the
+backends (ES ``_source`` includes, Mongo projections, Splunk ``fields``,
+dataset column selection) so whole documents are not shipped around.
+"""
+
+import copy
+import logging
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Entity types whose schema fields every view needs to render a row
+BASE_ENTITY_TYPES = ["timestamp", "severity", "host", "ip_address", "user"]
+
+# Extra entity types pulled in per intent (on top of the extracted entities)
+INTENT_ENTITY_TYPES = {
+    "show_failed_logins": ["event_id"],
+    "show_successful_logins": ["event_id"],
+    "network_traffic": ["port", "domain"],
+    "security_alerts": ["threat", "event_id"],
+    "user_activity": ["event_id", "process_name"],
+    "system_errors": ["event_id", "process_name"],
+    "malware_detection": ["threat", "hash", "file_path", "process_name"],
+    "threat_hunting": ["threat", "hash", "process_name", "domain"],
+    "compliance_check": ["event_id"],
+    "get_system_metrics": [],
+    "search_logs": ["event_id"],
+}
+
+# Explicit fields read by the formatters/calculators of each view
+VIEW_FIELDS = {
+    # ConversationalPipeline.format_results / _format_event and visual cards
+    "event_list": [
+        "@timestamp", "timestamp", "message",
+        "event.action", "event.category", "event.outcome", "event.severity", "event.code",
+        "severity", "log.level",
+        "source.ip", "source.user.name", "destination.ip", "destination.port",
+        "host.name", "user.name", "network.protocol", "network.bytes",
+        "threat.indicator.name", "threat.indicator.type", "file.path",
+        "winlog.event_id",
+        "winlog.event_data.Message", "winlog.event_data.IpAddress",
+        "winlog.event_data.TargetUserName", "winlog.event_data.SubjectUserName",
+        "winlog.event_data.ProcessName", "winlog.event_data.ProcessId",
+        "winlog.user.name",
+    ],
+    # dashboard.get_real_security_metrics
+    "dashboard_metrics": [
+        "@timestamp", "timestamp", "severity", "threat_level",
+        "alert.severity", "alert.status", "alert.title", "alert.category",
+        "event.severity", "event.category", "event.action",
+        "winlog.level", "winlog.event_id",
+    ],
+    # dashboard.get_real_system_uptime
+    "system_inventory": [
+        "@timestamp", "timestamp", "hostname", "ip",
+        "host.hostname", "host.name", "host.ip", "winlog.computer_name",
+    ],
+}
+
+# Bulky fields never worth projecting into a result row
+EXCLUDED_FIELDS = {"event.original", "winlog.event_data", "_raw", "full_log", "payload"}
+
+_MISSING = object()
+
+
+class FieldRequirements:
+    """
+    Resolves the minimal field set an intent/view reads, per platform
+    """
+
+    def __init__(self, schema_mapper=None):
+        """
+        Args:
+            schema_mapper: Optional AdvancedSchemaMapper providing per-platform
+                entity type -> field mappings
+        """
+        self.schema_mapper = schema_mapper
+        self._cache: Dict[Tuple, List[str]] = {}
+        self.stats = {"resolved": 0, "cache_hits": 0}
+
+        if self.schema_mapper is None:
+            try:
+                from ..nlp.advanced_schema_mapper import AdvancedSchemaMapper
+                self.schema_mapper = AdvancedSchemaMapper()
+            except Exception as e:
+                logger.warning(f"Advanced schema mapper unavailable for projections: {e}")
+
+    def fields_for(
+        self,
+        intent: Optional[str] = None,
+        view: str = "event_list",
+        platform: str = "elasticsearch",
+        field_mappings: Optional[Dict[str, List[str]]] = None
+    ) -> List[str]:
+        """
+        Get the fields required to answer an intent in a given view
+
+        Args:
+            intent: Query intent (enum value string)
+            view: Consumer view name (see VIEW_FIELDS)
+            platform: Target SIEM platform
+            field_mappings: Entity field mappings from SchemaMapper.map_entities
+
+        Returns:
+            Ordered list of field names
+        """
+        mapping_key = tuple(sorted(
+            (entity_type, tuple(fields)) for entity_type, fields in (field_mappings or {}).items()
+        ))
+        key = (intent, view, platform, mapping_key)
+        if key in self._cache:
+            self.stats["cache_hits"] += 1
+            return list(self._cache[key])
+
+        fields: List[str] = []
+        if platform == "elasticsearch":
+            fields.extend(VIEW_FIELDS.get(view, VIEW_FIELDS["event_list"]))
+
+        if view == "event_list":
+            entity_types = BASE_ENTITY_TYPES + INTENT_ENTITY_TYPES.get(intent or "", [])
+            platform_fields = self._platform_fields(platform)
+            for entity_type in entity_types:
+                fields.extend(platform_fields.get(entity_type, []))
+
+        for entity_fields in (field_mappings or {}).values():
+            for field in entity_fields:
+                # SchemaMapper encodes fixed values as "field:value"
+                fields.append(field.split(":", 1)[0])
+
+        resolved = self._dedupe(fields)
+        self._cache[key] = resolved
+        self.stats["resolved"] += 1
+        return list(resolved)
+
+    def _platform_fields(self, platform: str) -> Dict[str, List[str]]:
+        if not self.schema_mapper:
+            return {}
+        return getattr(self.schema_mapper, "field_mappings", {}).get(platform, {})
+
+    @staticmethod
+    def _dedupe(fields: Iterable[str]) -> List[str]:
+        seen = set()
+        result = []
+        for field in fields:
+            if not field or field in seen or field in EXCLUDED_FIELDS:
+                continue
+            seen.add(field)
+            result.append(field)
+        return result
+
+
+def get_source_includes(query: Any) -> Optional[List[str]]:
+    """Return the ``_source`` includes of an ES-style query, if any"""
+    if not isinstance(query, dict):
+        return None
+    source = query.get("_source")
+    if isinstance(source, dict):
+        includes = source.get("includes")
+    elif isinstance(source, list):
+        includes = source
+    else:
+        return None
+    return list(includes) if includes else None
+
+
+def apply_source_filter(query: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    Attach ``_source`` includes to an ES-style query
+
+    Leaves the query untouched when the caller already chose a ``_source``
+    or when the query only returns aggregations (``size: 0``).
+    """
+    if not isinstance(query, dict) or not fields:
+        return query
+    if "_source" in query or query.get("size") == 0:
+        return query
+    projected = dict(query)
+    projected["_source"] = {"includes": list(fields)}
+    return projected
+
+
+def strip_source_filter(query: Any) -> Any:
+    """Return the query without its ``_source`` directive"""
+    if isinstance(query, dict) and "_source" in query:
+        return {key: value for key, value in query.items() if key != "_source"}
+    return query
+
+
+def to_mongo_projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """Translate included fields to a MongoDB projection document"""
+    if not fields:
+        return None
+    projection = {}
+    for field in sorted(fields, key=len):
+        # Mongo rejects overlapping paths such as "host" and "host.name"
+        if any(field.startswith(parent + ".") for parent in projection):
+            continue
+        projection[field] = 1
+    return projection
+
+
+def project_document(document: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    Keep only the given dotted paths of a document
+
+    Both nested (``{"host": {"name": ..}}``) and flattened (``{"host.name": ..}``)
+    layouts are supported; the original layout is preserved.
+    """
+    if not fields or not isinstance(document, dict):
+        return document
+
+    projected: Dict[str, Any] = {}
+    for field in fields:
+        if field in document:
+            projected[field] = document[field]
+            continue
+
+        parts = field.split(".")
+        value = document
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                value = _MISSING
+                break
+            value = value[part]
+        if value is _MISSING:
+            continue
+
+        target = projected
+        for part in parts[:-1]:
+            existing = target.get(part)
+            if not isinstance(existing, dict):
+                existing = {}
+                target[part] = existing
+            target = existing
+        target[parts[-1]] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+    return projected
+
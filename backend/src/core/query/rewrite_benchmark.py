@@ -0,0 +1,140 @@
+"""
+Query Rewrite Benchmark
+Estimated-cost and mock-cluster comparison of search bodies before and after QueryRewriter.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Tuple, Optional, Any
+
+from .rewriter import QueryRewriter
+
+# (intent, search body) pairs shaped like the output of the repo's query builders
+SAMPLE_QUERIES: List[Tuple[str, Dict[str, Any]]] = [
+    ("show_failed_logins", {
+        "query": {"bool": {"must": [
+            {"match": {"event.outcome": "failure"}},
+            {"terms": {"event.code": ["4625", "4771"]}},
+            {"wildcard": {"user.name": "admin"}},
+        ]}},
+        "size": 100,
+        "sort": [{"@timestamp": {"order": "desc"}}],
+    }),
+    ("network_traffic", {
+        "query": {"bool": {
+            "must": [{"wildcard": {"source.ip": "*10.0.0.5*"}}, {"range": {"destination.port": {"gte": 1024}}}],
+            "should": [
+                {"term": {"destination.ip": "8.8.8.8"}},
+                {"term": {"destination.ip": "1.1.1.1"}},
+                {"term": {"destination.ip": "9.9.9.9"}},
+            ],
+            "minimum_should_match": 1,
+        }},
+        "size": 200,
+        "sort": [{"@timestamp": {"order": "desc"}}],
+    }),
+    ("security_alerts", {
+        "query": {"query_string": {"query": "event.category:intrusion_detection AND log.level:(critical OR high)"}},
+        "size": 50,
+    }),
+    ("user_activity", {
+        "query": {"bool": {
+            "must": [{"match": {"user.name": "jsmith"}}, {"match": {"message": "privilege escalation"}}],
+            "filter": [{"range": {"@timestamp": {"gte": "now-7d"}}}],
+        }},
+        "size": 100,
+    }),
+    ("malware_detection", {
+        "query": {"bool": {"must": [
+            {"query_string": {"query": "*mimikatz*"}},
+            {"exists": {"field": "file.hash.sha256"}},
+        ]}},
+        "size": 100,
+        "sort": [{"@timestamp": {"order": "desc"}}],
+    }),
+    ("search_logs", {"query": {"match_all": {}}, "size": 500}),
+]
+
+
+def evaluate(
+    rewriter: Optional[QueryRewriter] = None,
+    corpus: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
+    connector: Any = None,
+    rounds: int = 5
+) -> Dict[str, Any]:
+    """
+    Compare estimated cost (and mock execution, if a connector is given) before and after rewriting
+
+    Args:
+        rewriter: Rewriter to evaluate (a fresh one by default)
+        corpus: (intent, search body) pairs (SAMPLE_QUERIES by default)
+        connector: Connected connector exposing ``execute_query`` (e.g. MockSIEMConnector)
+        rounds: Timed executions per query and form
+
+    Returns:
+        Per-query and total cost figures
+    """
+    rewriter = rewriter or QueryRewriter()
+    corpus = corpus or SAMPLE_QUERIES
+    rows = []
+
+    for intent, query in corpus:
+        rewritten, report = rewriter.rewrite(query, intent)
+        row = {"intent": intent, **report.as_dict()}
+        if connector is not None:
+            row["execution"] = {
+                "before": asyncio.run(_execute(connector, query, rounds)),
+                "after": asyncio.run(_execute(connector, rewritten, rounds)),
+            }
+        rows.append(row)
+
+    before = sum(row["cost_before"] for row in rows)
+    after = sum(row["cost_after"] for row in rows)
+    return {
+        "queries": len(rows),
+        "rewritten": sum(1 for row in rows if row["rules"] and row["accepted"]),
+        "cost_before": round(before, 2),
+        "cost_after": round(after, 2),
+        "reduction": round(1 - after / before, 3) if before else 0.0,
+        "results": rows,
+    }
+
+
+async def _execute(connector: Any, query: Dict[str, Any], rounds: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    payload = 0
+    for _ in range(max(1, rounds)):
+        response = await connector.execute_query(query)
+        payload += len(json.dumps(response, default=str))
+    elapsed = time.perf_counter() - started
+    return {
+        "mean_latency_ms": round(elapsed / max(1, rounds) * 1000, 2),
+        "mean_response_bytes": payload // max(1, rounds),
+    }
+
+
+async def _mock_connector() -> Any:
+    from ...connectors.mock_connector import MockSIEMConnector
+    connector = MockSIEMConnector(name="rewrite_benchmark")
+    if not await connector.connect():
+        raise RuntimeError("mock cluster unavailable")
+    return connector
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """``python -m src.core.query.rewrite_benchmark [--execute]``"""
+    parser = argparse.ArgumentParser(description="Benchmark cost-based query rewriting")
+    parser.add_argument("--execute", action="store_true", help="also run both forms against the mock cluster")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    connector = asyncio.run(_mock_connector()) if args.execute else None
+    report = evaluate(connector=connector, rounds=args.rounds)
+    print(json.dumps(report, indent=2))
+    return 0 if report["cost_after"] <= report["cost_before"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
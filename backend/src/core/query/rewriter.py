@@ -0,0 +1,435 @@
+"""
+Query Rewriter
+Rule-based Elasticsearch DSL rewrites guided by QueryValidator.estimate_cost:
+filter context for non-scoring clauses, exact-match terms instead of wildcards and
+query_string, collapsed should terms, bounded time ranges and lean list-view responses.
+"""
+
+import copy
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+
+from .validator import QueryValidator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_WINDOW = "24h"
+TIMESTAMP_FIELD = "@timestamp"
+
+# Field types a term query matches exactly (no analysis)
+EXACT_TYPES = {"keyword", "constant_keyword", "ip", "long", "integer", "short", "byte", "boolean"}
+# Exact types whose values never contain wildcard-meaningful text, so "*v*" can only mean "v"
+ATOMIC_TYPES = {"ip", "long", "integer", "short", "byte", "boolean"}
+
+# ECS fields and their usual mapping types, used when no live mapping is supplied
+DEFAULT_FIELD_TYPES: Dict[str, str] = {
+    "source.ip": "ip", "destination.ip": "ip", "host.ip": "ip", "client.ip": "ip", "server.ip": "ip",
+    "source.port": "long", "destination.port": "long", "winlog.event_id": "long",
+    "user.name": "keyword", "source.user.name": "keyword", "destination.user.name": "keyword",
+    "user.domain": "keyword", "user.id": "keyword", "host.name": "keyword", "host.hostname": "keyword",
+    "agent.hostname": "keyword", "event.code": "keyword", "event.outcome": "keyword",
+    "event.category": "keyword", "event.type": "keyword", "event.action": "keyword",
+    "event.dataset": "keyword", "event.module": "keyword", "log.level": "keyword",
+    "network.protocol": "keyword", "network.transport": "keyword", "process.name": "keyword",
+    "file.hash.md5": "keyword", "file.hash.sha1": "keyword", "file.hash.sha256": "keyword",
+    "winlog.channel": "keyword", "winlog.computer_name": "keyword",
+    "winlog.event_data.TargetUserName": "keyword", "winlog.event_data.IpAddress": "keyword",
+    "rule.level": "long", "agent.name": "keyword",
+}
+
+# Clause types whose relevance score carries no information
+NON_SCORING_CLAUSES = {"term", "terms", "range", "exists", "ids", "prefix", "wildcard", "regexp", "geo_distance"}
+
+_OCCURS = ("must", "filter", "should", "must_not")
+_QS_CLAUSE = re.compile(r'^\s*([\w.@]+)\s*:\s*(?:"([^"]*)"|\(([^()]*)\)|([^\s()"]+))\s*$')
+_QS_AND = re.compile(r'\s+(?:AND|&&)\s+')
+_QS_OR = re.compile(r'\s+(?:OR|\|\|)\s+')
+# Unquoted values with Lucene syntax (ranges, fuzziness, boosts, regex, escapes) are not plain terms
+_QS_SYNTAX = re.compile(r'[><=~^/\[\]{}:\\]|^[+\-!]')
+
+
+def field_types_from_mapping(mapping: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    """Flatten an ES ``properties`` mapping (including multi-fields) into {field: type}"""
+    types: Dict[str, str] = {}
+    properties = mapping.get("properties", mapping) if isinstance(mapping, dict) else {}
+    for name, definition in properties.items():
+        if not isinstance(definition, dict):
+            continue
+        path = f"{prefix}{name}"
+        if "type" in definition:
+            types[path] = definition["type"]
+        for sub_name, sub_definition in definition.get("fields", {}).items():
+            if isinstance(sub_definition, dict) and "type" in sub_definition:
+                types[f"{path}.{sub_name}"] = sub_definition["type"]
+        if "properties" in definition:
+            types.update(field_types_from_mapping(definition, f"{path}."))
+    return types
+
+
+@dataclass
+class RewriteReport:
+    """What the rewriter did to one query"""
+    rules: List[str] = field(default_factory=list)
+    cost_before: float = 0.0
+    cost_after: float = 0.0
+    accepted: bool = True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rules": list(self.rules),
+            "cost_before": self.cost_before,
+            "cost_after": self.cost_after,
+            "reduction": round(1 - self.cost_after / self.cost_before, 3) if self.cost_before else 0.0,
+            "accepted": self.accepted
+        }
+
+
+class QueryRewriter:
+    """
+    Cost-based rewriter for Elasticsearch search bodies
+
+    Each rule is semantics-preserving for the rows returned (scores may change
+    where the ordering does not depend on them). The rewritten query is only
+    kept if ``estimate_cost`` does not rate it more expensive than the input.
+    """
+
+    # Term conversion runs first so the clauses it produces can still leave scoring context
+    RULES = ("exact_match_terms", "must_to_filter", "collapse_should_terms", "clamp_time_range", "list_view_limits")
+
+    def __init__(
+        self,
+        validator: Optional[QueryValidator] = None,
+        field_types: Optional[Dict[str, str]] = None,
+        time_defaults: Optional[Dict[str, str]] = None,
+        field_requirements=None
+    ):
+        self.validator = validator or QueryValidator()
+        self.field_types = {**DEFAULT_FIELD_TYPES, **(field_types or {})}
+        self.time_defaults = time_defaults if time_defaults is not None else self._load_time_defaults()
+        self.field_requirements = field_requirements
+        self.stats = {
+            "rewritten": 0,
+            "unchanged": 0,
+            "rejected": 0,
+            "rules": {rule: 0 for rule in self.RULES}
+        }
+
+    def update_field_types(self, mapping: Dict[str, Any]) -> None:
+        """Learn field types from a live index mapping"""
+        self.field_types.update(field_types_from_mapping(mapping))
+
+    def rewrite(
+        self,
+        query: Dict[str, Any],
+        intent: Optional[str] = None,
+        view: str = "event_list"
+    ) -> Tuple[Dict[str, Any], RewriteReport]:
+        """
+        Apply the rewrite rules to an ES search body
+
+        Args:
+            query: Search body (left untouched)
+            intent: Query intent, for the default time window and projection
+            view: Consumer of the results; list views drop hit counting
+
+        Returns:
+            Tuple of (rewritten query, report)
+        """
+        report = RewriteReport()
+        if not isinstance(query, dict) or not isinstance(query.get("query"), dict):
+            return query, report
+
+        report.cost_before = self.validator.estimate_cost(query)["cost_units"]
+        rewritten = copy.deepcopy(query)
+        for rule in self.RULES:
+            try:
+                if getattr(self, f"_{rule}")(rewritten, intent, view):
+                    report.rules.append(rule)
+            except Exception as e:
+                logger.error(f"Query rewrite rule {rule} failed: {e}")
+        report.cost_after = self.validator.estimate_cost(rewritten)["cost_units"]
+
+        if not report.rules:
+            self.stats["unchanged"] += 1
+            return query, report
+
+        if report.cost_after > report.cost_before:
+            report.accepted = False
+            self.stats["rejected"] += 1
+            logger.info(f"💰 Rewrite rejected, cost {report.cost_before} → {report.cost_after}")
+            return query, report
+
+        self.stats["rewritten"] += 1
+        for rule in report.rules:
+            self.stats["rules"][rule] += 1
+        logger.info(f"💰 Query cost {report.cost_before} → {report.cost_after} ({', '.join(report.rules)})")
+        return rewritten, report
+
+    def get_stats(self) -> Dict[str, Any]:
+        return copy.deepcopy(self.stats)
+
+    # ------------------------------------------------------------------
+    # Rules
+    # ------------------------------------------------------------------
+
+    def _must_to_filter(self, query: Dict[str, Any], intent: Optional[str], view: str) -> bool:
+        """Move clauses whose score is unused into filter context, where results are cached"""
+        score_matters = self._sorted_by_score(query) or "min_score" in query or "rescore" in query
+        changed = False
+        for bool_query in self._bools(query["query"]):
+            must = self._clauses(bool_query, "must")
+            if not must:
+                continue
+            keep = [c for c in must if score_matters and not self._constant_score(c)]
+            moved = [c for c in must if c not in keep]
+            if moved:
+                bool_query["filter"] = self._clauses(bool_query, "filter") + moved
+                bool_query["must"] = keep
+                changed = True
+        return changed
+
+    def _exact_match_terms(self, query: Dict[str, Any], intent: Optional[str], view: str) -> bool:
+        """Turn wildcard, match and query_string clauses into term/terms where the mapping allows"""
+        changed = False
+
+        def convert(clause: Any) -> Any:
+            nonlocal changed
+            replacement = self._exact_clause(clause)
+            if replacement is not None:
+                changed = True
+                return replacement
+            return clause
+
+        query["query"] = convert(query["query"])
+        for bool_query in self._bools(query["query"]):
+            for occur in _OCCURS:
+                if occur in bool_query:
+                    bool_query[occur] = [convert(c) for c in self._clauses(bool_query, occur)]
+        return changed
+
+    def _collapse_should_terms(self, query: Dict[str, Any], intent: Optional[str], view: str) -> bool:
+        """Collapse repeated should term clauses on one field into a single terms clause"""
+        changed = False
+        for bool_query in self._bools(query["query"]):
+            if str(bool_query.get("minimum_should_match", 1)) != "1":
+                continue
+            should = self._clauses(bool_query, "should")
+            values: Dict[str, List[Any]] = {}
+            for clause in should:
+                field_name, field_values = self._term_values(clause)
+                if field_name:
+                    values.setdefault(field_name, []).extend(field_values)
+
+            collapsible = {f for f, v in values.items() if sum(1 for c in should if self._term_values(c)[0] == f) > 1}
+            if not collapsible:
+                continue
+
+            collapsed, emitted = [], set()
+            for clause in should:
+                field_name = self._term_values(clause)[0]
+                if field_name not in collapsible:
+                    collapsed.append(clause)
+                elif field_name not in emitted:
+                    emitted.add(field_name)
+                    collapsed.append({"terms": {field_name: list(dict.fromkeys(values[field_name]))}})
+            bool_query["should"] = collapsed
+            changed = True
+        return changed
+
+    def _clamp_time_range(self, query: Dict[str, Any], intent: Optional[str], view: str) -> bool:
+        """Bound queries without a lower time limit to the intent's default window"""
+        range_def = self.validator._find_time_range(query["query"])
+        if range_def is not None and ("gte" in range_def or "gt" in range_def):
+            return False  # the user's bound stands, even in a form we cannot read
+
+        lower = f"now-{self.time_defaults.get(intent or '', DEFAULT_TIME_WINDOW)}"
+        if range_def is not None:
+            range_def["gte"] = lower
+            return True
+
+        root = query["query"]
+        time_filter = {"range": {TIMESTAMP_FIELD: {"gte": lower}}}
+        if "bool" in root and isinstance(root["bool"], dict):
+            root["bool"]["filter"] = self._clauses(root["bool"], "filter") + [time_filter]
+        elif "match_all" in root or not root:
+            query["query"] = {"bool": {"filter": [time_filter]}}
+        else:
+            query["query"] = {"bool": {"must": [root], "filter": [time_filter]}}
+        return True
+
+    def _list_view_limits(self, query: Dict[str, Any], intent: Optional[str], view: str) -> bool:
+        """Event lists neither need an exact hit count nor whole documents"""
+        if view != "event_list" or query.get("size", 1) == 0:
+            return False
+        changed = False
+        if "track_total_hits" not in query:
+            query["track_total_hits"] = False
+            changed = True
+        if "_source" not in query and self.field_requirements is not None:
+            from .projection import apply_source_filter
+            fields = self.field_requirements.fields_for(intent=intent or "search_logs", view=view)
+            if fields:
+                query.update(apply_source_filter(query, fields))
+                changed = True
+        return changed
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _exact_clause(self, clause: Any) -> Optional[Dict[str, Any]]:
+        """Exact-match equivalent of a wildcard/match/query_string clause, or None"""
+        clause_type = self._clause_type(clause)
+        if clause_type in ("wildcard", "match"):
+            body = clause[clause_type]
+            if not isinstance(body, dict) or len(body) != 1:
+                return None
+            field_name, spec = next(iter(body.items()))
+            key = "value" if clause_type == "wildcard" else "query"
+            if isinstance(spec, dict):
+                if set(spec) != {key}:
+                    return None  # boost, fuzziness, operator... keep as written
+                spec = spec[key]
+            field_type = self.field_types.get(field_name)
+            if field_type not in EXACT_TYPES or isinstance(spec, (dict, list)):
+                return None
+
+            if clause_type == "match":
+                return {"term": {field_name: spec}}
+            value = self._exact_wildcard_value(str(spec), field_type)
+            if value is not None:
+                return {"term": {field_name: value}}
+            if re.fullmatch(r'[^*?]+\*', str(spec)):
+                return {"prefix": {field_name: str(spec)[:-1]}}
+            return None
+
+        if clause_type == "query_string":
+            return self._query_string_terms(clause["query_string"])
+        return None
+
+    def _query_string_terms(self, body: Any) -> Optional[Dict[str, Any]]:
+        """``a:x AND b:(y OR z)`` on exact fields → term/terms filters"""
+        if not isinstance(body, dict) or set(body) - {"query", "default_operator", "analyze_wildcard"}:
+            return None
+        text = body.get("query")
+        if not isinstance(text, str) or not text.strip():
+            return None
+        if _QS_OR.search(_QS_AND.sub(" ", re.sub(r'\([^()]*\)', "", text))):
+            return None  # top-level OR
+
+        clauses = []
+        for part in _QS_AND.split(text.strip()):
+            match = _QS_CLAUSE.match(part)
+            if not match:
+                return None
+            field_name = match.group(1)
+            field_type = self.field_types.get(field_name)
+            if field_type not in EXACT_TYPES:
+                return None
+            if match.group(3) is not None:
+                raw_values = [v.strip() for v in _QS_OR.split(match.group(3).strip())]
+            elif match.group(2) is not None:
+                raw_values = [f'"{match.group(2)}"']
+            else:
+                raw_values = [match.group(4)]
+
+            values = []
+            for raw in raw_values:
+                if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+                    value = raw[1:-1]
+                elif '"' in raw or _QS_SYNTAX.search(raw):
+                    return None  # >4624, admin~, admin^2... mean more than the literal text
+                else:
+                    value = self._exact_wildcard_value(raw, field_type)
+                if not value:
+                    return None
+                values.append(value)
+            clauses.append({"term": {field_name: values[0]}} if len(values) == 1 else {"terms": {field_name: values}})
+
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"bool": {"filter": clauses}}
+
+    @staticmethod
+    def _exact_wildcard_value(pattern: str, field_type: str) -> Optional[str]:
+        """The exact value a wildcard pattern is equivalent to on this field type, if any"""
+        if not re.search(r'[*?]', pattern):
+            return pattern.replace("\\", "")
+        if field_type in ATOMIC_TYPES:
+            # "*10.0.0.1*" on an ip field can only ever match 10.0.0.1
+            stripped = pattern.strip("*")
+            if stripped and not re.search(r'[*?]', stripped):
+                return stripped
+        return None
+
+    @staticmethod
+    def _term_values(clause: Any) -> Tuple[Optional[str], List[Any]]:
+        """(field, values) for a plain single-field term/terms clause"""
+        if not isinstance(clause, dict) or len(clause) != 1:
+            return None, []
+        clause_type, body = next(iter(clause.items()))
+        if clause_type not in ("term", "terms") or not isinstance(body, dict) or len(body) != 1:
+            return None, []
+        field_name, spec = next(iter(body.items()))
+        if clause_type == "term":
+            if isinstance(spec, dict):
+                if set(spec) != {"value"}:
+                    return None, []
+                spec = spec["value"]
+            return (field_name, [spec]) if not isinstance(spec, (dict, list)) else (None, [])
+        return (field_name, list(spec)) if isinstance(spec, list) else (None, [])
+
+    @staticmethod
+    def _sorted_by_score(query: Dict[str, Any]) -> bool:
+        sort = query.get("sort")
+        if not sort:
+            return True
+        first = sort[0] if isinstance(sort, list) else sort
+        if isinstance(first, dict):
+            first = next(iter(first), "_score")
+        return first == "_score"
+
+    def _constant_score(self, clause: Any) -> bool:
+        """Clause that scores every hit the same (a bool of filters counts)"""
+        clause_type = self._clause_type(clause)
+        if clause_type == "bool":
+            return isinstance(clause["bool"], dict) and not set(clause["bool"]) & {"must", "should"}
+        return clause_type in NON_SCORING_CLAUSES
+
+    @staticmethod
+    def _clause_type(clause: Any) -> Optional[str]:
+        if isinstance(clause, dict) and len(clause) == 1:
+            return next(iter(clause))
+        return None
+
+    @staticmethod
+    def _clauses(bool_query: Dict[str, Any], occur: str) -> List[Any]:
+        clauses = bool_query.get(occur, [])
+        return list(clauses) if isinstance(clauses, list) else [clauses]
+
+    def _bools(self, node: Any) -> Iterator[Dict[str, Any]]:
+        """Every bool body in a query tree, outermost first"""
+        if not isinstance(node, dict):
+            return
+        bool_query = node.get("bool")
+        if isinstance(bool_query, dict):
+            yield bool_query
+            for occur in _OCCURS:
+                for clause in self._clauses(bool_query, occur):
+                    yield from self._bools(clause)
+
+    @staticmethod
+    def _load_time_defaults() -> Dict[str, str]:
+        """Routine-monitoring window per intent from the smart defaults engine"""
+        try:
+            from ..nlp.smart_defaults import SecurityContext, SmartDefaultsEngine
+            defaults = SmartDefaultsEngine().time_defaults
+            return {
+                intent: windows.get(SecurityContext.ROUTINE_MONITORING, DEFAULT_TIME_WINDOW)
+                for intent, windows in defaults.items()
+            }
+        except Exception as e:
+            logger.debug(f"Smart time defaults unavailable: {e}")
+            return {}
@@ -8,9 +8,14 @@ import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from enum import Enum
-import re
 
 from ..platform.detector import RobustPlatformDetector, PlatformType, DataSourceType
+from .codegen import get_translation_cache
+from .ir import (
+    QueryIR, IRBuilder, SortKey, TimeRange,
+    any_of, exists, match, multi_match, optimize, phrase, terms
+)
+from ..nlp.time_parser import parse_time_expression
 
 logger = logging.getLogger(__name__)
 
@@ -98,6 +103,24 @@ class UniversalQueryBuilder:
         """
         Build universal query that adapts to detected platform.
         """
+        ir = await self.build_ir(intent, query_text, entities, time_range, limit)
+        query_dsl = get_translation_cache().lower(ir, "elasticsearch")
+        
+        logger.info(f"✅ Built query targeting {len(self.platform_info.available_indices)} indices")
+        
+        return query_dsl
+    
+    async def build_ir(
+        self,
+        intent: QueryIntent,
+        query_text: str = "",
+        entities: List[Dict[str, Any]] = None,
+        time_range: str = "1h",
+        limit: int = 100
+    ) -> QueryIR:
+        """
+        Build the backend-neutral query once; ``build_query`` lowers it to Elasticsearch DSL.
+        """
         entities = entities or []
         
         # Get platform info
@@ -107,51 +130,37 @@ class UniversalQueryBuilder:
         logger.info(f"🔨 Building {intent.value} query for {self.platform_info.platform_type.value}")
         
         # Build base query structure
-        query_dsl = self._build_base_query()
+        query = self._build_base_query()
         
         # Add intent-specific filters
-        self._add_intent_filters(query_dsl, intent)
+        self._add_intent_filters(query, intent)
         
         # Add entity filters
-        self._add_entity_filters(query_dsl, entities)
+        self._add_entity_filters(query, entities)
         
         # Add time filter
-        self._add_time_filter(query_dsl, time_range)
+        self._add_time_filter(query, time_range)
         
         # Add text search if provided
         if query_text:
-            self._add_text_search(query_dsl, query_text)
+            self._add_text_search(query, query_text)
         
         # Set result size
-        query_dsl["size"] = limit
+        query.size = limit
         
         # Add sorting
-        self._add_sorting(query_dsl)
+        self._add_sorting(query)
         
-        logger.info(f"✅ Built query targeting {len(self.platform_info.available_indices)} indices")
-        
-        return query_dsl
+        return optimize(query.build())
     
-    def _build_base_query(self) -> Dict[str, Any]:
-        """Build base Elasticsearch query structure"""
-        return {
-            "query": {
-                "bool": {
-                    "must": [],
-                    "should": [],
-                    "filter": [],
-                    "must_not": [],
-                    "minimum_should_match": 0
-                }
-            },
-            "size": 100,
-            "sort": [],
-            "_source": {
-                "excludes": ["@metadata", "agent.ephemeral_id", "ecs.version"]
-            }
-        }
+    def _build_base_query(self) -> IRBuilder:
+        """Build base query structure"""
+        query = IRBuilder(size=100)
+        query.minimum_should_match = 0
+        query.excludes = ["@metadata", "agent.ephemeral_id", "ecs.version"]
+        return query
     
-    def _add_intent_filters(self, query_dsl: Dict[str, Any], intent: QueryIntent):
+    def _add_intent_filters(self, query: IRBuilder, intent: QueryIntent):
         """Add filters based on intent and detected platform"""
         if intent not in self.intent_patterns:
             return
@@ -162,25 +171,23 @@ class UniversalQueryBuilder:
         field_mappings = self.platform_info.field_mappings
         
         # Strategy 1: Use detected field mappings for precise queries
-        self._add_mapped_field_filters(query_dsl, intent, patterns, field_mappings)
+        self._add_mapped_field_filters(query, intent, patterns, field_mappings)
         
         # Strategy 2: Add platform-specific filters
         if platform_type == PlatformType.WINDOWS and DataSourceType.BEATS in data_sources:
-            self._add_windows_beats_filters(query_dsl, patterns)
+            self._add_windows_beats_filters(query, patterns)
         elif platform_type == PlatformType.LINUX and DataSourceType.SYSLOG in data_sources:
-            self._add_linux_syslog_filters(query_dsl, patterns)
+            self._add_linux_syslog_filters(query, patterns)
         
         # Strategy 3: Add generic ECS filters
         if DataSourceType.ECS in data_sources:
-            self._add_ecs_filters(query_dsl, patterns)
+            self._add_ecs_filters(query, patterns)
         
         # Strategy 4: Add keyword-based fallback (last resort)
-        self._add_keyword_filters(query_dsl, patterns)
+        self._add_keyword_filters(query, patterns)
     
-    def _add_mapped_field_filters(self, query_dsl: Dict[str, Any], intent: QueryIntent, patterns: Dict, field_mappings: Dict[str, str]):
+    def _add_mapped_field_filters(self, query: IRBuilder, intent: QueryIntent, patterns: Dict, field_mappings: Dict[str, str]):
         """Use dynamically detected field mappings"""
-        bool_query = query_dsl["query"]["bool"]
-        
         # Use event_id field if detected
         if "event_id" in field_mappings:
             event_field = field_mappings["event_id"]
@@ -189,125 +196,83 @@ class UniversalQueryBuilder:
             if intent in [QueryIntent.FAILED_LOGINS, QueryIntent.SUCCESSFUL_LOGINS, QueryIntent.AUTHENTICATION_EVENTS]:
                 event_ids = patterns.get("windows_events", [])
                 if event_ids:
-                    bool_query["should"].append({
-                        "terms": {event_field: event_ids}
-                    })
+                    query.should.append(terms(event_field, event_ids))
         
         # Use event_category if detected
         if "event_category" in field_mappings:
             category_field = field_mappings["event_category"]
             categories = patterns.get("event_categories", [])
             if categories:
-                bool_query["should"].append({
-                    "terms": {category_field: categories}
-                })
+                query.should.append(terms(category_field, categories))
         
         # Use username field if detected
         if "username" in field_mappings and intent in [QueryIntent.AUTHENTICATION_EVENTS, QueryIntent.USER_ACTIVITY]:
-            user_field = field_mappings["username"]
-            bool_query["must"].append({
-                "exists": {"field": user_field}
-            })
+            query.must.append(exists(field_mappings["username"]))
     
-    def _add_windows_beats_filters(self, query_dsl: Dict[str, Any], patterns: Dict):
+    def _add_windows_beats_filters(self, query: IRBuilder, patterns: Dict):
         """Add Windows Beats-specific filters"""
-        bool_query = query_dsl["query"]["bool"]
-        
         # Check if winlogbeat indices are available
         winlogbeat_indices = [idx for idx in self.platform_info.available_indices 
                              if "winlogbeat" in idx.lower()]
         
         if winlogbeat_indices:
             # Add Windows-specific filters
-            bool_query["must"].append({
-                "match": {"agent.type": "winlogbeat"}
-            })
+            query.must.append(match("agent.type", "winlogbeat"))
             
             # Add Windows event IDs if available
             event_ids = patterns.get("windows_events", [])
             if event_ids:
-                bool_query["should"].append({
-                    "terms": {"winlog.event_id": event_ids}
-                })
-                bool_query["should"].append({
-                    "terms": {"event.code": event_ids}
-                })
+                query.should.append(terms("winlog.event_id", event_ids))
+                query.should.append(terms("event.code", event_ids))
     
-    def _add_linux_syslog_filters(self, query_dsl: Dict[str, Any], patterns: Dict):
+    def _add_linux_syslog_filters(self, query: IRBuilder, patterns: Dict):
         """Add Linux syslog-specific filters"""
-        bool_query = query_dsl["query"]["bool"]
-        
         # Add syslog-specific filters
-        linux_patterns = patterns.get("linux_patterns", [])
-        if linux_patterns:
-            for pattern in linux_patterns:
-                bool_query["should"].append({
-                    "match_phrase": {"message": pattern}
-                })
+        for pattern in patterns.get("linux_patterns", []):
+            query.should.append(phrase("message", pattern))
         
         # Add common syslog fields
-        bool_query["should"].extend([
-            {"exists": {"field": "syslog.facility"}},
-            {"exists": {"field": "log.syslog.facility.name"}},
-            {"match": {"input.type": "log"}}
+        query.should.extend([
+            exists("syslog.facility"),
+            exists("log.syslog.facility.name"),
+            match("input.type", "log")
         ])
     
-    def _add_ecs_filters(self, query_dsl: Dict[str, Any], patterns: Dict):
+    def _add_ecs_filters(self, query: IRBuilder, patterns: Dict):
         """Add ECS (Elastic Common Schema) filters"""
-        bool_query = query_dsl["query"]["bool"]
-        
         # Use ECS event categories
         categories = patterns.get("event_categories", [])
         if categories:
-            bool_query["should"].append({
-                "terms": {"event.category": categories}
-            })
+            query.should.append(terms("event.category", categories))
         
         # Use ECS event outcomes for authentication
         if "authentication" in str(patterns).lower():
-            bool_query["should"].extend([
-                {"match": {"event.outcome": "success"}},
-                {"match": {"event.outcome": "failure"}}
+            query.should.extend([
+                match("event.outcome", "success"),
+                match("event.outcome", "failure")
             ])
     
-    def _add_keyword_filters(self, query_dsl: Dict[str, Any], patterns: Dict):
+    def _add_keyword_filters(self, query: IRBuilder, patterns: Dict):
         """Add keyword-based filters as fallback"""
-        bool_query = query_dsl["query"]["bool"]
-        
         keywords = patterns.get("keywords", [])
         if keywords:
             # Create multi-field keyword search
-            keyword_queries = []
-            for keyword in keywords:
-                keyword_queries.append({
-                    "multi_match": {
-                        "query": keyword,
-                        "fields": [
-                            "message^2",
-                            "event.action",
-                            "log.level",
-                            "tags",
-                            "_all"
-                        ],
-                        "type": "best_fields",
-                        "fuzziness": "AUTO"
-                    }
-                })
-            
-            if keyword_queries:
-                bool_query["should"].append({
-                    "bool": {
-                        "should": keyword_queries,
-                        "minimum_should_match": 1
-                    }
-                })
+            keyword_queries = [
+                multi_match(
+                    keyword,
+                    ["message^2", "event.action", "log.level", "tags", "_all"],
+                    type="best_fields",
+                    fuzziness="AUTO"
+                )
+                for keyword in keywords
+            ]
+            query.should.append(any_of(*keyword_queries))
     
-    def _add_entity_filters(self, query_dsl: Dict[str, Any], entities: List[Dict[str, Any]]):
+    def _add_entity_filters(self, query: IRBuilder, entities: List[Dict[str, Any]]):
         """Add filters based on extracted entities"""
         if not entities:
             return
         
-        bool_query = query_dsl["query"]["bool"]
         field_mappings = self.platform_info.field_mappings
         
         for entity in entities:
@@ -319,9 +284,7 @@ class UniversalQueryBuilder:
             
             # Use detected field mappings first
             if entity_type == "user" and "username" in field_mappings:
-                bool_query["must"].append({
-                    "match": {field_mappings["username"]: entity_value}
-                })
+                query.must.append(match(field_mappings["username"], entity_value))
             elif entity_type == "ip":
                 ip_fields = []
                 if "source_ip" in field_mappings:
@@ -329,99 +292,56 @@ class UniversalQueryBuilder:
                 if "destination_ip" in field_mappings:
                     ip_fields.append(field_mappings["destination_ip"])
                 
-                if ip_fields:
-                    bool_query["should"].append({
-                        "multi_match": {
-                            "query": entity_value,
-                            "fields": ip_fields
-                        }
-                    })
-                else:
-                    # Fallback to common IP fields
-                    bool_query["should"].append({
-                        "multi_match": {
-                            "query": entity_value,
-                            "fields": ["source.ip", "destination.ip", "client.ip", "server.ip"]
-                        }
-                    })
+                # Fallback to common IP fields
+                query.should.append(multi_match(
+                    entity_value,
+                    ip_fields or ["source.ip", "destination.ip", "client.ip", "server.ip"]
+                ))
             elif entity_type == "hostname" and "hostname" in field_mappings:
-                bool_query["must"].append({
-                    "match": {field_mappings["hostname"]: entity_value}
-                })
+                query.must.append(match(field_mappings["hostname"], entity_value))
     
-    def _add_time_filter(self, query_dsl: Dict[str, Any], time_range: str):
+    def _add_time_filter(self, query: IRBuilder, time_range: str):
         """Add time range filter"""
         # Parse time range
         time_filter = self._parse_time_range(time_range)
         
-        # Add to filter context for performance
+        # Filter context for performance, on the detected timestamp field
+        query.time_range = TimeRange(
+            start=time_filter["gte"],
+            end=None,
+            field=self._timestamp_field()
+        )
+    
+    def _timestamp_field(self) -> str:
         if "timestamp" in self.platform_info.field_mappings:
-            timestamp_field = self.platform_info.field_mappings["timestamp"]
-        else:
-            timestamp_field = "@timestamp"  # ECS standard
-        
-        query_dsl["query"]["bool"]["filter"].append({
-            "range": {
-                timestamp_field: time_filter
-            }
-        })
+            return self.platform_info.field_mappings["timestamp"]
+        return "@timestamp"  # ECS standard
     
     def _parse_time_range(self, time_range: str) -> Dict[str, str]:
         """Parse time range string to Elasticsearch format"""
-        # Handle different time formats
-        if time_range.isdigit():
-            return {"gte": f"now-{time_range}h"}
-        
-        # Parse patterns like "1h", "24h", "7d", "1w"
-        time_patterns = {
-            r'(\d+)h': lambda m: {"gte": f"now-{m.group(1)}h"},
-            r'(\d+)d': lambda m: {"gte": f"now-{m.group(1)}d"},
-            r'(\d+)w': lambda m: {"gte": f"now-{m.group(1)}w"},
-            r'(\d+)m': lambda m: {"gte": f"now-{m.group(1)}m"},
-        }
-        
-        for pattern, formatter in time_patterns.items():
-            match = re.match(pattern, time_range.lower())
-            if match:
-                return formatter(match)
+        # Bare numbers are hours; "1h", "24h", "7d", "1w", "30m" and phrases via the shared parser
+        expression = parse_time_expression(time_range)
+        if expression:
+            return {"gte": expression.start}
         
         # Default fallback
         return {"gte": "now-1h"}
     
-    def _add_text_search(self, query_dsl: Dict[str, Any], query_text: str):
+    def _add_text_search(self, query: IRBuilder, query_text: str):
         """Add free text search"""
-        bool_query = query_dsl["query"]["bool"]
-        
         # Multi-field search across common fields
-        bool_query["must"].append({
-            "multi_match": {
-                "query": query_text,
-                "fields": [
-                    "message^3",
-                    "event.action^2", 
-                    "user.name^2",
-                    "host.name^2",
-                    "process.name",
-                    "tags",
-                    "_all"
-                ],
-                "type": "best_fields",
-                "fuzziness": "AUTO",
-                "minimum_should_match": "75%"
-            }
-        })
+        query.must.append(multi_match(
+            query_text,
+            ["message^3", "event.action^2", "user.name^2", "host.name^2", "process.name", "tags", "_all"],
+            type="best_fields",
+            fuzziness="AUTO",
+            minimum_should_match="75%"
+        ))
     
-    def _add_sorting(self, query_dsl: Dict[str, Any]):
+    def _add_sorting(self, query: IRBuilder):
         """Add sorting to query"""
         # Use detected timestamp field
-        if "timestamp" in self.platform_info.field_mappings:
-            timestamp_field = self.platform_info.field_mappings["timestamp"]
-        else:
-            timestamp_field = "@timestamp"
-        
-        query_dsl["sort"] = [
-            {timestamp_field: {"order": "desc"}}
-        ]
+        query.sort = [SortKey(self._timestamp_field(), "desc")]
     
     def get_target_indices(self) -> List[str]:
         """Get list of indices to target for queries"""
@@ -6,6 +6,7 @@ Validates and sanitizes SIEM queries for safety and performance
 from typing import Dict, Tuple, List, Any, Optional
 import re
 import logging
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +38,26 @@ class QueryValidator:
     MAX_QUERY_DEPTH = 5
     TIMEOUT_SECONDS = 30
     
+    # Relative cost model used by estimate_cost
+    EVENTS_PER_HOUR_ESTIMATE = 5000
+    DEFAULT_SOURCE_FIELDS = 50
+    # Elasticsearch date math: "+1d", "-2h", "/d" steps after "now" or "<date>||"
+    DATE_MATH_SECONDS = {"s": 1, "m": 60, "h": 3600, "H": 3600, "d": 86400, "w": 604800,
+                         "M": 2592000, "y": 31536000}
+    DATE_MATH_STEP = r'([+-])(\d+)([yMwdhHms])|/([yMwdhHms])'
+    DATE_MATH_STEPS = r'(?:[+-]\d+[yMwdhHms]|/[yMwdhHms])*'
+    
+    CLAUSE_COSTS = {
+        "term": 1.0, "terms": 1.2, "ids": 0.5, "exists": 0.8, "range": 1.0,
+        "match": 2.0, "match_phrase": 3.0, "multi_match": 3.5, "prefix": 2.0,
+        "wildcard": 6.0, "query_string": 8.0, "regexp": 12.0, "fuzzy": 8.0,
+        "match_all": 0.1
+    }
+    SCORING_FACTOR = 1.5
+    LEADING_WILDCARD_FACTOR = 5.0
+    COUNTING_FACTOR = 0.3
+    MS_PER_COST_UNIT = 0.5
+    
     def __init__(self, strict_mode: bool = True):
         """
         Initialize validator
@@ -291,6 +312,11 @@ class QueryValidator:
         """
         Estimate the cost/resources required for a query
         
+        ``cost_units`` is a relative figure for comparing two forms of the same
+        query: documents in the time window, weighted by how expensive each
+        clause is to evaluate (scoring context and leading wildcards cost more,
+        cached filters less), plus hit counting and ``_source`` fetch costs.
+        
         Args:
             query: Query to estimate
             
@@ -304,9 +330,22 @@ class QueryValidator:
             "warnings": []
         }
         
-        # Estimate based on size
+        window_hours = self.time_window_hours(query)
+        if window_hours is None:
+            window_hours = self.MAX_TIME_RANGE_DAYS * 24
+            cost["warnings"].append("Query has no time bound")
+        cost["estimated_docs_scanned"] = int(window_hours * self.EVENTS_PER_HOUR_ESTIMATE)
+        
+        clause_cost = self._clause_cost(query.get("query", {}), scoring=True) or 1.0
         size = query.get("size", self.DEFAULT_SIZE)
-        cost["estimated_docs_scanned"] = size * 10  # Rough estimate
+        source_fields = self._source_field_count(query)
+        counting = query.get("track_total_hits") is not False
+        
+        scan_units = cost["estimated_docs_scanned"] / 1000 * clause_cost
+        fetch_units = size * source_fields / self.DEFAULT_SOURCE_FIELDS / 10
+        count_units = scan_units * self.COUNTING_FACTOR if counting else 0.0
+        cost["cost_units"] = round(scan_units + fetch_units + count_units, 2)
+        cost["estimated_time_ms"] = round(cost["cost_units"] * self.MS_PER_COST_UNIT, 1)
         
         # Check for expensive operations
         if "aggs" in query or "aggregations" in query:
@@ -320,7 +359,7 @@ class QueryValidator:
                 cost["warnings"].append(f"High aggregation bucket count: {bucket_count}")
         
         # Check for wildcards
-        query_str = str(query)
+        query_str = str(query.get("query", {}))
         if "*" in query_str:
             cost["complexity"] = "medium" if cost["complexity"] == "low" else cost["complexity"]
             cost["warnings"].append("Query contains wildcards")
@@ -332,6 +371,138 @@ class QueryValidator:
         
         return cost
     
+    def time_window_hours(self, query: Dict[str, Any]) -> Optional[float]:
+        """Width of the query's timestamp range in hours, or None when it has no readable lower bound"""
+        range_def = self._find_time_range(query.get("query", {}))
+        if not range_def:
+            return None
+        # ES rounds "gte"/"lt" date math down and "gt"/"lte" up
+        lower = "gte" if "gte" in range_def else "gt"
+        start = self._parse_bound(range_def.get(lower), round_up=lower == "gt")
+        if start is None:
+            return None
+        upper = "lte" if "lte" in range_def else "lt"
+        end = self._parse_bound(range_def.get(upper), round_up=upper == "lte") or datetime.now()
+        return max((end - start).total_seconds() / 3600, 0.0)
+    
+    def _find_time_range(self, query_part: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(query_part, dict):
+            return None
+        for field, range_def in query_part.get("range", {}).items():
+            if ("@timestamp" in field or "timestamp" in field.lower()) and isinstance(range_def, dict):
+                return range_def
+        bool_query = query_part.get("bool", {})
+        for clause in ["filter", "must"]:
+            sub_queries = bool_query.get(clause, [])
+            for sub_query in sub_queries if isinstance(sub_queries, list) else [sub_queries]:
+                found = self._find_time_range(sub_query)
+                if found:
+                    return found
+        return None
+    
+    @staticmethod
+    def _parse_bound(value: Any, round_up: bool = False) -> Optional[datetime]:
+        """
+        Resolve a range bound: epoch millis, ISO dates, or date math anchored at
+        ``now`` or ``<date>||`` (``now-1d/d``, ``2025-10-01||-1d``)
+        """
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)) or (isinstance(value, str) and re.fullmatch(r'\d{5,}', value)):
+            return datetime.fromtimestamp(float(value) / 1000)
+        if not isinstance(value, str):
+            return None
+        
+        if value.startswith("now"):
+            moment, math = datetime.now(), value[3:]
+        else:
+            anchor, _, math = value.partition("||")
+            if re.fullmatch(r'\d{5,}', anchor):
+                moment = datetime.fromtimestamp(int(anchor) / 1000)
+            else:
+                try:
+                    parsed = datetime.fromisoformat(anchor.replace("Z", "+00:00"))
+                except ValueError:
+                    return None
+                moment = parsed.replace(tzinfo=None) if parsed.tzinfo else parsed
+        
+        if not re.fullmatch(QueryValidator.DATE_MATH_STEPS, math):
+            return None
+        for sign, amount, unit, rounding in re.findall(QueryValidator.DATE_MATH_STEP, math):
+            if rounding:
+                moment = QueryValidator._round_date(moment, rounding, round_up)
+            else:
+                seconds = int(amount) * QueryValidator.DATE_MATH_SECONDS[unit]
+                moment += timedelta(seconds=seconds if sign == "+" else -seconds)
+        return moment
+    
+    @staticmethod
+    def _round_date(moment: datetime, unit: str, up: bool) -> datetime:
+        """Start of ``moment``'s unit, or its last microsecond when rounding up"""
+        floor = moment.replace(microsecond=0)
+        if unit == "s":
+            step = timedelta(seconds=1)
+        elif unit == "m":
+            floor, step = floor.replace(second=0), timedelta(minutes=1)
+        elif unit in ("h", "H"):
+            floor, step = floor.replace(minute=0, second=0), timedelta(hours=1)
+        else:
+            floor = floor.replace(hour=0, minute=0, second=0)
+            if unit == "d":
+                step = timedelta(days=1)
+            elif unit == "w":
+                floor, step = floor - timedelta(days=floor.weekday()), timedelta(weeks=1)
+            elif unit == "M":
+                floor = floor.replace(day=1)
+                step = (floor.replace(year=floor.year + 1, month=1) if floor.month == 12
+                        else floor.replace(month=floor.month + 1)) - floor
+            else:
+                floor = floor.replace(month=1, day=1)
+                step = floor.replace(year=floor.year + 1) - floor
+        return floor + step - timedelta(microseconds=1) if up else floor
+    
+    def _clause_cost(self, query_part: Any, scoring: bool) -> float:
+        """Relative evaluation cost of a query tree"""
+        if not isinstance(query_part, dict):
+            return 0.0
+        total = 0.0
+        for clause_type, body in query_part.items():
+            if clause_type == "bool" and isinstance(body, dict):
+                for occur, sub_queries in body.items():
+                    if occur not in ("must", "should", "filter", "must_not"):
+                        continue
+                    sub_scoring = scoring and occur in ("must", "should")
+                    for sub_query in sub_queries if isinstance(sub_queries, list) else [sub_queries]:
+                        total += self._clause_cost(sub_query, sub_scoring)
+                continue
+            base = self.CLAUSE_COSTS.get(clause_type, 2.0)
+            if clause_type in ("wildcard", "query_string") and self._has_leading_wildcard(body):
+                base *= self.LEADING_WILDCARD_FACTOR
+            total += base * (self.SCORING_FACTOR if scoring else 1.0)
+        return total
+    
+    @staticmethod
+    def _has_leading_wildcard(body: Any) -> bool:
+        if not isinstance(body, dict):
+            return False
+        values = [body.get("query")] if "query" in body else list(body.values())
+        for value in values:
+            if isinstance(value, dict):
+                value = value.get("value", value.get("wildcard"))
+            if isinstance(value, str) and re.search(r'(^|[\s:(])[*?]', value):
+                return True
+        return False
+    
+    def _source_field_count(self, query: Dict[str, Any]) -> int:
+        source = query.get("_source")
+        if source is False:
+            return 0
+        if isinstance(source, list):
+            return len(source)
+        if isinstance(source, dict) and isinstance(source.get("includes"), list):
+            return len(source["includes"])
+        return self.DEFAULT_SOURCE_FIELDS
+    
     def get_validation_stats(self) -> Dict[str, int]:
         """Get validation statistics"""
         return self.validation_stats.copy()
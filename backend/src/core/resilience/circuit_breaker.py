@@ -7,7 +7,8 @@ import asyncio
 import logging
 import time
 import json
-from typing import Dict, List, Any, Optional, Callable, Union
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Callable, Union, AsyncIterator
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
@@ -15,6 +16,10 @@ from collections import deque, defaultdict
 import statistics
 import random
 
+from ..monitoring.histogram import WindowedHistogram
+from ..monitoring.metrics import COUNTER, GAUGE, MetricFamily, get_registry
+from .counters import RollingCounters
+
 logger = logging.getLogger(__name__)
 
 
@@ -64,6 +69,9 @@ class HealthMetrics:
     last_failure_time: Optional[float] = None
     consecutive_failures: int = 0
     consecutive_successes: int = 0
+    # Sliding-window outcome counts and latencies: rates and percentiles without scans or sorts
+    window: RollingCounters = field(default_factory=RollingCounters)
+    latency: WindowedHistogram = field(default_factory=lambda: WindowedHistogram(window_seconds=60.0, windows=5))
     
     @property
     def success_rate(self) -> float:
@@ -79,21 +87,16 @@ class HealthMetrics:
     
     @property
     def p95_response_time(self) -> float:
-        """Calculate 95th percentile response time"""
-        if len(self.response_times) < 5:
+        """95th percentile response time over the last few minutes"""
+        histogram, _ = self.latency.merged()
+        if histogram.count < 5:
             return self.avg_response_time
-        sorted_times = sorted(self.response_times)
-        index = int(len(sorted_times) * 0.95)
-        return sorted_times[index]
+        return histogram.quantile(0.95)
     
     @property
     def recent_failure_rate(self) -> float:
-        """Calculate failure rate for recent requests (last 50)"""
-        recent_failures = len([f for f in self.failure_history if f.age_seconds < 300])  # 5 minutes
-        recent_total = min(50, self.total_requests)
-        if recent_total == 0:
-            return 0.0
-        return (recent_failures / recent_total) * 100
+        """Failure rate percentage inside the sliding window"""
+        return self.window.failure_rate
 
 
 @dataclass
@@ -107,8 +110,10 @@ class CircuitBreakerConfig:
     failure_rate_threshold: float = 50.0 # Failure rate % to trigger opening
     slow_call_threshold: float = 10.0    # Slow call threshold in seconds
     slow_call_rate_threshold: float = 50.0 # Slow call rate % to trigger
-    minimum_throughput: int = 10         # Minimum requests before evaluation
+    minimum_throughput: int = 10         # Minimum requests in the window before rate evaluation
     sliding_window_size: int = 100       # Size of sliding window for metrics
+    window_seconds: float = 60.0         # Time covered by the rate window
+    window_buckets: int = 12             # Ring-buffer slots in the rate window
     
     # Advanced settings
     exponential_backoff: bool = True     # Use exponential backoff
@@ -123,7 +128,7 @@ class AdvancedCircuitBreaker:
     def __init__(self, config: CircuitBreakerConfig):
         self.config = config
         self.state = CircuitState.CLOSED
-        self.metrics = HealthMetrics()
+        self.metrics = HealthMetrics(window=RollingCounters(config.window_seconds, config.window_buckets))
         
         # State management
         self.state_changed_time = time.time()
@@ -141,33 +146,57 @@ class AdvancedCircuitBreaker:
         self.on_failure: Optional[Callable] = None
         self.on_success: Optional[Callable] = None
         
+        # /metrics: calls are timed and rejections counted as they happen, state read on scrape
+        registry = get_registry()
+        self.call_seconds = registry.histogram(
+            "circuit_breaker_call_duration_seconds", "Latency of calls through a circuit breaker",
+            ("breaker", "outcome"), unit="seconds"
+        )
+        self.rejected = registry.counter(
+            "circuit_breaker_rejected", "Calls rejected while a circuit breaker was open", ("breaker",)
+        ).labels(self.config.name)
+        registry.register_collector(self.collect_metrics)
+        
         logger.info(f"🛡️ Advanced Circuit Breaker initialized: {self.config.name}")
     
     async def call(self, func: Callable, *args, **kwargs) -> Any:
         """Execute function through circuit breaker protection"""
+        async with self.protect():
+            return await func(*args, **kwargs)
+    
+    @asynccontextmanager
+    async def protect(self) -> AsyncIterator[None]:
+        """
+        Admit the enclosed call or raise CircuitBreakerOpenError, then record its outcome
+        
+        Rejections raised inside the block (a nested breaker or a shedding limiter)
+        propagate without counting as failures: the backend was never called.
+        """
         # Check if circuit is open
         if not await self._should_allow_request():
+            self.rejected.inc()
             raise CircuitBreakerOpenError(
                 f"Circuit breaker is OPEN for {self.config.name}. "
                 f"Next attempt in {self._time_until_next_attempt():.1f} seconds"
             )
         
-        # Execute the protected function
+        # Execute the protected block
         start_time = time.time()
         try:
-            result = await func(*args, **kwargs)
-            
-            # Record successful execution
-            execution_time = time.time() - start_time
-            await self._record_success(execution_time)
-            
-            return result
-            
+            yield
+        except CircuitBreakerOpenError:
+            raise
         except Exception as e:
             # Record failure
             execution_time = time.time() - start_time
+            self.call_seconds.labels(self.config.name, "failure").record(execution_time)
             await self._record_failure(e, execution_time)
             raise
+        else:
+            # Record successful execution
+            execution_time = time.time() - start_time
+            self.call_seconds.labels(self.config.name, "success").record(execution_time)
+            await self._record_success(execution_time)
     
     async def _should_allow_request(self) -> bool:
         """Determine if request should be allowed"""
@@ -200,10 +229,12 @@ class AdvancedCircuitBreaker:
         
         # Update response time metrics
         self.metrics.response_times.append(response_time)
+        self.metrics.latency.record(response_time)
         self._update_avg_response_time(response_time)
         
         # Check for slow calls
         is_slow_call = response_time > self.config.slow_call_threshold
+        self.metrics.window.record(True, response_time, is_slow_call)
         if is_slow_call:
             logger.warning(f"🐌 Slow call detected for {self.config.name}: {response_time:.2f}s")
         
@@ -228,6 +259,9 @@ class AdvancedCircuitBreaker:
         self.metrics.consecutive_failures += 1
         self.metrics.consecutive_successes = 0
         self.metrics.last_failure_time = time.time()
+        self.metrics.window.record(
+            False, response_time or 0.0, (response_time or 0.0) > self.config.slow_call_threshold
+        )
         
         # Classify failure type
         failure_type = self._classify_failure(exception)
@@ -280,33 +314,33 @@ class AdvancedCircuitBreaker:
         if self.state == CircuitState.OPEN:
             return  # Already open
         
-        # Check if minimum throughput is met
-        if self.metrics.total_requests < self.config.minimum_throughput:
-            return
-        
         should_open = False
         reason = ""
+        window = self.metrics.window
+        
+        # A failed probe reopens the circuit (gradual recovery throttles instead)
+        if self.state == CircuitState.HALF_OPEN and not self.recovery_mode:
+            should_open = True
+            reason = "failure while testing recovery"
         
         # Check consecutive failures
-        if self.metrics.consecutive_failures >= self.config.failure_threshold:
+        elif self.metrics.consecutive_failures >= self.config.failure_threshold:
             should_open = True
             reason = f"consecutive failures ({self.metrics.consecutive_failures})"
         
+        # Rates need minimum throughput inside the window
+        elif window.total < self.config.minimum_throughput:
+            return
+        
         # Check failure rate
-        elif self.metrics.failure_rate >= self.config.failure_rate_threshold:
+        elif window.failure_rate >= self.config.failure_rate_threshold:
             should_open = True
-            reason = f"high failure rate ({self.metrics.failure_rate:.1f}%)"
+            reason = f"high failure rate ({window.failure_rate:.1f}%)"
         
         # Check slow call rate
-        slow_calls = len([
-            rt for rt in self.metrics.response_times 
-            if rt > self.config.slow_call_threshold
-        ])
-        slow_call_rate = (slow_calls / len(self.metrics.response_times)) * 100 if self.metrics.response_times else 0
-        
-        if slow_call_rate >= self.config.slow_call_rate_threshold:
+        elif window.slow_call_rate >= self.config.slow_call_rate_threshold:
             should_open = True
-            reason = f"high slow call rate ({slow_call_rate:.1f}%)"
+            reason = f"high slow call rate ({window.slow_call_rate:.1f}%)"
         
         if should_open:
             await self._transition_to_open(reason)
@@ -324,6 +358,8 @@ class AdvancedCircuitBreaker:
         self.backoff_multiplier = 1.0
         self.recovery_mode = False
         self.gradual_recovery_rate = 1.0
+        # Judge the recovered backend on fresh traffic, not the outage
+        self.metrics.window.reset()
         
         await self._record_state_change(old_state, CircuitState.CLOSED, "Recovery completed")
     
@@ -473,7 +509,8 @@ class AdvancedCircuitBreaker:
                 "consecutive_successes": self.metrics.consecutive_successes,
                 "last_success_time": self.metrics.last_success_time,
                 "last_failure_time": self.metrics.last_failure_time,
-                "recent_failure_rate": self.metrics.recent_failure_rate
+                "recent_failure_rate": self.metrics.recent_failure_rate,
+                "window": self.metrics.window.snapshot()
             },
             "config": {
                 "failure_threshold": self.config.failure_threshold,
@@ -488,6 +525,23 @@ class AdvancedCircuitBreaker:
             }
         }
     
+    def collect_metrics(self) -> List[MetricFamily]:
+        """get_state() essentials as metric families for /metrics"""
+        name = self.config.name
+        state = MetricFamily("circuit_breaker_state", GAUGE, "1 for the breaker's current state, 0 otherwise")
+        for candidate in CircuitState:
+            state.add({"breaker": name, "state": candidate.value}, candidate == self.state)
+        return [
+            state,
+            MetricFamily("circuit_breaker_requests", COUNTER, "Calls through a circuit breaker by outcome")
+            .add({"breaker": name, "outcome": "success"}, self.metrics.successful_requests)
+            .add({"breaker": name, "outcome": "failure"}, self.metrics.failed_requests),
+            MetricFamily("circuit_breaker_consecutive_failures", GAUGE, "Failures since the last success")
+            .add({"breaker": name}, self.metrics.consecutive_failures),
+            MetricFamily("circuit_breaker_recovery_rate", GAUGE, "Share of requests admitted during gradual recovery")
+            .add({"breaker": name}, self.gradual_recovery_rate),
+        ]
+    
     def get_failure_analysis(self) -> Dict[str, Any]:
         """Get detailed failure analysis"""
         failure_types = defaultdict(int)
@@ -751,3 +805,31 @@ def create_splunk_breaker() -> AdvancedCircuitBreaker:
         minimum_throughput=5
     )
     return circuit_breaker_manager.create_breaker("splunk", config)
+
+
+def create_gemini_breaker() -> AdvancedCircuitBreaker:
+    """Create circuit breaker optimized for the Gemini API"""
+    config = CircuitBreakerConfig(
+        name="gemini",
+        failure_threshold=5,
+        success_threshold=2,
+        timeout_seconds=30.0,
+        failure_rate_threshold=50.0,
+        slow_call_threshold=20.0,
+        minimum_throughput=5
+    )
+    return circuit_breaker_manager.create_breaker("gemini", config)
+
+
+def create_openai_breaker() -> AdvancedCircuitBreaker:
+    """Create circuit breaker optimized for the OpenAI API"""
+    config = CircuitBreakerConfig(
+        name="openai",
+        failure_threshold=5,
+        success_threshold=2,
+        timeout_seconds=30.0,
+        failure_rate_threshold=50.0,
+        slow_call_threshold=30.0,
+        minimum_throughput=5
+    )
+    return circuit_breaker_manager.create_breaker("openai", config)
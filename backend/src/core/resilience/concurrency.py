@@ -0,0 +1,303 @@
+"""
+Adaptive Concurrency Limits
+Per-backend in-flight limits that adapt to observed latency (AIMD or Vegas), load
+shedding once a limit and its queue are full, and BackendGuard, which puts a circuit
+breaker and a limiter in front of every call to one backend
+"""
+
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Callable, AsyncIterator, Deque
+
+from ..monitoring.metrics import COUNTER, GAUGE, MetricFamily, get_registry
+from .circuit_breaker import (
+    AdvancedCircuitBreaker, CircuitBreakerConfig, CircuitBreakerOpenError, get_circuit_breaker_manager,
+    create_elasticsearch_breaker, create_gemini_breaker, create_openai_breaker, create_splunk_breaker,
+    create_wazuh_breaker
+)
+
+logger = logging.getLogger(__name__)
+
+AIMD = "aimd"
+VEGAS = "vegas"
+
+# Name of the guard the current task is inside; nested guards pass through
+_active_guard: contextvars.ContextVar = contextvars.ContextVar("kartavya_backend_guard", default=None)
+
+
+class LoadShedError(CircuitBreakerOpenError):
+    """Raised when a backend's concurrency limit and queue are full; the backend was not called"""
+
+    def __init__(self, message: str, backend: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps in-flight calls to one backend at a limit learned from its latency
+
+    ``aimd`` grows the limit by one per call made while at least half of it was in
+    use and multiplies it by ``backoff_ratio`` on a drop (a timeout, a cancellation,
+    or a call slower than ``latency_threshold``). ``vegas`` compares each call's
+    latency to the lowest seen (the no-load latency) to estimate how many calls are
+    queued inside the backend, growing the limit while that queue is short and
+    shrinking it once it builds. Calls over the limit wait up to ``queue_timeout``
+    in a queue of at most ``max_queue``; everything beyond that is shed.
+    """
+
+    def __init__(self, name: str, initial_limit: Optional[int] = None, min_limit: int = 1,
+                 max_limit: Optional[int] = None, algorithm: Optional[str] = None,
+                 max_queue: Optional[int] = None, queue_timeout: Optional[float] = None,
+                 latency_threshold: Optional[float] = None, backoff_ratio: float = 0.9,
+                 probe_interval: int = 1000):
+        self.name = name
+        self.algorithm = (algorithm or os.getenv("CONCURRENCY_LIMIT_ALGORITHM", VEGAS)).lower()
+        if self.algorithm not in (AIMD, VEGAS):
+            raise ValueError(f"Unknown concurrency limit algorithm: {self.algorithm}")
+        self.max_limit = max_limit or int(os.getenv("CONCURRENCY_MAX_LIMIT", "100"))
+        self.min_limit = min(min_limit, self.max_limit)
+        initial = initial_limit or int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "10"))
+        self.limit = float(max(self.min_limit, min(initial, self.max_limit)))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("CONCURRENCY_MAX_QUEUE", "50"))
+        self.queue_timeout = (
+            queue_timeout if queue_timeout is not None else float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT", "2.0"))
+        )
+        self.latency_threshold = latency_threshold
+        self.backoff_ratio = backoff_ratio
+        self.probe_interval = probe_interval
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.no_load_latency: Optional[float] = None
+        self._samples_since_probe = 0
+        self.stats = {"admitted": 0, "queued": 0, "shed": 0, "drops": 0}
+
+        registry = get_registry()
+        self.shed_total = registry.counter(
+            "concurrency_shed", "Calls shed because a backend's concurrency limit was full", ("backend",)
+        ).labels(name)
+        registry.register_collector(self.collect_metrics)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """Hold one slot for the enclosed call, or raise LoadShedError"""
+        await self._admit()
+        started = time.monotonic()
+        dropped = ignored = False
+        try:
+            yield
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            dropped = True
+            raise
+        except Exception:
+            # Fast failures say nothing about capacity and would skew the latency signal
+            ignored = True
+            raise
+        finally:
+            self._release(time.monotonic() - started, dropped, ignored)
+
+    async def _admit(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return
+        if len(self._waiters) >= self.max_queue or self.queue_timeout <= 0:
+            self._shed("queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()  # the slot was handed over just as we were cancelled
+            else:
+                self._forget(waiter)
+            raise
+        if not waiter.done():
+            self._forget(waiter)
+            self._shed(f"no slot within {self.queue_timeout:.1f}s")
+        self.stats["admitted"] += 1
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _shed(self, reason: str) -> None:
+        self.stats["shed"] += 1
+        self.shed_total.inc()
+        raise LoadShedError(
+            f"Load shed for {self.name}: {reason} ({self.in_flight}/{int(self.limit)} in flight)",
+            backend=self.name,
+            retry_after=max(self.queue_timeout, 1.0)
+        )
+
+    def _release(self, latency: float, dropped: bool, ignored: bool) -> None:
+        if not ignored:
+            if self.latency_threshold is not None and latency > self.latency_threshold:
+                dropped = True
+            if dropped:
+                self.stats["drops"] += 1
+            self._adjust(latency, dropped)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        # Hand freed (or newly grown) capacity to queued callers in arrival order
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+    def _adjust(self, latency: float, dropped: bool) -> None:
+        limit = self.limit
+        if self.algorithm == AIMD:
+            if dropped:
+                limit *= self.backoff_ratio
+            elif self.in_flight * 2 >= limit:
+                limit += 1.0
+        else:
+            if not dropped:
+                # Re-learn the no-load latency now and then, in case the backend got faster or slower
+                self._samples_since_probe += 1
+                if self._samples_since_probe >= self.probe_interval:
+                    self.no_load_latency = None
+                    self._samples_since_probe = 0
+                if self.no_load_latency is None or latency < self.no_load_latency:
+                    self.no_load_latency = latency
+            step = max(1.0, math.log10(limit))
+            if dropped:
+                limit -= step
+            elif self.in_flight * 2 >= limit and latency > 0:
+                queued = limit * (1 - self.no_load_latency / latency)
+                if queued <= step:
+                    limit += 6 * step
+                elif queued < 3 * step:
+                    limit += step
+                elif queued > 6 * step:
+                    limit -= step
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), limit))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "algorithm": self.algorithm,
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued_now": len(self._waiters),
+            "no_load_latency": self.no_load_latency,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit
+        }
+
+    def collect_metrics(self) -> List[MetricFamily]:
+        """Limit, in-flight and queued calls for /metrics"""
+        labels = {"backend": self.name}
+        return [
+            MetricFamily("concurrency_limit", GAUGE, "Adaptive concurrency limit per backend").add(labels, int(self.limit)),
+            MetricFamily("concurrency_in_flight", GAUGE, "Calls in flight per backend").add(labels, self.in_flight),
+            MetricFamily("concurrency_queued", GAUGE, "Calls waiting for a slot per backend").add(labels, len(self._waiters)),
+            MetricFamily("concurrency_drops", COUNTER, "Calls that timed out or ran past the latency threshold")
+            .add(labels, self.stats["drops"]),
+        ]
+
+
+class BackendGuard:
+    """
+    Circuit breaker plus adaptive concurrency limit in front of one backend
+
+    The breaker rejects calls while the backend is failing; the limiter caps how many
+    reach it while it is slow and sheds the rest. Shed calls never count as breaker
+    failures. Guards do not stack: inside one guarded call (say a source query made by
+    MultiSourceManager), the connector's own guard passes straight through.
+    """
+
+    def __init__(self, name: str, breaker: AdvancedCircuitBreaker, limiter: AdaptiveConcurrencyLimiter):
+        self.name = name
+        self.breaker = breaker
+        self.limiter = limiter
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Run the enclosed call under this guard; raises CircuitBreakerOpenError or LoadShedError"""
+        if _active_guard.get() is not None:
+            yield
+            return
+        async with self.breaker.protect():
+            async with self.limiter.acquire():
+                token = _active_guard.set(self.name)
+                try:
+                    yield
+                finally:
+                    _active_guard.reset(token)
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Await ``func(*args, **kwargs)`` under this guard"""
+        async with self.admit():
+            return await func(*args, **kwargs)
+
+    async def record_failure(self, exception: Exception) -> None:
+        """Count a failure seen outside a guarded call (e.g. a failed health check)"""
+        await self.breaker._record_failure(exception)
+
+    @property
+    def available(self) -> bool:
+        """False while the breaker is open and its retry time has not come"""
+        return self.breaker._time_until_next_attempt() == 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        state = self.breaker.get_state()
+        return {
+            "name": self.name,
+            "state": state["state"],
+            "next_attempt_in": state["next_attempt_in"],
+            "window": state["metrics"]["window"],
+            "concurrency": self.limiter.get_stats()
+        }
+
+
+# Guards per backend name
+_guards: Dict[str, BackendGuard] = {}
+
+# Tuned breakers for the SIEM platforms and AI providers
+_BREAKER_PRESETS = {
+    "elasticsearch": create_elasticsearch_breaker,
+    "wazuh": create_wazuh_breaker,
+    "splunk": create_splunk_breaker,
+    "gemini": create_gemini_breaker,
+    "openai": create_openai_breaker
+}
+
+
+def get_backend_guard(name: str, breaker_config: Optional[CircuitBreakerConfig] = None,
+                      **limiter_options) -> BackendGuard:
+    """Get or create the guard for a backend; options only apply on creation"""
+    guard = _guards.get(name)
+    if guard is None:
+        manager = get_circuit_breaker_manager()
+        breaker = manager.get_breaker(name)
+        if breaker is None:
+            preset = _BREAKER_PRESETS.get(name) if breaker_config is None else None
+            breaker = preset() if preset else manager.create_breaker(name, breaker_config)
+        limiter_options.setdefault("latency_threshold", breaker.config.slow_call_threshold)
+        guard = _guards[name] = BackendGuard(name, breaker, AdaptiveConcurrencyLimiter(name, **limiter_options))
+        logger.info(f"🛡️ Backend guard ready: {name} ({guard.limiter.algorithm}, limit {int(guard.limiter.limit)})")
+    return guard
+
+
+def get_backend_guards() -> Dict[str, BackendGuard]:
+    """All backend guards created so far"""
+    return dict(_guards)
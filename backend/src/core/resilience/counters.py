@@ -0,0 +1,112 @@
+"""
+Rolling Counters
+Ring-buffer bucketed request/failure/slow-call counters with O(1) recording and
+O(1) rate reads over a sliding time window
+"""
+
+import time
+from typing import Dict, Any, Callable
+
+
+class RollingCounters:
+    """
+    Outcome counts over the last ``window_seconds``, kept in ``buckets`` slots
+
+    Each slot covers ``window_seconds / buckets`` seconds. Running totals are kept
+    alongside the ring and adjusted as slots are recycled, so reading a rate never
+    walks the ring; advancing the clock clears at most ``buckets`` slots however
+    long the counters sat idle.
+    """
+
+    __slots__ = ("window_seconds", "buckets", "bucket_seconds", "_clock", "_epoch",
+                 "_requests", "_failures", "_slow", "_latency",
+                 "requests", "failures", "slow_calls", "latency_sum")
+
+    def __init__(self, window_seconds: float = 60.0, buckets: int = 12,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.bucket_seconds = window_seconds / buckets
+        self._clock = clock
+        self._epoch = int(clock() // self.bucket_seconds)
+        self._requests = [0] * buckets
+        self._failures = [0] * buckets
+        self._slow = [0] * buckets
+        self._latency = [0.0] * buckets
+        self.requests = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.latency_sum = 0.0
+
+    def _advance(self) -> int:
+        """Recycle slots the clock has moved past; returns the current slot"""
+        epoch = int(self._clock() // self.bucket_seconds)
+        if epoch != self._epoch:
+            for stale in range(self._epoch + 1, self._epoch + 1 + min(epoch - self._epoch, self.buckets)):
+                slot = stale % self.buckets
+                self.requests -= self._requests[slot]
+                self.failures -= self._failures[slot]
+                self.slow_calls -= self._slow[slot]
+                self.latency_sum -= self._latency[slot]
+                self._requests[slot] = self._failures[slot] = self._slow[slot] = 0
+                self._latency[slot] = 0.0
+            if not self.requests:
+                self.latency_sum = 0.0  # drop float residue from the subtractions
+            self._epoch = epoch
+        return epoch % self.buckets
+
+    def record(self, success: bool, latency: float = 0.0, slow: bool = False) -> None:
+        slot = self._advance()
+        self._requests[slot] += 1
+        self.requests += 1
+        self._latency[slot] += latency
+        self.latency_sum += latency
+        if not success:
+            self._failures[slot] += 1
+            self.failures += 1
+        if slow:
+            self._slow[slot] += 1
+            self.slow_calls += 1
+
+    @property
+    def total(self) -> int:
+        """Requests inside the window"""
+        self._advance()
+        return self.requests
+
+    @property
+    def failure_rate(self) -> float:
+        """Failure rate percentage inside the window"""
+        self._advance()
+        return (self.failures / self.requests) * 100 if self.requests else 0.0
+
+    @property
+    def slow_call_rate(self) -> float:
+        """Slow call rate percentage inside the window"""
+        self._advance()
+        return (self.slow_calls / self.requests) * 100 if self.requests else 0.0
+
+    @property
+    def avg_latency(self) -> float:
+        self._advance()
+        return self.latency_sum / self.requests if self.requests else 0.0
+
+    def reset(self) -> None:
+        self._requests = [0] * self.buckets
+        self._failures = [0] * self.buckets
+        self._slow = [0] * self.buckets
+        self._latency = [0.0] * self.buckets
+        self.requests = self.failures = self.slow_calls = 0
+        self.latency_sum = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._advance()
+        return {
+            "window_seconds": self.window_seconds,
+            "requests": self.requests,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "failure_rate": self.failure_rate,
+            "slow_call_rate": self.slow_call_rate,
+            "avg_latency": self.avg_latency
+        }
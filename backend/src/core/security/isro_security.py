@@ -23,6 +23,8 @@ import bcrypt
 import base64
 import os
 
+from .rate_limiting import RateLimit, get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -103,7 +105,6 @@ class ISROSecurityManager:
         self.audit_events: List[AuditEvent] = []
         
         # Rate limiting
-        self.rate_limits: Dict[str, List[datetime]] = {}
         
         # IP whitelist/blacklist
         self.ip_whitelist = set(config.get('ip_whitelist', []))
@@ -331,31 +332,18 @@ class ISROSecurityManager:
         if limit_per_minute is None:
             limit_per_minute = self.security_policies['network_security']['rate_limiting']['requests_per_minute']
         
-        now = datetime.utcnow()
-        cutoff_time = now - timedelta(minutes=1)
-        
-        # Clean old entries
-        if identifier in self.rate_limits:
-            self.rate_limits[identifier] = [
-                timestamp for timestamp in self.rate_limits[identifier]
-                if timestamp > cutoff_time
-            ]
-        else:
-            self.rate_limits[identifier] = []
-        
-        # Check if under limit
-        if len(self.rate_limits[identifier]) >= limit_per_minute:
+        # Shared GCRA limiter (synchronous callers use this process's state)
+        result = get_rate_limiter().hit_local(f"isro:{identifier}", RateLimit(limit_per_minute, 60))
+        if not result.allowed:
             self.log_security_violation(
                 user_id=None,
                 action="rate_limit_exceeded",
                 resource=f"api:{identifier}",
                 ip_address=identifier.split(':')[0] if ':' in identifier else identifier,
-                metadata={"limit": limit_per_minute, "attempts": len(self.rate_limits[identifier])}
+                metadata={"limit": limit_per_minute, "retry_after": round(result.retry_after, 2)}
             )
             return False
         
-        # Add current request
-        self.rate_limits[identifier].append(now)
         return True
     
     def validate_ip_address(self, ip_address: str) -> bool:
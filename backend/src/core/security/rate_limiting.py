@@ -0,0 +1,252 @@
+"""
+Rate Limiting
+GCRA limiter shared across workers through one atomic Redis script, falling back to a
+bounded in-process limiter while Redis is unavailable
+"""
+
+import logging
+import math
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_EPSILON = 1e-6
+
+# GCRA over any number of rules: a request is admitted only if every rule admits it,
+# and only then are the rules' theoretical arrival times (TAT) advanced.
+# KEYS: one per rule; ARGV: emission interval and burst tolerance (ms) per rule.
+# Returns {allowed, remaining, retry_after_ms, reset_after_ms, limiting rule index}.
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local allowed, remaining, retry, reset, limiting = 1, -1, 0, 0, 1
+local tats = {}
+for i = 1, #KEYS do
+  local interval = tonumber(ARGV[2 * i - 1])
+  local tolerance = tonumber(ARGV[2 * i])
+  local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+  if tat < now then tat = now end
+  local new_tat = tat + interval
+  local wait = new_tat - tolerance - now
+  if wait > 0.001 then
+    if allowed == 1 or wait > retry then limiting = i; retry = wait end
+    allowed = 0
+    reset = math.max(reset, tat - now)
+  else
+    local left = math.floor((tolerance - (new_tat - now)) / interval + 0.000001)
+    if allowed == 1 and (remaining < 0 or left < remaining) then remaining = left; limiting = i end
+    reset = math.max(reset, new_tat - now)
+  end
+  tats[i] = new_tat
+end
+if allowed == 1 then
+  for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], string.format('%.3f', tats[i]), 'PX', math.max(1, math.ceil(tats[i] - now)))
+  end
+else
+  remaining = 0
+end
+return {allowed, remaining, math.ceil(retry), math.ceil(reset), limiting}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """``limit`` requests per ``window`` seconds, with bursts of up to ``burst`` (default: ``limit``)"""
+    limit: int
+    window: float
+    burst: Optional[int] = None
+
+    @property
+    def interval(self) -> float:
+        """Emission interval: steady-state spacing between requests"""
+        return self.window / self.limit
+
+    @property
+    def tolerance(self) -> float:
+        return self.interval * (self.burst or self.limit)
+
+    @property
+    def name(self) -> str:
+        return f"{self.limit}r{self.window:g}s" + (f"b{self.burst}" if self.burst else "")
+
+
+@dataclass(slots=True)
+class RateLimitResult:
+    """Outcome of one rate-limit check (for several rules, the most restrictive one)"""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until a request would be admitted (0 when allowed)
+    reset_after: float  # seconds until the full burst is available again
+    backend: str = "local"
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(int(time.time() + math.ceil(self.reset_after))),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class LocalRateLimiter:
+    """
+    In-process GCRA: one arrival time per key and rule, O(1) per request
+
+    Keys are kept in LRU order and capped at ``max_keys``; the least recently seen
+    clients are forgotten first (they are almost always fully replenished anyway).
+    """
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._tats: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def hit(self, key: str, rules: Sequence[RateLimit]) -> RateLimitResult:
+        now = self._clock()
+        tats = self._tats.get(key)
+        if tats is None:
+            tats = self._tats[key] = {}
+            if len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._tats.move_to_end(key)
+
+        allowed, remaining, retry, reset, limiting = True, -1, 0.0, 0.0, rules[0]
+        new_tats: List[Tuple[str, float]] = []
+        for rule in rules:
+            tat = max(tats.get(rule.name, now), now)
+            new_tat = tat + rule.interval
+            wait = new_tat - rule.tolerance - now
+            if wait > _EPSILON:
+                if allowed or wait > retry:
+                    limiting, retry = rule, wait
+                allowed = False
+                reset = max(reset, tat - now)
+            else:
+                left = int((rule.tolerance - (new_tat - now)) / rule.interval + _EPSILON)
+                if allowed and (remaining < 0 or left < remaining):
+                    remaining, limiting = left, rule
+                reset = max(reset, new_tat - now)
+            new_tats.append((rule.name, new_tat))
+
+        if allowed:
+            tats.update(new_tats)
+        return RateLimitResult(allowed, limiting.limit, max(remaining, 0), retry, reset)
+
+    def peek(self, key: str, rule: RateLimit) -> int:
+        """Requests ``key`` could still make right now under ``rule``, without consuming any"""
+        now = self._clock()
+        tat = max(self._tats.get(key, {}).get(rule.name, now), now)
+        return max(int((rule.tolerance - (tat - now)) / rule.interval + _EPSILON), 0)
+
+    def reset(self, key: str) -> None:
+        self._tats.pop(key, None)
+
+
+class RateLimiter:
+    """
+    Rate limiting for every worker
+
+    With Redis attached, decisions are made by one atomic script against shared state,
+    so limits hold across uvicorn workers. If Redis errors, requests are decided by the
+    local limiter (per-worker, approximate) and Redis is retried after a cool-down.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        prefix: str = "kartavya:ratelimit:",
+        max_local_keys: int = 100_000,
+        redis_retry_interval: float = 5.0
+    ):
+        self.prefix = prefix
+        self.redis_retry_interval = redis_retry_interval
+        self.local = LocalRateLimiter(max_local_keys)
+        self.redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+        self.stats = {"requests": 0, "allowed": 0, "limited": 0, "redis": 0, "local": 0, "redis_errors": 0}
+        if redis_client is not None:
+            self.attach_redis(redis_client, prefix)
+
+    def attach_redis(self, redis_client: Any, prefix: Optional[str] = None) -> None:
+        """Share limiter state through Redis (async client with ``register_script``)"""
+        self.redis = redis_client
+        self._script = redis_client.register_script(GCRA_SCRIPT)
+        self._redis_down_until = 0.0
+        if prefix is not None:
+            self.prefix = prefix
+        logger.info("✅ Rate limiter using shared Redis state")
+
+    async def hit(self, key: str, *rules: RateLimit) -> RateLimitResult:
+        """Count one request for ``key`` against all ``rules``"""
+        if self._script is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                return self._record(await self._hit_redis(key, rules))
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                self._redis_down_until = time.monotonic() + self.redis_retry_interval
+                logger.warning(f"⚠️ Redis rate limiting unavailable, using local limiter: {e}")
+        return self._record(self.local.hit(key, rules))
+
+    def hit_local(self, key: str, *rules: RateLimit) -> RateLimitResult:
+        """Synchronous check against this process's state only"""
+        return self._record(self.local.hit(key, rules))
+
+    async def _hit_redis(self, key: str, rules: Sequence[RateLimit]) -> RateLimitResult:
+        keys = [f"{self.prefix}{key}:{rule.name}" for rule in rules]
+        args: List[float] = []
+        for rule in rules:
+            args += [rule.interval * 1000, rule.tolerance * 1000]
+        allowed, remaining, retry_ms, reset_ms, index = await self._script(keys=keys, args=args)
+        rule = rules[int(index) - 1]
+        return RateLimitResult(bool(int(allowed)), rule.limit, int(remaining),
+                               int(retry_ms) / 1000, int(reset_ms) / 1000, "redis")
+
+    def _record(self, result: RateLimitResult) -> RateLimitResult:
+        self.stats["requests"] += 1
+        self.stats["allowed" if result.allowed else "limited"] += 1
+        self.stats[result.backend] += 1
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "backend": "redis" if self._script is not None and time.monotonic() >= self._redis_down_until else "local",
+            "local_keys": len(self.local),
+            "local_evicted": self.local.evicted,
+        }
+
+
+def client_key(client_ip: str, user_agent: str) -> str:
+    """
+    Limiter key for a client
+
+    The user-agent digest is CRC32, not ``hash()``: str hashes are salted per process,
+    and every worker has to derive the same Redis key for the same client.
+    """
+    return f"{client_ip}:{zlib.crc32(user_agent.encode('utf-8')) % 10000}"
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
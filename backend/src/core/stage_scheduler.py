@@ -0,0 +1,171 @@
+"""
+Stage Scheduler
+Runs independent pipeline stages concurrently - CPU-bound NLP work on a bounded
+worker pool, I/O-bound AI calls as coroutines with timeouts - and records per-stage timings.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from .monitoring.metrics import get_registry
+from .monitoring.sampling_profiler import sampling_profiler
+from .monitoring.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AI_TIMEOUT = 15.0
+
+
+class StageScheduler:
+    """
+    Shared worker pool for pipeline stages
+
+    Stages run off the event loop so a long query no longer stalls WebSocket
+    traffic for other users on the same worker. The pool is bounded: with more
+    concurrent queries than workers, stages queue instead of oversubscribing
+    the CPU. ``executor="process"`` sidesteps the GIL for pure-Python stages at
+    the price of pickling arguments and results; callables must then be
+    importable module-level functions.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        executor: str = "thread",
+        ai_timeout: float = DEFAULT_AI_TIMEOUT
+    ):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.executor_kind = executor
+        self.ai_timeout = ai_timeout
+        self._executor: Optional[Executor] = None
+        self.stats = {
+            "stages_run": 0,
+            "timeouts": 0,
+            "failures": 0
+        }
+        # Shared across schedulers: one histogram child per stage name
+        self.stage_seconds = get_registry().histogram(
+            "pipeline_stage_duration_seconds", "Time spent in each pipeline stage, plus the request total",
+            ("stage",), unit="seconds"
+        )
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="nlp-stage"
+                )
+        return self._executor
+
+    def start(self) -> "StageRun":
+        """Begin timing the stages of one request"""
+        return StageRun(self)
+
+    def shutdown(self, wait: bool = False) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "executor": self.executor_kind,
+            "max_workers": self.max_workers
+        }
+
+
+class StageRun:
+    """Timings and stage helpers for a single pipeline request"""
+
+    def __init__(self, scheduler: StageScheduler):
+        self.scheduler = scheduler
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    def cpu(self, name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> "asyncio.Future":
+        """
+        Schedule a CPU-bound stage on the worker pool
+
+        Returns the future right away so several stages can be awaited together
+        and abandoned ones can be cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        span = tracer.start_span(f"pipeline.{name}", {"stage": name, "executor": self.scheduler.executor_kind})
+        started = time.perf_counter()
+        if self.scheduler.executor_kind == "thread":
+            # Credits the worker thread's CPU samples to this request's endpoint (no-op unless sampling)
+            func = sampling_profiler.wrap(func)
+        future = loop.run_in_executor(self.scheduler.executor, functools.partial(func, *args, **kwargs))
+        future.add_done_callback(lambda f: self._finish(name, started, f, span))
+        return future
+
+    async def io(
+        self,
+        name: str,
+        awaitable: Awaitable[Any],
+        timeout: Optional[float] = None,
+        default: Any = None
+    ) -> Any:
+        """Await an I/O-bound stage, returning ``default`` on timeout or error"""
+        timeout = self.scheduler.ai_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        with tracer.start_span(f"pipeline.{name}", {"stage": name}) as span:
+            try:
+                return await asyncio.wait_for(awaitable, timeout)
+            except asyncio.TimeoutError:
+                self.scheduler.stats["timeouts"] += 1
+                span.set_status("ERROR", f"timed out after {timeout}s")
+                logger.warning(f"⏱️ Stage '{name}' timed out after {timeout}s")
+                return default
+            except Exception as e:
+                self.scheduler.stats["failures"] += 1
+                span.record_exception(e)
+                logger.error(f"Stage '{name}' failed: {e}")
+                return default
+            finally:
+                self._record(name, started)
+
+    @contextmanager
+    def inline(self, name: str) -> Iterator[None]:
+        """Time a stage that runs on the event loop (cheap or already async)"""
+        started = time.perf_counter()
+        with tracer.start_span(f"pipeline.{name}", {"stage": name}):
+            try:
+                yield
+            finally:
+                self._record(name, started)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage timings in milliseconds, plus the elapsed total (recorded once per request)"""
+        elapsed = time.perf_counter() - self.started
+        self.scheduler.stage_seconds.labels("total").record(elapsed)
+        timings = {name: round(ms, 3) for name, ms in self.timings.items()}
+        timings["total"] = round(elapsed * 1000, 3)
+        return timings
+
+    def _finish(self, name: str, started: float, future: "asyncio.Future", span: Any) -> None:
+        if future.cancelled():
+            span.set_attribute("cancelled", True)
+            span.end()
+            return
+        if future.exception() is not None:
+            self.scheduler.stats["failures"] += 1
+            span.record_exception(future.exception())
+        self._record(name, started)
+        span.end()
+
+    def _record(self, name: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.scheduler.stats["stages_run"] += 1
+        self.scheduler.stage_seconds.labels(name).record(elapsed)
+        self.timings[name] = elapsed * 1000
@@ -0,0 +1,297 @@
+"""
+Broadcast Hub
+Serialize-once WebSocket fan-out with a bounded send queue and writer task per client,
+so one slow consumer never stalls the others
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Deque, Iterable, Union
+
+logger = logging.getLogger(__name__)
+
+# What to do when a client's queue is full
+DROP_OLDEST = "drop_oldest"    # discard the oldest droppable frame (live feeds)
+DROP_NEWEST = "drop_newest"    # discard the frame being published
+DISCONNECT = "disconnect"      # the client is too far behind; close it
+
+Sender = Callable[[str], Awaitable[Any]]
+
+
+@dataclass(slots=True)
+class Frame:
+    """A message encoded once and shared by every client queue it is put on"""
+    text: str
+    created: float
+    droppable: bool = True
+    coalesce_key: Optional[str] = None
+
+    @classmethod
+    def encode(cls, message: Union[Dict[str, Any], str], droppable: bool = True,
+               coalesce_key: Optional[str] = None) -> "Frame":
+        text = message if isinstance(message, str) else json.dumps(message, default=str)
+        return cls(text, time.monotonic(), droppable, coalesce_key)
+
+
+@dataclass
+class ClientStats:
+    """Per-client delivery metrics"""
+    sent: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    max_depth: int = 0
+    last_lag_ms: float = 0.0
+    max_lag_ms: float = 0.0
+    avg_lag_ms: float = 0.0  # EWMA of enqueue-to-sent time
+
+
+class ClientChannel:
+    """
+    Bounded send queue plus writer task for one connection
+
+    Frames sharing a ``coalesce_key`` occupy a single queue slot that always holds the
+    latest frame (e.g. metrics snapshots), so a slow client gets fresh data, not a backlog.
+    """
+
+    def __init__(self, client_id: str, send: Sender, max_queue: int = 256,
+                 overflow: str = DROP_OLDEST, send_timeout: float = 10.0,
+                 on_close: Optional[Callable[[str], Any]] = None):
+        self.client_id = client_id
+        self.send = send
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.send_timeout = send_timeout
+        self.on_close = on_close
+        self.stats = ClientStats()
+        self.closed = False
+        self._queue: Deque[Union[Frame, str]] = deque()  # a str entry is a coalesce slot
+        self._latest: Dict[str, Frame] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._writer(), name=f"ws-writer-{self.client_id}")
+
+    def offer(self, frame: Frame) -> bool:
+        """Queue a frame without waiting; False if it was dropped"""
+        if self.closed:
+            return False
+
+        key = frame.coalesce_key
+        if key is not None and key in self._latest:
+            self._latest[key] = frame
+            self.stats.coalesced += 1
+            return True
+
+        if len(self._queue) >= self.max_queue and not self._make_room(frame):
+            return False
+
+        if key is not None:
+            self._latest[key] = frame
+            self._queue.append(key)
+        else:
+            self._queue.append(frame)
+        self.stats.max_depth = max(self.stats.max_depth, len(self._queue))
+        self._wakeup.set()
+        return True
+
+    def _make_room(self, frame: Frame) -> bool:
+        if not frame.droppable:
+            if len(self._queue) < 2 * self.max_queue:
+                return True  # essential frames get headroom instead of evicting anything
+        elif self.overflow == DROP_OLDEST:
+            if self._drop_oldest():
+                return True
+            self.stats.dropped += 1
+            return False
+        elif self.overflow == DROP_NEWEST:
+            self.stats.dropped += 1
+            return False
+        logger.warning(f"⚠️ WebSocket client {self.client_id} is too far behind - disconnecting")
+        self.close()
+        return False
+
+    def _drop_oldest(self) -> bool:
+        """Evict the oldest live frame, or failing that a coalesced snapshot slot"""
+        slot = None
+        for index, item in enumerate(self._queue):
+            if isinstance(item, str):
+                slot = index if slot is None else slot
+            elif item.droppable:
+                del self._queue[index]
+                self.stats.dropped += 1
+                return True
+        if slot is None:
+            return False
+        self._latest.pop(self._queue[slot], None)
+        del self._queue[slot]
+        self.stats.dropped += 1
+        return True
+
+    async def _writer(self) -> None:
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                item = self._queue.popleft()
+                frame = self._latest.pop(item) if isinstance(item, str) else item
+                async with asyncio.timeout(self.send_timeout):
+                    await self.send(frame.text)
+                self._record_lag(frame)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"WebSocket client {self.client_id} send failed: {e}")
+        finally:
+            self.close()
+
+    def _record_lag(self, frame: Frame) -> None:
+        lag = (time.monotonic() - frame.created) * 1000
+        stats = self.stats
+        stats.sent += 1
+        stats.last_lag_ms = lag
+        stats.max_lag_ms = max(stats.max_lag_ms, lag)
+        stats.avg_lag_ms = lag if stats.sent == 1 else stats.avg_lag_ms * 0.9 + lag * 0.1
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._latest.clear()
+        self._wakeup.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        if self.on_close:
+            try:
+                self.on_close(self.client_id)
+            except Exception as e:
+                logger.error(f"Error in WebSocket close callback for {self.client_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats
+        return {
+            "queue_depth": self.depth,
+            "max_depth": stats.max_depth,
+            "sent": stats.sent,
+            "dropped": stats.dropped,
+            "coalesced": stats.coalesced,
+            "last_lag_ms": round(stats.last_lag_ms, 2),
+            "avg_lag_ms": round(stats.avg_lag_ms, 2),
+            "max_lag_ms": round(stats.max_lag_ms, 2),
+        }
+
+
+class BroadcastHub:
+    """
+    Fan-out to many WebSocket clients
+
+    ``publish`` encodes once and only enqueues, so it never waits on a socket; each
+    client's writer task drains its own queue.
+    """
+
+    def __init__(self, max_queue: int = 256, overflow: str = DROP_OLDEST, send_timeout: float = 10.0):
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.send_timeout = send_timeout
+        self.channels: Dict[str, ClientChannel] = {}
+        self._close_listeners: List[Callable[[str], Any]] = []
+        self.stats = {"published": 0, "encoded": 0, "enqueued": 0, "dropped": 0, "disconnects": 0}
+
+    def add_close_listener(self, listener: Callable[[str], Any]) -> None:
+        """Called with the client id whenever a channel closes (send failure, overflow, unregister)"""
+        self._close_listeners.append(listener)
+
+    def register(self, client_id: str, send: Sender, **options: Any) -> ClientChannel:
+        """Attach a connection; ``options`` override the hub's queue settings for this client"""
+        self.unregister(client_id)
+        channel = ClientChannel(
+            client_id, send,
+            max_queue=options.get("max_queue", self.max_queue),
+            overflow=options.get("overflow", self.overflow),
+            send_timeout=options.get("send_timeout", self.send_timeout),
+            on_close=self._closed,
+        )
+        self.channels[client_id] = channel
+        channel.start()
+        return channel
+
+    def unregister(self, client_id: str) -> None:
+        channel = self.channels.get(client_id)
+        if channel is not None:
+            channel.close()
+
+    def _closed(self, client_id: str) -> None:
+        channel = self.channels.pop(client_id, None)
+        if channel is None:
+            return
+        self.stats["disconnects"] += 1
+        for listener in self._close_listeners:
+            listener(client_id)
+
+    def encode(self, message: Union[Dict[str, Any], str], droppable: bool = True,
+               coalesce_key: Optional[str] = None) -> Frame:
+        self.stats["encoded"] += 1
+        return Frame.encode(message, droppable, coalesce_key)
+
+    def publish(
+        self,
+        message: Union[Dict[str, Any], str, Frame],
+        coalesce_key: Optional[str] = None,
+        exclude: Optional[str] = None,
+        targets: Optional[Iterable[str]] = None
+    ) -> int:
+        """Queue one shared frame for every (or every targeted) client; returns how many accepted it"""
+        frame = message if isinstance(message, Frame) else self.encode(message, True, coalesce_key)
+        self.stats["published"] += 1
+        channels = self.channels if targets is None else {
+            client_id: self.channels[client_id] for client_id in targets if client_id in self.channels
+        }
+        accepted = 0
+        for client_id, channel in list(channels.items()):
+            if client_id == exclude:
+                continue
+            if channel.offer(frame):
+                accepted += 1
+            else:
+                self.stats["dropped"] += 1
+        self.stats["enqueued"] += accepted
+        return accepted
+
+    def send(self, client_id: str, message: Union[Dict[str, Any], str], droppable: bool = False) -> bool:
+        """Queue a message for one client (not dropped under backpressure by default)"""
+        channel = self.channels.get(client_id)
+        if channel is None:
+            return False
+        return channel.offer(self.encode(message, droppable))
+
+    async def close(self) -> None:
+        for channel in list(self.channels.values()):
+            channel.close()
+        await asyncio.sleep(0)
+
+    def get_stats(self, per_client: bool = False) -> Dict[str, Any]:
+        depths = [channel.depth for channel in self.channels.values()]
+        lags = [channel.stats.avg_lag_ms for channel in self.channels.values() if channel.stats.sent]
+        stats = {
+            **self.stats,
+            "clients": len(self.channels),
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "avg_lag_ms": round(sum(lags) / len(lags), 2) if lags else 0.0,
+            "max_lag_ms": round(max((c.stats.max_lag_ms for c in self.channels.values()), default=0.0), 2),
+        }
+        if per_client:
+            stats["per_client"] = {client_id: channel.get_stats() for client_id, channel in self.channels.items()}
+        return stats
@@ -0,0 +1,177 @@
+"""
+Streamed Assistant Responses
+Incremental events for one query (stage updates, visual cards, result pages and summary
+tokens) shared by the WebSocket chat and the /assistant/stream SSE endpoint
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+ROW_PAGE_SIZE = 25
+
+# Event types, in the order a successful stream emits them
+STATUS = "status"      # coarse stage update
+INTENT = "intent"      # NLP result
+CARD = "card"          # one visual card, sent as soon as its data is ready
+ROWS = "rows"          # a page of formatted results
+TOKEN = "token"        # summary text chunk ("content" is only set on these)
+DONE = "done"          # final status, full summary and composite payload
+ERROR = "error"
+
+
+def summary_card(total: int) -> Dict[str, Any]:
+    return {"type": "summary_card", "title": "Results Found", "value": total}
+
+
+def timeline_card(results: List[Dict], intent: str) -> Optional[Dict[str, Any]]:
+    """Events-over-time chart for intents where a trend is meaningful"""
+    if len(results) <= 1 or intent not in ["failed_login", "malware", "network"]:
+        return None
+    return {
+        "type": "chart",
+        "chart_type": "line",
+        "title": f"{intent.replace('_', ' ').title()} Over Time",
+        "data": [
+            {"x": result.get("@timestamp", f"Point {i+1}"), "y": 1}
+            for i, result in enumerate(results[:10])  # Limit to 10 points
+        ]
+    }
+
+
+def table_card(results: List[Dict]) -> Dict[str, Any]:
+    """Table card with the first few results"""
+    return {
+        "type": "table",
+        "title": "Recent Events",
+        "columns": [
+            {"key": "timestamp", "label": "Time"},
+            {"key": "message", "label": "Message"},
+            {"key": "source", "label": "Source"}
+        ],
+        "rows": [
+            [
+                result.get("@timestamp", "Unknown"),
+                result.get("message", result.get("event", {}).get("action", "No message")),
+                result.get("host", {}).get("name", result.get("source", {}).get("ip", "Unknown"))
+            ]
+            for result in results[:5]
+        ]
+    }
+
+
+def generate_visual_cards(results: List[Dict], intent: str) -> List[Dict]:
+    """All visual cards for a result set"""
+    if not results:
+        return []
+    cards = [summary_card(len(results)), timeline_card(results, intent), table_card(results)]
+    return [card for card in cards if card]
+
+
+def sse_event(event: Dict[str, Any]) -> str:
+    """Encode an event as a server-sent events frame"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def stream_assistant_response(
+    query: str,
+    pipeline: Any,
+    siem_connector: Any = None,
+    context: Optional[Dict[str, Any]] = None,
+    user_context: Optional[Dict[str, Any]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    size: int = 100,
+    page_size: int = ROW_PAGE_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run one query through the pipeline, yielding events as each piece becomes available
+
+    Queries that fail validation end in a ``blocked`` DONE event without reaching the
+    SIEM. Cards go out right after the fetch, the fetched rows are sent in pages of
+    ``page_size``, and the summary is streamed last in chunks (provider tokens when the
+    AI backend supports it).
+    """
+    started = time.time()
+    try:
+        yield {"type": STATUS, "stage": "nlp_processing", "message": "🔍 Analyzing your query..."}
+        result = await pipeline.process(query=query, context=context, user_context=user_context or {},
+                                        filters=filters or {})
+        if not result or result.get("error"):
+            yield {"type": ERROR, "message": (result or {}).get("error", "Pipeline returned no result")}
+            return
+
+        intent = result.get("intent", "unknown")
+        metadata = {
+            "intent": intent,
+            "confidence": result.get("confidence", 0.0),
+            "entities": result.get("entities", []),
+        }
+        yield {"type": INTENT, "stage": "query_building", **metadata}
+
+        if result.get("needs_clarification") or not result.get("siem_query"):
+            yield {"type": DONE, "status": "clarification_needed", "summary": (
+                "I need more information to help you. Could you please clarify your request?"
+            ), "metadata": {**metadata, "clarifications": result.get("clarifications", {})}}
+            return
+        if siem_connector is None:
+            yield {"type": DONE, "status": "offline", "summary": (
+                "I'm currently running in offline mode. To process security queries, please connect to a SIEM platform."
+            ), "metadata": metadata}
+            return
+
+        if not result.get("query_valid", True):
+            validation_error = result.get("validation_error") or "Query failed validation"
+            yield {"type": DONE, "status": "blocked", "summary": f"Query blocked for safety: {validation_error}",
+                   "error": validation_error, "metadata": metadata}
+            return
+
+        yield {"type": STATUS, "stage": "siem_query", "message": "🔎 Searching SIEM data..."}
+        search_results, fetch_plan = await pipeline.fetch_results(siem_connector, result["siem_query"], size=size)
+        formatted_results = await pipeline.format_results(results=search_results, query_type=intent)
+
+        cards = []
+        if formatted_results:
+            for card in (summary_card(len(formatted_results)), table_card(formatted_results),
+                         timeline_card(formatted_results, intent)):
+                if card:
+                    cards.append(card)
+                    yield {"type": CARD, "card": card}
+
+        pages = max(1, -(-len(formatted_results) // page_size))
+        for page in range(pages):
+            rows = formatted_results[page * page_size:(page + 1) * page_size]
+            if rows:
+                yield {"type": ROWS, "page": page, "pages": pages, "rows": rows}
+
+        yield {"type": STATUS, "stage": "summarizing", "message": "✍️ Summarizing findings..."}
+        summary = []
+        first_token_ms = None
+        async for chunk in pipeline.stream_summary(results=formatted_results, query=query, intent=intent):
+            if first_token_ms is None:
+                first_token_ms = round((time.time() - started) * 1000, 1)
+            summary.append(chunk)
+            yield {"type": TOKEN, "content": chunk}
+
+        yield {
+            "type": DONE,
+            "status": "success",
+            "summary": "".join(summary),
+            "metadata": {
+                **metadata,
+                "results_count": len(formatted_results),
+                "fetch_plan": fetch_plan.as_dict(),
+                "processing_time": result.get("processing_time", 0),
+                "first_token_ms": first_token_ms,
+                "total_ms": round((time.time() - started) * 1000, 1),
+                "timestamp": datetime.now().isoformat(),
+            },
+            "visual_payload": {"type": "composite", "cards": cards} if cards else None,
+        }
+
+    except Exception as e:
+        logger.error(f"Error streaming assistant response: {e}")
+        yield {"type": ERROR, "message": str(e)}
@@ -0,0 +1,162 @@
+"""
+Versioned Dashboard State
+Sequence-numbered state with a bounded ring buffer of diffs, so clients resume from
+their last version with a small delta instead of a full snapshot
+"""
+
+import copy
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Deque, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Path = Tuple[str, ...]
+
+
+@dataclass(slots=True)
+class StateDelta:
+    """Changes between version ``seq - 1`` and ``seq``
+
+    ``set`` holds new values; a dict value is merged cell by cell into a dict already held
+    under that key (e.g. only the MITRE heatmap cells that changed). ``unset`` lists the
+    removed ``(key,)`` or ``(key, cell)`` paths and is applied first.
+    """
+    seq: int
+    set: Dict[str, Any] = field(default_factory=dict)
+    unset: List[Path] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.set or self.unset)
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any], seq: int) -> StateDelta:
+    """Diff two state versions, descending one level into dicts held under the same key"""
+    delta = StateDelta(seq)
+    for key in old.keys() - new.keys():
+        delta.unset.append((key,))
+    for key, value in new.items():
+        if key not in old:
+            delta.set[key] = copy.deepcopy(value)
+            continue
+        previous = old[key]
+        if isinstance(value, dict) and isinstance(previous, dict):
+            cells = {cell: copy.deepcopy(v) for cell, v in value.items()
+                     if cell not in previous or previous[cell] != v}
+            delta.unset.extend((key, cell) for cell in previous.keys() - value.keys())
+            if cells:
+                delta.set[key] = cells
+        elif previous != value:
+            delta.set[key] = copy.deepcopy(value)
+    return delta
+
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a ``dashboard_delta`` message (or StateDelta fields) to a state dict in place"""
+    for path in delta.get("unset", ()):
+        if len(path) == 1:
+            state.pop(path[0], None)
+        elif isinstance(state.get(path[0]), dict):
+            state[path[0]].pop(path[1], None)
+    for key, value in delta.get("set", {}).items():
+        if isinstance(value, dict) and isinstance(state.get(key), dict):
+            state[key].update(copy.deepcopy(value))
+        else:
+            state[key] = copy.deepcopy(value)
+    return state
+
+
+class VersionedState:
+    """
+    Live state dict plus its committed versions
+
+    The owner mutates ``data`` freely; ``commit`` diffs it against the last committed
+    version, assigns the next sequence number and keeps the diff in a ring buffer of
+    ``history`` entries. ``epoch`` changes on every restart so stale sequence numbers
+    from a previous process always get a full snapshot.
+    """
+
+    def __init__(self, initial: Dict[str, Any], history: int = 512):
+        self.data = initial
+        self.seq = 0
+        self.epoch = uuid.uuid4().hex[:12]
+        self._committed = copy.deepcopy(initial)
+        self._deltas: Deque[StateDelta] = deque(maxlen=history)
+        self.stats = {"commits": 0, "snapshots": 0, "resumed": 0, "resync": 0}
+
+    @property
+    def oldest_seq(self) -> int:
+        """Lowest version a client can resume from with deltas alone"""
+        return self._deltas[0].seq - 1 if self._deltas else self.seq
+
+    def commit(self) -> Optional[Dict[str, Any]]:
+        """Record changes since the last commit; returns the delta message, or None if unchanged"""
+        delta = diff_state(self._committed, self.data, self.seq + 1)
+        if not delta:
+            return None
+        apply_delta(self._committed, {"set": delta.set, "unset": delta.unset})
+        self.seq = delta.seq
+        self._deltas.append(delta)
+        self.stats["commits"] += 1
+        return self._delta_message(self.seq - 1, delta.set, delta.unset)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Full committed state at the current sequence number"""
+        self.stats["snapshots"] += 1
+        return {
+            "type": "dashboard_state",
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "data": copy.deepcopy(self._committed),
+        }
+
+    def since(self, seq: Optional[int], epoch: Optional[str] = None) -> Dict[str, Any]:
+        """Message bringing a client at ``seq`` up to date: one merged delta when the ring
+        buffer still covers it, otherwise a full snapshot"""
+        if seq is None or epoch != self.epoch or not self.oldest_seq <= seq <= self.seq:
+            if seq is not None:
+                self.stats["resync"] += 1
+            return self.snapshot()
+
+        merged_set: Dict[str, Any] = {}
+        merged_unset: Set[Path] = set()
+        for delta in self._deltas:
+            if delta.seq <= seq:
+                continue
+            for path in delta.unset:
+                if len(path) == 1:
+                    merged_set.pop(path[0], None)
+                elif isinstance(merged_set.get(path[0]), dict):
+                    merged_set[path[0]].pop(path[1], None)
+                merged_unset.add(path)
+            for key, value in delta.set.items():
+                merged_unset.discard((key,))
+                if isinstance(value, dict):
+                    merged_unset.difference_update((key, cell) for cell in value)
+                    if isinstance(merged_set.get(key), dict):
+                        merged_set[key].update(value)
+                        continue
+                merged_set[key] = dict(value) if isinstance(value, dict) else value
+        self.stats["resumed"] += 1
+        return self._delta_message(seq, merged_set, sorted(merged_unset))
+
+    def _delta_message(self, from_seq: int, changes: Dict[str, Any], unset: List[Path]) -> Dict[str, Any]:
+        return {
+            "type": "dashboard_delta",
+            "epoch": self.epoch,
+            "from_seq": from_seq,
+            "seq": self.seq,
+            "set": changes,
+            "unset": [list(path) for path in unset],
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "seq": self.seq,
+            "epoch": self.epoch,
+            "buffered_deltas": len(self._deltas),
+            "oldest_seq": self.oldest_seq,
+        }
@@ -0,0 +1,197 @@
+"""
+Topic Subscriptions
+Compiled predicate index routing each event only to the clients whose topics it matches
+"""
+
+import fnmatch
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Set, FrozenSet, Iterable, Tuple, Pattern
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = ("info", "low", "medium", "high", "critical")
+
+# Topic dimensions: exact-value ones and ones accepting glob patterns ("web-*", "svc_*")
+EXACT_DIMENSIONS = ("event_type", "severity", "technique")
+PATTERN_DIMENSIONS = ("host", "user")
+
+# Client-facing topic names -> dimension
+TOPIC_ALIASES = {
+    "event_types": "event_type", "event_type": "event_type",
+    "severities": "severity", "severity": "severity",
+    "techniques": "technique", "mitre_techniques": "technique", "technique": "technique",
+    "hosts": "host", "host": "host",
+    "users": "user", "user": "user",
+}
+
+_MAX_CACHED_VALUES = 4096
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """
+    One client's topics: values are OR'ed within a dimension, dimensions are AND'ed
+
+    A dimension left out matches everything; a subscription with no topics receives every event.
+    """
+    client_id: str
+    topics: Tuple[Tuple[str, FrozenSet[str]], ...] = ()
+
+    @classmethod
+    def from_request(cls, client_id: str, topics: Optional[Dict[str, Any]]) -> "Subscription":
+        """Parse a client's ``subscribe`` payload (``min_severity`` expands to a severity band)"""
+        dimensions: Dict[str, Set[str]] = defaultdict(set)
+        for name, values in (topics or {}).items():
+            if name == "min_severity":
+                level = str(values).lower()
+                if level not in SEVERITY_ORDER:
+                    raise ValueError(f"Unknown severity: {values}")
+                dimensions["severity"].update(SEVERITY_ORDER[SEVERITY_ORDER.index(level):])
+                continue
+            dimension = TOPIC_ALIASES.get(name)
+            if dimension is None:
+                raise ValueError(f"Unknown topic: {name}")
+            if isinstance(values, str):
+                values = [values]
+            normalized = {str(value).lower() for value in values if str(value).strip()}
+            if dimension == "technique":
+                normalized = {value.upper() for value in normalized}
+            dimensions[dimension].update(normalized)
+        return cls(client_id, tuple(sorted((name, frozenset(values)) for name, values in dimensions.items() if values)))
+
+    @property
+    def constraints(self) -> int:
+        return len(self.topics)
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {name: sorted(values) for name, values in self.topics}
+
+
+class _PatternTable:
+    """Exact values plus compiled globs for one dimension, with memoized lookups"""
+
+    def __init__(self):
+        self.exact: Dict[str, Set[str]] = defaultdict(set)
+        self.globs: Dict[str, Tuple[Pattern, Set[str]]] = {}
+        self._cache: Dict[str, FrozenSet[str]] = {}
+
+    def add(self, value: str, client_id: str) -> None:
+        if any(char in value for char in "*?["):
+            compiled, clients = self.globs.get(value, (re.compile(fnmatch.translate(value)), set()))
+            clients.add(client_id)
+            self.globs[value] = (compiled, clients)
+        else:
+            self.exact[value].add(client_id)
+        self._cache.clear()
+
+    def remove(self, value: str, client_id: str) -> None:
+        if value in self.globs:
+            clients = self.globs[value][1]
+            clients.discard(client_id)
+            if not clients:
+                del self.globs[value]
+        elif value in self.exact:
+            self.exact[value].discard(client_id)
+            if not self.exact[value]:
+                del self.exact[value]
+        self._cache.clear()
+
+    def lookup(self, value: str) -> FrozenSet[str]:
+        cached = self._cache.get(value)
+        if cached is not None:
+            return cached
+        clients = set(self.exact.get(value, ()))
+        for compiled, glob_clients in self.globs.values():
+            if compiled.match(value):
+                clients |= glob_clients
+        result = frozenset(clients)
+        if len(self._cache) >= _MAX_CACHED_VALUES:
+            self._cache.clear()
+        self._cache[value] = result
+        return result
+
+
+class SubscriptionIndex:
+    """
+    Counting index over subscriptions
+
+    Each event looks up the posting list of every value it carries; a subscription
+    matches when its hit count reaches its number of constrained dimensions. Cost is
+    proportional to the postings touched, not to the number of connected clients.
+    """
+
+    def __init__(self):
+        self.subscriptions: Dict[str, Subscription] = {}
+        self._match_all: Set[str] = set()
+        self._exact: Dict[str, Dict[str, Set[str]]] = {name: defaultdict(set) for name in EXACT_DIMENSIONS}
+        self._patterns: Dict[str, _PatternTable] = {name: _PatternTable() for name in PATTERN_DIMENSIONS}
+        self.stats = {"events": 0, "routed": 0}
+
+    def subscribe(self, subscription: Subscription) -> None:
+        """Add or replace a client's subscription"""
+        self.unsubscribe(subscription.client_id)
+        self.subscriptions[subscription.client_id] = subscription
+        if not subscription.constraints:
+            self._match_all.add(subscription.client_id)
+            return
+        for name, values in subscription.topics:
+            for value in values:
+                if name in self._patterns:
+                    self._patterns[name].add(value, subscription.client_id)
+                else:
+                    self._exact[name][value].add(subscription.client_id)
+
+    def unsubscribe(self, client_id: str) -> None:
+        subscription = self.subscriptions.pop(client_id, None)
+        if subscription is None:
+            return
+        self._match_all.discard(client_id)
+        for name, values in subscription.topics:
+            for value in values:
+                if name in self._patterns:
+                    self._patterns[name].remove(value, client_id)
+                else:
+                    postings = self._exact[name]
+                    postings[value].discard(client_id)
+                    if not postings[value]:
+                        del postings[value]
+
+    def match(self, attributes: Dict[str, Any]) -> Set[str]:
+        """Client ids whose subscription accepts an event with these attribute values"""
+        hits: Dict[str, int] = defaultdict(int)
+        for name, values in attributes.items():
+            if values is None:
+                continue
+            if isinstance(values, str) or not isinstance(values, Iterable):
+                values = (values,)
+            matched: Set[str] = set()
+            for value in values:
+                if value is None:
+                    continue
+                if name in self._patterns:
+                    matched |= self._patterns[name].lookup(str(value).lower())
+                elif name == "technique":
+                    matched |= self._exact[name].get(str(value).upper(), set())
+                elif name in self._exact:
+                    matched |= self._exact[name].get(str(value).lower(), set())
+            for client_id in matched:
+                hits[client_id] += 1
+
+        targets = set(self._match_all)
+        for client_id, count in hits.items():
+            if count == self.subscriptions[client_id].constraints:
+                targets.add(client_id)
+        self.stats["events"] += 1
+        self.stats["routed"] += len(targets)
+        return targets
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "subscriptions": len(self.subscriptions),
+            "match_all": len(self._match_all),
+            "avg_fanout": round(self.stats["routed"] / self.stats["events"], 2) if self.stats["events"] else 0.0,
+        }
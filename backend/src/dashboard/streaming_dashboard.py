@@ -23,6 +23,7 @@ import threading
 import queue
 import uuid
 from pathlib import Path
+from urllib.parse import urlparse, parse_qs
 import sys
 
 # Add project root to path for imports
@@ -32,6 +33,9 @@ sys.path.insert(0, str(project_root))
 # Import our enhanced modules
 from nlp.security_entities import SecurityNLPRecognizer
 from analytics.attack_chains import SimpleAttackChainGenerator
+from core.streaming.hub import BroadcastHub, DROP_OLDEST
+from core.streaming.subscriptions import Subscription, SubscriptionIndex
+from core.streaming.state import VersionedState
 
 
 class DashboardEventType(Enum):
@@ -56,6 +60,23 @@ class DashboardEvent:
     severity: str = "medium"
     source: str = "kartavya_siem"
 
+    def topics(self) -> Dict[str, Any]:
+        """Values clients can subscribe on: type, severity, MITRE techniques, hosts and users"""
+        data = self.data
+        context = data.get("context") or {}
+        victim = data.get("victim") or {}
+        techniques = list(data.get("mitre_techniques") or [])
+        techniques += [t.get("id") for t in (data.get("mitre_mapping") or {}).get("techniques", [])]
+        hosts = [context.get("host"), context.get("source_host"), context.get("dest_host"), victim.get("hostname")]
+        users = [context.get("user"), victim.get("username")]
+        return {
+            "event_type": self.event_type.value,
+            "severity": self.severity,
+            "technique": [t for t in techniques if t],
+            "host": [h for h in hosts if h],
+            "user": [u for u in users if u],
+        }
+
 
 class RealTimeMetricsGenerator:
     """Generates realistic real-time security metrics"""
@@ -299,34 +320,50 @@ class SecurityEventSimulator:
 class StreamingDashboard:
     """Main streaming dashboard with WebSocket support"""
     
-    def __init__(self, host="localhost", port=8765):
+    def __init__(self, host="localhost", port=8765, max_client_queue=256,
+                 snapshot_interval=1.0, replay_history=512):
         self.host = host
         self.port = port
         self.clients: Set[websockets.WebSocketServerProtocol] = set()
+        self.client_ids: Dict[Any, str] = {}
+        self._sockets: Dict[str, Any] = {}
+        
+        # Serialize-once fan-out; a slow viewer only ever backs up its own queue
+        self.hub = BroadcastHub(max_queue=max_client_queue, overflow=DROP_OLDEST)
+        self.hub.add_close_listener(self._client_closed)
+        # Clients receive everything until they narrow it with a "subscribe" message
+        self.subscriptions = SubscriptionIndex()
         self.event_simulator = SecurityEventSimulator()
         self.running = False
         self.event_queue = queue.Queue()
         
-        # Dashboard state
-        self.dashboard_state = {
+        # Dashboard state: mutated in place, committed as sequence-numbered deltas
+        self.state = VersionedState({
             "total_alerts": 0,
             "active_incidents": 0,
             "mitre_heatmap": {},
             "top_threats": [],
             "system_health": "operational"
-        }
+        }, history=replay_history)
+        self.dashboard_state = self.state.data
+        self.snapshot_interval = snapshot_interval
     
     async def register_client(self, websocket, path):
         """Register a new WebSocket client"""
+        client_id = str(uuid.uuid4())
         self.clients.add(websocket)
+        self.client_ids[websocket] = client_id
+        self._sockets[client_id] = websocket
+        self.hub.register(client_id, websocket.send)
+        self.subscriptions.subscribe(Subscription(client_id))
         print(f"📱 New client connected: {websocket.remote_address}")
         
-        # Send initial dashboard state
-        await self.send_to_client(websocket, {
-            "type": "dashboard_state",
-            "data": self.dashboard_state,
-            "timestamp": datetime.now().isoformat()
-        })
+        # Full state for new clients; reconnects passing ?seq=&epoch= get only what they missed
+        query = parse_qs(urlparse(path or "").query)
+        seq = query.get("seq", [None])[0]
+        await self.send_to_client(websocket, self.state.since(
+            int(seq) if seq and seq.isdigit() else None, query.get("epoch", [None])[0]
+        ))
         
         try:
             # Handle client messages
@@ -343,6 +380,7 @@ class StreamingDashboard:
             pass
         finally:
             self.clients.discard(websocket)
+            self.hub.unregister(self.client_ids.get(websocket, ""))
             print(f"📱 Client disconnected: {websocket.remote_address}")
     
     async def handle_client_message(self, websocket, data):
@@ -357,6 +395,29 @@ class StreamingDashboard:
                 "data": metrics
             })
         
+        elif msg_type == "resume":
+            # Sent by clients that noticed a gap in the delta sequence
+            seq = data.get("seq")
+            await self.send_to_client(websocket, self.state.since(
+                seq if isinstance(seq, int) else None, data.get("epoch")
+            ))
+        
+        elif msg_type in ("subscribe", "unsubscribe"):
+            client_id = self.client_ids.get(websocket)
+            if client_id is None:
+                return
+            try:
+                topics = data.get("topics") if msg_type == "subscribe" else None
+                subscription = Subscription.from_request(client_id, topics)
+            except (TypeError, ValueError) as e:
+                await self.send_to_client(websocket, {"type": "error", "message": str(e)})
+                return
+            self.subscriptions.subscribe(subscription)
+            await self.send_to_client(websocket, {
+                "type": "subscribed",
+                "topics": subscription.as_dict()
+            })
+        
         elif msg_type == "chat_query":
             # Simulate chat response
             query = data.get("message", "")
@@ -379,38 +440,45 @@ class StreamingDashboard:
                 severity="info"
             )
             
-            await self.broadcast_event(response_event)
+            # The asker always gets its answer; other viewers only if subscribed to it
+            await self.send_to_client(websocket, self._event_message(response_event))
+            await self.broadcast_event(response_event, exclude=self.client_ids.get(websocket))
     
     async def send_to_client(self, websocket, data):
-        """Send data to a specific client"""
-        try:
-            await websocket.send(json.dumps(data))
-        except websockets.exceptions.ConnectionClosed:
+        """Queue data for a specific client (delivered in order by its writer task)"""
+        client_id = self.client_ids.get(websocket)
+        if client_id is None or not self.hub.send(client_id, data):
             self.clients.discard(websocket)
     
-    async def broadcast_event(self, event: DashboardEvent):
-        """Broadcast event to all connected clients"""
-        if not self.clients:
-            return
-        
-        message = {
+    @staticmethod
+    def _event_message(event: DashboardEvent) -> Dict[str, Any]:
+        return {
             "type": "dashboard_event",
-            "event": asdict(event)
+            "event": {**asdict(event), "event_type": event.event_type.value}
         }
-        
-        # Update dashboard state
+    
+    async def broadcast_event(self, event: DashboardEvent, exclude: str = None):
+        """Broadcast event to the clients subscribed to it"""
+        # State advances even with nobody watching so reconnecting clients can catch up
         self.update_dashboard_state(event)
+        if not self.clients:
+            return
         
-        # Send to all clients
-        disconnected = set()
-        for client in self.clients:
-            try:
-                await self.send_to_client(client, message)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected.add(client)
+        targets = self.subscriptions.match(event.topics())
+        if not targets:
+            return
         
-        # Remove disconnected clients
-        self.clients -= disconnected
+        # Encode once and enqueue for matching clients; metrics snapshots coalesce to the latest
+        coalesce_key = "system_metric" if event.event_type == DashboardEventType.SYSTEM_METRIC else None
+        self.hub.publish(self._event_message(event), coalesce_key=coalesce_key, exclude=exclude, targets=targets)
+    
+    def _client_closed(self, client_id: str):
+        """Forget clients whose writer gave up (closed socket, too far behind)"""
+        self.subscriptions.unsubscribe(client_id)
+        websocket = self._sockets.pop(client_id, None)
+        if websocket is not None:
+            self.clients.discard(websocket)
+            self.client_ids.pop(websocket, None)
     
     def update_dashboard_state(self, event: DashboardEvent):
         """Update internal dashboard state based on event"""
@@ -429,6 +497,23 @@ class StreamingDashboard:
                 self.dashboard_state["mitre_heatmap"][technique] = \
                     self.dashboard_state["mitre_heatmap"].get(technique, 0) + 1
     
+    def publish_state_delta(self) -> bool:
+        """Commit pending state changes and push the diff to every client"""
+        delta = self.state.commit()
+        if delta is None or not self.clients:
+            return False
+        self.hub.publish(delta)
+        return True
+    
+    async def snapshot_loop(self):
+        """Periodically publish state diffs (changed counters and heatmap cells only)"""
+        while self.running:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                self.publish_state_delta()
+            except Exception as e:
+                print(f"❌ Error publishing dashboard state: {e}")
+    
     async def event_generator_loop(self):
         """Main event generation loop"""
         while self.running:
@@ -483,6 +568,7 @@ class StreamingDashboard:
         
         # Start event generator
         event_task = asyncio.create_task(self.event_generator_loop())
+        snapshot_task = asyncio.create_task(self.snapshot_loop())
         
         # Start WebSocket server
         server = await websockets.serve(
@@ -504,6 +590,7 @@ class StreamingDashboard:
             print("\n🛑 Shutting down Streaming Dashboard...")
             self.running = False
             event_task.cancel()
+            snapshot_task.cancel()
             server.close()
             await server.wait_closed()
 
@@ -580,9 +667,13 @@ def create_test_client():
     <script>
         let socket;
         let eventCount = 0;
+        let dashboardState = null;
+        let stateSeq = null;
+        let stateEpoch = null;
         
         function connect() {
-            socket = new WebSocket('ws://localhost:8765');
+            const resume = stateSeq === null ? '' : `?seq=${stateSeq}&epoch=${stateEpoch}`;
+            socket = new WebSocket('ws://localhost:8765/' + resume);
             
             socket.onopen = function() {
                 document.getElementById('connection-status').textContent = 'Connected';
@@ -605,8 +696,37 @@ def create_test_client():
             if (data.type === 'dashboard_event') {
                 handleDashboardEvent(data.event);
             } else if (data.type === 'dashboard_state') {
-                updateDashboardState(data.data);
+                dashboardState = data.data;
+                stateSeq = data.seq;
+                stateEpoch = data.epoch;
+                updateDashboardState(dashboardState);
+            } else if (data.type === 'dashboard_delta') {
+                applyStateDelta(data);
+            }
+        }
+        
+        function applyStateDelta(delta) {
+            if (dashboardState === null || delta.epoch !== stateEpoch || delta.from_seq !== stateSeq) {
+                if (dashboardState === null || delta.seq > stateSeq) {
+                    socket.send(JSON.stringify({type: 'resume', seq: stateSeq, epoch: stateEpoch}));
+                }
+                return;
+            }
+            for (const path of delta.unset) {
+                if (path.length === 1) delete dashboardState[path[0]];
+                else if (dashboardState[path[0]]) delete dashboardState[path[0]][path[1]];
+            }
+            for (const [key, value] of Object.entries(delta.set)) {
+                const current = dashboardState[key];
+                if (value && typeof value === 'object' && !Array.isArray(value) &&
+                    current && typeof current === 'object' && !Array.isArray(current)) {
+                    Object.assign(current, value);
+                } else {
+                    dashboardState[key] = value;
+                }
             }
+            stateSeq = delta.seq;
+            updateDashboardState(dashboardState);
         }
         
         function handleDashboardEvent(event) {
@@ -16,6 +16,8 @@ from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import multiprocessing as mp
 from pathlib import Path
 
+from ..core.monitoring.metrics import COUNTER, GAUGE, MetricFamily, get_registry
+
 # External dependencies
 try:
     import pandas as pd
@@ -416,6 +418,13 @@ class BatchExecutionEngine:
         self.processed_jobs = 0
         self.failed_jobs = 0
         
+        # /metrics: job durations are recorded on completion, counters read on scrape
+        registry = get_registry()
+        self.job_seconds = registry.histogram(
+            "batch_job_duration_seconds", "Wall time of batch jobs", ("job_type", "outcome"), unit="seconds"
+        )
+        registry.register_collector(self.collect_metrics)
+        
         # Create directories
         Path(config.temp_storage_path).mkdir(parents=True, exist_ok=True)
         Path(config.checkpoint_storage_path).mkdir(parents=True, exist_ok=True)
@@ -490,6 +499,24 @@ class BatchExecutionEngine:
             "success_rate": self.processed_jobs / max(self.processed_jobs + self.failed_jobs, 1) * 100
         }
     
+    def collect_metrics(self) -> List[MetricFamily]:
+        """get_engine_stats() essentials as metric families for /metrics"""
+        families = [
+            MetricFamily("batch_jobs", COUNTER, "Batch jobs finished by outcome")
+            .add({"outcome": "completed"}, self.processed_jobs)
+            .add({"outcome": "failed"}, self.failed_jobs),
+            MetricFamily("batch_workers", GAUGE, "Batch worker tasks running")
+            .add({}, len(self.workers) if self.running else 0),
+        ]
+        # Local queue depths are free to read; Redis-backed depths need a round trip
+        if not self.queue.redis_client:
+            families.append(
+                MetricFamily("batch_queue_depth", GAUGE, "Jobs waiting in the local batch queues")
+                .add({"queue": "normal"}, self.queue.local_queue.qsize())
+                .add({"queue": "priority"}, self.queue.priority_queue.qsize())
+            )
+        return families
+    
     async def _worker(self, worker_id: str):
         """Worker task for processing jobs"""
         logger.info(f"Worker {worker_id} started")
@@ -581,6 +608,9 @@ class BatchExecutionEngine:
             
             await self.status_tracker.update_status(job_id, status)
             self.processed_jobs += 1
+            self.job_seconds.labels(job.job_type, "completed").record(
+                status.metrics["processing_time_seconds"]
+            )
             
             logger.info(f"Job {job_id} completed successfully by worker {worker_id}")
             
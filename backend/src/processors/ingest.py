@@ -0,0 +1,702 @@
+"""
+Bulk Ingest Pipeline
+Streams events from the JSONL dataset, mock generators and attack-chain scenarios
+through a bounded parse -> normalize -> enrich -> bulk-write pipeline into
+Elasticsearch (``_bulk``) or MongoDB (``insert_many``)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Optional, AsyncIterator, Tuple, Iterable
+
+from ..core.datasets.ecs import record_to_ecs
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATASET_PATH = (
+    Path(__file__).resolve().parents[2]
+    / "data" / "datasets" / "Advanced_SIEM_Dataset" / "advanced_siem_dataset.jsonl"
+)
+
+# Bulk item statuses worth retrying; anything else (mapping errors, bad documents) is rejected
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# MongoDB write error codes that are transient (not-primary, shutdown, timeouts)
+MONGO_RETRYABLE_CODES = {6, 7, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+MONGO_DUPLICATE_KEY = 11000
+
+MOCK_GENERATORS = {
+    "windows": "WindowsEventGenerator",
+    "system_metrics": "SystemMetricsGenerator",
+    "authentication": "AuthenticationEventGenerator",
+    "auditbeat": "AuditbeatEventGenerator",
+    "packetbeat": "PacketbeatEventGenerator",
+    "filebeat": "FilebeatEventGenerator",
+    "network": "NetworkLogsGenerator",
+    "security_alerts": "SecurityAlertsGenerator",
+    "process": "ProcessLogsGenerator",
+}
+
+# (document id, encoded payload, payload size in bytes)
+PreparedDoc = Tuple[str, Any, int]
+
+
+@dataclass
+class IngestConfig:
+    """Bulk ingest configuration"""
+    target: str = "elasticsearch"           # "elasticsearch" or "mongodb"
+    index: str = "siem-events"              # ES index (MongoDB writes to the events collection)
+    source_name: str = "ingest"
+
+    # Batching
+    chunk_size: int = 2000                  # items per source chunk / transform unit
+    batch_size: int = 5000                  # max documents per bulk request
+    batch_bytes: int = 10 * 1024 * 1024     # max payload bytes per bulk request
+
+    # Concurrency
+    queue_size: int = 8                     # chunks / batches buffered between stages
+    transform_workers: int = 2
+    transform_processes: int = 0            # > 0 moves parse/normalize/enrich/encode to a process pool (else threads)
+    writers: int = 4
+
+    # Retries
+    max_retries: int = 5
+    retry_backoff: float = 0.5
+
+    progress_interval: float = 10.0
+
+
+@dataclass
+class IngestStats:
+    """Ingest counters and throughput"""
+    read: int = 0
+    transformed: int = 0
+    parse_errors: int = 0
+    batches: int = 0
+    written: int = 0
+    rejected: int = 0
+    failed: int = 0
+    retried: int = 0
+    bytes_written: int = 0
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return max(1e-9, (self.finished_at or time.time()) - self.started_at)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        return {
+            "read": self.read,
+            "transformed": self.transformed,
+            "parse_errors": self.parse_errors,
+            "batches": self.batches,
+            "written": self.written,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "retried": self.retried,
+            "bytes_written": self.bytes_written,
+            "elapsed_seconds": round(elapsed, 2),
+            "events_per_second": round(self.written / elapsed, 1),
+            "mb_per_second": round(self.bytes_written / elapsed / (1024 * 1024), 2),
+        }
+
+
+# ----------------------------------------------------------------------
+# Transform stages (module-level so they can run in a process pool)
+# ----------------------------------------------------------------------
+
+def parse_item(item: Any) -> Optional[Dict[str, Any]]:
+    """Raw JSONL line (bytes/str) or already-decoded dict -> dict"""
+    if isinstance(item, dict):
+        return item
+    if isinstance(item, (bytes, str)):
+        if not item.strip():
+            return None
+        decoded = json.loads(item)
+        return decoded if isinstance(decoded, dict) else None
+    raise TypeError(f"Unsupported ingest item: {type(item).__name__}")
+
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """ECS-shaped records pass through; flat dataset rows are mapped"""
+    if "@timestamp" not in record or not any(isinstance(v, dict) for v in record.values()):
+        record = record_to_ecs(record)
+
+    timestamp = record.get("@timestamp")
+    if isinstance(timestamp, datetime):
+        record["@timestamp"] = timestamp.isoformat()
+    return record
+
+
+def enrich_record(record: Dict[str, Any], source_name: str, ingested: str) -> Dict[str, Any]:
+    """Add ingest metadata and ECS ``related.*`` pivots"""
+    event = record.get("event")
+    if not isinstance(event, dict):
+        event = record["event"] = {}
+    event.setdefault("ingested", ingested)
+    event.setdefault("dataset", source_name)
+
+    related: Dict[str, List[str]] = {}
+    for group, path in (
+        ("ip", ("source", "ip")),
+        ("ip", ("destination", "ip")),
+        ("user", ("user", "name")),
+        ("hosts", ("host", "name")),
+        ("hosts", ("host", "hostname")),
+    ):
+        parent = record.get(path[0])
+        value = parent.get(path[1]) if isinstance(parent, dict) else None
+        if isinstance(value, str) and value and value not in related.get(group, ()):
+            related.setdefault(group, []).append(value)
+    if related:
+        record.setdefault("related", related)
+    return record
+
+
+def encode_record(record: Dict[str, Any], target: str) -> PreparedDoc:
+    """
+    Serialize once and derive a content-hash ``_id``
+
+    The id makes retries idempotent: a re-sent item overwrites itself in
+    Elasticsearch and hits a duplicate key in MongoDB instead of duplicating.
+    """
+    line = json.dumps(record, separators=(",", ":"), default=str).encode()
+    doc_id = hashlib.blake2b(line, digest_size=12).hexdigest()
+
+    if target == "mongodb":
+        document = dict(record, _id=doc_id)
+        timestamp = document.get("@timestamp")
+        if isinstance(timestamp, str):
+            try:
+                document["@timestamp"] = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            except ValueError:
+                pass
+        return doc_id, document, len(line)
+
+    payload = b'{"index":{"_id":"' + doc_id.encode() + b'"}}\n' + line + b"\n"
+    return doc_id, payload, len(payload)
+
+
+def transform_chunk(items: List[Any], target: str, source_name: str) -> Tuple[List[PreparedDoc], int]:
+    """parse -> normalize -> enrich -> encode one chunk; returns (prepared docs, error count)"""
+    ingested = datetime.now(timezone.utc).isoformat()
+    prepared: List[PreparedDoc] = []
+    errors = 0
+    for item in items:
+        try:
+            record = parse_item(item)
+            if record is None:
+                continue
+            record = enrich_record(normalize_record(record), source_name, ingested)
+            prepared.append(encode_record(record, target))
+        except Exception:
+            errors += 1
+    return prepared, errors
+
+
+def iter_batches(docs: Iterable[PreparedDoc], batch_size: int, batch_bytes: int) -> Iterable[List[PreparedDoc]]:
+    """Group prepared docs into batches bounded by document count and payload bytes"""
+    batch: List[PreparedDoc] = []
+    size = 0
+    for doc in docs:
+        if batch and (len(batch) >= batch_size or size + doc[2] > batch_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(doc)
+        size += doc[2]
+    if batch:
+        yield batch
+
+
+# ----------------------------------------------------------------------
+# Sources (async iterators of chunks)
+# ----------------------------------------------------------------------
+
+async def jsonl_source(
+    path: Optional[Path] = None,
+    chunk_size: int = 2000,
+    limit: Optional[int] = None
+) -> AsyncIterator[List[bytes]]:
+    """Stream raw lines from a JSONL file without loading it into memory"""
+    path = Path(path or DEFAULT_DATASET_PATH)
+    remaining = limit
+
+    with open(path, "rb") as handle:
+        while remaining is None or remaining > 0:
+            wanted = chunk_size if remaining is None else min(chunk_size, remaining)
+            lines = await asyncio.to_thread(lambda: list(itertools.islice(handle, wanted)))
+            if not lines:
+                break
+            if remaining is not None:
+                remaining -= len(lines)
+            yield lines
+
+
+def _load_mock_generators(names: Optional[List[str]], seed: Optional[int]) -> List[Any]:
+    from mock import generators as mock_generators
+
+    selected = names or list(MOCK_GENERATORS)
+    unknown = [name for name in selected if name not in MOCK_GENERATORS]
+    if unknown:
+        raise ValueError(f"Unknown mock generators: {unknown}")
+    return [getattr(mock_generators, MOCK_GENERATORS[name])(seed=seed) for name in selected]
+
+
+def _mock_event_to_record(event: Any) -> Dict[str, Any]:
+    record = dict(event.data)
+    record.setdefault("@timestamp", event.timestamp.isoformat())
+    event_fields = record.get("event")
+    if isinstance(event_fields, dict):
+        event_fields.setdefault("id", event.id)
+        event_fields.setdefault("severity", event.severity.value)
+    return record
+
+
+async def mock_source(
+    count: int,
+    chunk_size: int = 2000,
+    generators: Optional[List[str]] = None,
+    seed: Optional[int] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Generate ``count`` events round-robin across the mock generators"""
+    instances = _load_mock_generators(generators, seed)
+    per_generator = max(1, chunk_size // len(instances))
+
+    def generate(n: int) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        for generator in instances:
+            take = min(per_generator, n - len(records))
+            if take <= 0:
+                break
+            records.extend(_mock_event_to_record(e) for e in generator.generate_batch(take))
+        return records
+
+    produced = 0
+    while produced < count:
+        chunk = await asyncio.to_thread(generate, min(chunk_size, count - produced))
+        if not chunk:
+            break
+        produced += len(chunk)
+        yield chunk
+
+
+async def attack_chain_source(scenarios: int, chunk_size: int = 2000) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Events from ``scenarios`` multi-stage attack chains, cycling scenario types and victims"""
+    from ..analytics.attack_chains import SimpleAttackChainGenerator
+
+    generator = SimpleAttackChainGenerator()
+    builders = [
+        generator.generate_apt_spearphishing_attack,
+        generator.generate_ransomware_attack,
+        generator.generate_insider_threat_scenario,
+    ]
+
+    buffer: List[Dict[str, Any]] = []
+    for i in range(scenarios):
+        victim = generator.victim_profiles[i % len(generator.victim_profiles)]
+        scenario = await builders[i % len(builders)](victim)
+        for event in scenario.events:
+            labels = event.setdefault("labels", {})
+            if isinstance(labels, dict):
+                labels.setdefault("attack_scenario", scenario.name)
+            buffer.append(event)
+        if len(buffer) >= chunk_size:
+            yield buffer
+            buffer = []
+    if buffer:
+        yield buffer
+
+
+# ----------------------------------------------------------------------
+# Writers
+# ----------------------------------------------------------------------
+
+class BulkWriter(ABC):
+    """
+    Writes one batch and reports per-item outcomes
+
+    ``write`` returns ``(written, retryable_docs, rejected)`` so only the
+    failed items of a batch are retried.
+    """
+
+    async def open(self) -> None:
+        pass
+
+    @abstractmethod
+    async def write(self, batch: List[PreparedDoc]) -> Tuple[int, List[PreparedDoc], int]:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class ElasticsearchBulkWriter(BulkWriter):
+    """NDJSON ``_bulk`` requests over a pooled aiohttp session"""
+
+    def __init__(
+        self,
+        url: str,
+        index: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        timeout: float = 120.0,
+        connections: int = 16
+    ):
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("aiohttp is required for Elasticsearch bulk ingest")
+        self.bulk_url = f"{url.rstrip('/')}/{index}/_bulk"
+        self.auth = aiohttp.BasicAuth(username, password) if username and password else None
+        self.timeout = timeout
+        self.connections = connections
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self._logged_rejections = 0
+
+    async def open(self) -> None:
+        self.session = aiohttp.ClientSession(
+            auth=self.auth,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=self.connections)
+        )
+
+    async def write(self, batch: List[PreparedDoc]) -> Tuple[int, List[PreparedDoc], int]:
+        body = b"".join(doc[1] for doc in batch)
+        async with self.session.post(
+            self.bulk_url,
+            data=body,
+            headers={"Content-Type": "application/x-ndjson"},
+            # Only what we need to decide per-item outcomes
+            params={"filter_path": "errors,items.*.status,items.*.error.type,items.*.error.reason"}
+        ) as response:
+            if response.status in RETRYABLE_STATUS:
+                return 0, list(batch), 0
+            if response.status >= 400:
+                text = await response.text()
+                raise RuntimeError(f"_bulk failed with HTTP {response.status}: {text[:200]}")
+            result = await response.json(content_type=None)
+
+        if not result.get("errors"):
+            return len(batch), [], 0
+
+        written, rejected = 0, 0
+        retry: List[PreparedDoc] = []
+        for doc, item in zip(batch, result.get("items", []), strict=True):
+            outcome = next(iter(item.values()), {})
+            status = outcome.get("status", 500)
+            if status < 300:
+                written += 1
+            elif status in RETRYABLE_STATUS:
+                retry.append(doc)
+            else:
+                rejected += 1
+                if self._logged_rejections < 5:
+                    self._logged_rejections += 1
+                    error = outcome.get("error", {})
+                    logger.warning(f"⚠️ Rejected document {doc[0]}: {error.get('type')} {error.get('reason')}")
+        return written, retry, rejected
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+
+class MongoBulkWriter(BulkWriter):
+    """Unordered ``insert_many`` into a Motor collection"""
+
+    def __init__(self, collection: Any, owner: Any = None):
+        self.collection = collection
+        self.owner = owner  # connector to disconnect on close, if we created it
+
+    async def write(self, batch: List[PreparedDoc]) -> Tuple[int, List[PreparedDoc], int]:
+        try:
+            result = await self.collection.insert_many([doc[1] for doc in batch], ordered=False)
+            return len(result.inserted_ids), [], 0
+        except Exception as e:
+            details = getattr(e, "details", None)
+            if not isinstance(details, dict) or "writeErrors" not in details:
+                raise
+
+        written = details.get("nInserted", 0)
+        retry: List[PreparedDoc] = []
+        rejected = 0
+        for error in details["writeErrors"]:
+            code = error.get("code")
+            if code == MONGO_DUPLICATE_KEY:
+                written += 1  # an earlier attempt already stored it
+            elif code in MONGO_RETRYABLE_CODES:
+                retry.append(batch[error["index"]])
+            else:
+                rejected += 1
+        return written, retry, rejected
+
+    async def close(self) -> None:
+        if self.owner is not None:
+            await self.owner.disconnect()
+
+
+async def create_writer(config: IngestConfig) -> BulkWriter:
+    """Build the writer for ``config.target`` from environment settings"""
+    if config.target == "mongodb":
+        from ..connectors.mongodb_connector import MongoDBConnector
+
+        connector = MongoDBConnector()
+        if not await connector.connect():
+            raise RuntimeError("Could not connect to MongoDB")
+        return MongoBulkWriter(connector.collections["events"], owner=connector)
+
+    if config.target == "elasticsearch":
+        return ElasticsearchBulkWriter(
+            url=os.getenv("ELASTICSEARCH_URL", "http://localhost:9200"),
+            index=config.index,
+            username=os.getenv("ELASTICSEARCH_USERNAME"),
+            password=os.getenv("ELASTICSEARCH_PASSWORD"),
+            connections=max(4, config.writers * 2)
+        )
+
+    raise ValueError(f"Unknown ingest target: {config.target}")
+
+
+# ----------------------------------------------------------------------
+# Pipeline
+# ----------------------------------------------------------------------
+
+class IngestPipeline:
+    """
+    Bounded async ingest pipeline
+
+    reader -> transform workers -> batcher -> bulk writers, connected by
+    bounded queues so a slow backend applies backpressure all the way to the
+    source instead of buffering the dataset in memory.
+    """
+
+    def __init__(self, writer: BulkWriter, config: Optional[IngestConfig] = None):
+        self.writer = writer
+        self.config = config or IngestConfig()
+        self.stats = IngestStats()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+
+    async def run(self, source: AsyncIterator[List[Any]]) -> IngestStats:
+        """Drain ``source`` into the writer and return the final stats"""
+        config = self.config
+        self.stats = IngestStats()
+        raw_q: asyncio.Queue = asyncio.Queue(maxsize=config.queue_size)
+        prepared_q: asyncio.Queue = asyncio.Queue(maxsize=config.queue_size)
+        batch_q: asyncio.Queue = asyncio.Queue(maxsize=config.queue_size)
+        self._queues = {"raw": raw_q, "prepared": prepared_q, "batches": batch_q}
+
+        if config.transform_processes > 0:
+            self._executor = ProcessPoolExecutor(max_workers=config.transform_processes)
+        transform_workers = max(1, config.transform_workers, config.transform_processes)
+        writers = max(1, config.writers)
+
+        await self.writer.open()
+        logger.info(
+            f"🚚 Ingest started: target={config.target} batch={config.batch_size} docs/"
+            f"{config.batch_bytes // 1024} KiB, writers={writers}, transforms={transform_workers}"
+        )
+
+        async def transforms_done():
+            await asyncio.gather(*transform_tasks)
+            await prepared_q.put(None)
+
+        transform_tasks = [asyncio.create_task(self._transform_worker(raw_q, prepared_q)) for _ in range(transform_workers)]
+        tasks = [
+            asyncio.create_task(self._reader(source, raw_q, transform_workers)),
+            asyncio.create_task(transforms_done()),
+            asyncio.create_task(self._batcher(prepared_q, batch_q, writers)),
+            *[asyncio.create_task(self._writer_worker(batch_q)) for _ in range(writers)],
+        ]
+        progress = asyncio.create_task(self._report_progress())
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks + transform_tasks + [progress]:
+                task.cancel()
+            await self.writer.close()
+            if self._executor:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self.stats.finished_at = time.time()
+
+        logger.info(f"✅ Ingest finished: {self.stats.as_dict()}")
+        return self.stats
+
+    def get_status(self) -> Dict[str, Any]:
+        """Live counters plus current queue depths"""
+        status = self.stats.as_dict()
+        status["queues"] = {name: queue.qsize() for name, queue in self._queues.items()}
+        return status
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    async def _reader(self, source: AsyncIterator[List[Any]], raw_q: asyncio.Queue, consumers: int) -> None:
+        async for chunk in source:
+            self.stats.read += len(chunk)
+            await raw_q.put(chunk)
+        for _ in range(consumers):
+            await raw_q.put(None)
+
+    async def _transform_worker(self, raw_q: asyncio.Queue, prepared_q: asyncio.Queue) -> None:
+        config = self.config
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await raw_q.get()
+            if chunk is None:
+                return
+            if self._executor:
+                prepared, errors = await loop.run_in_executor(
+                    self._executor, transform_chunk, chunk, config.target, config.source_name
+                )
+            else:
+                # Off the event loop, though still under the GIL: writers keep flushing meanwhile
+                prepared, errors = await asyncio.to_thread(
+                    transform_chunk, chunk, config.target, config.source_name
+                )
+            self.stats.transformed += len(prepared)
+            self.stats.parse_errors += errors
+            if prepared:
+                await prepared_q.put(prepared)
+
+    async def _batcher(self, prepared_q: asyncio.Queue, batch_q: asyncio.Queue, consumers: int) -> None:
+        config = self.config
+        pending: List[PreparedDoc] = []
+        while True:
+            prepared = await prepared_q.get()
+            if prepared is None:
+                break
+            pending.extend(prepared)
+            # Emit full batches; keep the tail to combine with the next chunk
+            batches = list(iter_batches(pending, config.batch_size, config.batch_bytes))
+            for batch in batches[:-1]:
+                await batch_q.put(batch)
+            pending = batches[-1] if batches else []
+            if len(pending) >= config.batch_size:
+                await batch_q.put(pending)
+                pending = []
+
+        if pending:
+            await batch_q.put(pending)
+        for _ in range(consumers):
+            await batch_q.put(None)
+
+    async def _writer_worker(self, batch_q: asyncio.Queue) -> None:
+        while True:
+            batch = await batch_q.get()
+            if batch is None:
+                return
+            self.stats.batches += 1
+            await self._write_with_retry(batch)
+
+    async def _write_with_retry(self, batch: List[PreparedDoc]) -> None:
+        """Write a batch, re-sending only the items that failed transiently"""
+        config = self.config
+        pending = batch
+        attempt = 0
+        while pending:
+            try:
+                written, retry, rejected = await self.writer.write(pending)
+            except Exception as e:
+                logger.warning(f"⚠️ Bulk write of {len(pending)} docs failed: {e}")
+                written, retry, rejected = 0, pending, 0
+
+            retry_ids = {id(doc) for doc in retry}
+            self.stats.written += written
+            self.stats.rejected += rejected
+            self.stats.bytes_written += sum(doc[2] for doc in pending if id(doc) not in retry_ids)
+
+            if not retry:
+                return
+            attempt += 1
+            if attempt > config.max_retries:
+                self.stats.failed += len(retry)
+                logger.error(f"❌ Giving up on {len(retry)} docs after {config.max_retries} retries")
+                return
+            self.stats.retried += len(retry)
+            await asyncio.sleep(config.retry_backoff * (2 ** (attempt - 1)))
+            pending = retry
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.progress_interval)
+            status = self.get_status()
+            logger.info(
+                f"📈 Ingest progress: {status['written']:,} written, "
+                f"{status['events_per_second']:,.0f} ev/s, {status['mb_per_second']} MB/s, "
+                f"retried={status['retried']} queues={status['queues']}"
+            )
+
+
+async def run_ingest(
+    source: AsyncIterator[List[Any]],
+    config: Optional[IngestConfig] = None,
+    writer: Optional[BulkWriter] = None
+) -> IngestStats:
+    """Convenience wrapper: build the writer for ``config`` and run one ingest"""
+    config = config or IngestConfig()
+    writer = writer or await create_writer(config)
+    return await IngestPipeline(writer, config).run(source)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """``python -m src.processors.ingest --source mock --count 10000000``"""
+    parser = argparse.ArgumentParser(description="Bulk-ingest SIEM events")
+    parser.add_argument("--source", choices=["jsonl", "mock", "attack_chains"], default="mock")
+    parser.add_argument("--path", help="JSONL file (default: bundled Advanced SIEM dataset)")
+    parser.add_argument("--count", type=int, default=100_000,
+                        help="events (mock), scenarios (attack_chains) or line limit (jsonl)")
+    parser.add_argument("--generators", help="comma-separated mock generators")
+    parser.add_argument("--target", choices=["elasticsearch", "mongodb"], default="elasticsearch")
+    parser.add_argument("--index", default="siem-events")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--batch-mb", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=0, help="transform processes (0 = threads)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    config = IngestConfig(
+        target=args.target,
+        index=args.index,
+        source_name=args.source,
+        batch_size=args.batch_size,
+        batch_bytes=int(args.batch_mb * 1024 * 1024),
+        writers=args.writers,
+        transform_processes=args.processes
+    )
+
+    if args.source == "jsonl":
+        source = jsonl_source(args.path, config.chunk_size, limit=args.count)
+    elif args.source == "attack_chains":
+        source = attack_chain_source(args.count, config.chunk_size)
+    else:
+        generators = args.generators.split(",") if args.generators else None
+        source = mock_source(args.count, config.chunk_size, generators)
+
+    stats = asyncio.run(run_ingest(source, config))
+    print(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,48 +2,30 @@
 
 from __future__ import annotations
 
-import time
-from collections import defaultdict, deque
 from dataclasses import dataclass, field
-from typing import Deque, Dict
+
+from ..core.security.rate_limiting import LocalRateLimiter, RateLimit
 
 
 @dataclass
 class RateLimiter:
-    """Token bucket style limiter suitable for single-process usage."""
+    """Synchronous GCRA limiter with its own in-process store (not shared across workers)."""
 
-    _buckets: Dict[str, Deque[float]] = field(default_factory=lambda: defaultdict(deque))
+    _store: LocalRateLimiter = field(default_factory=LocalRateLimiter)
 
     def allow(self, key: str, limit: int, window_seconds: int) -> bool:
         """Return True if the caller identified by *key* may proceed."""
 
         if limit <= 0:
             return False
-        now = time.time()
-        window_start = now - window_seconds
-        bucket = self._buckets[key]
-
-        # Drop timestamps that are outside the window
-        while bucket and bucket[0] < window_start:
-            bucket.popleft()
-
-        if len(bucket) >= limit:
-            return False
-
-        bucket.append(now)
-        return True
+        return self._store.hit(key, (RateLimit(limit, window_seconds),)).allowed
 
     def remaining(self, key: str, limit: int, window_seconds: int) -> int:
         """Return the remaining allowance for *key* within the window."""
 
-        now = time.time()
-        window_start = now - window_seconds
-        bucket = self._buckets[key]
-
-        while bucket and bucket[0] < window_start:
-            bucket.popleft()
-
-        return max(limit - len(bucket), 0)
+        if limit <= 0:
+            return 0
+        return self._store.peek(key, RateLimit(limit, window_seconds))
 
     def reset(self, key: str) -> None:
-        self._buckets.pop(key, None)
+        self._store.reset(key)
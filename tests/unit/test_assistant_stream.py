@@ -0,0 +1,167 @@
+import asyncio
+import json
+import time
+
+from src.core.ai import response_generator as response_module
+from src.core.ai.response_generator import ResponseGenerator, chunk_text
+from src.core.query.estimator import FetchPlan
+from src.core.streaming.responses import sse_event, stream_assistant_response
+
+
+class _Pipeline:
+    def __init__(self, generator, rows=60):
+        self.generator = generator
+        self.rows = rows
+
+    async def process(self, query, context, user_context, filters):
+        return {"intent": "malware", "confidence": 0.9, "entities": [], "siem_query": {"query": {"match_all": {}}}}
+
+    async def fetch_results(self, connector, query, size=None):
+        return [{"@timestamp": f"t{i}", "message": f"event {i}"} for i in range(self.rows)], FetchPlan(mode="full", limit=size)
+
+    async def format_results(self, results, query_type):
+        return results
+
+    async def stream_summary(self, results, query, intent):
+        async for chunk in self.generator.stream_summary(results, query, intent):
+            yield chunk
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _StreamingModel:
+    def generate_content(self, prompt, stream=False):
+        assert stream
+        return iter([_Chunk("**Three** hosts "), _Chunk("show Emotet "), _Chunk("beacons.")])
+
+
+def _collect(stream):
+    async def run():
+        return [event async for event in stream]
+    return asyncio.run(run())
+
+
+def test_template_summary_is_chunked_losslessly() -> None:
+    text = "Found 3 failed logins from 2 users.  Review\nthe source IPs for brute force activity."
+    chunks = chunk_text(text, words=4)
+    assert len(chunks) == 4 and "".join(chunks) == text
+
+    generator = ResponseGenerator()
+    generator.initialized = False
+    results = [{"severity": "high"}, {"severity": "low"}]
+    streamed = _collect(generator.stream_summary(results, "show alerts", "security_alerts"))
+    assert len(streamed) > 1
+    assert "".join(streamed) == generator._generate_template_summary(results, "show alerts", "security_alerts")
+
+
+def test_provider_tokens_are_relayed_as_they_stream(monkeypatch) -> None:
+    monkeypatch.setattr(response_module, "GEMINI_AVAILABLE", True)
+    generator = ResponseGenerator()
+    generator.initialized, generator.gemini_model = True, _StreamingModel()
+
+    streamed = _collect(generator.stream_summary([{"host": "web01"}], "malware?", "malware_detection"))
+    assert streamed == ["Three hosts ", "show Emotet ", "beacons."]
+
+
+def test_stream_emits_cards_and_row_pages_before_summary_tokens() -> None:
+    generator = ResponseGenerator()
+    generator.initialized = False
+    events = _collect(stream_assistant_response("malware on hosts", _Pipeline(generator), siem_connector=object(),
+                                                size=100, page_size=25))
+    kinds = [event["type"] for event in events]
+
+    assert kinds[:3] == ["status", "intent", "status"] and kinds[-1] == "done"
+    assert kinds.index("card") < kinds.index("rows") < kinds.index("token")
+    assert [event["page"] for event in events if event["type"] == "rows"] == [0, 1, 2]
+    assert [event["card"]["type"] for event in events if event["type"] == "card"] == ["summary_card", "table", "chart"]
+
+    done = events[-1]
+    assert done["status"] == "success" and done["metadata"]["results_count"] == 60
+    assert done["summary"] == "".join(event["content"] for event in events if event["type"] == "token")
+    assert all("content" not in event for event in events if event["type"] != "token")
+
+    frame = sse_event(done)
+    assert frame.startswith("event: done\ndata: ") and json.loads(frame.split("data: ", 1)[1])["status"] == "success"
+
+
+def test_summary_cap_stops_the_provider_stream(monkeypatch) -> None:
+    monkeypatch.setattr(response_module, "GEMINI_AVAILABLE", True)
+    pulled = []
+
+    class _EndlessModel:
+        def generate_content(self, prompt, stream=False):
+            while True:
+                pulled.append(1)
+                yield _Chunk("beacon " * 20)
+
+    generator = ResponseGenerator()
+    generator.initialized, generator.gemini_model = True, _EndlessModel()
+
+    streamed = _collect(generator.stream_summary([{"host": "web01"}], "malware?", "malware_detection"))
+    assert len("".join(streamed)) >= response_module.MAX_SUMMARY_CHARS
+    # asyncio.run joins the worker thread: returning at all means the endless stream was stopped
+    assert pulled
+
+
+def test_invalid_query_is_blocked_before_the_fetch() -> None:
+    class _Blocked(_Pipeline):
+        async def process(self, query, context, user_context, filters):
+            return {"intent": "search_logs", "confidence": 0.5, "entities": [], "siem_query": {"query": {"match_all": {}}},
+                    "query_valid": False, "validation_error": "wildcard on every index"}
+
+        async def fetch_results(self, connector, query, size=None):
+            raise AssertionError("blocked queries must not reach the SIEM")
+
+    events = _collect(stream_assistant_response("everything", _Blocked(ResponseGenerator()), siem_connector=object()))
+    done = events[-1]
+    assert [event["type"] for event in events] == ["status", "intent", "done"]
+    assert done["status"] == "blocked" and done["summary"] == "Query blocked for safety: wildcard on every index"
+
+
+def test_slow_gemini_call_falls_back_to_the_template(monkeypatch) -> None:
+    monkeypatch.setattr(response_module, "GEMINI_AVAILABLE", True)
+
+    class _SlowModel:
+        def generate_content(self, prompt, stream=False):
+            time.sleep(0.3)
+            return _Chunk("too late")
+
+    generator = ResponseGenerator(ai_timeout=0.05)
+    generator.initialized, generator.gemini_model = True, _SlowModel()
+    results = [{"severity": "high"}]
+
+    async def run():
+        started = time.perf_counter()
+        summary = await generator.generate_summary(results, "show alerts", "security_alerts")
+        return summary, time.perf_counter() - started, generator.gemini_guard.limiter.in_flight
+
+    summary, elapsed, in_flight = asyncio.run(run())
+    assert summary == generator._generate_template_summary(results, "show alerts", "security_alerts")
+    assert elapsed < 0.25 and in_flight == 1  # the worker thread still holds its Gemini slot
+
+
+def test_stalled_stream_falls_back_and_keeps_the_slot(monkeypatch) -> None:
+    monkeypatch.setattr(response_module, "GEMINI_AVAILABLE", True)
+
+    class _StalledModel:
+        def generate_content(self, prompt, stream=False):
+            time.sleep(0.3)
+            yield _Chunk("too late")
+
+    generator = ResponseGenerator(ai_timeout=0.05)
+    generator.initialized, generator.gemini_model = True, _StalledModel()
+    results = [{"severity": "high"}]
+
+    async def run():
+        streamed = [chunk async for chunk in generator.stream_summary(results, "show alerts", "security_alerts")]
+        in_flight = generator.gemini_guard.limiter.in_flight
+        while generator._draining:
+            await asyncio.sleep(0.01)
+        return streamed, in_flight, generator.gemini_guard.limiter.in_flight
+
+    streamed, stalled_in_flight, drained_in_flight = asyncio.run(run())
+    assert "".join(streamed) == generator._generate_template_summary(results, "show alerts", "security_alerts")
+    assert (stalled_in_flight, drained_in_flight) == (1, 0)
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from src.core.streaming.hub import DISCONNECT, DROP_OLDEST, BroadcastHub
+
+
+class _Socket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.received = []
+
+    async def send(self, text):
+        if self.fail:
+            raise ConnectionError("closed")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(text)
+
+
+def test_publish_encodes_once_and_slow_clients_do_not_stall_fast_ones() -> None:
+    async def scenario():
+        hub = BroadcastHub(max_queue=6, overflow=DROP_OLDEST)
+        fast, slow = _Socket(), _Socket(delay=0.05)
+        hub.register("fast", fast.send)
+        hub.register("slow", slow.send)
+
+        for i in range(10):
+            assert hub.publish({"type": "event", "n": i}) >= 1
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+
+        assert hub.stats["encoded"] == 10
+        assert [json.loads(text)["n"] for text in fast.received] == list(range(10))
+        assert len(slow.received) < 10 and hub.channels["slow"].stats.dropped > 0
+
+        await asyncio.sleep(0.5)
+        received = [json.loads(text)["n"] for text in slow.received]
+        assert received == sorted(received) and received[-1] == 9  # newest kept, oldest dropped
+        stats = hub.get_stats(per_client=True)
+        assert stats["clients"] == 2 and stats["per_client"]["slow"]["max_lag_ms"] > 0
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_coalesced_snapshots_keep_only_the_latest_and_unicast_is_never_dropped() -> None:
+    async def scenario():
+        hub = BroadcastHub(max_queue=3)
+        viewer = _Socket(delay=0.02)
+        hub.register("viewer", viewer.send)
+
+        hub.publish({"type": "event", "n": 0})
+        for value in range(5):
+            hub.publish({"type": "metrics", "value": value}, coalesce_key="metrics")
+        for i in range(3):
+            assert hub.send("viewer", {"type": "chat", "n": i})
+        await asyncio.sleep(0.3)
+
+        messages = [json.loads(text) for text in viewer.received]
+        metrics = [m["value"] for m in messages if m["type"] == "metrics"]
+        assert len(metrics) <= 2 and metrics[-1] == 4
+        assert [m["n"] for m in messages if m["type"] == "chat"] == [0, 1, 2]
+        assert hub.channels["viewer"].stats.coalesced >= 3
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_and_lagging_clients_are_disconnected() -> None:
+    async def scenario():
+        hub = BroadcastHub(max_queue=2, overflow=DISCONNECT)
+        closed = []
+        hub.add_close_listener(closed.append)
+        hub.register("broken", _Socket(fail=True).send)
+        hub.register("stuck", _Socket(delay=10).send)
+
+        hub.publish({"n": 1})
+        await asyncio.sleep(0.01)
+        for i in range(3):
+            hub.publish({"n": i})
+
+        assert set(closed) == {"broken", "stuck"} and hub.channels == {}
+        assert hub.publish({"n": 99}) == 0 and not hub.send("stuck", {"n": 1})
+        assert hub.get_stats()["disconnects"] == 2
+
+    asyncio.run(scenario())
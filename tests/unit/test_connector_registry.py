@@ -0,0 +1,64 @@
+import asyncio
+
+from src.connectors.registry import ConnectorRegistry
+
+
+class FakeConnector:
+    def __init__(self, config):
+        self.config = config
+        self.connected = False
+        self.healthy = True
+        self.disconnects = 0
+
+    async def connect(self):
+        self.connected = True
+        return True
+
+    async def test_connection(self):
+        return self.healthy
+
+    async def disconnect(self):
+        self.disconnects += 1
+
+
+def make_registry(**kwargs) -> ConnectorRegistry:
+    registry = ConnectorRegistry(**kwargs)
+    registry.register_kind("fake", FakeConnector, initializer=lambda c: c.connect())
+    return registry
+
+
+def test_registry_shares_instances_per_config() -> None:
+    async def scenario():
+        registry = make_registry()
+        first = await registry.acquire("fake", {"path": "a"})
+        second = await registry.acquire("fake", {"path": "a"})
+        other = await registry.acquire("fake", {"path": "b"})
+
+        assert first is second
+        assert first is not other
+        assert first.connected is True
+        assert registry.stats["created"] == 2
+        assert registry.stats["reused"] == 1
+
+        await registry.release(first)
+        await registry.release(second)
+        assert first.disconnects == 0  # kept warm until idle_ttl
+
+    asyncio.run(scenario())
+
+
+def test_registry_replaces_unhealthy_and_closes_idle() -> None:
+    async def scenario():
+        registry = make_registry(health_check_interval=0.0, idle_ttl=0.0)
+        async with registry.lease("fake") as connector:
+            connector.healthy = False
+            replacement = await registry.acquire("fake")
+            assert replacement is not connector
+            assert connector.disconnects == 0  # still leased
+        assert connector.disconnects == 1
+
+        await registry.release(replacement)
+        assert replacement.disconnects == 1
+        assert registry.get_status()["entries"] == []
+
+    asyncio.run(scenario())
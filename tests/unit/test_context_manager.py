@@ -0,0 +1,161 @@
+import asyncio
+
+from src.core.context.manager import ContextManager
+
+
+class _FakeRedis:
+    """In-memory subset of the async Redis API used for write-through"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.lists = {}
+        self.commands = []
+
+    def pipeline(self, transaction=False):
+        return _FakePipeline(self)
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+            self.lists.pop(key, None)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.queued.append((name, args, kwargs))
+
+    async def execute(self):
+        results = []
+        for name, args, kwargs in self.queued:
+            self.redis.commands.append((name, args[0]))
+            if name == "hset":
+                self.redis.hashes.setdefault(args[0], {}).update(kwargs["mapping"])
+            elif name == "hdel":
+                for field in args[1:]:
+                    self.redis.hashes.get(args[0], {}).pop(field, None)
+            elif name == "hincrby":
+                fields = self.redis.hashes.setdefault(args[0], {})
+                fields[args[1]] = str(int(fields.get(args[1], 0)) + args[2])
+                results.append(int(fields[args[1]]))
+                continue
+            elif name == "rpush":
+                self.redis.lists.setdefault(args[0], []).append(args[1])
+            elif name == "ltrim":
+                self.redis.lists[args[0]] = self.redis.lists.get(args[0], [])[args[1]:]
+            elif name == "hgetall":
+                results.append(dict(self.redis.hashes.get(args[0], {})))
+                continue
+            elif name == "lrange":
+                results.append(list(self.redis.lists.get(args[0], [])))
+                continue
+            results.append(True)
+        return results
+
+
+def test_expiry_is_heap_driven_and_touch_extends_deadline() -> None:
+    manager = ContextManager(ttl_minutes=1, max_conversations=3)
+    clock = [0.0]
+    manager._clock = lambda: clock[0]
+
+    async def scenario():
+        for conv_id in ("a", "b", "c"):
+            await manager.get_context(conv_id)
+        clock[0] = 50
+        await manager.update_context("a", "failed logins", {"entities": []})
+        clock[0] = 61
+        await manager.get_context("a")
+        assert set(manager.conversations) == {"a"}
+        assert manager.stats["expired"] == 2
+
+        for conv_id in ("d", "e", "f"):
+            clock[0] += 1
+            await manager.get_context(conv_id)
+        assert set(manager.conversations) == {"d", "e", "f"} and manager.stats["evicted"] == 1
+        assert len(manager._expiry_heap) <= len(manager._deadlines) + 3
+
+    asyncio.run(scenario())
+
+
+def test_merged_state_is_incremental_and_bounded() -> None:
+    manager = ContextManager(max_history=3, max_entity_values=2, max_filters=2)
+
+    async def scenario():
+        for i, host in enumerate(["dc01", "web02", "dc01", "db03"]):
+            await manager.update_context("c1", f"query {i}", {
+                "intent": "search_logs",
+                "entities": [{"type": "hostname", "value": host}, {"type": "username", "value": "admin"}],
+                "filters": {f"f{i}": i},
+            })
+        context = await manager.get_context("c1")
+        assert [turn["query"] for turn in context["history"]] == ["query 1", "query 2", "query 3"]
+        assert context["entities"] == {"hostname": ["dc01", "db03"], "username": ["admin"]}
+        assert context["filters"] == {"f2": 2, "f3": 3}
+
+        new_entities = [{"type": "username", "value": "bob"}]
+        enhanced = await manager.apply_context_to_query("c1", "only those", new_entities)
+        assert enhanced["is_follow_up"] and enhanced["previous_intent"] == "search_logs"
+        assert enhanced["entities"][1:] == [{"type": "hostname", "value": "db03", "from_context": True}]
+        assert new_entities == [{"type": "username", "value": "bob"}]
+
+        fresh = await manager.apply_context_to_query("c2", "show malware detections on all hosts", [])
+        assert not fresh["is_follow_up"] and fresh["entities"] == []
+
+    asyncio.run(scenario())
+
+
+def test_redis_write_through_sends_deltas_and_restores() -> None:
+    redis = _FakeRedis()
+    manager = ContextManager(max_history=2, max_filters=1, redis_client=redis, redis_prefix="t:")
+
+    async def scenario():
+        await manager.update_context("c1", "logins for admin", {
+            "intent": "failed_login", "entities": [{"type": "username", "value": "admin"}], "filters": {"host": "dc01"},
+        })
+        redis.commands.clear()
+        await manager.update_context("c1", "and after that", {
+            "intent": "failed_login", "entities": [{"type": "username", "value": "admin"}], "filters": {"severity": "high"},
+        })
+        written = {(name, key) for name, key in redis.commands if name != "expire"}
+        assert ("hset", "t:c1:entities") not in written  # unchanged entity state isn't rewritten
+        assert ("hdel", "t:c1:filters") in written and ("rpush", "t:c1:history") in written
+        await manager.update_context("c1", "third", {"entities": []})
+        assert len(redis.lists["t:c1:history"]) == 2
+
+        restarted = ContextManager(redis_client=redis, redis_prefix="t:")
+        context = await restarted.get_context("c1")
+        assert [turn["query"] for turn in context["history"]] == ["and after that", "third"]
+        assert context["entities"] == {"username": ["admin"]} and context["filters"] == {"severity": "high"}
+        assert restarted.get_stats()["restored"] == 1
+
+        await restarted.clear_context("c1")
+        assert "t:c1:meta" not in redis.hashes
+
+    asyncio.run(scenario())
+
+
+def test_workers_sharing_redis_see_each_others_turns() -> None:
+    redis = _FakeRedis()
+    first = ContextManager(redis_client=redis, redis_prefix="t:")
+    second = ContextManager(redis_client=redis, redis_prefix="t:")
+
+    async def scenario():
+        await first.update_context("c1", "logins for admin", {"entities": [{"type": "username", "value": "admin"}]})
+        assert [turn["query"] for turn in (await second.get_context("c1"))["history"]] == ["logins for admin"]
+
+        await second.update_context("c1", "only dc01", {"entities": [{"type": "hostname", "value": "dc01"}]})
+        context = await first.get_context("c1")  # stale local copy is reloaded
+        assert [turn["query"] for turn in context["history"]] == ["logins for admin", "only dc01"]
+        assert context["entities"] == {"username": ["admin"], "hostname": ["dc01"]}
+        assert first.get_stats()["refreshed"] == 1
+
+        await first.update_context("c1", "third", {"entities": []})
+        assert (await first.get_context("c1"))["version"] == 3 and first.get_stats()["refreshed"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+from src.chat.conversation_memory import (
+    ConversationMemoryManager, ConversationTurn, FileTurnLog, TurnLog
+)
+
+QUERIES = [
+    "Show me recent security alerts",
+    "Investigate failed login attempts for user john.doe",
+    "Correlate these IPs with malware detections",
+    "Are there any APT29 indicators in this activity?",
+]
+
+
+def _summary_without_duration(manager, session_id):
+    history = manager.get_session_history(session_id)
+    summary = dict(history["context_summary"])
+    summary.pop("investigation_duration")
+    return history["session_info"]["state"], summary, [turn["query"] for turn in history["conversation_turns"]]
+
+
+def test_turns_are_slotted_and_derived_state_is_incremental() -> None:
+    manager = ConversationMemoryManager()
+    session_id = manager.create_session(investigation_type="incident_response")
+    results = [manager.process_query(session_id, query) for query in QUERIES]
+
+    session = manager.get_session(session_id)
+    turn = session.turns[-1]
+    assert not hasattr(turn, "__dict__") and not hasattr(session, "__dict__")
+    assert all(isinstance(entity, tuple) and len(entity) == 3 for entity in turn.entities)
+    assert ConversationTurn.from_record(turn.to_record()) == turn
+
+    summary = results[-1]["context_summary"]
+    assert summary["conversation_turns"] == 4
+    assert summary["total_entities"] == sum(len(values) for values in session.context.primary_entities.values())
+    assert summary["threat_actors_identified"] == ["APT29"]
+    assert sum(summary["intent_counts"].values()) == 4
+    assert list(session.context.intent_history) == [result["intent"] for result in results]
+
+
+def test_sessions_restore_from_a_durable_log_after_restart(tmp_path) -> None:
+    first = ConversationMemoryManager(turn_log=FileTurnLog(str(tmp_path)))
+    session_id = first.create_session(user_id="alice")
+    for query in QUERIES:
+        first.process_query(session_id, query)
+    before = _summary_without_duration(first, session_id)
+
+    restarted = ConversationMemoryManager(turn_log=FileTurnLog(str(tmp_path)))
+    assert session_id not in restarted.sessions
+    assert _summary_without_duration(restarted, session_id) == before
+    assert restarted.get_session(session_id).user_id == "alice" and restarted.stats["restored"] == 1
+
+    result = restarted.process_query(session_id, "Generate a summary of this investigation")
+    assert result["session_id"] == session_id and result["context_summary"]["conversation_turns"] == 5
+
+
+def test_resident_memory_is_bounded_and_history_comes_from_the_log() -> None:
+    log = TurnLog()
+    manager = ConversationMemoryManager(max_sessions=3, resident_turns=2, turn_log=log)
+    session_ids = [manager.create_session() for _ in range(5)]
+    assert list(manager.sessions) == session_ids[2:] and manager.stats["evicted"] == 2
+    assert manager.get_session(session_ids[0]) is None  # in-memory log is dropped on eviction
+
+    for query in QUERIES:
+        manager.process_query(session_ids[-1], query)
+    session = manager.get_session(session_ids[-1])
+    assert len(session.turns) == 2 and session.turn_count == 4
+    history = manager.get_session_history(session_ids[-1])
+    assert [turn["query"] for turn in history["conversation_turns"]] == QUERIES
+
+
+def test_in_memory_log_keeps_only_recent_turns() -> None:
+    manager = ConversationMemoryManager(resident_turns=2, turn_log=TurnLog(max_turns=3))
+    session_id = manager.create_session(user_id="bob")
+    for query in QUERIES:
+        manager.process_query(session_id, query)
+
+    records = list(manager.turn_log.read(session_id))
+    assert records[0]["kind"] == "session" and len(records) == 4
+    history = manager.get_session_history(session_id)
+    assert [turn["query"] for turn in history["conversation_turns"]] == QUERIES[1:]
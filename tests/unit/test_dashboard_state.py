@@ -0,0 +1,60 @@
+import copy
+
+from src.core.streaming.state import VersionedState, apply_delta
+
+
+def _state():
+    return {"total_alerts": 0, "active_incidents": 0, "mitre_heatmap": {}, "system_health": "operational"}
+
+
+def test_commit_sends_only_changed_counters_and_heatmap_cells() -> None:
+    state = VersionedState(_state())
+    assert state.commit() is None and state.seq == 0
+
+    state.data["total_alerts"] += 1
+    state.data["mitre_heatmap"].update({"T1486": 1, "T1078": 2})
+    first = state.commit()
+    assert first["from_seq"] == 0 and first["seq"] == 1
+    assert first["set"] == {"total_alerts": 1, "mitre_heatmap": {"T1486": 1, "T1078": 2}}
+
+    state.data["mitre_heatmap"]["T1486"] += 1
+    del state.data["mitre_heatmap"]["T1078"]
+    second = state.commit()
+    assert second["set"] == {"mitre_heatmap": {"T1486": 2}} and second["unset"] == [["mitre_heatmap", "T1078"]]
+    assert state.snapshot()["data"] == state.data and state.snapshot()["data"] is not state.data
+
+
+def test_resume_merges_missed_deltas_into_one() -> None:
+    state = VersionedState(_state())
+    client = state.snapshot()
+    view = copy.deepcopy(client["data"])
+
+    for technique in ["T1486", "T1078", "T1486", "T1059"]:
+        state.data["total_alerts"] += 1
+        state.data["mitre_heatmap"][technique] = state.data["mitre_heatmap"].get(technique, 0) + 1
+        state.commit()
+    del state.data["mitre_heatmap"]["T1059"]
+    state.data["system_health"] = "degraded"
+    state.commit()
+
+    resumed = state.since(client["seq"], client["epoch"])
+    assert resumed["type"] == "dashboard_delta" and (resumed["from_seq"], resumed["seq"]) == (0, 5)
+    assert apply_delta(view, resumed) == state.data
+    assert "T1059" not in resumed["set"]["mitre_heatmap"] and ["mitre_heatmap", "T1059"] in resumed["unset"]
+
+    current = state.since(state.seq, state.epoch)
+    assert current["set"] == {} and current["unset"] == []
+
+
+def test_stale_or_foreign_sequences_get_a_full_snapshot() -> None:
+    state = VersionedState(_state(), history=3)
+    for _ in range(6):
+        state.data["total_alerts"] += 1
+        state.commit()
+
+    assert state.oldest_seq == 3
+    assert state.since(3, state.epoch)["type"] == "dashboard_delta"
+    assert state.since(2, state.epoch)["type"] == "dashboard_state"
+    assert state.since(4, "previous-process")["type"] == "dashboard_state"
+    assert state.since(99, state.epoch)["type"] == "dashboard_state"
+    assert state.get_stats()["resync"] == 3
@@ -0,0 +1,69 @@
+import asyncio
+import importlib.util
+from pathlib import Path
+
+from src.connectors.enterprise_siem import SIEMConfig, create_siem_connector, fetch_pages_concurrently
+
+# Loaded by path: the mock package's __init__ pulls in every generator, which the
+# stand-ins do not need
+_spec = importlib.util.spec_from_file_location(
+    "siem_standins", Path(__file__).resolve().parents[2] / "backend" / "mock" / "connectors" / "siem_standins.py"
+)
+standins = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(standins)
+
+EVENT_COUNT = 250
+TIMESTAMP_FIELD = {"splunk": "timestamp", "qradar": "starttime", "azure_sentinel": "TimeGenerated"}
+
+
+def test_fetch_pages_concurrently_yields_in_offset_order() -> None:
+    in_flight = []
+    peak = []
+
+    async def fetch_page(offset, count):
+        in_flight.append(offset)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.02 - offset / 5000)  # later pages finish first
+        in_flight.remove(offset)
+        return list(range(offset, offset + count))
+
+    async def run():
+        return [page async for page in fetch_pages_concurrently(fetch_page, 95, 10, 3)]
+
+    pages = asyncio.run(run())
+    assert [len(page) for page in pages] == [10] * 9 + [5]
+    assert [row for page in pages for row in page] == list(range(95))
+    assert max(peak) == 3 and not in_flight
+
+
+def test_iter_pages_against_stand_ins() -> None:
+    expected = [event["timestamp"] for event in standins.generate_events(EVENT_COUNT)]
+
+    async def run():
+        runners, ports = await standins.start_standins(EVENT_COUNT)
+        pages = {}
+        try:
+            for platform, port in ports.items():
+                config = SIEMConfig(
+                    host="127.0.0.1", port=port, scheme="http", ssl_verify=False,
+                    username="admin", password="changeme", sec_token="stand-in", token="stand-in",
+                    workspace_id="stand-in", max_results=EVENT_COUNT, page_size=100,
+                    page_concurrency=3, poll_interval=0.01
+                )
+                connector = create_siem_connector(platform, config)
+                if platform != "splunk":
+                    await connector.connect()
+                pages[platform] = [page async for page in connector.iter_pages({"query": {"bool": {"must": []}}})]
+                await connector.disconnect()
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+        return pages
+
+    pages = asyncio.run(run())
+    # Splunk offset/count, QRadar Range: items=x-y and KQL row_number windows
+    assert set(pages) == set(TIMESTAMP_FIELD)
+    for platform, platform_pages in pages.items():
+        assert [len(page) for page in platform_pages] == [100, 100, 50], platform
+        field = TIMESTAMP_FIELD[platform]
+        assert [row[field] for page in platform_pages for row in page] == expected, platform
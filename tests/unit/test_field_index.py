@@ -0,0 +1,77 @@
+import asyncio
+
+from src.core.nlp.advanced_schema_mapper import AdvancedSchemaMapper, SIEMPlatform
+from src.core.nlp.field_index import FieldIndex, field_similarity
+from src.core.nlp.schema_mapper import SchemaMapper
+from src.core.platform.detector import RobustPlatformDetector
+
+
+def build_index() -> FieldIndex:
+    index = FieldIndex()
+    for field in ["source.ip", "destination.ip", "user.name", "winlog.event_data.TargetUserName", "event.code"]:
+        index.add(field, tags=["ecs"])
+    index.add("failed_login", aliases=["bad logon"])
+    return index
+
+
+def test_prefix_substring_and_similarity_lookups() -> None:
+    index = build_index()
+
+    assert index.with_prefix("dest") == ["destination.ip"]
+    assert index.with_prefix("name") == ["user.name"]  # dotted segment
+    assert index.containing("username") == ["winlog.event_data.TargetUserName"]
+    assert index.containing("ip") == ["source.ip", "destination.ip"]
+    assert index.within("show failed_login events") == ["failed_login"]
+    assert index.related("bad logon") == ["failed_login"]
+
+    best, score = index.similar("destination_ip", limit=1)[0]
+    assert best == "destination.ip"
+    assert 0 < score < 1
+
+    # Candidate pruning still finds the same top result as scoring every field
+    brute = max(index._names, key=lambda name: field_similarity("targetusername", name))
+    assert index.similar("targetusername", limit=1)[0][0] == brute
+
+
+def test_schema_mapper_matches_linear_scan() -> None:
+    mapper = SchemaMapper(mapping_file="does-not-exist.yaml")
+
+    def linear(entity: str):
+        fields = []
+        for key, mapping in mapper.mappings.items():
+            if key in entity or entity in key:
+                fields.extend(mapping.get("elastic", mapping.get("fields", [])))
+        return list(dict.fromkeys(fields))
+
+    for entity in ["failed_login", "admin user", "ip", "sshd", "log"]:
+        assert mapper.map_entity_to_fields(entity) == linear(entity)
+
+
+def test_detector_discoveries_refresh_mappers_incrementally() -> None:
+    schema_mapper = SchemaMapper(mapping_file="does-not-exist.yaml")
+    advanced = AdvancedSchemaMapper()
+    assert "winlog.event_data.IpAddress" not in schema_mapper.map_entity_to_fields("ip")
+
+    detector = RobustPlatformDetector()
+    detector._announce_field_mappings({"ip_address": "winlog.event_data.IpAddress"})
+    detector._announce_field_mappings({"ip_address": "winlog.event_data.IpAddress"})  # unchanged: no-op
+
+    assert "winlog.event_data.IpAddress" in schema_mapper.map_entity_to_fields("ip")
+    suggestions = asyncio.run(advanced.get_field_suggestions("ipaddr", SIEMPlatform.ELASTICSEARCH))
+    assert suggestions[0]["field"] == "winlog.event_data.IpAddress"
+    assert suggestions[0]["entity_type"] == "ip_address"
+
+
+def test_translation_only_follows_exact_names_and_aliases() -> None:
+    index = build_index()
+    assert index.resolve("Source.IP") == "source.ip"
+    assert index.resolve("bad logon") == "failed_login"
+    assert index.resolve("source.ipp") is None and index.resolve("source") is None
+
+    mapper = AdvancedSchemaMapper()
+
+    def translate(field: str):
+        return asyncio.run(mapper._translate_single_field(field, SIEMPlatform.ELASTICSEARCH, SIEMPlatform.SPLUNK))
+
+    assert translate("source.ip") is not None
+    assert translate("source.ipp") is None  # a near miss is not silently mapped to another field
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from src.processors.ingest import (
+    BulkWriter,
+    IngestConfig,
+    IngestPipeline,
+    encode_record,
+    iter_batches,
+    transform_chunk,
+)
+
+
+class FlakyWriter(BulkWriter):
+    """Fails every third document of a batch once, then accepts it"""
+
+    def __init__(self):
+        self.calls = []
+        self.seen = set()
+
+    async def write(self, batch):
+        self.calls.append([doc[0] for doc in batch])
+        retry = []
+        for i, doc in enumerate(batch):
+            if i % 3 == 0 and doc[0] not in self.seen:
+                self.seen.add(doc[0])
+                retry.append(doc)
+        return len(batch) - len(retry), retry, 0
+
+
+async def chunks(records, size):
+    for i in range(0, len(records), size):
+        yield records[i:i + size]
+
+
+def test_transform_normalizes_flat_rows_and_passes_ecs() -> None:
+    rows = [
+        json.dumps({"timestamp": "2025-01-01T00:00:00", "src_ip": "10.0.0.1", "username": "bob"}).encode(),
+        {"@timestamp": "2025-01-01T00:00:00", "host": {"name": "SRV-01"}},
+        b"not json",
+        b"   ",
+    ]
+
+    prepared, errors = transform_chunk(rows, "elasticsearch", "unit")
+
+    assert errors == 1
+    assert len(prepared) == 2
+    action, body = prepared[0][1].splitlines()
+    assert json.loads(action) == {"index": {"_id": prepared[0][0]}}
+    document = json.loads(body)
+    assert document["source"]["ip"] == "10.0.0.1"
+    assert document["related"] == {"ip": ["10.0.0.1"], "user": ["bob"]}
+    assert document["event"]["dataset"] == "unit"
+    assert json.loads(prepared[1][1].splitlines()[1])["host"] == {"name": "SRV-01"}
+
+
+def test_batches_respect_count_and_bytes() -> None:
+    docs = [encode_record({"@timestamp": "t", "event": {"n": i}}, "elasticsearch") for i in range(10)]
+    size = docs[0][2]
+
+    assert [len(b) for b in iter_batches(docs, batch_size=4, batch_bytes=10**6)] == [4, 4, 2]
+    assert [len(b) for b in iter_batches(docs, batch_size=100, batch_bytes=size * 3)] == [3, 3, 3, 1]
+
+
+def test_pipeline_retries_only_failed_items() -> None:
+    records = [{"@timestamp": "2025-01-01T00:00:00", "event": {"sequence": i}} for i in range(25)]
+    writer = FlakyWriter()
+    config = IngestConfig(chunk_size=7, batch_size=10, writers=2, retry_backoff=0.0)
+
+    stats = asyncio.run(IngestPipeline(writer, config).run(chunks(records, 7)))
+
+    assert stats.read == 25
+    assert stats.written == 25
+    assert stats.failed == 0
+    assert stats.retried == len(writer.seen)
+    sent = [doc for call in writer.calls for doc in call]
+    assert len(sent) == 25 + len(writer.seen)
+    assert {doc for doc in sent if sent.count(doc) > 1} == writer.seen
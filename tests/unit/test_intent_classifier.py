@@ -0,0 +1,53 @@
+import re
+
+from src.core.nlp.intent_benchmark import BASELINE_ACCURACY, LABELED_QUERIES, evaluate
+from src.core.nlp.intent_classifier import IntentClassifier, QueryIntent
+
+
+def legacy_classify(classifier: IntentClassifier, query: str):
+    """Per-pattern scoring as it worked before patterns were compiled"""
+    query_lower = query.lower().strip()
+    if not query_lower:
+        return QueryIntent.UNKNOWN, 0.0
+
+    best_intent, best_score = QueryIntent.UNKNOWN, 0.0
+    for intent, patterns in classifier.intent_patterns.items():
+        scores = []
+        for pattern in patterns:
+            if re.search(pattern, query_lower, re.IGNORECASE):
+                exact = r'\b' + re.escape(pattern.replace(r'\b', '')) + r'\b'
+                scores.append(1.0 if re.search(exact, query_lower, re.IGNORECASE) else 0.7)
+        score = max(scores) if scores else 0.0
+        if score > best_score:
+            best_intent, best_score = intent, score
+
+    if best_intent == QueryIntent.UNKNOWN and best_score < 0.3:
+        if any(keyword in query_lower for keyword in classifier.search_keywords):
+            return QueryIntent.SEARCH_LOGS, 0.6
+    if best_score < 0.2:
+        return QueryIntent.UNKNOWN, best_score
+    return best_intent, best_score
+
+
+def test_compiled_classifier_matches_legacy_scoring() -> None:
+    classifier = IntentClassifier()
+    queries = [query for query, _ in LABELED_QUERIES] + ["", "   ", "BRUTE FORCE on 4688"]
+
+    assert classifier.classify_many(queries) == [legacy_classify(classifier, q) for q in queries]
+
+
+def test_refresh_patterns_picks_up_new_rules() -> None:
+    classifier = IntentClassifier()
+    assert classifier.classify_intent("kerberoasting spree")[0] == QueryIntent.UNKNOWN
+
+    classifier.intent_patterns[QueryIntent.THREAT_HUNTING].append(r'\bkerberoasting\b')
+    classifier.refresh_patterns()
+
+    assert classifier.classify_intent("kerberoasting spree") == (QueryIntent.THREAT_HUNTING, 1.0)
+
+
+def test_benchmark_accuracy_does_not_regress() -> None:
+    report = evaluate(rounds=1)
+
+    assert report["accuracy"] >= BASELINE_ACCURACY
+    assert report["queries_per_second"] > 0
@@ -0,0 +1,69 @@
+import random
+
+from src.core.monitoring.histogram import LogLinearHistogram, WindowedHistogram
+from src.core.monitoring.performance_profiler import PerformanceProfiler, QueryType
+
+
+def test_quantiles_stay_within_bucket_error_in_fixed_memory() -> None:
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-3, 1.2) for _ in range(20000)]
+    histogram = LogLinearHistogram()
+    size = len(histogram.counts)
+    for value in values:
+        histogram.record(value)
+
+    ordered = sorted(values)
+    estimates = histogram.quantiles((0.5, 0.95, 0.99))
+    for q, estimate in zip((0.5, 0.95, 0.99), estimates):
+        exact = ordered[int(q * len(ordered)) - 1]
+        assert abs(estimate - exact) / exact < 1 / histogram.sub_buckets
+    assert len(histogram.counts) == size and histogram.count == 20000
+    assert histogram.cumulative((0.01, 0.1))[-1][1] == 20000
+
+    # le is inclusive: a value sitting exactly on a bound is counted in that bucket
+    edges = LogLinearHistogram()
+    for value in (0.05, 0.1, 0.1, 0.3):
+        edges.record(value)
+    assert edges.cumulative((0.05, 0.1, 0.25)) == [(0.05, 1), (0.1, 3), (0.25, 3), (float("inf"), 4)]
+
+    other = LogLinearHistogram()
+    other.record(50.0)
+    assert histogram.merge(other).max == 50.0 and histogram.quantile(1.0) == 50.0
+
+
+def test_windows_rotate_in_place_and_expire() -> None:
+    clock = [0.0]
+    windowed = WindowedHistogram(window_seconds=60, windows=3, clock=lambda: clock[0])
+    for minute, latency in enumerate([0.01, 0.02, 0.04, 0.08]):
+        clock[0] = minute * 60 + 1
+        windowed.record(latency, error=(minute == 3))
+
+    last_minute, errors = windowed.merged(60)
+    assert last_minute.count == 1 and errors == 1
+    whole, _ = windowed.merged()
+    assert whole.count == 3 and whole.min == 0.02  # minute 0 was overwritten by minute 3
+
+    clock[0] += 600
+    assert windowed.merged()[0].count == 0
+
+
+def test_profiler_summary_and_prometheus_come_from_histograms() -> None:
+    profiler = PerformanceProfiler(max_metrics_history=5)
+    profiler.enable_system_monitoring = False
+    for i in range(200):
+        profiler.record(QueryType.API_ENDPOINT, "GET /api/events", 0.02 + (i % 10) * 0.01)
+    profiler.record(QueryType.DATABASE_QUERY, 'mongodb:"alerts"', 3.0, success=False, error_message="timeout")
+
+    summary = profiler.get_performance_summary(60)
+    overview = summary["overview"]
+    assert overview["total_requests"] == 201 and overview["failed_requests"] == 1
+    assert 0.09 < overview["p95_response_time"] < 0.12
+    assert summary["slow_queries"]["count"] == 1 and summary["error_analysis"]["timeout"]["count"] == 1
+    assert set(summary["by_query_type"]) == {"api_endpoint", "database_query"}
+    assert len(profiler.metrics_history) == 1  # only the slow/failed request is kept individually
+    assert len(profiler.get_endpoint_details("GET /api/events")["recent_metrics"]) == 20
+
+    text = profiler.export_prometheus()
+    assert 'kartavya_request_duration_seconds_bucket{endpoint="GET /api/events",query_type="api_endpoint",le="+Inf"} 200' in text
+    assert 'endpoint="mongodb:\\"alerts\\""' in text
+    assert 'kartavya_requests_total{endpoint="mongodb:\\"alerts\\"",query_type="database_query",outcome="error"} 1' in text
@@ -0,0 +1,81 @@
+import asyncio
+import gc
+
+from src.core.monitoring.metrics import COUNTER, GAUGE, MetricFamily, MetricsRegistry, get_registry
+from src.core.monitoring.performance_profiler import PerformanceProfiler, QueryType
+from src.core.resilience.circuit_breaker import AdvancedCircuitBreaker, CircuitBreakerConfig
+from src.core.stage_scheduler import StageScheduler
+
+
+class _Source:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def collect_metrics(self):
+        return [MetricFamily("source_queries", COUNTER, "Queries per source").add({"source": "es"}, self.queries)]
+
+
+def test_registry_renders_openmetrics_families() -> None:
+    registry = MetricsRegistry(namespace="t")
+    requests = registry.counter("http_requests", "HTTP requests", ("method",))
+    requests.labels("GET").inc()
+    requests.labels(method="GET").inc(2)
+    registry.gauge("queue_depth", "Queued jobs").set(4)
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), unit="seconds", bounds=(0.1, 1.0))
+    for value in (0.05, 0.5, 3.0):
+        latency.labels('say "hi"').record(value)
+
+    text = registry.render_openmetrics()
+    assert registry.counter("http_requests", "HTTP requests", ("method",)) is requests
+    assert "# TYPE t_http_requests counter" in text and 't_http_requests_total{method="GET"} 3.0' in text
+    assert "t_queue_depth 4" in text and "# UNIT t_latency_seconds seconds" in text
+    assert 't_latency_seconds_bucket{stage="say \\"hi\\"",le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{stage="say \\"hi\\"",le="+Inf"} 3' in text
+    assert 't_latency_seconds_count{stage="say \\"hi\\""} 3' in text
+    assert text.endswith("# EOF\n")
+
+    try:
+        registry.gauge("http_requests", "clash")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("re-registering a name with another type must fail")
+
+
+def test_collectors_merge_by_name_and_drop_with_their_objects() -> None:
+    registry = MetricsRegistry()
+    first, second = _Source(3), _Source(4)
+    registry.register_collector(first.collect_metrics)
+    registry.register_collector(second.collect_metrics)
+    registry.register_collector(lambda: [MetricFamily("up", GAUGE, "Up").add({}, True)])
+
+    families = {family.name: family for family in registry.collect()}
+    assert families["source_queries"].samples == {(("source", "es"),): 7}
+    assert families["up"].samples == {(): True}
+
+    del second
+    gc.collect()
+    assert 'kartavya_source_queries_total{source="es"} 3' in registry.render_openmetrics()
+    assert registry.get_stats()["collectors"] == 2
+
+
+def test_components_report_into_the_global_registry() -> None:
+    profiler = PerformanceProfiler()
+    profiler.record(QueryType.API_ENDPOINT, "GET /metrics-test", 0.2)
+    breaker = AdvancedCircuitBreaker(CircuitBreakerConfig(name="metrics-test"))
+
+    async def ok():
+        return "ok"
+
+    asyncio.run(breaker.call(ok))
+    run = StageScheduler().start()
+    with run.inline("metrics_test_stage"):
+        pass
+    run.as_dict()
+
+    text = get_registry().render_openmetrics()
+    assert 'kartavya_requests_total{endpoint="GET /metrics-test",query_type="api_endpoint",outcome="success"} 1' in text
+    assert 'kartavya_circuit_breaker_state{breaker="metrics-test",state="closed"} 1' in text
+    assert 'kartavya_circuit_breaker_call_duration_seconds_count{breaker="metrics-test",outcome="success"} 1' in text
+    assert 'kartavya_pipeline_stage_duration_seconds_count{stage="metrics_test_stage"} 1' in text
+    assert text.count("# TYPE kartavya_requests counter") == 1
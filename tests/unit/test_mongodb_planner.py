@@ -0,0 +1,58 @@
+import asyncio
+
+from src.connectors.mongodb_planner import MongoQueryPlanner
+
+
+def test_shape_ignores_values_and_orders_index_keys() -> None:
+    planner = MongoQueryPlanner()
+    sort = [("@timestamp", -1)]
+
+    first = planner.shape_of("events", {"source.ip": "10.0.0.1", "@timestamp": {"$gte": 1}}, sort)
+    second = planner.shape_of("events", {"@timestamp": {"$gte": 2}, "source.ip": "10.0.0.2"}, sort)
+
+    assert first == second
+    assert first.index_keys() == [("source.ip", 1), ("@timestamp", -1)]
+    assert planner.shape_of("events", {"$or": []}, sort).unindexable is True
+
+
+def test_summarize_plan_detects_collscan_and_index() -> None:
+    collscan = MongoQueryPlanner.summarize_plan({
+        "queryPlanner": {"winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "COLLSCAN"}}},
+        "executionStats": {"totalDocsExamined": 5000, "nReturned": 10},
+    })
+    indexed = MongoQueryPlanner.summarize_plan({
+        "queryPlanner": {"winningPlan": {"queryPlan": {
+            "stage": "FETCH",
+            "inputStage": {"stage": "IXSCAN", "indexName": "user.name_1_@timestamp_-1"},
+        }}},
+        "executionStats": {"totalDocsExamined": 10, "nReturned": 10},
+    })
+
+    assert collscan["collscan"] is True
+    assert collscan["examined_ratio"] == 500
+    assert indexed["collscan"] is False
+    assert indexed["index_name"] == "user.name_1_@timestamp_-1"
+
+
+def test_frequent_shape_index_builds_in_the_background() -> None:
+    class SlowCollection:
+        def __init__(self):
+            self.created = []
+
+        async def create_index(self, keys):
+            await asyncio.sleep(0.01)
+            self.created.append(keys)
+
+    planner = MongoQueryPlanner(min_shape_count=2)
+    collection = SlowCollection()
+    shape = planner.shape_of("events", {"user.name": "bob"}, [("@timestamp", -1)])
+
+    async def run():
+        for _ in range(3):
+            planner.record(shape, 0.01, 1)
+            planner.schedule_index(shape, collection)  # returns at once; one build at a time
+        assert collection.created == [] and len(planner._indexing) == 1
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert collection.created == [[("user.name", 1), ("@timestamp", -1)]] and not planner._indexing
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from src.core.nlp.time_parser import parse_time_expression
+from src.core.query.plan_cache import QueryPlanCache, canonicalize
+
+
+def test_canonicalize_normalizes_time_and_entities() -> None:
+    first = canonicalize("failed logins last hour")
+    second = canonicalize("Show failed logins in the last 1 hour")
+    minutes = canonicalize("failed logins over the past 60 minutes")
+
+    assert first.text == second.text == minutes.text == "failed logins @last:1h"
+
+    shaped = canonicalize("Failed login for user Admin from 192.168.1.100 yesterday")
+    assert shaped.text == "failed login user @user from @ip @cal:yesterday"
+    assert shaped.params == [("ip", "192.168.1.100"), ("user", "Admin")]
+    assert shaped.calendar is True
+    assert canonicalize("user activity").params == []
+
+
+def test_hit_binds_values_and_reanchors_time() -> None:
+    cache = QueryPlanCache()
+    built_at = datetime.now() - timedelta(minutes=5)
+    query = "failed login for user alice from 10.0.0.1 last 24 hours"
+    result = {
+        "intent": "show_failed_logins",
+        "entities": [{"type": "username", "value": "alice", "start_pos": 22, "end_pos": 27}],
+        "processed_query": query + " (time: 24h)",
+        "siem_query": {"query": {"bool": {"filter": [
+            {"term": {"user.name": "alice"}},
+            {"term": {"source.ip": "10.0.0.1"}},
+            {"range": {"@timestamp": {"gte": (built_at - timedelta(hours=24)).isoformat()}}},
+        ]}}},
+        "query_valid": True,
+    }
+
+    assert cache.store(canonicalize(query), query, result, built_at)
+
+    repeat = "show failed login for user bob from 10.9.9.9 in the past 24 hours"
+    bound = cache.lookup(canonicalize(repeat), repeat)
+    filters = bound["siem_query"]["query"]["bool"]["filter"]
+
+    assert filters[0] == {"term": {"user.name": "bob"}}
+    assert filters[1] == {"term": {"source.ip": "10.9.9.9"}}
+    gte = datetime.fromisoformat(filters[2]["range"]["@timestamp"]["gte"])
+    assert abs((datetime.now() - timedelta(hours=24) - gte).total_seconds()) < 5
+    assert bound["processed_query"] == repeat + " (time: 24h)"
+    assert bound["entities"][0]["value"] == "bob"
+    assert bound["entities"][0]["start_pos"] == repeat.index("bob")
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_values_missing_from_result_are_not_cached() -> None:
+    cache = QueryPlanCache()
+    query = "logs from user carol"
+    result = {"intent": "search_logs", "siem_query": {"query": {"match": {"user.name": "CAROL"}}}}
+
+    assert cache.store(canonicalize(query), query, result, datetime.now()) is False
+    assert cache.lookup(canonicalize("logs from user dave"), "logs from user dave") is None
+    assert cache.get_stats()["uncacheable"] == 1
+
+
+def test_literal_dates_are_not_reanchored() -> None:
+    cache = QueryPlanCache()
+    built_at = datetime.now() - timedelta(minutes=30)
+    query = "failed logins since 2025-10-01"
+    result = {
+        "intent": "show_failed_logins",
+        "siem_query": {"query": {"range": {"@timestamp": {
+            "gte": "2025-10-01T00:00:00", "lte": built_at.isoformat()
+        }}}},
+    }
+
+    assert cache.store(canonicalize(query), query, result, built_at)
+    bounds = cache.lookup(canonicalize(query), query)["siem_query"]["query"]["range"]["@timestamp"]
+
+    assert bounds["gte"] == "2025-10-01T00:00:00"
+    assert abs((datetime.now() - datetime.fromisoformat(bounds["lte"])).total_seconds()) < 5
+    assert cache.lookup(canonicalize("failed logins since 2025-10-02"), query) is None
+
+
+def test_calendar_time_range_is_rederived_on_a_hit() -> None:
+    clock = [datetime(2026, 10, 18, 10, 0, 0, 12059)]
+    cache = QueryPlanCache(clock=lambda: clock[0])
+    query = "failed logins today"
+    expression = parse_time_expression(query)
+    window = {key: value.isoformat() if isinstance(value, datetime) else value
+              for key, value in expression.window(clock[0]).items()}
+    result = {"intent": "show_failed_logins", "time_range": window,
+              "siem_query": {"query": {"range": {"@timestamp": window["range"]}}}}
+
+    assert cache.store(canonicalize(query), query, result, clock[0])
+    assert cache.lookup(canonicalize(query), query)["time_range"]["start_time"] == "2026-10-18T00:00:00"
+
+    clock[0] = datetime(2026, 10, 18, 15, 0)
+    bound = cache.lookup(canonicalize(query), query)
+    # Still "today" at 15:00: midnight start, not the 10:00 offset (05:00) re-anchored
+    assert bound["time_range"]["start_time"] == "2026-10-18T00:00:00"
+    assert bound["time_range"]["end_time"] == "2026-10-18T15:00:00"
+    assert bound["siem_query"]["query"]["range"]["@timestamp"] == {"gte": "now/d", "lte": "now"}
@@ -0,0 +1,132 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from src.core.query.builder import QueryBuilder
+from src.core.query.codegen import CODEGENS, TranslationCache, lower
+from src.core.query.ir import QueryIR, TimeRange, from_es_dsl, optimize
+
+
+def _failed_login_ir():
+    return QueryBuilder().build_ir(
+        "failed_login",
+        [{"type": "username", "value": "admin"}, {"type": "time_range", "value": "last 1 hour"}],
+        {"admin": ["user.name"]},
+        {"filters": {"host": "dc01"}},
+    )
+
+
+def test_builder_ir_lowers_to_every_backend() -> None:
+    ir = _failed_login_ir()
+
+    assert asyncio.run(QueryBuilder().build(
+        "failed_login",
+        [{"type": "username", "value": "admin"}, {"type": "time_range", "value": "last 1 hour"}],
+        {"admin": ["user.name"]},
+        {"filters": {"host": "dc01"}},
+    )) == {
+        "query": {"bool": {
+            "must": [
+                {"match": {"event.action": "authentication_failure"}},
+                {"match": {"event.outcome": "failure"}},
+                {"match": {"user.name": "admin"}},
+            ],
+            "filter": [{"match": {"host.name": "dc01"}}, {"range": {"@timestamp": {"gte": "now-1h", "lte": "now"}}}],
+        }},
+        "size": 100,
+        "sort": [{"@timestamp": {"order": "desc"}}],
+    }
+
+    spl = lower(ir, "spl")
+    assert spl["search"].startswith('search event.action="*authentication_failure*"')
+    assert (spl["earliest_time"], spl["latest_time"]) == ("-1h", "now")
+    aql = lower(ir, "aql")["query_expression"]
+    assert "\"user.name\" ILIKE '%admin%'" in aql and aql.endswith("LIMIT 100 LAST 1 HOURS")
+    kql = lower(ir, "kql")
+    assert kql["query"].startswith("SecurityEvent | where TimeGenerated >= ago(1h) | where (")
+    assert kql["timespan"] == "PT1H"
+    mongo = lower(ir, "mongo")
+    assert mongo.filter["$and"][3] == {"host.name": "dc01"}
+    assert mongo.filter_at()["$and"][-1]["@timestamp"]["$gte"] > datetime.now(timezone.utc) - timedelta(hours=2)
+    assert set(CODEGENS) == {"elasticsearch", "spl", "aql", "kql", "mongo", "dataset"}
+
+
+def test_lifted_dsl_is_optimized_and_filters_records() -> None:
+    ir = optimize(from_es_dsl({
+        "query": {"bool": {
+            "must": [{"bool": {"filter": [{"term": {"event.outcome": "failure"}}]}}],
+            "should": [{"term": {"host.name": "a"}}, {"term": {"host.name": "b"}}, {"term": {"host.name": "a"}}],
+            "minimum_should_match": 1,
+            "must_not": [{"wildcard": {"user.name.keyword": "svc*"}}],
+            "filter": [{"range": {"@timestamp": {"gte": "now-1d"}}}],
+        }},
+        "size": 10,
+    }))
+
+    assert ir.time_range == TimeRange(start="now-1d", end=None)
+    assert lower(ir, "elasticsearch")["query"]["bool"] == {
+        "filter": [{"term": {"event.outcome": "failure"}}, {"range": {"@timestamp": {"gte": "now-1d"}}}],
+        "should": [{"terms": {"host.name": ["a", "b"]}}],
+        "must_not": [{"wildcard": {"user.name.keyword": "svc*"}}],
+        "minimum_should_match": 1,
+    }
+
+    now = datetime.now().isoformat()
+    records = [
+        {"@timestamp": now, "event": {"outcome": "failure"}, "host": {"name": "b"}, "user": {"name": "bob"}},
+        {"@timestamp": now, "event": {"outcome": "failure"}, "host": {"name": "a"}, "user": {"name": "svc-backup"}},
+        {"@timestamp": now, "event": {"outcome": "failure"}, "host": {"name": "c"}, "user": {"name": "bob"}},
+        {"@timestamp": "2001-01-01T00:00:00", "event": {"outcome": "failure"}, "host": {"name": "a"}},
+    ]
+    assert lower(ir, "dataset").filter(records) == records[:1]
+
+
+def test_translation_cache_reuses_lowering_for_repeated_questions() -> None:
+    cache = TranslationCache(max_entries=2)
+    first, second = _failed_login_ir(), _failed_login_ir()
+
+    assert first is not second and first.fingerprint == second.fingerprint
+    body = cache.lower(first, "elasticsearch")
+    body["size"] = 0  # callers may decorate their copy
+    assert cache.lower(second, "elasticsearch")["size"] == 100
+    cache.lower(first, "spl")
+    cache.lower(first, "kql")
+
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_translation_cache_keys_closed_windows_by_day() -> None:
+    cache = TranslationCache()
+    ir = QueryIR(time_range=TimeRange(start="2025-10-01T00:00:00", end="now"))
+    day_one = datetime(2025, 10, 3, 12, 0)
+
+    first = cache.lower(ir, "aql", day_one)["range"]
+    assert cache.lower(ir, "aql", day_one + timedelta(hours=6))["range"] == first
+    later = cache.lower(ir, "aql", day_one + timedelta(days=2))["range"]
+
+    assert first == "START '2025-10-01 00:00:00' STOP '2025-10-04 00:00:00'"
+    assert later == "START '2025-10-01 00:00:00' STOP '2025-10-06 00:00:00'"
+    assert cache.lower(ir, "kql", day_one)["timespan"] == "P3D"
+    assert cache.lower(ir, "kql", day_one + timedelta(days=2))["timespan"] == "P5D"
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_rounded_windows_resolve_in_utc_with_exclusive_ends() -> None:
+    yesterday = QueryIR(time_range=TimeRange(start="now-1d/d", end="now/d"))
+    now = datetime(2025, 10, 3, 12, 0, tzinfo=timezone.utc)
+
+    start, end = yesterday.time_range.resolve()
+    assert start.tzinfo is not None and end - start == timedelta(days=1)
+
+    window = lower(yesterday, "mongo").filter_at(now)["@timestamp"]
+    assert window == {"$gte": datetime(2025, 10, 2, tzinfo=timezone.utc), "$lt": datetime(2025, 10, 3, tzinfo=timezone.utc)}
+    assert "TimeGenerated < startofday(now())" in lower(yesterday, "kql")["query"]
+
+    records = [{"@timestamp": stamp} for stamp in (
+        "2025-10-01T23:59:59Z", "2025-10-02T00:00:00Z", "2025-10-02T23:59:59Z", "2025-10-03T00:00:00Z",
+        "2025-10-03T01:30:00+02:00",  # 23:30 UTC on the 2nd
+    )]
+    kept = lower(yesterday, "dataset").filter(records, now=now)
+    assert [record["@timestamp"] for record in kept] == [
+        "2025-10-02T00:00:00Z", "2025-10-02T23:59:59Z", "2025-10-03T01:30:00+02:00"
+    ]
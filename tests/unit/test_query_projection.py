@@ -0,0 +1,63 @@
+from src.core.query.projection import (
+    FieldRequirements,
+    apply_source_filter,
+    get_source_includes,
+    project_document,
+    to_mongo_projection,
+)
+
+
+def test_field_requirements_merge_intent_and_mappings() -> None:
+    requirements = FieldRequirements()
+    fields = requirements.fields_for(
+        intent="malware_detection",
+        field_mappings={"failed_login": ["event.code:4625", "event.outcome:failure"]},
+    )
+
+    assert "file.hash.sha256" in fields
+    assert "event.code" in fields
+    assert "event.original" not in fields
+    assert "winlog.event_data" not in fields
+    assert len(fields) == len(set(fields))
+
+    again = requirements.fields_for(
+        intent="malware_detection",
+        field_mappings={"failed_login": ["event.code:4625", "event.outcome:failure"]},
+    )
+    assert again == fields
+    assert requirements.stats["cache_hits"] == 1
+
+
+def test_apply_source_filter_respects_existing_and_aggregations() -> None:
+    query = {"query": {"match_all": {}}}
+    projected = apply_source_filter(query, ["@timestamp", "host.name"])
+
+    assert get_source_includes(projected) == ["@timestamp", "host.name"]
+    assert "_source" not in query
+    assert apply_source_filter({"size": 0, "aggs": {}}, ["host.name"]) == {"size": 0, "aggs": {}}
+    assert apply_source_filter({"_source": False}, ["host.name"]) == {"_source": False}
+
+
+def test_project_document_nested_and_flat() -> None:
+    document = {
+        "@timestamp": "2025-10-12T00:00:00Z",
+        "host": {"name": "SRV-DC01", "os": {"name": "Windows"}},
+        "winlog": {"event_data": {"TargetUserName": "bob", "Blob": "x" * 1000}},
+        "user.name": "bob",
+    }
+
+    projected = project_document(
+        document, ["@timestamp", "host.name", "winlog.event_data.TargetUserName", "user.name", "missing.field"]
+    )
+
+    assert projected == {
+        "@timestamp": "2025-10-12T00:00:00Z",
+        "host": {"name": "SRV-DC01"},
+        "winlog": {"event_data": {"TargetUserName": "bob"}},
+        "user.name": "bob",
+    }
+
+
+def test_mongo_projection_drops_overlapping_paths() -> None:
+    assert to_mongo_projection(["host.name", "host", "user.name"]) == {"host": 1, "user.name": 1}
+    assert to_mongo_projection(None) is None
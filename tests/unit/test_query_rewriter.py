@@ -0,0 +1,123 @@
+import pytest
+
+from src.core.query.rewrite_benchmark import evaluate
+from src.core.query.rewriter import QueryRewriter, field_types_from_mapping
+from src.core.query.validator import QueryValidator
+
+
+def test_rules_rewrite_builder_output() -> None:
+    rewriter = QueryRewriter(time_defaults={"show_failed_logins": "1h"})
+    query = {
+        "query": {"bool": {
+            "must": [
+                {"match": {"event.outcome": "failure"}},
+                {"wildcard": {"source.ip": "*10.0.0.1*"}},
+                {"query_string": {"query": "event.code:4625 AND user.name:(admin OR root)"}},
+            ],
+            "should": [{"term": {"host.name": "dc01"}}, {"term": {"host.name": "dc02"}}],
+        }},
+        "size": 100,
+        "sort": [{"@timestamp": {"order": "desc"}}],
+    }
+
+    rewritten, report = rewriter.rewrite(query, "show_failed_logins")
+    bool_query = rewritten["query"]["bool"]
+
+    assert bool_query["must"] == []
+    assert bool_query["filter"] == [
+        {"term": {"event.outcome": "failure"}},
+        {"term": {"source.ip": "10.0.0.1"}},
+        {"bool": {"filter": [{"term": {"event.code": "4625"}}, {"terms": {"user.name": ["admin", "root"]}}]}},
+        {"range": {"@timestamp": {"gte": "now-1h"}}},
+    ]
+    assert bool_query["should"] == [{"terms": {"host.name": ["dc01", "dc02"]}}]
+    assert rewritten["track_total_hits"] is False
+    assert "track_total_hits" not in query  # input untouched
+    assert report.rules == list(QueryRewriter.RULES)
+    assert report.cost_after < report.cost_before
+
+
+def test_rewrites_that_would_change_results_are_skipped() -> None:
+    rewriter = QueryRewriter()
+    query = {
+        "query": {"bool": {
+            "must": [
+                {"wildcard": {"user.name": "*admin*"}},  # keyword substring match
+                {"query_string": {"query": "user.name:admin OR host.name:web01"}},
+                {"match": {"message": "failed password"}},  # analyzed text
+            ],
+            "should": [{"term": {"host.name": "a"}}, {"term": {"host.name": "b"}}],
+            "minimum_should_match": 2,
+            "filter": [{"range": {"@timestamp": {"gte": "now-15m"}}}],
+        }},
+        "track_total_hits": True,
+    }
+
+    rewritten, report = rewriter.rewrite(query, view="dashboard_metrics")
+
+    # Scored (no sort): only constant-score clauses leave must; everything else is kept verbatim
+    assert rewritten["query"]["bool"]["must"] == query["query"]["bool"]["must"][1:]
+    assert rewritten["query"]["bool"]["filter"][1] == {"wildcard": {"user.name": "*admin*"}}
+    assert rewritten["query"]["bool"]["should"] == query["query"]["bool"]["should"]
+    assert rewritten["track_total_hits"] is True
+    assert report.rules == ["must_to_filter"]
+
+
+def test_mapping_types_and_benchmark() -> None:
+    mapping = {"properties": {
+        "user": {"properties": {"name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}}}},
+        "source": {"properties": {"port": {"type": "long"}}},
+    }}
+    assert field_types_from_mapping(mapping) == {
+        "user.name": "text", "user.name.keyword": "keyword", "source.port": "long"
+    }
+
+    rewriter = QueryRewriter()
+    rewriter.update_field_types(mapping)
+    rewritten, _ = rewriter.rewrite({"query": {"match": {"user.name": "bob"}}, "size": 0})
+    assert rewritten["query"]["bool"]["must"] == [{"match": {"user.name": "bob"}}]  # text stays analyzed
+
+    assert QueryValidator().time_window_hours({"query": {"range": {"@timestamp": {"gte": "now-2d"}}}}) == pytest.approx(48)
+    report = evaluate()
+    assert report["rewritten"] == report["queries"]
+    assert report["reduction"] > 0.5
+
+
+def test_user_lower_bounds_are_read_and_never_replaced() -> None:
+    validator = QueryValidator()
+
+    def hours(bounds):
+        return validator.time_window_hours({"query": {"range": {"@timestamp": bounds}}})
+
+    assert hours({"gte": "now-1d/d", "lte": "now-1d/d"}) == pytest.approx(24)
+    assert hours({"gte": "2025-10-01||-1d", "lt": "2025-10-01"}) == pytest.approx(24)
+    assert hours({"gte": 1696118400000, "lte": "1696122000000"}) == pytest.approx(1)
+    assert hours({"gte": "now/w"}) is not None and hours({"gte": "now-1q"}) is None
+
+    rewriter = QueryRewriter(time_defaults={"search_logs": "1h"})
+    for lower in ("now/d", 1696118400000, "2025-10-01||-1d", "now-1q"):
+        query = {"query": {"bool": {"filter": [{"range": {"@timestamp": {"gte": lower}}}]}}}
+        rewritten, _ = rewriter.rewrite(query, "search_logs")
+        assert rewritten["query"]["bool"]["filter"] == [{"range": {"@timestamp": {"gte": lower}}}]
+
+    upper_only = {"query": {"range": {"@timestamp": {"lte": "now"}}}}
+    rewritten, _ = rewriter.rewrite(upper_only, "search_logs")
+    assert rewritten["query"] == {"range": {"@timestamp": {"lte": "now", "gte": "now-1h"}}}
+
+
+def test_lucene_syntax_in_query_string_is_left_alone() -> None:
+    rewriter = QueryRewriter(time_defaults={})
+    for text in ("winlog.event_id:>4624", "user.name:admin~", "user.name:admin^2"):
+        clause = {"query_string": {"query": text}}
+        rewritten, _ = rewriter.rewrite({"query": {"bool": {"must": [clause]}}, "size": 0})
+        assert rewritten["query"]["bool"]["must"] == [clause], text
+        assert rewriter._exact_clause(clause) is None
+
+    # Scored query: terms converted from query_string leave must for filter context
+    scored = {"query": {"bool": {"must": [{"query_string": {"query": 'user.name:"admin" AND event.code:4625'}}]}}}
+    rewritten, report = rewriter.rewrite(scored, view="dashboard_metrics")
+    assert rewritten["query"]["bool"]["must"] == []
+    assert rewritten["query"]["bool"]["filter"][0] == {
+        "bool": {"filter": [{"term": {"user.name": "admin"}}, {"term": {"event.code": "4625"}}]}
+    }
+    assert report.rules[:2] == ["exact_match_terms", "must_to_filter"]
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from src.core.security.rate_limiting import LocalRateLimiter, RateLimit, RateLimiter, client_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Script:
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.calls = []
+
+    async def __call__(self, keys, args):
+        self.calls.append((keys, args))
+        if self.error:
+            raise self.error
+        return self.reply
+
+
+class _Redis:
+    def __init__(self, script):
+        self.script = script
+
+    def register_script(self, source):
+        assert "redis.call('TIME')" in source
+        return self.script
+
+
+def test_gcra_admits_a_burst_then_paces_requests() -> None:
+    clock = _Clock()
+    limiter = LocalRateLimiter(clock=clock)
+    rule = RateLimit(60, 60, burst=3)
+
+    results = [limiter.hit("client", (rule,)) for _ in range(4)]
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results[:3]] == [2, 1, 0]
+    assert abs(results[3].retry_after - 1.0) < 1e-6
+
+    clock.now += 1.0
+    assert limiter.hit("client", (rule,)).allowed and not limiter.hit("client", (rule,)).allowed
+    clock.now += 10
+    assert limiter.peek("client", rule) == 3 and limiter.hit("other", (rule,)).remaining == 2
+
+
+def test_all_rules_must_admit_and_memory_is_bounded() -> None:
+    clock = _Clock()
+    limiter = LocalRateLimiter(max_keys=2, clock=clock)
+    minute, hour = RateLimit(10, 60), RateLimit(3, 3600)
+
+    assert all(limiter.hit("ip", (minute, hour)).allowed for _ in range(3))
+    denied = limiter.hit("ip", (minute, hour))
+    assert not denied.allowed and denied.limit == 3 and denied.retry_after > 60
+    assert limiter.peek("ip", minute) == 7  # a denied request consumes nothing
+
+    for key in ("a", "b", "c"):
+        limiter.hit(key, (minute,))
+    assert len(limiter) == 2 and limiter.evicted == 2
+
+
+def test_redis_failures_fall_back_locally_and_recover() -> None:
+    script = _Script(error=ConnectionError("redis down"))
+    limiter = RateLimiter(_Redis(script), prefix="t:", redis_retry_interval=60)
+    rule = RateLimit(2, 60)
+
+    async def scenario():
+        results = [await limiter.hit("client", rule) for _ in range(3)]
+        assert [r.allowed for r in results] == [True, True, False]
+        assert {r.backend for r in results} == {"local"} and len(script.calls) == 1  # cool-down skips Redis
+
+        keys, args = script.calls[0]
+        assert keys == ["t:client:2r60s"] and args == [30000.0, 60000.0]
+
+        script.error, script.reply = None, [0, 0, 1500, 60000, 1]
+        limiter._redis_down_until = 0
+        shared = await limiter.hit("client", rule)
+        assert shared.backend == "redis" and not shared.allowed and shared.retry_after == 1.5
+        assert shared.headers()["Retry-After"] == "2"
+
+    asyncio.run(scenario())
+    stats = limiter.get_stats()
+    assert stats["redis_errors"] == 1 and stats["local"] == 3 and stats["redis"] == 1 and stats["limited"] == 2
+
+
+def test_client_key_is_the_same_in_every_worker() -> None:
+    agent = "Mozilla/5.0 (X11; Linux x86_64) Firefox/131.0"
+    script = ("import sys; from src.core.security.rate_limiting import client_key; "
+              "print(client_key('10.0.0.5', sys.argv[1]))")
+    keys = set()
+    for seed in ("1", "2", "3"):
+        completed = subprocess.run(
+            [sys.executable, "-c", script, agent], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parents[2] / "backend", env={**os.environ, "PYTHONHASHSEED": seed}
+        )
+        keys.add(completed.stdout.strip())
+    assert keys == {client_key("10.0.0.5", agent)}
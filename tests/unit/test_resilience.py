@@ -0,0 +1,138 @@
+import asyncio
+
+from src.core.resilience.circuit_breaker import (
+    AdvancedCircuitBreaker, CircuitBreakerConfig, CircuitBreakerOpenError, CircuitState
+)
+from src.core.resilience.concurrency import (
+    AIMD, VEGAS, AdaptiveConcurrencyLimiter, BackendGuard, LoadShedError, get_backend_guard
+)
+from src.core.resilience.counters import RollingCounters
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rolling_counters_slide_and_drive_the_breaker() -> None:
+    clock = _Clock()
+    counters = RollingCounters(window_seconds=10, buckets=5, clock=clock)
+    for success in (True, True, False, False):
+        counters.record(success, latency=0.5, slow=not success)
+    assert counters.total == 4 and counters.failure_rate == 50.0 and counters.slow_call_rate == 50.0
+    clock.now += 6
+    counters.record(True, latency=1.5)
+    assert counters.total == 5 and counters.avg_latency == 0.7
+    clock.now += 5  # the first four fall out of the window
+    assert counters.total == 1 and counters.failure_rate == 0.0 and counters.avg_latency == 1.5
+    clock.now += 1000
+    assert counters.snapshot()["requests"] == 0 and counters.latency_sum == 0.0
+
+    breaker = AdvancedCircuitBreaker(CircuitBreakerConfig(
+        name="window-test", failure_threshold=100, failure_rate_threshold=40.0, minimum_throughput=5
+    ))
+
+    async def ok():
+        return "ok"
+
+    async def boom():
+        raise ConnectionError("connection refused")
+
+    async def run():
+        for call in (ok, ok, ok, boom):
+            try:
+                await breaker.call(call)
+            except ConnectionError:
+                pass
+        assert breaker.state == CircuitState.CLOSED  # 4 calls: below minimum throughput
+        try:
+            await breaker.call(boom)
+        except ConnectionError:
+            pass
+        assert breaker.state == CircuitState.OPEN  # 2 of 5 failed in the window
+        try:
+            await breaker.call(ok)
+        except CircuitBreakerOpenError:
+            pass
+        else:
+            raise AssertionError("open breaker must reject")
+        await breaker.cleanup()
+
+    asyncio.run(run())
+    assert breaker.get_state()["metrics"]["window"]["failures"] == 2
+
+
+def test_limits_adapt_to_latency_and_timeouts() -> None:
+    vegas = AdaptiveConcurrencyLimiter("vegas-test", initial_limit=20, max_limit=50, algorithm=VEGAS)
+    vegas.in_flight = 20
+    for _ in range(5):
+        vegas._adjust(0.1, dropped=False)  # no queueing: latency at its floor
+    grown = vegas.limit
+    assert grown > 20 and vegas.no_load_latency == 0.1
+    vegas.in_flight = int(grown)
+    for _ in range(10):
+        vegas._adjust(1.0, dropped=False)  # 10x the no-load latency: calls are queueing
+    assert vegas.limit < grown
+    vegas._adjust(0.1, dropped=True)
+    assert vegas.limit >= vegas.min_limit
+
+    aimd = AdaptiveConcurrencyLimiter("aimd-test", initial_limit=10, max_limit=20, algorithm=AIMD,
+                                      latency_threshold=0.05)
+
+    async def slow():
+        await asyncio.sleep(0.06)
+
+    async def run():
+        async with aimd.acquire():
+            pass
+        assert aimd.limit == 10.0  # 1 in flight of 10: nothing learned
+        try:
+            async with aimd.acquire():
+                await asyncio.wait_for(asyncio.sleep(1), 0.01)
+        except asyncio.TimeoutError:
+            pass
+        async with aimd.acquire():
+            await slow()
+
+    asyncio.run(run())
+    assert aimd.stats["drops"] == 2 and round(aimd.limit, 2) == 8.1 and aimd.in_flight == 0
+
+
+def test_guard_queues_then_sheds_without_tripping_the_breaker() -> None:
+    breaker = AdvancedCircuitBreaker(CircuitBreakerConfig(name="shed-test", failure_threshold=1))
+    guard = BackendGuard(
+        "shed-test", breaker,
+        AdaptiveConcurrencyLimiter("shed-test", initial_limit=1, max_limit=1, max_queue=1, queue_timeout=0.5)
+    )
+    nested = get_backend_guard("elasticsearch")
+
+    async def query(seconds):
+        # A connector's own guard passes through inside the source's guard
+        async with nested.admit():
+            await asyncio.sleep(seconds)
+        return seconds
+
+    async def run():
+        results = await asyncio.gather(
+            guard.call(query, 0.05), guard.call(query, 0.01), guard.call(query, 0.01),
+            return_exceptions=True
+        )
+        assert results[:2] == [0.05, 0.01]
+        assert isinstance(results[2], LoadShedError) and isinstance(results[2], CircuitBreakerOpenError)
+        assert breaker.state == CircuitState.CLOSED and breaker.metrics.failed_requests == 0
+        assert nested.limiter.stats["admitted"] == 0
+
+        try:
+            await guard.call(lambda: asyncio.wait_for(asyncio.sleep(1), 0.01))
+        except asyncio.TimeoutError:
+            pass
+        assert breaker.state == CircuitState.OPEN and not guard.available
+        await breaker.cleanup()
+
+    asyncio.run(run())
+    stats = guard.get_stats()
+    assert stats["state"] == "open" and stats["concurrency"]["shed"] == 1
+    assert stats["concurrency"]["in_flight"] == 0 and stats["concurrency"]["queued"] == 1
@@ -0,0 +1,139 @@
+import asyncio
+import random
+
+from src.core.query.builder import QueryBuilder
+from src.core.query.codegen import lower
+from src.core.query.estimator import (
+    FETCH_AGGREGATE, FETCH_FULL, FETCH_SAMPLE, FETCH_SKIP,
+    FetchPlan, LimitNegotiator, ResultEstimate, reservoir_sample, shape_query
+)
+
+
+class _CountingConnector:
+    """Connector exposing only the ``_count``-style fallback"""
+
+    def __init__(self, total):
+        self.total = total
+        self.calls = 0
+
+    def count_documents(self, query):
+        self.calls += 1
+        return self.total
+
+
+class _EstimatingConnector:
+    def __init__(self, total):
+        self.total = total
+        self.requests = []
+
+    async def estimate_result_size(self, query, distinct_fields=None):
+        self.requests.append(distinct_fields)
+        cardinality = {name: 7 for name in distinct_fields or []}
+        return ResultEstimate(self.total, True, "count", cardinality)
+
+
+def test_plans_pick_full_sample_aggregate_or_skip() -> None:
+    negotiator = LimitNegotiator(max_fetch=1000, aggregate_above=100_000)
+
+    # A count under the budget still fetches the whole budget: events may have arrived since
+    assert negotiator.plan(ResultEstimate(40, True, "count"), 100) == FetchPlan(
+        FETCH_FULL, 100, 1.0, ResultEstimate(40, True, "count")
+    )
+    assert negotiator.plan(ResultEstimate(0, True, "count"), 100).mode == FETCH_SKIP
+    assert negotiator.plan(ResultEstimate(0, False, "sample"), 100).mode == FETCH_FULL
+    assert negotiator.plan(ResultEstimate(), None) == FetchPlan(FETCH_FULL, 1000, 1.0, ResultEstimate())
+    sampled = negotiator.plan(ResultEstimate(50_000, True, "count"), None)
+    assert (sampled.mode, sampled.limit, sampled.sample_rate) == (FETCH_SAMPLE, 1000, 0.02)
+    assert sampled.scale(30) == 1500
+    assert negotiator.plan(ResultEstimate(500_000, True, "count"), 100, aggregatable=True).mode == FETCH_AGGREGATE
+    assert negotiator.plan(ResultEstimate(500_000, True, "count"), 100).mode == FETCH_SAMPLE
+    # Event lists keep plain size=N however large the result
+    listed = negotiator.plan(ResultEstimate(500_000, True, "count"), 100, aggregatable=True, sampling=False)
+    assert listed == FetchPlan(FETCH_FULL, 100, 1.0, ResultEstimate(500_000, True, "count"))
+
+    body = {"query": {"term": {"event.outcome": "failure"}}, "size": 100, "sort": [{"@timestamp": "desc"}]}
+    shaped = shape_query(body, sampled, seed=7)
+    assert shaped["size"] == 1000 and shaped["sort"] == body["sort"]
+    assert shaped["query"]["function_score"] == {
+        "query": {"term": {"event.outcome": "failure"}},
+        "random_score": {"seed": 7, "field": "_seq_no"},
+        "boost_mode": "replace",
+        "min_score": 0.98,
+    }
+    aggregated = shape_query(body, FetchPlan(FETCH_AGGREGATE, 0, 0.0, ResultEstimate(10**6, True, "count", {"host.name": 3})))
+    assert aggregated["size"] == 0 and "sort" not in aggregated
+    assert aggregated["aggs"]["by_host.name"] == {"terms": {"field": "host.name", "size": 3}}
+    assert aggregated["aggs"]["by_event.category"]["terms"]["size"] == 50
+    assert body["size"] == 100  # input untouched
+
+
+def test_negotiator_estimates_once_and_fetches_cardinality_only_for_aggregation() -> None:
+    negotiator = LimitNegotiator(max_fetch=500, aggregate_above=10_000)
+    body = {"query": {"match_all": {}}}
+
+    counting = _CountingConnector(200)
+    first = asyncio.run(negotiator.negotiate(counting, body, 100, key="q"))
+    second = asyncio.run(negotiator.negotiate(counting, body, 100, key="q"))
+    assert (first.mode, first.limit, first.sample_rate) == (FETCH_SAMPLE, 100, 0.5)
+    assert second.estimate is first.estimate and counting.calls == 1
+    assert negotiator.get_stats()["cache_hits"] == 1
+
+    # An empty source is counted again next time rather than skipped for the TTL
+    empty = _CountingConnector(0)
+    assert asyncio.run(negotiator.negotiate(empty, body, 100, key="empty")).mode == FETCH_SKIP
+    empty.total = 3
+    assert asyncio.run(negotiator.negotiate(empty, body, 100, key="empty")).mode == FETCH_FULL
+    assert empty.calls == 2
+
+    estimating = _EstimatingConnector(2_000_000)
+    plan = asyncio.run(negotiator.negotiate(estimating, body, 100, group_by=["user.name"]))
+    assert plan.mode == FETCH_AGGREGATE
+    assert estimating.requests == [None, ["user.name"]]
+    assert shape_query(body, plan, ["user.name"])["aggs"]["by_user.name"]["terms"]["size"] == 7
+
+    # Cardinalities go into the plan's copy; the cached estimate is left as counted
+    cached = LimitNegotiator(aggregate_above=10_000)
+    plan = asyncio.run(cached.negotiate(estimating, body, 100, group_by=["user.name"], key="agg"))
+    again = asyncio.run(cached.negotiate(estimating, body, 100, group_by=["host.name"], key="agg"))
+    assert plan.estimate.cardinality == {"user.name": 7} and again.estimate.cardinality == {"host.name": 7}
+
+    # Native forms without aggregations are sampled instead
+    predicate = lower(QueryBuilder().build_ir("search_logs", [], {}), "dataset")
+    assert asyncio.run(negotiator.negotiate(estimating, predicate, 100)).mode == FETCH_SAMPLE
+
+    class _Broken:
+        def estimate_result_size(self, query, distinct_fields=None):
+            raise RuntimeError("cluster down")
+
+    assert asyncio.run(negotiator.negotiate(_Broken(), body, 100)).mode == FETCH_FULL
+
+
+def test_dataset_predicates_count_and_reservoir_sample() -> None:
+    ir = QueryBuilder().build_ir(
+        "failed_login", [{"type": "username", "value": "admin"}], {"admin": ["user.name"]}
+    )
+    records = [
+        {"event": {"action": "authentication_failure", "outcome": "failure"}, "user": {"name": "admin"}, "seq": i}
+        for i in range(1000)
+    ] + [{"event": {"action": "logon", "outcome": "success"}, "user": {"name": "admin"}}] * 50
+    predicate = lower(ir, "dataset")
+
+    assert predicate.count(records) == 1000
+    first_ten = predicate.filter(records, 10)
+    assert [record["seq"] for record in first_ten] == list(range(10))
+
+    plan = LimitNegotiator().plan(ResultEstimate(predicate.count(records), True, "scan"), 10)
+    sampled = shape_query(predicate, plan)
+    assert sampled.sample and sampled.limit == 10 and not predicate.sample
+    random.seed(3)
+    picked = sampled.filter(records)
+    assert len(picked) == 10 and all(record["event"]["outcome"] == "failure" for record in picked)
+    assert max(record["seq"] for record in picked) > 100  # spread across the matches, not the head
+
+    rng = random.Random(5)
+    counts = [0] * 10
+    for _ in range(2000):
+        for item in reservoir_sample(range(10), 3, rng):
+            counts[item] += 1
+    assert all(500 < count < 700 for count in counts)  # ~600 each when uniform
+    assert reservoir_sample(range(3), 5) == [0, 1, 2] and reservoir_sample(range(3), 0) == []
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+from src.core.monitoring.sampling_profiler import TRUNCATED, UNATTRIBUTED, SamplingProfiler
+from src.core.stage_scheduler import StageScheduler
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(100))
+
+
+def _busy_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), daemon=True)
+    worker.start()
+    return stop, worker
+
+
+def test_samples_collapse_into_windows_that_expire() -> None:
+    clock = _Clock()
+    profiler = SamplingProfiler(window_seconds=10, windows=3, clock=clock)
+    stop, worker = _busy_thread()
+    try:
+        for _ in range(5):
+            profiler.sample_once()
+        clock.now += 10
+        profiler.sample_once()
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = profiler.collapsed().splitlines()
+    spin = [line for line in lines if "test_sampling_profiler._spin" in line]
+    assert spin and sum(int(line.rsplit(" ", 1)[1]) for line in spin) == 6
+    assert all(line.startswith("threading.Thread._bootstrap") for line in spin)
+    assert not any(line.split(" ")[0].endswith("threading.Event.wait") for line in lines)
+    # Only the newest window is inside the last 10 seconds
+    assert sum(count for (_, stack), count in profiler.merged(10).items() if "_spin" in stack) == 1
+
+    clock.now += 30
+    assert profiler.collapsed() == "" and profiler.endpoints() == {}
+
+
+def test_samples_are_attributed_to_the_endpoint_being_served() -> None:
+    profiler = SamplingProfiler(interval=0.001, max_stacks=2)
+
+    def busy(deadline):
+        while time.monotonic() < deadline:
+            sum(range(100))
+        return True
+
+    async def handler():
+        with profiler.request("POST /api/assistant/chat"):
+            # Work in a child task and on a worker thread is still credited to the request
+            await asyncio.create_task(asyncio.sleep(0))
+            return await asyncio.get_running_loop().run_in_executor(
+                None, profiler.wrap(busy), time.monotonic() + 0.2
+            )
+
+    async def main():
+        assert profiler.start()
+        try:
+            assert not profiler.start()
+            return await handler()
+        finally:
+            assert profiler.stop()
+
+    assert asyncio.run(main())
+    assert not profiler.running and profiler.stats["samples"] > 0
+
+    assert profiler.endpoints()["POST /api/assistant/chat"] > 0
+    by_endpoint = profiler.collapsed(by_endpoint=True, endpoint="POST /api/assistant/chat")
+    assert by_endpoint and all(line.startswith("POST /api/assistant/chat;") for line in by_endpoint.splitlines())
+    assert any("busy" in line or TRUNCATED in line for line in by_endpoint.splitlines())
+    top = profiler.top_functions(endpoint="POST /api/assistant/chat", limit=5)
+    assert top and top[0]["self"] > 0 and 0 < top[0]["total_percent"] <= 100
+    assert set(profiler.endpoints()) <= {"POST /api/assistant/chat", UNATTRIBUTED}
+
+
+def test_duration_stops_sampling_and_restores_the_task_factory() -> None:
+    profiler = SamplingProfiler(interval=0.005)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        assert profiler.start(duration=0.05)
+        assert loop.get_task_factory() is not None
+        deadline = time.monotonic() + 2
+        while profiler._thread is not None and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return loop.get_task_factory()
+
+    assert asyncio.run(main()) is None
+    assert not profiler.running and not profiler.stop()
+
+    # Without a running profiler, tagging and wrapping are free
+    with profiler.request("GET /x"):
+        assert profiler.wrap(len) is len
+
+    async def stage():
+        return await StageScheduler(max_workers=1).start().cpu("intent", len, "abc")
+
+    assert asyncio.run(stage()) == 3
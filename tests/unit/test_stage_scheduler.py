@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from src.core.pipeline import ConversationalPipeline
+from src.core.stage_scheduler import StageScheduler
+
+
+def test_cpu_stages_leave_event_loop_responsive() -> None:
+    scheduler = StageScheduler(max_workers=2)
+
+    async def scenario():
+        run = scheduler.start()
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        results = await asyncio.gather(run.cpu("a", time.sleep, 0.1), run.cpu("b", time.sleep, 0.1))
+        beat.cancel()
+        return run, results, ticks
+
+    started = time.perf_counter()
+    run, results, ticks = asyncio.run(scenario())
+    elapsed = time.perf_counter() - started
+    scheduler.shutdown()
+
+    assert results == [None, None]
+    assert elapsed < 0.19  # both stages overlapped
+    assert ticks >= 5  # the loop kept serving other work meanwhile
+    assert set(run.as_dict()) == {"a", "b", "total"}
+
+
+def test_io_stage_times_out_with_default() -> None:
+    scheduler = StageScheduler(ai_timeout=0.05)
+
+    async def scenario():
+        run = scheduler.start()
+        value = await run.io("ai", asyncio.sleep(1, result="late"), default="fallback")
+        return run, value
+
+    run, value = asyncio.run(scenario())
+
+    assert value == "fallback"
+    assert scheduler.stats["timeouts"] == 1
+    assert 40 <= run.timings["ai"] < 500
+
+
+def test_pipeline_reports_stage_timings() -> None:
+    pipeline = ConversationalPipeline()
+    query = "show failed logins for user admin in the last 24 hours"
+
+    result = asyncio.run(pipeline.process(query))
+    asyncio.run(pipeline.cleanup())
+
+    assert result["query_valid"] is True
+    assert result["time_range"]["description"] == "Last 24 hours"
+    assert {"intent", "entities", "time_range", "query_build", "validation", "total"} <= set(result["stage_timings"])
+    assert [e["value"] for e in result["entities"]] == [
+        e.value for e in pipeline.entity_extractor.extract_entities(query)
+    ]
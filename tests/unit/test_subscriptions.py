@@ -0,0 +1,52 @@
+import pytest
+
+from src.core.streaming.subscriptions import Subscription, SubscriptionIndex
+
+
+def _event(event_type="security_alert", severity="high", techniques=(), hosts=(), users=()):
+    return {"event_type": event_type, "severity": severity, "technique": list(techniques),
+            "host": list(hosts), "user": list(users)}
+
+
+def test_dimensions_are_anded_and_values_ored() -> None:
+    index = SubscriptionIndex()
+    index.subscribe(Subscription("all"))
+    index.subscribe(Subscription.from_request("soc", {"event_types": ["security_alert", "attack_chain"],
+                                                      "min_severity": "high"}))
+    index.subscribe(Subscription.from_request("hunter", {"techniques": ["t1003.001"], "hosts": ["WIN-SERVER01"]}))
+
+    assert index.match(_event(severity="critical")) == {"all", "soc"}
+    assert index.match(_event(severity="medium")) == {"all"}
+    assert index.match(_event("system_metric", "info")) == {"all"}
+    assert index.match(_event(techniques=["T1003.001"], hosts=["win-server01"])) == {"all", "soc", "hunter"}
+    assert index.match(_event(severity="low", techniques=["T1003.001"], hosts=["LINUX-WS01"])) == {"all"}
+
+
+def test_host_and_user_globs_are_memoized_and_invalidated() -> None:
+    index = SubscriptionIndex()
+    index.subscribe(Subscription.from_request("windows", {"hosts": "WIN-*"}))
+    index.subscribe(Subscription.from_request("admins", {"users": ["admin", "svc_*"]}))
+
+    assert index.match(_event(hosts=["WIN-SERVER01"], users=["svc_backup"])) == {"windows", "admins"}
+    assert index.match(_event(hosts=["DESKTOP-ABC123"], users=["guest"])) == set()
+    assert "win-server01" in index._patterns["host"]._cache
+
+    index.subscribe(Subscription.from_request("windows", {"hosts": "DESKTOP-*"}))
+    assert index.match(_event(hosts=["WIN-SERVER01"])) == set()
+    assert index.match(_event(hosts=["DESKTOP-ABC123"])) == {"windows"}
+
+
+def test_unsubscribe_cleans_postings_and_bad_topics_are_rejected() -> None:
+    index = SubscriptionIndex()
+    index.subscribe(Subscription.from_request("a", {"severity": "high", "users": "admin"}))
+    index.unsubscribe("a")
+    index.unsubscribe("missing")
+
+    assert index.match(_event(users=["admin"])) == set()
+    assert not index._exact["severity"] and not index._patterns["user"].exact
+    assert index.get_stats()["subscriptions"] == 0
+
+    with pytest.raises(ValueError):
+        Subscription.from_request("b", {"colour": ["red"]})
+    with pytest.raises(ValueError):
+        Subscription.from_request("b", {"min_severity": "urgent"})
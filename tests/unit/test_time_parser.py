@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from src.core.nlp.entity_extractor import EntityExtractor
+from src.core.nlp.schema_mapper import SchemaMapper
+from src.core.nlp.time_parser import get_parser_stats, parse_time_expression, tokenize
+from src.core.query.builder import QueryBuilder
+from src.core.query.codegen import lower
+from src.core.query.validator import QueryValidator
+
+
+def test_grammar_covers_relative_calendar_and_absolute_phrases() -> None:
+    cases = {
+        "show failed logins in the last 24 hours": ("now-24h", "now", "Last 24 hours"),
+        "past hour": ("now-1h", "now", "Last 1 hour"),
+        "last two weeks": ("now-2w", "now", "Last 2 weeks"),
+        "7d": ("now-7d", "now", "Last 7 days"),
+        "30m": ("now-30m", "now", "Last 30 minutes"),
+        "12": ("now-12h", "now", "Last 12 hours"),
+        "3 days ago": ("now-3d", "now", "Since 3 days ago"),
+        "alerts from today": ("now/d", "now", "Today"),
+        "yesterday's logins": ("now-1d/d", "now/d", "Yesterday"),
+        "this month": ("now/M", "now", "This month"),
+        "between 2024-01-05 and 2024-01-07": ("2024-01-05T00:00:00", "2024-01-07T23:59:59", "2024-01-05 to 2024-01-07"),
+        "from 01/05/2024 to 01/06/2024": ("2024-01-05T00:00:00", "2024-01-06T23:59:59", "2024-01-05 to 2024-01-06"),
+        "failed logins on 2025-10-01": ("2025-10-01T00:00:00", "2025-10-01T23:59:59", "On 2025-10-01"),
+    }
+    for text, (start, end, description) in cases.items():
+        expression = parse_time_expression(text)
+        assert (expression.start, expression.end, expression.description) == (start, end, description), text
+
+    assert parse_time_expression("show me malware on host-7") is None
+    assert parse_time_expression("") is None
+    assert [token.kind for token in tokenize("last 5 mins after hours")] == ["LAST", "NUMBER", "UNIT", "AFTER_HOURS"]
+
+    # Calendar bounds are date math the validator can size
+    validator = QueryValidator()
+    for text, hours in (("yesterday", 24), ("this week", None)):
+        window = validator.time_window_hours({"query": {"range": {"@timestamp": parse_time_expression(text).range()}}})
+        assert window is not None and (hours is None or abs(window - hours) < 0.01), text
+
+    text = "Failed logins during the last 3 hours on dc01"
+    span = parse_time_expression(text).span
+    assert text[span[0]:span[1]] == "last 3 hours"
+
+
+def test_windows_align_to_buckets_and_parses_are_memoized() -> None:
+    now = datetime(2024, 3, 6, 14, 37, 12)  # a Wednesday
+    day = parse_time_expression("last 24 hours")
+    assert day.bucket == "h"
+    assert day.resolve(now, aligned=True) == (datetime(2024, 3, 5, 14), datetime(2024, 3, 6, 15))
+    assert day.resolve(datetime(2024, 3, 6, 14, 1), aligned=True) == day.resolve(now, aligned=True)
+    assert day.aligned().start == "now-24h/h"
+    assert parse_time_expression("last 30 days").bucket == "d"
+    assert parse_time_expression("last hour").bucket == "m"
+
+    business = parse_time_expression("logins during business hours last week")
+    assert business.hours == "business" and business.start == "now-1w"
+    windows = business.hour_windows(now)
+    assert len(windows) == 6 and all(start.hour == 9 and end.hour == 17 for start, end in windows[1:-1])
+    assert parse_time_expression("after hours logins").start == "now-24h"
+
+    before = get_parser_stats()
+    for _ in range(3):
+        parse_time_expression("errors over the last 6 hours")
+    after = get_parser_stats()
+    assert after["misses"] - before["misses"] == 1 and after["hits"] - before["hits"] == 2
+
+
+def test_pipeline_components_share_the_parser() -> None:
+    extracted = EntityExtractor().extract_time_range("vpn logins in the last 6 hours")
+    assert extracted["range"] == {"gte": "now-6h", "lte": "now"}
+    assert extracted["description"] == "Last 6 hours"
+    assert SchemaMapper().map_time_range("this week") == {"gte": "now/w", "lte": "now"}
+
+    builder = QueryBuilder()
+    plain = builder.build_ir("failed_login", [{"type": "time_range", "value": "last 2 days"}], {})
+    assert (plain.time_range.start, plain.time_range.end) == ("now-2d", "now")
+
+    after_hours = lower(builder.build_ir(
+        "failed_login", [{"type": "time_range", "value": "after hours over the last 3 days"}], {}
+    ), "elasticsearch")
+    excluded = after_hours["query"]["bool"]["must_not"][0]["bool"]["should"]
+    assert excluded and all("@timestamp" in clause["range"] for clause in excluded)
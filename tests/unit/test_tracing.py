@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+from src.core.monitoring import tracing
+from src.core.monitoring.tracing import (
+    NOOP_SPAN, FileSpanExporter, InMemorySpanExporter, SpanContext, Tracer, extract, inject, traced
+)
+from src.core.stage_scheduler import StageScheduler
+
+
+def _enable(sample_rate: float = 1.0) -> InMemorySpanExporter:
+    memory = InMemorySpanExporter()
+    tracing.tracer.enabled = True
+    tracing.tracer.sample_rate = sample_rate
+    tracing.tracer.exporters, tracing.tracer.memory = [], None
+    tracing.tracer.add_exporter(memory)
+    return memory
+
+
+def _restore(state) -> None:
+    tracing.tracer.enabled, tracing.tracer.sample_rate, tracing.tracer.exporters, tracing.tracer.memory = state
+
+
+def test_spans_nest_across_stages_and_cost_nothing_when_disabled() -> None:
+    state = (tracing.tracer.enabled, tracing.tracer.sample_rate, tracing.tracer.exporters, tracing.tracer.memory)
+
+    @traced("cache.get")
+    async def lookup():
+        tracing.current_span().set_attribute("cache.hit", True)
+        return 42
+
+    async def request():
+        with tracing.tracer.start_span("pipeline.process"):
+            run = StageScheduler(max_workers=1).start()
+            intent = await run.cpu("intent", len, "abc")
+            with run.inline("schema_mapping"):
+                value = await lookup()
+            return intent, value
+
+    try:
+        tracing.tracer.enabled = False
+        assert tracing.tracer.start_span("anything") is NOOP_SPAN
+        assert asyncio.run(request()) == (3, 42)
+
+        memory = _enable()
+        asyncio.run(request())
+        spans = {span.name: span for span in memory.get_finished_spans()}
+        assert set(spans) == {"pipeline.process", "pipeline.intent", "pipeline.schema_mapping", "cache.get"}
+        root = spans["pipeline.process"]
+        assert len({span.context.trace_id for span in spans.values()}) == 1 and root.parent_id is None
+        assert spans["pipeline.intent"].parent_id == root.context.span_id
+        assert spans["cache.get"].parent_id == spans["pipeline.schema_mapping"].context.span_id
+        assert spans["cache.get"].attributes == {"cache.hit": True}
+        assert tracing.current_span() is NOOP_SPAN
+    finally:
+        _restore(state)
+
+
+def test_traceparent_propagates_and_sampling_follows_the_caller() -> None:
+    state = (tracing.tracer.enabled, tracing.tracer.sample_rate, tracing.tracer.exporters, tracing.tracer.memory)
+    incoming = {"type": "chat_message", "traceparent": "00-" + "a" * 32 + "-" + "b" * 16 + "-01"}
+    try:
+        memory = _enable(sample_rate=0.0)
+        with tracing.tracer.start_span("websocket.chat_message", parent=extract(incoming)) as span:
+            reply = inject({"type": "chat_response"})
+        assert span.parent_id == "b" * 16 and span.context.trace_id == "a" * 32
+        assert SpanContext.from_traceparent(reply["traceparent"]) == span.context
+
+        unsampled = {"traceparent": incoming["traceparent"][:-2] + "00"}
+        with tracing.tracer.start_span("websocket.ping", parent=extract(unsampled)) as quiet:
+            with tracing.tracer.start_span("child") as child:
+                child.set_attribute("ignored", True)
+            assert inject({})["traceparent"].endswith("-00")
+        assert not quiet.is_recording and not child.is_recording
+        assert [s.name for s in memory.get_finished_spans()] == ["websocket.chat_message"]
+
+        for bad in (None, "garbage", "00-" + "0" * 32 + "-" + "b" * 16 + "-01", "00-xyz-abc-01"):
+            assert extract({"traceparent": bad}) is None
+    finally:
+        _restore(state)
+
+
+def test_exporters_keep_traces_in_memory_and_on_disk(tmp_path) -> None:
+    path = tmp_path / "traces.jsonl"
+    file_exporter = FileSpanExporter(path, flush_every=10)
+    local = Tracer(enabled=True, exporters=[InMemorySpanExporter(), file_exporter])
+
+    with local.start_span("chat") as root:
+        with local.start_span("source.query", {"source.id": "es"}):
+            pass
+        try:
+            with local.start_span("response.summary"):
+                raise RuntimeError("gemini down")
+        except RuntimeError:
+            pass
+    assert not path.exists()  # buffered until flush_every or shutdown
+    local.shutdown()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["source.query", "response.summary", "chat"]
+    assert lines[1]["status"] == {"code": "ERROR", "message": "gemini down"}
+    assert lines[0]["parentSpanId"] == root.context.span_id and lines[0]["attributes"] == {"source.id": "es"}
+
+    trace = local.memory.get_trace(root.context.trace_id)
+    assert [span["name"] for span in trace["spans"]] == ["chat", "source.query", "response.summary"]
+    summary = local.memory.recent_traces()
+    assert summary[0]["root"] == "chat" and summary[0]["spans"] == 3 and summary[0]["status"] == "ERROR"